@@ -0,0 +1,164 @@
+"""Benchmark of rendering figures for the vision model.
+
+This script renders synthetic figures of several sizes with several render policies
+and compares rendering time and payload size (base64 encoded, as sent to Azure Open AI)
+against the fixed 300 DPI png rendering used before RenderPolicy.
+
+With --processes, it also renders the diagram on every page of a long PDF
+in the threads of this process and in worker processes, and compares the time.
+
+Usage:
+    python benchmarks/bench_figure_rendering.py [--repeat 5] [--processes 8] [--pages 64]
+"""
+from argparse import ArgumentParser
+import base64
+import os
+import statistics
+import sys
+import time
+
+import fitz
+
+sys.path.append(
+    os.path.abspath(
+        os.path.join(
+            os.path.dirname(__file__),
+            '../src'
+        )
+    )
+)
+from packages.domain.image_extractor import ImageExtractor
+from packages.domain.render_policy import RenderPolicy
+from packages.infrastructure.process_pool_image_extractor import ProcessPoolImageExtractor
+
+# name -> page number and bounding box on an A4 page in points
+FIGURES = {
+    "icon (0.5 inch)": (1, [100, 100, 136, 136]),
+    "chart (half page)": (1, [36, 36, 559, 400]),
+    "diagram (full page)": (1, [0, 0, 595, 842]),
+    "photo (half page)": (2, [36, 36, 559, 400])
+}
+
+def create_pdf(path: str) -> None:
+    """Create a PDF with a page filled with a diagram of boxes, lines and labels, and a page with a photo-like image."""
+
+    with fitz.open() as doc:
+        page = doc.new_page(width=595, height=842)
+        for row in range(40):
+            for column in range(12):
+                x, y = 10 + column * 48, 10 + row * 20.5
+                color = ((row * 7 % 10) / 10, (column * 3 % 10) / 10, 0.5)
+                page.draw_rect(fitz.Rect(x, y, x + 40, y + 16), color=(0, 0, 0), fill=color)
+                page.insert_text((x + 2, y + 11), f"N{row}-{column}", fontsize=7)
+                if column:
+                    page.draw_line((x - 8, y + 8), (x, y + 8), color=(0.2, 0.2, 0.2))
+
+        # Smooth gradient with noise, which compresses like a photo.
+        width, height = 1200, 800
+        random = os.urandom(width * height)
+        samples = bytearray(width * height * 3)
+        for y in range(height):
+            for x in range(width):
+                noise = random[y * width + x] % 24
+                idx = (y * width + x) * 3
+                samples[idx] = (x * 200 // width + noise) % 256
+                samples[idx + 1] = (y * 200 // height + noise) % 256
+                samples[idx + 2] = ((x + y) * 100 // (width + height) + noise) % 256
+        photo = fitz.Pixmap(fitz.csRGB, width, height, bytes(samples), False)
+        doc.new_page(width=595, height=842).insert_image(fitz.Rect(36, 36, 559, 400), pixmap=photo)
+        doc.save(path)
+
+def measure(pdf_path: str, policy: RenderPolicy, page_number: int, bounding_box: list[float], repeat: int) -> tuple[float, int, str]:
+    """Render one figure repeatedly.
+
+    Returns:
+        median milliseconds of rendering and encoding, base64 payload bytes and image size.
+    """
+
+    elapsed = []
+    with ImageExtractor(render_policy=policy).open(pdf_path) as session:
+        for _ in range(repeat):
+            start = time.perf_counter()
+            image = session.render(page_number, bounding_box)
+            payload = base64.b64encode(image)
+            elapsed.append((time.perf_counter() - start) * 1000)
+
+    pix = fitz.Pixmap(image) if policy.image_format != "webp" else None
+    size = f"{pix.width}x{pix.height}" if pix is not None else "-"
+    return statistics.median(elapsed), len(payload), size
+
+def measure_batch(pdf_path: str, extractor: ImageExtractor, page_count: int) -> float:
+    """Render the diagram of every page at once.
+
+    Returns:
+        seconds of rendering all figures.
+    """
+
+    regions = [(page_number, FIGURES["diagram (full page)"][1]) for page_number in range(1, page_count + 1)]
+    start = time.perf_counter()
+    with extractor.open(pdf_path) as session:
+        session.render_all(regions)
+
+    return time.perf_counter() - start
+
+def compare_processes(pdf_path: str, processes: int, page_count: int) -> None:
+    """Compare rendering figures of a long PDF in this process and in worker processes."""
+
+    long_pdf_path = pdf_path.replace(".pdf", "_long.pdf")
+    with fitz.open(pdf_path) as source, fitz.open() as doc:
+        for _ in range(page_count):
+            doc.insert_pdf(source, from_page=0, to_page=0)
+        doc.save(long_pdf_path)
+
+    extractor = ProcessPoolImageExtractor(processes)
+    try:
+        # The first batch starts the worker processes, which is not counted.
+        measure_batch(long_pdf_path, extractor, page_count)
+        print(f"## {page_count} full page diagrams")
+        print(f"{'extractor':<22}{'seconds':>12}{'speedup':>12}")
+        baseline = measure_batch(long_pdf_path, ImageExtractor(), page_count)
+        print(f"{'in process':<22}{baseline:>12.2f}{1:>11.1f}x")
+        elapsed = measure_batch(long_pdf_path, extractor, page_count)
+        print(f"{f'{processes} processes':<22}{elapsed:>12.2f}{baseline / elapsed:>11.1f}x")
+        print(f"(CPU cores: {os.cpu_count()})")
+    finally:
+        extractor.close()
+        os.remove(long_pdf_path)
+
+if __name__ == "__main__":
+    parser = ArgumentParser(description="Compare render policies of figures.")
+    parser.add_argument("--repeat", type=int, default=5, help="number of renders of each figure")
+    parser.add_argument("--processes", type=int, default=0, help="number of worker processes to compare with rendering in this process")
+    parser.add_argument("--pages", type=int, default=64, help="number of pages of the PDF rendered with --processes")
+    args = parser.parse_args()
+
+    policies = {
+        "before (300 DPI png)": RenderPolicy(max_dpi=300, max_edge_px=None, max_pixels=None),
+        "default (png)": RenderPolicy(),
+        "jpeg q85": RenderPolicy(image_format="jpeg", quality=85),
+        "jpeg q70, 1024px": RenderPolicy(max_edge_px=1024, max_pixels=1024 * 768, image_format="jpeg", quality=70)
+    }
+    try:
+        import PIL
+        policies["webp q80"] = RenderPolicy(image_format="webp", quality=80)
+    except ImportError:
+        print("Pillow is not installed. webp is skipped.\n")
+
+    pdf_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "bench_figure_rendering.pdf")
+    create_pdf(pdf_path)
+
+    try:
+        for figure_name, (page_number, bounding_box) in FIGURES.items():
+            print(f"## {figure_name}")
+            print(f"{'policy':<22}{'image':>12}{'render ms':>12}{'payload KB':>12}{'vs before':>12}")
+            baseline = None
+            for policy_name, policy in policies.items():
+                ms, payload, size = measure(pdf_path, policy, page_number, bounding_box, args.repeat)
+                baseline = baseline or payload
+                print(f"{policy_name:<22}{size:>12}{ms:>12.1f}{payload / 1024:>12.1f}{payload / baseline:>11.0%}")
+            print()
+
+        if args.processes > 0:
+            compare_processes(pdf_path, args.processes, args.pages)
+    finally:
+        os.remove(pdf_path)
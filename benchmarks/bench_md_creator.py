@@ -0,0 +1,128 @@
+"""Benchmark of creating markdown from large Azure Document Intelligence results.
+
+This script creates synthetic results of documents with many pages
+and measures how the time of DocumentIntelligenceMdCreator.create grows with the number of pages.
+Time per page stays flat if markdown is assembled in linear time.
+Time of wrapping the result in AnalyzeResult, which create did before it read the JSON response directly,
+is shown for comparison. Peak memory allocated by create is measured by tracemalloc in a separate run.
+
+Usage:
+    python benchmarks/bench_md_creator.py [--pages 1000 2500 5000 10000] [--repeat 3]
+"""
+from argparse import ArgumentParser
+import os
+import statistics
+import sys
+import time
+import tracemalloc
+
+from azure.ai.documentintelligence.models import AnalyzeResult
+
+sys.path.append(
+    os.path.abspath(
+        os.path.join(
+            os.path.dirname(__file__),
+            '../src'
+        )
+    )
+)
+from packages.domain.document_intelligence_md_creator import DocumentIntelligenceMdCreator
+from packages.domain.image_extractor import ImageExtractor
+from packages.domain.image_summarizer import ImageSummarizer
+
+PARAGRAPHS_PER_PAGE = 5
+TABLE_EVERY_PAGES = 10
+TABLE_ROWS = 20
+TABLE_COLUMNS = 5
+
+class NoImageSummarizer(ImageSummarizer):
+    """Summarizer which is never called, because synthetic results have no figures."""
+
+    def summarize(self, img: bytes | str) -> str:
+        raise NotImplementedError()
+
+def create_result(page_count: int) -> dict[str, any]:
+    """Create a result with paragraphs of several roles on each page, and a table every TABLE_EVERY_PAGES pages."""
+
+    region = [0.5, 0.5, 8.0, 0.5, 8.0, 1.0, 0.5, 1.0]
+    paragraphs = []
+    tables = []
+    elements = []
+    for page_number in range(1, page_count + 1):
+        for i in range(PARAGRAPHS_PER_PAGE):
+            role = "sectionHeading" if i == 0 else None
+            paragraph = {
+                "content": f"Paragraph {i} of page {page_number}. " * 4,
+                "boundingRegions": [{"pageNumber": page_number, "polygon": region}],
+                "spans": [{"offset": 0, "length": 1}]
+            }
+            if role:
+                paragraph["role"] = role
+            elements.append(f"/paragraphs/{len(paragraphs)}")
+            paragraphs.append(paragraph)
+
+        if page_number % TABLE_EVERY_PAGES == 0:
+            cells = []
+            for row in range(TABLE_ROWS):
+                for column in range(TABLE_COLUMNS):
+                    cell = {"rowIndex": row, "columnIndex": column, "content": f"r{row}c{column}"}
+                    if row == 0:
+                        cell["kind"] = "columnHeader"
+                    cells.append(cell)
+            elements.append(f"/tables/{len(tables)}")
+            tables.append({"rowCount": TABLE_ROWS, "columnCount": TABLE_COLUMNS, "cells": cells})
+
+    return {
+        "content": "",
+        "paragraphs": [{**paragraphs[0], "role": "title"}] + paragraphs[1:],
+        "tables": tables,
+        "figures": [],
+        "sections": [{"elements": elements}]
+    }
+
+def measure(creator: DocumentIntelligenceMdCreator, result: dict[str, any], repeat: int) -> tuple[float, float, int]:
+    """Create markdown repeatedly.
+
+    Returns:
+        median seconds of create, median seconds of AnalyzeResult in it and length of the markdown.
+    """
+
+    elapsed = []
+    model_elapsed = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        AnalyzeResult(result)
+        model_elapsed.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        markdown = creator.create(result, "unused.pdf")
+        elapsed.append(time.perf_counter() - start)
+
+    return statistics.median(elapsed), statistics.median(model_elapsed), len(markdown)
+
+def measure_peak_memory(creator: DocumentIntelligenceMdCreator, result: dict[str, any]) -> int:
+    """Get peak bytes allocated while creating markdown, including the markdown itself."""
+
+    tracemalloc.start()
+    try:
+        creator.create(result, "unused.pdf")
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+if __name__ == "__main__":
+    parser = ArgumentParser(description="Measure scaling of markdown creation with the number of pages.")
+    parser.add_argument("--pages", type=int, nargs="+", default=[1000, 2500, 5000, 10000], help="numbers of pages of synthetic results")
+    parser.add_argument("--repeat", type=int, default=3, help="number of runs of each size")
+    args = parser.parse_args()
+
+    creator = DocumentIntelligenceMdCreator(ImageExtractor(), NoImageSummarizer())
+
+    print(f"{'pages':>8}{'paragraphs':>12}{'tables':>8}{'markdown MB':>13}{'seconds':>10}{'ms/page':>10}{'model ms/page':>15}{'peak MB':>10}")
+    for page_count in args.pages:
+        result = create_result(page_count)
+        seconds, model_seconds, length = measure(creator, result, args.repeat)
+        peak = measure_peak_memory(creator, result)
+        print(f"{page_count:>8}{len(result['paragraphs']):>12}{len(result['tables']):>8}"
+              f"{length / 1024 / 1024:>13.1f}{seconds:>10.2f}{seconds / page_count * 1000:>10.3f}"
+              f"{model_seconds / page_count * 1000:>15.3f}{peak / 1024 / 1024:>10.1f}")
@@ -0,0 +1,204 @@
+"""End-to-end benchmark of converting documents against fake Azure services.
+
+This script starts local fake servers of Azure Document Intelligence and Azure Open AI
+(tests/fakes) with the given latency, jitter and throttling, and converts a batch of synthetic PDFs
+by DocumentConvertService with the real Azure clients, once for each setting of workers.
+
+Each setting runs in its own process, so that peak RSS of the settings do not mix.
+Per-document latency is the time from the start of analyzing a document until its markdown is created.
+
+Usage:
+    python benchmarks/bench_pipeline.py [--documents 40] [--settings 1:1:1 1:4:2 2:8:4]
+        [--di-latency 0.05] [--di-processing 1.0] [--oai-latency 0.5] [--jitter 0.2] [--throttle-rate 0.0]
+        [--use-async]
+
+    A setting is the numbers of convert, analyze and render workers separated by ':',
+    optionally followed by the number of documents analyzed at the same time, such as 1:2:2:32.
+"""
+from argparse import SUPPRESS, ArgumentParser
+from concurrent.futures import Future
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from threading import Lock
+from typing import IO, Iterator, MutableMapping
+
+import fitz
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(ROOT)
+sys.path.append(os.path.join(ROOT, 'src'))
+from packages.domain.document_extractor import DocumentExtractor
+from packages.domain.md_creator import MdCreator
+
+RESULT_PREFIX = "RESULT "
+
+class TimedDocumentExtractor(DocumentExtractor):
+    """Record when analysis of each document starts."""
+
+    def __init__(self, extractor: DocumentExtractor, started_at: dict[str, float]) -> None:
+        self.extractor = extractor
+        self.started_at = started_at
+
+    def extract(self, document: IO) -> dict[str, any]:
+        self.started_at.setdefault(os.path.basename(document.name), time.perf_counter())
+        return self.extractor.extract(document)
+
+    def begin_extract(self, document: IO) -> Future:
+        self.started_at.setdefault(os.path.basename(document.name), time.perf_counter())
+        return self.extractor.begin_extract(document)
+
+class TimedMdCreator(MdCreator):
+    """Record when markdown of each document is created."""
+
+    def __init__(self, md_creator: MdCreator, finished_at: dict[str, float]) -> None:
+        self.md_creator = md_creator
+        self.finished_at = finished_at
+        self.lock = Lock()
+
+    def create(self, analyze_result: dict[str, any], source_pdf_path: str) -> str:
+        return ''.join(self.create_chunks(analyze_result, source_pdf_path))
+
+    def create_chunks(
+        self,
+        analyze_result: dict[str, any],
+        source_pdf_path: str,
+        figure_summaries: MutableMapping[int, str] | None = None,
+        skipped_figures: MutableMapping[int, str] | None = None
+    ) -> Iterator[str]:
+        yield from self.md_creator.create_chunks(analyze_result, source_pdf_path, figure_summaries, skipped_figures)
+        with self.lock:
+            self.finished_at[os.path.basename(source_pdf_path)] = time.perf_counter()
+
+def create_documents(source_dir: str, count: int) -> None:
+    """Create one-page PDFs with a figure where the fixture of Document Intelligence has it."""
+
+    for idx in range(count):
+        with fitz.open() as doc:
+            page = doc.new_page(width=612, height=792)
+            page.insert_text((72, 72), f"Document {idx}", fontsize=20)
+            # The figure of the fixture is at (1.03, 7.12) - (4.14, 9.07) inches.
+            figure = fitz.Rect(1.03 * 72, 7.12 * 72, 4.14 * 72, 9.07 * 72)
+            page.draw_rect(figure, color=(0, 0, 0), fill=(0.2, 0.4, 0.8))
+            page.insert_text((figure.x0 + 10, figure.y0 + 30), f"Figure of document {idx}", fontsize=12, color=(1, 1, 1))
+            doc.save(os.path.join(source_dir, f"document_{idx:05d}.pdf"))
+
+def percentile(values: list[float], ratio: float) -> float:
+    """Get percentile of values by the nearest rank."""
+
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, round(ratio * len(ordered)) - 1))]
+
+def run_setting(args) -> None:
+    """Convert documents with one setting in this process, and print the result as JSON."""
+
+    from injector import Injector
+    from packages.application.document_convert_service import DocumentConvertService
+    from packages.dicontainer.di_container import DIContainer
+    from packages.domain.image_extractor import ImageExtractor
+    from packages.domain.image_summarizer import ImageSummarizer
+    from packages.domain.pdf_generator import PdfGenerator
+
+    os.environ.update({
+        "DI_KEY": "fake",
+        "DI_ENDPOINT": args.di_endpoint,
+        "AZURE_OPENAI_API_KEY": "fake",
+        "AZURE_OPENAI_ENDPOINT": args.oai_endpoint,
+        "AZURE_OPENAI_API_VERSION": "2024-06-01",
+        "AZURE_OPENAI_DEPLOYMENT": "fake-deployment"
+    })
+    convert_workers, analyze_workers, render_workers, *analyze_in_flight = [int(count) for count in args.setting.split(':')]
+
+    container = DIContainer(use_async=args.use_async)
+    injector = Injector([container])
+    started_at: dict[str, float] = {}
+    finished_at: dict[str, float] = {}
+    service = DocumentConvertService(
+        TimedDocumentExtractor(injector.get(DocumentExtractor), started_at),
+        injector.get(PdfGenerator),
+        injector.get(ImageExtractor),
+        injector.get(ImageSummarizer),
+        TimedMdCreator(injector.get(MdCreator), finished_at)
+    )
+
+    with tempfile.TemporaryDirectory() as output_dir:
+        start = time.perf_counter()
+        report = service.extractDocument(
+            args.source_dir,
+            output_dir,
+            convert_workers=convert_workers,
+            analyze_workers=analyze_workers,
+            render_workers=render_workers,
+            analyze_in_flight=analyze_in_flight[0] if analyze_in_flight else 0
+        )
+        elapsed = time.perf_counter() - start
+    container.close()
+
+    latencies = [finished_at[name] - started_at[name] for name in finished_at if name in started_at]
+    print(RESULT_PREFIX + json.dumps({
+        "converted": len(report.converted),
+        "failed": len(report.failed),
+        "seconds": elapsed,
+        "p50": percentile(latencies, 0.5) if latencies else 0,
+        "p99": percentile(latencies, 0.99) if latencies else 0,
+        # ru_maxrss is in kilobytes on Linux.
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    }), flush=True)
+
+if __name__ == "__main__":
+    parser = ArgumentParser(description="Measure throughput of DocumentConvertService against fake Azure services.")
+    parser.add_argument("--documents", type=int, default=40, help="number of documents of the batch")
+    parser.add_argument("--settings", nargs="+", default=["1:1:1", "1:4:2", "2:8:4"], help="convert:analyze:render workers, and optionally :analyze in flight, to compare")
+    parser.add_argument("--di-latency", type=float, default=0.05, help="seconds of each request to Document Intelligence")
+    parser.add_argument("--di-processing", type=float, default=1.0, help="seconds until a document is analyzed")
+    parser.add_argument("--oai-latency", type=float, default=0.5, help="seconds of each request to Open AI")
+    parser.add_argument("--jitter", type=float, default=0.2, help="upper limit of random seconds added to latencies")
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="ratio of requests answered with 429")
+    parser.add_argument("--use-async", action="store_true", help="send requests from one event loop")
+    # Arguments of the process of a setting.
+    parser.add_argument("--setting", help=SUPPRESS)
+    parser.add_argument("--source-dir", help=SUPPRESS)
+    parser.add_argument("--di-endpoint", help=SUPPRESS)
+    parser.add_argument("--oai-endpoint", help=SUPPRESS)
+    args = parser.parse_args()
+
+    if args.setting is not None:
+        run_setting(args)
+        sys.exit(0)
+
+    from tests.fakes.fake_document_intelligence_server import FakeDocumentIntelligenceServer
+    from tests.fakes.fake_openai_server import FakeOpenAIServer
+    from tests.fakes.fake_server import ServiceProfile
+
+    di_server = FakeDocumentIntelligenceServer(
+        ServiceProfile(latency_sec=args.di_latency, jitter_sec=args.jitter, throttle_rate=args.throttle_rate, seed=1),
+        processing_sec=args.di_processing
+    )
+    oai_server = FakeOpenAIServer(
+        ServiceProfile(latency_sec=args.oai_latency, jitter_sec=args.jitter, throttle_rate=args.throttle_rate, seed=2)
+    )
+
+    with tempfile.TemporaryDirectory() as source_dir, di_server, oai_server:
+        create_documents(source_dir, args.documents)
+        print(f"{args.documents} documents, Document Intelligence {args.di_latency}s + {args.di_processing}s processing, "
+              f"Open AI {args.oai_latency}s, jitter {args.jitter}s, throttled {args.throttle_rate:.0%}"
+              f"{', async' if args.use_async else ''}")
+        print(f"{'workers':>10}{'converted':>11}{'failed':>8}{'seconds':>9}{'docs/sec':>10}{'p50 s':>8}{'p99 s':>8}{'peak RSS MB':>13}")
+        for setting in args.settings:
+            command = [
+                sys.executable, os.path.abspath(__file__),
+                "--setting", setting,
+                "--source-dir", source_dir,
+                "--di-endpoint", di_server.url,
+                "--oai-endpoint", oai_server.url
+            ] + (["--use-async"] if args.use_async else [])
+            output = subprocess.run(command, stdout=subprocess.PIPE, text=True, check=True).stdout
+            result = json.loads(next(line for line in output.splitlines() if line.startswith(RESULT_PREFIX))[len(RESULT_PREFIX):])
+            print(f"{setting:>10}{result['converted']:>11}{result['failed']:>8}{result['seconds']:>9.2f}"
+                  f"{result['converted'] / result['seconds']:>10.2f}{result['p50']:>8.2f}{result['p99']:>8.2f}"
+                  f"{result['peak_rss_mb']:>13.1f}")
+        print(f"Requests: Document Intelligence {di_server.counts}, Open AI {oai_server.counts}")
@@ -0,0 +1,111 @@
+"""Benchmark of the startup time of the batch entry point.
+
+This script runs `python -X importtime` for each scenario of startup,
+and reports the time of the imports of the scenario and the slowest modules imported by it.
+Modules imported by the interpreter itself, which `python -X importtime -c pass` also imports, are not counted.
+
+Startup regresses when a module imported at startup imports an SDK or PyMuPDF at its top,
+so the script fails if any scenario imports one of HEAVY_MODULES,
+or if the median import time of a scenario is over --max-ms.
+Clients of Azure services and PyMuPDF are imported when they are used first, not when they are created.
+
+Usage:
+    python benchmarks/bench_startup.py [--repeat 5] [--top 10] [--max-ms 300]
+"""
+from argparse import ArgumentParser
+import os
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+SRC_DIR = os.path.join(ROOT, 'src')
+
+# Top-level packages which must not be imported until a document needs them.
+HEAVY_MODULES = (
+    "aiohttp", "azure", "fitz", "httpx", "langchain_core", "langchain_openai", "openai", "pymupdf", "requests"
+)
+
+RESOLVE_CONTROLLER = """
+from injector import Injector
+from packages.dicontainer.di_container import DIContainer
+from packages.presentation.document_convert_controller import DocumentConvertController
+Injector([DIContainer({arguments})]).get(DocumentConvertController)
+"""
+
+IMPORT_TIME_LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$")
+
+def scenarios(cache_dir: str) -> dict[str, str]:
+    """Get the name of each scenario and the code run in src directory."""
+
+    cache_arguments = (
+        f"analyze_cache_dir={os.path.join(cache_dir, 'analyze')!r}, "
+        f"summary_cache_dir={os.path.join(cache_dir, 'summary')!r}, analyze_shard_pages=100"
+    )
+
+    return {
+        "import main": "import main",
+        "resolve controller": "import main" + RESOLVE_CONTROLLER.format(arguments=""),
+        "resolve with caches and shards": "import main" + RESOLVE_CONTROLLER.format(arguments=cache_arguments)
+    }
+
+def import_times(code: str) -> list[tuple[str, int, int]]:
+    """Run code with -X importtime.
+
+    Returns:
+        Name, cumulative microseconds and depth of each imported module, in the order of the output.
+    """
+
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=SRC_DIR, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True
+    )
+    if completed.returncode != 0:
+        raise RuntimeError(f"Failed to run {code!r}:\n{completed.stderr}")
+
+    modules = []
+    for line in completed.stderr.splitlines():
+        match = IMPORT_TIME_LINE.match(line)
+        if match is not None:
+            modules.append((match.group(4), int(match.group(2)), (len(match.group(3)) - 1) // 2))
+
+    return modules
+
+def measure(code: str, baseline: set[str]) -> tuple[float, list[tuple[str, int, int]]]:
+    """Run code once and get milliseconds of the imports not done by the interpreter itself."""
+
+    modules = [module for module in import_times(code) if module[0] not in baseline]
+    total_us = sum(cumulative for _, cumulative, depth in modules if depth == 0)
+
+    return total_us / 1000, modules
+
+if __name__ == "__main__":
+    parser = ArgumentParser(description="Measure imports at startup of the batch entry point.")
+    parser.add_argument("--repeat", type=int, default=5, help="number of runs of each scenario")
+    parser.add_argument("--top", type=int, default=10, help="number of the slowest modules shown for each scenario")
+    parser.add_argument("--max-ms", type=float, default=300, help="fail if the median import time of a scenario is over this")
+    args = parser.parse_args()
+
+    baseline = {name for name, _, _ in import_times("pass")}
+    failures = []
+    with tempfile.TemporaryDirectory() as cache_dir:
+        for scenario, code in scenarios(cache_dir).items():
+            runs = [measure(code, baseline) for _ in range(args.repeat)]
+            median_ms = statistics.median(total_ms for total_ms, _ in runs)
+            modules = runs[-1][1]
+
+            print(f"{scenario}: {median_ms:.1f} ms (min {min(total_ms for total_ms, _ in runs):.1f} ms, {len(modules)} modules)")
+            for name, cumulative, depth in sorted(modules, key=lambda module: module[1], reverse=True)[:args.top]:
+                print(f"    {cumulative / 1000:>8.1f} ms  {'  ' * depth}{name}")
+
+            heavy = sorted({name.split('.')[0] for name, _, _ in modules} & set(HEAVY_MODULES))
+            if heavy:
+                failures.append(f"{scenario} imports {', '.join(heavy)}")
+            if median_ms > args.max_ms:
+                failures.append(f"{scenario} takes {median_ms:.1f} ms, over {args.max_ms:.1f} ms")
+
+    for failure in failures:
+        print(f"Error: {failure}")
+    sys.exit(1 if failures else 0)
@@ -1,10 +1,28 @@
+from argparse import ArgumentParser
 from os import environ
+import time
 
 from injector import Injector
 from dotenv import load_dotenv
 
+from packages.application.convert_manifest import config_fingerprint
 from packages.presentation.document_convert_controller import DocumentConvertController
 from packages.dicontainer.di_container import DIContainer
+from packages.domain.figure_classifier import FigureClassifier
+from packages.domain.instrumentation import Instrumentation
+from packages.domain.render_policy import RenderPolicy
+from packages.infrastructure.azure_document_extractor import AzureDocumentExtractor
+from packages.infrastructure.http_pool_settings import HttpPoolSettings
+from packages.infrastructure.rate_limiter import AdaptiveRateLimiter, RetryPolicy
+
+def create_rate_limiter(prefix: str) -> AdaptiveRateLimiter | None:
+    """Create rate limiter from {prefix}_MAX_REQUESTS_PER_SEC and {prefix}_BURST, or None if the rate is not set."""
+
+    max_rate_per_sec = environ.get(prefix + '_MAX_REQUESTS_PER_SEC')
+    if not max_rate_per_sec:
+        return None
+
+    return AdaptiveRateLimiter(float(max_rate_per_sec), burst=int(environ.get(prefix + '_BURST') or 1))
 
 if __name__ == "__main__":
     load_dotenv()
@@ -13,7 +31,100 @@ if __name__ == "__main__":
     source_dir = "./source"
     output_dir = "./output"
 
-    injector = Injector([DIContainer()])
+    parser = ArgumentParser(description="Convert documents in source folder to markdown files in output folder.")
+    parser.add_argument("--convert-workers", type=int, default=1, help="number of documents converted to PDF at the same time")
+    parser.add_argument("--analyze-workers", type=int, default=1, help="number of threads submitting documents to Document Intelligence")
+    parser.add_argument("--analyze-in-flight", type=int, default=0, help="number of documents analyzed by Document Intelligence at the same time (default: analyze workers)")
+    parser.add_argument("--render-workers", type=int, default=1, help="number of documents rendered to markdown at the same time")
+    parser.add_argument("--convert-batch-size", type=int, default=1, help="maximum number of DOCX files converted by one LibreOffice process")
+    parser.add_argument("--force", action="store_true", help="convert all documents even if they have not changed since the last run or they are quarantined")
+    parser.add_argument("--max-attempts", type=int, default=3, help="number of attempts of a failing document before it is quarantined")
+    parser.add_argument("--retry-delay-sec", type=float, default=5, help="seconds before a failed document is tried again, doubled on each attempt")
+    parser.add_argument("--retry-quarantined", action="store_true", help="convert quarantined documents again without converting unchanged documents")
+    parser.add_argument("--node-id", help="unique name of this node, to share documents with other nodes converting the same folders on shared storage")
+    parser.add_argument("--lease-sec", type=float, default=60, help="seconds after which documents leased by a stopped node are taken over by other nodes")
+    parser.add_argument("--watch", action="store_true", help="keep converting documents written to source folder until interrupted by Ctrl+C")
+    parser.add_argument("--profile", choices=["sampling", "cprofile"], help="profile the run and write the results to a folder in output folder")
+    args = parser.parse_args()
+
+    render_policy = RenderPolicy(
+        max_dpi=float(environ.get('FIGURE_MAX_DPI') or 300),
+        max_edge_px=int(environ.get('FIGURE_MAX_EDGE_PX') or 2048),
+        max_pixels=int(environ.get('FIGURE_MAX_PIXELS') or 2048 * 768),
+        image_format=environ.get('FIGURE_IMAGE_FORMAT') or "png",
+        quality=int(environ.get('FIGURE_IMAGE_QUALITY') or 85)
+    )
+    figure_classifier = FigureClassifier(
+        min_edge_pt=float(environ.get('FIGURE_SKIP_MIN_EDGE_PT') or 0),
+        min_area_pt=float(environ.get('FIGURE_SKIP_MIN_AREA_PT') or 0),
+        uniform_max_stddev=float(environ.get('FIGURE_SKIP_UNIFORM_MAX_STDDEV') or 0),
+        min_ink_coverage=float(environ.get('FIGURE_SKIP_MIN_INK_COVERAGE') or 0),
+        min_entropy_bits=float(environ.get('FIGURE_SKIP_MIN_ENTROPY_BITS') or 0),
+        skipped_summary=environ.get('FIGURE_SKIPPED_SUMMARY') or ""
+    )
+    fingerprinted_config = {
+        "model_id": AzureDocumentExtractor.MODEL_ID,
+        "output_content_format": AzureDocumentExtractor.OUTPUT_CONTENT_FORMAT,
+        "openai_deployment": environ.get('AZURE_OPENAI_DEPLOYMENT'),
+        "render_policy": vars(render_policy)
+    }
+    # Only when enabled, so that documents converted before the classifier existed are not converted again.
+    if figure_classifier.enabled:
+        fingerprinted_config["figure_classifier"] = vars(figure_classifier)
+    analyze_cache_max_mb = environ.get('ANALYZE_CACHE_MAX_MB')
+    summary_cache_max_mb = environ.get('SUMMARY_CACHE_MAX_MB')
+    summary_cache_max_distance = environ.get('SUMMARY_CACHE_MAX_DISTANCE')
+    container = DIContainer(
+        analyze_cache_dir=environ.get('ANALYZE_CACHE_DIR') or None,
+        analyze_cache_max_bytes=int(analyze_cache_max_mb) * 1024 * 1024 if analyze_cache_max_mb else 1024 * 1024 * 1024,
+        summary_cache_dir=environ.get('SUMMARY_CACHE_DIR') or None,
+        summary_cache_max_bytes=int(summary_cache_max_mb) * 1024 * 1024 if summary_cache_max_mb else 64 * 1024 * 1024,
+        summary_cache_max_distance=int(summary_cache_max_distance) if summary_cache_max_distance else None,
+        office_pool_size=int(environ.get('OFFICE_POOL_SIZE') or 0),
+        figure_debug_dir=environ.get('FIGURE_DEBUG_DIR') or None,
+        render_policy=render_policy,
+        figure_classifier=figure_classifier,
+        http_pool_settings=HttpPoolSettings.from_environ(),
+        use_async=(environ.get('USE_ASYNC') or 'false').lower() == 'true',
+        async_max_concurrency=int(environ.get('ASYNC_MAX_CONCURRENCY') or 64),
+        analyze_rate_limiter=create_rate_limiter('DI'),
+        summary_rate_limiter=create_rate_limiter('OAI'),
+        retry_policy=RetryPolicy(max_retries=int(environ.get('RATE_LIMIT_MAX_RETRIES') or 5)),
+        analyze_shard_pages=int(environ.get('ANALYZE_SHARD_PAGES') or 0),
+        analyze_shard_workers=int(environ.get('ANALYZE_SHARD_WORKERS') or 4),
+        figure_render_processes=int(environ.get('FIGURE_RENDER_PROCESSES') or 0),
+        watch_polling=(environ.get('WATCH_POLLING') or 'false').lower() == 'true',
+        watch_poll_sec=float(environ.get('WATCH_POLL_SEC') or 1),
+        watch_settle_sec=float(environ.get('WATCH_SETTLE_SEC') or 2),
+        metrics_log_path=environ.get('METRICS_LOG_PATH') or None,
+        metrics_port=int(environ.get('METRICS_PORT') or 0),
+        metrics_host=environ.get('METRICS_HOST') or "127.0.0.1",
+        profile_mode=args.profile,
+        profile_sample_interval_sec=float(environ.get('PROFILE_SAMPLE_INTERVAL_SEC') or 0.01)
+    )
+    injector = Injector([container])
     controller: DocumentConvertController = injector.get(DocumentConvertController)
 
-    controller.batch_convert_local_files(source_dir, output_dir)
+    try:
+        controller.batch_convert_local_files(
+            source_dir,
+            output_dir,
+            convert_workers=args.convert_workers,
+            analyze_workers=args.analyze_workers,
+            render_workers=args.render_workers,
+            convert_batch_size=args.convert_batch_size,
+            analyze_in_flight=args.analyze_in_flight,
+            config_fingerprint=config_fingerprint(fingerprinted_config),
+            force=args.force,
+            max_attempts=args.max_attempts,
+            retry_delay_sec=args.retry_delay_sec,
+            retry_quarantined=args.retry_quarantined,
+            node_id=args.node_id,
+            lease_sec=args.lease_sec,
+            watch=args.watch,
+            profile_dir=output_dir + "/.profile/" + time.strftime("%Y%m%d-%H%M%S") if args.profile else None
+        )
+    finally:
+        # Spans of documents finished so far and the final metrics are written even if interrupted.
+        injector.get(Instrumentation).close()
+        container.close()
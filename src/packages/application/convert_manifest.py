@@ -0,0 +1,473 @@
+"""Recording converted documents for incremental runs.
+
+This module provides class to remember which source documents have been converted to which markdown files,
+so that later runs convert only new or changed documents.
+
+A source is regarded as unchanged if its size and modification time are the same as recorded.
+If only the modification time differs, its SHA-256 hash is compared.
+Sources converted with another configuration, such as another model, are converted again.
+
+Every change is appended to a journal file next to the manifest and flushed to disk at once,
+so a run which stops suddenly loses nothing recorded. The journal is merged into the manifest by save.
+Failures of sources are also recorded, so that a source which keeps failing can be quarantined.
+Transient failures, such as throttling and timeouts, are recorded without being counted as failed attempts.
+
+Several nodes can share one manifest on shared storage. Each node has its own journal,
+refresh reads changes made by the other nodes, and save merges them under a file lock.
+
+Typical usage example:
+
+    manifest = ConvertManifest("output/.convert_manifest.json")
+    fingerprint = config_fingerprint({"model_id": "prebuilt-layout"})
+    up_to_date, state = manifest.check(source, "output/foo.md", fingerprint)
+    if not up_to_date:
+        convert(source)
+        manifest.record(source, state, "output/foo.md", fingerprint)
+    manifest.save()
+"""
+from contextlib import contextmanager
+import fcntl
+import hashlib
+import json
+import os
+import pathlib
+import tempfile
+from threading import Lock
+from typing import Iterator
+
+def config_fingerprint(
+        settings: dict[str, any]
+) -> str:
+    """Get fingerprint of the settings which affect converted markdown.
+
+    Args:
+        settings:
+            Settings which can be serialized to JSON.
+
+    Returns:
+        SHA-256 hex digest of the settings.
+    """
+
+    return hashlib.sha256(json.dumps(settings, sort_keys=True, default=str).encode()).hexdigest()
+
+def file_sha256(
+        path: pathlib.Path
+) -> str:
+    """Get SHA-256 hex digest of the file, reading it in blocks."""
+
+    digest = hashlib.sha256()
+    with open(path, "rb") as file:
+        for block in iter(lambda: file.read(1024 * 1024), b""):
+            digest.update(block)
+
+    return digest.hexdigest()
+
+class SourceState:
+    """Size, modification time and hash of a source document."""
+
+    __slots__ = ("size", "mtime_ns", "sha256")
+
+    def __init__(self, size: int, mtime_ns: int, sha256: str) -> None:
+        self.size = size
+        self.mtime_ns = mtime_ns
+        self.sha256 = sha256
+
+class ConvertManifest:
+    """Persistent record of converted documents."""
+
+    VERSION = 1
+    JOURNAL_SUFFIX = ".journal"
+
+    def __init__(
+            self,
+            path: str,
+            node_id: str | None = None
+    ) -> None:
+        """
+        Args:
+            path:
+                JSON file of the manifest. It is created by save if it does not exist.
+            node_id:
+                Name of this node if several nodes share the manifest. It is used in the name of the journal.
+        """
+
+        self.path = pathlib.Path(path)
+        self.journal_path = pathlib.Path(path + (f".{node_id}" if node_id else "") + self.JOURNAL_SUFFIX)
+        self.lock_path = pathlib.Path(path + ".lock")
+        self.lock = Lock()
+
+        # source name -> {"size", "mtime_ns", "sha256", "config", "output"}
+        self.entries: dict[str, dict[str, any]] = {}
+        # source name -> {"sha256", "attempts", "error"}
+        self.failures: dict[str, dict[str, any]] = {}
+        # names of sources which were being converted when the journals were written last
+        self.in_flight: set[str] = set()
+        # modification time and size of the manifest file when it was read
+        self.snapshot_stat: tuple[int, int] | None = None
+        # journal name -> bytes of the journal read so far
+        self.journal_offsets: dict[str, int] = {}
+
+        self.__load()
+
+        # Drop a line left partially written by a stopped run, so that new events start on a new line.
+        self.journal = open(self.journal_path, "a", encoding="utf-8")
+        self.journal.truncate(self.journal_offsets.get(self.journal_path.name, 0))
+
+    def check(
+            self,
+            source: pathlib.Path,
+            output_path: str,
+            config_fingerprint: str
+    ) -> tuple[bool, SourceState]:
+        """Check whether the source has been converted to output_path as it is now.
+
+        Args:
+            source:
+                Source document.
+            output_path:
+                Markdown file the source is converted to.
+            config_fingerprint:
+                Fingerprint of the current configuration.
+
+        Returns:
+            True if the source need not be converted, and the current state of the source.
+        """
+
+        stat = source.stat()
+        with self.lock:
+            entry = self.entries.get(source.name)
+
+        if (entry is not None) and (entry["size"] == stat.st_size) and (entry["mtime_ns"] == stat.st_mtime_ns):
+            state = SourceState(stat.st_size, stat.st_mtime_ns, entry["sha256"])
+        else:
+            state = SourceState(stat.st_size, stat.st_mtime_ns, file_sha256(source))
+
+        up_to_date = (
+            (entry is not None)
+            and (entry["sha256"] == state.sha256)
+            and (entry["config"] == config_fingerprint)
+            and (entry["output"] == output_path)
+            and pathlib.Path(output_path).exists()
+        )
+        if up_to_date and (entry["mtime_ns"] != state.mtime_ns):
+            # Touched but not changed. Remember the new time to skip hashing next time.
+            self.record(source, state, output_path, config_fingerprint)
+
+        return up_to_date, state
+
+    def record(
+            self,
+            source: pathlib.Path,
+            state: SourceState,
+            output_path: str,
+            config_fingerprint: str
+    ) -> None:
+        """Record that the source has been converted.
+
+        Args:
+            source:
+                Source document.
+            state:
+                State of the source when it was read for the conversion.
+            output_path:
+                Markdown file the source has been converted to.
+            config_fingerprint:
+                Fingerprint of the configuration of the conversion.
+        """
+
+        entry = {
+            "size": state.size,
+            "mtime_ns": state.mtime_ns,
+            "sha256": state.sha256,
+            "config": config_fingerprint,
+            "output": output_path
+        }
+        with self.lock:
+            self.__apply({"event": "completed", "source": source.name, "entry": entry})
+
+    def start(
+            self,
+            source: pathlib.Path
+    ) -> None:
+        """Record that conversion of the source has started.
+
+        Args:
+            source:
+                Source document.
+        """
+
+        with self.lock:
+            self.__apply({"event": "started", "source": source.name})
+
+    def record_failure(
+            self,
+            source: pathlib.Path,
+            state: SourceState,
+            error: str,
+            transient: bool = False
+    ) -> int:
+        """Record that conversion of the source has failed.
+
+        Failures of earlier contents of the source are not counted.
+
+        Args:
+            source:
+                Source document.
+            state:
+                State of the source when it was read for the conversion.
+            error:
+                Why the conversion failed.
+            transient:
+                True if the failure may go away by itself, such as throttling or a timeout.
+                It is not counted as a failed attempt.
+
+        Returns:
+            Number of failed attempts of the current content of the source.
+        """
+
+        with self.lock:
+            failure = self.failures.get(source.name)
+            attempts = failure["attempts"] if (failure is not None) and (failure["sha256"] == state.sha256) else 0
+            if not transient:
+                attempts += 1
+            self.__apply({"event": "failed", "source": source.name, "sha256": state.sha256, "attempts": attempts, "error": error})
+
+        return attempts
+
+    def failed_attempts(
+            self,
+            source: pathlib.Path,
+            state: SourceState
+    ) -> int:
+        """Get number of failed attempts of the current content of the source.
+
+        Args:
+            source:
+                Source document.
+            state:
+                Current state of the source.
+        """
+
+        with self.lock:
+            failure = self.failures.get(source.name)
+
+        if (failure is None) or (failure["sha256"] != state.sha256):
+            return 0
+
+        return failure["attempts"]
+
+    def reset_failures(
+            self,
+            source: pathlib.Path
+    ) -> None:
+        """Forget failed attempts of the source, so that it is no longer quarantined.
+
+        Args:
+            source:
+                Source document.
+        """
+
+        with self.lock:
+            if source.name in self.failures:
+                self.__apply({"event": "reset", "source": source.name})
+
+    def remove_missing(
+            self,
+            sources: list[pathlib.Path]
+    ) -> list[str]:
+        """Forget sources which no longer exist, and delete their markdown files.
+
+        A markdown file is kept if one of sources is converted to the same file.
+
+        Args:
+            sources:
+                Source documents which exist now.
+
+        Returns:
+            Deleted markdown files.
+        """
+
+        names = {source.name for source in sources}
+        with self.lock:
+            missing = [name for name in self.entries if name not in names]
+            outputs_in_use = {entry["output"] for name, entry in self.entries.items() if name in names}
+            removed_entries = [self.entries[name] for name in missing]
+            for name in missing:
+                self.__apply({"event": "removed", "source": name})
+            for name in [name for name in self.failures if name not in names]:
+                self.__apply({"event": "removed", "source": name})
+
+        deleted = []
+        for entry in removed_entries:
+            output_path = entry["output"]
+            if output_path in outputs_in_use:
+                continue
+            if pathlib.Path(output_path).exists():
+                pathlib.Path(output_path).unlink()
+                deleted.append(output_path)
+
+        return deleted
+
+    def refresh(self) -> None:
+        """Read changes recorded by other nodes since the manifest was read."""
+
+        with self.lock:
+            self.__refresh()
+
+    def save(self) -> None:
+        """Write the manifest to its file atomically, and empty the journal merged into it.
+
+        Changes recorded by other nodes are merged into the manifest, so that they are not overwritten.
+        """
+
+        with self.lock, self.__file_lock():
+            self.__refresh()
+            data = json.dumps(
+                {"version": self.VERSION, "entries": self.entries, "failures": self.failures},
+                ensure_ascii=False,
+                indent=1
+            )
+            self.__write(data)
+            self.journal.truncate(0)
+            self.journal.seek(0)
+            self.snapshot_stat = self.__stat(self.path)
+            self.journal_offsets[self.journal_path.name] = 0
+
+    def close(self) -> None:
+        """Close the journal. Changes not saved are kept in the journal for the next run."""
+
+        with self.lock:
+            self.journal.close()
+
+    def __apply(
+            self,
+            event: dict[str, any]
+    ) -> None:
+        """Apply the event and append it to the journal. Must be called with the lock held."""
+
+        self.__apply_event(event)
+        self.journal.write(json.dumps(event, ensure_ascii=False) + "\n")
+        self.journal.flush()
+        os.fsync(self.journal.fileno())
+
+    def __apply_event(
+            self,
+            event: dict[str, any]
+    ) -> None:
+        name = event["source"]
+        if event["event"] == "started":
+            self.in_flight.add(name)
+        elif event["event"] == "completed":
+            self.entries[name] = event["entry"]
+            self.failures.pop(name, None)
+            self.in_flight.discard(name)
+        elif event["event"] == "failed":
+            self.failures[name] = {"sha256": event["sha256"], "attempts": event["attempts"], "error": event["error"]}
+            self.in_flight.discard(name)
+        elif event["event"] == "removed":
+            self.entries.pop(name, None)
+            self.failures.pop(name, None)
+        elif event["event"] == "reset":
+            self.failures.pop(name, None)
+
+    def __load(self) -> None:
+        """Read the manifest file and apply events of all journals. Must be called with the lock held or from __init__."""
+
+        self.entries = {}
+        self.failures = {}
+        self.in_flight = set()
+        self.journal_offsets = {}
+        self.snapshot_stat = self.__stat(self.path)
+
+        if self.snapshot_stat is not None:
+            try:
+                data = json.loads(self.path.read_text(encoding="utf-8"))
+            except ValueError as e:
+                print(f"Error: {self.path} is broken and ignored. {e}")
+                data = {}
+            if data.get("version") == self.VERSION:
+                self.entries = data.get("entries", {})
+                self.failures = data.get("failures", {})
+
+        self.__replay_journals()
+
+    def __refresh(self) -> None:
+        """Apply events appended to journals, or read everything again if the manifest file has been saved.
+
+        Must be called with the lock held.
+        """
+
+        if (self.__stat(self.path) != self.snapshot_stat) or (not self.__replay_journals()):
+            self.__load()
+
+    def __replay_journals(self) -> bool:
+        """Apply events of all journals written after they were read last.
+
+        A line is applied only when it is complete, since a node may be writing it.
+
+        Returns:
+            False if a journal has been emptied since it was read, and everything must be read again.
+        """
+
+        for journal_path in sorted(self.path.parent.glob(self.path.name + "*" + self.JOURNAL_SUFFIX)):
+            offset = self.journal_offsets.get(journal_path.name, 0)
+            try:
+                with open(journal_path, "rb") as journal:
+                    journal.seek(0, os.SEEK_END)
+                    if journal.tell() < offset:
+                        return False
+                    journal.seek(offset)
+                    data = journal.read()
+            except FileNotFoundError:
+                continue
+
+            for line in data.splitlines(keepends=True):
+                if not line.endswith(b"\n"):
+                    break
+                try:
+                    event = json.loads(line)
+                except ValueError:
+                    break
+                self.__apply_event(event)
+                offset += len(line)
+            self.journal_offsets[journal_path.name] = offset
+
+        return True
+
+    @contextmanager
+    def __file_lock(self) -> Iterator[None]:
+        """Lock the manifest file against other nodes."""
+
+        with open(self.lock_path, "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def __stat(
+            self,
+            path: pathlib.Path
+    ) -> tuple[int, int] | None:
+        try:
+            stat = path.stat()
+        except FileNotFoundError:
+            return None
+
+        return stat.st_mtime_ns, stat.st_size
+
+    def __write(
+            self,
+            data: str
+    ) -> None:
+        """Replace the manifest file with data. Must be called with the lock held."""
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        file_descriptor, temp_path = tempfile.mkstemp(dir=str(self.path.parent), prefix=self.path.name + '.')
+        try:
+            with os.fdopen(file_descriptor, "w", encoding="utf-8") as file:
+                file.write(data)
+            os.replace(temp_path, self.path)
+        except BaseException:
+            pathlib.Path(temp_path).unlink(missing_ok=True)
+            raise
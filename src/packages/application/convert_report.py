@@ -0,0 +1,127 @@
+"""Reporting result of batch conversion.
+
+This module provides class to hold the result of converting documents.
+"""
+
+class ConvertReport:
+    """Result of batch conversion."""
+
+    def __init__(self) -> None:
+        self.converted: list[str] = []
+        self.failed: dict[str, str] = {}
+        self.skipped: list[str] = []
+        self.removed: list[str] = []
+        self.quarantined: list[str] = []
+        self.resumed: list[str] = []
+        self.dropped: list[str] = []
+        self.skipped_figures: dict[str, int] = {}
+
+    def add_converted(
+            self,
+            output_path: str
+    ) -> None:
+        """Record a markdown file written by the conversion.
+
+        Args:
+            output_path:
+                Path to the written markdown file.
+        """
+
+        self.converted.append(output_path)
+
+    def add_failed(
+            self,
+            source_path: str,
+            reason: str
+    ) -> None:
+        """Record a source document which could not be converted.
+
+        Args:
+            source_path:
+                Path to the source document.
+            reason:
+                Why the conversion failed.
+        """
+
+        self.failed[source_path] = reason
+
+    def add_skipped(
+            self,
+            source_path: str
+    ) -> None:
+        """Record a source document which has not changed since it was converted.
+
+        Args:
+            source_path:
+                Path to the source document.
+        """
+
+        self.skipped.append(source_path)
+
+    def add_removed(
+            self,
+            output_path: str
+    ) -> None:
+        """Record a markdown file deleted because its source document was deleted.
+
+        Args:
+            output_path:
+                Path to the deleted markdown file.
+        """
+
+        self.removed.append(output_path)
+
+    def add_quarantined(
+            self,
+            source_path: str
+    ) -> None:
+        """Record a source document skipped because it has failed too many times.
+
+        Args:
+            source_path:
+                Path to the source document.
+        """
+
+        self.quarantined.append(source_path)
+
+    def add_resumed(
+            self,
+            source_path: str
+    ) -> None:
+        """Record a source document which was being converted when the last run stopped.
+
+        Args:
+            source_path:
+                Path to the source document.
+        """
+
+        self.resumed.append(source_path)
+
+    def add_dropped(
+            self,
+            source_path: str
+    ) -> None:
+        """Record a source document left to another node which has taken over its lease.
+
+        Args:
+            source_path:
+                Path to the source document.
+        """
+
+        self.dropped.append(source_path)
+
+    def add_skipped_figures(
+            self,
+            source_path: str,
+            count: int
+    ) -> None:
+        """Record figures of a converted document which were not summarized because they are trivial.
+
+        Args:
+            source_path:
+                Path to the source document.
+            count:
+                Number of the skipped figures.
+        """
+
+        self.skipped_figures[source_path] = count
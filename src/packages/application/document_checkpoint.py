@@ -0,0 +1,161 @@
+"""Keeping intermediate results of a document being converted.
+
+This module provides class to save the analyze result and figure summaries of a document
+while it is converted, so that a run which stops before the document is completed
+can resume it without calling Azure services again for the saved results.
+
+Typical usage example:
+
+    checkpoint = DocumentCheckpoint("output/.convert_checkpoints/0123abcd")
+    analyze_result = checkpoint.load_analyze_result()
+    if analyze_result is None:
+        analyze_result = extractor.extract(file)
+        checkpoint.save_analyze_result(analyze_result)
+
+    for chunk in md_creator.create_chunks(analyze_result, pdf_path, checkpoint.figure_summaries()):
+        ...
+    checkpoint.remove()
+"""
+import gzip
+import hashlib
+import json
+import os
+import pathlib
+import shutil
+import tempfile
+from collections.abc import MutableMapping
+from threading import Lock
+from typing import Iterator
+
+def checkpoint_key(
+        source_name: str,
+        source_sha256: str,
+        config_fingerprint: str
+) -> str:
+    """Get key of the checkpoint of a source converted with a configuration.
+
+    The key includes the name of the source, so that sources of the same content have their own checkpoints.
+    """
+
+    return hashlib.sha256((source_name + "\0" + source_sha256 + "\0" + config_fingerprint).encode()).hexdigest()
+
+def write_atomically(
+        path: pathlib.Path,
+        data: bytes
+) -> None:
+    """Replace the file with data, so that the file never has partial data."""
+
+    file_descriptor, temp_path = tempfile.mkstemp(dir=str(path.parent), prefix=path.name + '.')
+    try:
+        with os.fdopen(file_descriptor, "wb") as file:
+            file.write(data)
+        os.replace(temp_path, path)
+    except BaseException:
+        pathlib.Path(temp_path).unlink(missing_ok=True)
+        raise
+
+class FigureSummaryStore(MutableMapping):
+    """Summaries of figures by index of figure, saved to a file on every update."""
+
+    def __init__(
+            self,
+            path: pathlib.Path
+    ) -> None:
+        self.path = path
+        self.lock = Lock()
+        self.summaries: dict[int, str] = {}
+        if path.exists():
+            try:
+                self.summaries = {int(idx): summary for idx, summary in json.loads(path.read_text(encoding="utf-8")).items()}
+            except ValueError as e:
+                print(f"Error: {path} is broken and ignored. {e}")
+
+    def __getitem__(self, idx: int) -> str:
+        return self.summaries[idx]
+
+    def __setitem__(self, idx: int, summary: str) -> None:
+        self.update({idx: summary})
+
+    def __delitem__(self, idx: int) -> None:
+        with self.lock:
+            del self.summaries[idx]
+            self.__save()
+
+    def __iter__(self) -> Iterator[int]:
+        return iter(list(self.summaries))
+
+    def __len__(self) -> int:
+        return len(self.summaries)
+
+    def update(self, summaries: dict[int, str]) -> None:
+        """Add summaries and save them at once."""
+
+        with self.lock:
+            self.summaries.update(summaries)
+            self.__save()
+
+    def __save(self) -> None:
+        write_atomically(self.path, json.dumps(self.summaries, ensure_ascii=False).encode())
+
+class DocumentCheckpoint:
+    """Intermediate results of a document being converted."""
+
+    ANALYZE_RESULT_NAME = "analyze_result.json.gz"
+    FIGURE_SUMMARIES_NAME = "figure_summaries.json"
+
+    def __init__(
+            self,
+            checkpoint_dir: str
+    ) -> None:
+        """
+        Args:
+            checkpoint_dir:
+                Directory to save the results. It is created on first save.
+        """
+
+        self.checkpoint_dir = pathlib.Path(checkpoint_dir)
+
+    def load_analyze_result(self) -> dict[str, any] | None:
+        """Load the saved analyze result.
+
+        Returns:
+            The analyze result, or None if it has not been saved.
+        """
+
+        path = self.checkpoint_dir / self.ANALYZE_RESULT_NAME
+        if not path.exists():
+            return None
+
+        try:
+            return json.loads(gzip.decompress(path.read_bytes()))
+        except (OSError, ValueError) as e:
+            print(f"Error: {path} is broken and ignored. {e}")
+            return None
+
+    def save_analyze_result(
+            self,
+            analyze_result: dict[str, any]
+    ) -> None:
+        """Save the analyze result.
+
+        Args:
+            analyze_result:
+                Azure Document Intelligence result of extracting file.
+        """
+
+        self.checkpoint_dir.mkdir(parents=True, exist_ok=True)
+        write_atomically(
+            self.checkpoint_dir / self.ANALYZE_RESULT_NAME,
+            gzip.compress(json.dumps(analyze_result, ensure_ascii=False).encode(), compresslevel=1)
+        )
+
+    def figure_summaries(self) -> FigureSummaryStore:
+        """Get summaries of figures saved so far. Summaries added to it are saved at once."""
+
+        self.checkpoint_dir.mkdir(parents=True, exist_ok=True)
+        return FigureSummaryStore(self.checkpoint_dir / self.FIGURE_SUMMARIES_NAME)
+
+    def remove(self) -> None:
+        """Remove the saved results after the document is completed."""
+
+        shutil.rmtree(self.checkpoint_dir, ignore_errors=True)
@@ -1,16 +1,75 @@
+import os
 import pathlib
 import shutil
+import tempfile
+import time
+import uuid
+from concurrent.futures import Future
+from threading import Event, Lock
+from typing import Callable, Iterator
 
 from injector import inject, singleton
 
+from packages.application.convert_manifest import ConvertManifest, SourceState
+from packages.application.convert_report import ConvertReport
+from packages.application.document_checkpoint import DocumentCheckpoint, checkpoint_key
+from packages.application.document_pipeline import DocumentPipeline, PipelineFailure, PipelineStage
+from packages.application.lease_work_queue import LeaseLostError, LeaseWorkQueue
+from packages.domain.directory_watcher import DirectoryWatcher
 from packages.domain.document_extractor import DocumentExtractor
 from packages.domain.pdf_generator import PdfGenerator
 from packages.domain.image_extractor import ImageExtractor
 from packages.domain.image_summarizer import ImageSummarizer
+from packages.domain.instrumentation import NULL_SPAN, Instrumentation, NullInstrumentation, Span
 from packages.domain.md_creator import MdCreator
+from packages.domain.service_error import is_transient_error
+
+class DocumentJob:
+    """State of one document in the conversion pipeline."""
+
+    def __init__(self, source: pathlib.Path, workdir: pathlib.Path) -> None:
+        self.source = source
+        self.workdir = workdir
+        self.pdf_path: pathlib.Path | None = None
+        self.analyze_result: dict[str, any] | None = None
+        self.source_state: SourceState | None = None
+        self.checkpoint: DocumentCheckpoint | None = None
+        # key of the checkpoint and the lease of the source
+        self.key: str | None = None
+        self.span: Span = NULL_SPAN
+        self.skipped_figures: dict[int, str] = {}
+        # attempt of the source in this run, from 1
+        self.attempt = 1
+        # time.monotonic() when the job may start, and why its last attempt failed, if it is a retry
+        self.retry_at = 0.0
+        self.error: str | None = None
+
+    def retry(self, delay_sec: float, error: str) -> 'DocumentJob':
+        """Create job to convert the source again in a new working directory after delay_sec."""
+
+        job = DocumentJob(self.source, self.workdir.with_name(f"{self.workdir.name}-{self.attempt + 1}"))
+        job.source_state = self.source_state
+        job.checkpoint = self.checkpoint
+        job.key = self.key
+        job.attempt = self.attempt + 1
+        job.retry_at = time.monotonic() + delay_sec
+        job.error = error
+
+        return job
 
 @singleton
 class DocumentConvertService:
+    MANIFEST_NAME = ".convert_manifest.json"
+    CHECKPOINT_DIR_NAME = ".convert_checkpoints"
+    WORK_QUEUE_NAME = ".convert_work_queue.sqlite"
+    SOURCE_SUFFIXES = [".docx", ".pdf"]
+    # Interval of saving the manifest while watching source_dir, so that the journal does not grow forever.
+    MANIFEST_SAVE_INTERVAL_SEC = 60
+    # Interval of looking for sources deleted while watching source_dir, to delete their markdown files.
+    MISSING_CHECK_INTERVAL_SEC = 10
+    # Upper limit of the delay before a failed document is tried again.
+    RETRY_MAX_DELAY_SEC = 300
+
     @inject
     def __init__(
         self,
@@ -18,33 +77,548 @@ class DocumentConvertService:
         pdf_generator: PdfGenerator,
         img_extractor: ImageExtractor,
         img_summarizer: ImageSummarizer,
-        md_creator: MdCreator
+        md_creator: MdCreator,
+        watcher: DirectoryWatcher = None,
+        instrumentation: Instrumentation = None
     ) -> None:
         self.extractor = extractor
         self.pdf_generator = pdf_generator
         self.img_extractor = img_extractor
         self.img_summarizer = img_summarizer
         self.md_creator = md_creator
+        self.watcher = watcher
+        self.instrumentation = instrumentation if instrumentation is not None else NullInstrumentation()
+
+    def extractDocument(
+        self,
+        source_dir: str,
+        output_dir: str,
+        convert_workers: int = 1,
+        analyze_workers: int = 1,
+        render_workers: int = 1,
+        convert_batch_size: int = 1,
+        analyze_in_flight: int = 0,
+        config_fingerprint: str = "",
+        force: bool = False,
+        max_attempts: int = 3,
+        retry_delay_sec: float = 5,
+        retry_quarantined: bool = False,
+        node_id: str | None = None,
+        lease_sec: float = 60,
+        watch: bool = False,
+        stop: Event | None = None
+    ) -> ConvertReport:
+        """Convert documents in source_dir to markdown files in output_dir.
+
+        Documents go through convert (DOCX to PDF), analyze and render stages.
+        The stages run at the same time on different documents,
+        and each markdown file is written as soon as its document finishes.
+
+        Converted documents are recorded in MANIFEST_NAME in output_dir.
+        Documents which have not changed since they were converted with the same configuration are skipped,
+        and markdown files of deleted documents are deleted.
+
+        Analyze results and figure summaries of documents being converted are kept in CHECKPOINT_DIR_NAME in output_dir,
+        so a run started after an interrupted run resumes the documents without calling Azure services again for them.
+        A failed document is tried again after retry_delay_sec, which doubles on each attempt,
+        up to max_attempts times in this run and in total over runs,
+        and then it is quarantined: later runs skip it until it changes.
+        Transient failures, such as throttling, errors of the services and timeouts, are not counted toward quarantine.
+
+        If node_id is given, several nodes can convert the same source_dir to the same output_dir on shared storage.
+        A node converts a document only while it holds its lease in WORK_QUEUE_NAME in output_dir,
+        and waits for documents leased by other nodes until they are converted or their leases expire,
+        so each document is converted once even if a node stops.
+        A node which has lost the lease of a document, because it did not renew the lease in time,
+        drops the document before analyzing or rendering it, and leaves it to the node which has taken it over.
+
+        Each document is recorded as span 'document' with spans of its stages as children,
+        and the number of documents of each result is counted in 'documents_total'.
+
+        If watch is True, this method keeps watching source_dir after the documents in it are converted,
+        and each document added or modified later is fed to the stages as soon as it has been written.
+        A document modified while it is being converted is converted again after the current conversion ends,
+        and markdown files of documents deleted while watching are deleted.
+        It returns when stop is set.
+
+        Args:
+            source_dir:
+                Directory which has DOCX and PDF files.
+            output_dir:
+                Directory to write markdown files.
+            convert_workers:
+                Number of documents converted to PDF at the same time.
+            analyze_workers:
+                Number of threads submitting documents to be analyzed.
+            render_workers:
+                Number of documents rendered to markdown at the same time.
+            convert_batch_size:
+                Maximum number of DOCX files converted by one LibreOffice process.
+            analyze_in_flight:
+                Number of documents analyzed at the same time.
+                Documents waiting for their results do not hold the threads submitting documents,
+                so this can be much more than analyze_workers. Same as analyze_workers if it is less.
+            config_fingerprint:
+                Fingerprint of the configuration which affects markdown.
+                Documents converted with another configuration are converted again.
+            force:
+                Convert all documents even if they have not changed or they are quarantined.
+            max_attempts:
+                Number of attempts of a document before it is quarantined.
+            retry_delay_sec:
+                Delay before the second attempt of a failed document. It doubles on each attempt.
+            retry_quarantined:
+                Convert quarantined documents again from their first attempt.
+                Unlike force, documents which have not changed are still skipped.
+            node_id:
+                Name of this node, unique among the nodes converting the same documents.
+                Documents are not shared with other nodes if None.
+            lease_sec:
+                Time after which a lease of a node which has stopped expires.
+            watch:
+                Keep converting documents written to source_dir until stop is set.
+            stop:
+                Event to stop watching. If None, watching stops only by KeyboardInterrupt.
+
+        Returns:
+            Result of the conversion.
+        """
+
+        # Each run has its own working directory, so removing it never affects other runs.
+        tempdir = tempfile.mkdtemp(prefix="document_converter_")
+        report = ConvertReport()
+
+        # The directory is watched before it is listed, so a document written in between is not missed.
+        written_sources = self.watcher.watch(source_dir, self.SOURCE_SUFFIXES, stop or Event()) if watch else None
+        sources = self.__list_sources(source_dir)
+        manifest = ConvertManifest(output_dir + '/' + self.MANIFEST_NAME, node_id)
+        for output_path in manifest.remove_missing(sources):
+            report.add_removed(output_path)
+
+        work_queue = LeaseWorkQueue(output_dir + '/' + self.WORK_QUEUE_NAME, node_id, lease_sec) if node_id else None
+        checkpoint_root = pathlib.Path(output_dir) / self.CHECKPOINT_DIR_NAME
+        checkpoint_keys = set()
+        leased_by_others = object()
+
+        def check(source: pathlib.Path) -> tuple[bool, SourceState | None]:
+            """Check whether the source must be converted now, and report it if not."""
+
+            try:
+                up_to_date, state = manifest.check(source, self.__output_path(source, output_dir), config_fingerprint)
+            except OSError as e:
+                print(f"Error: {source} could not be read. {e}")
+                report.add_failed(str(source), f"check: {e}")
+                self.instrumentation.count("documents_total", result="failed")
+                return False, None
+
+            if up_to_date and not force:
+                report.add_skipped(str(source))
+                self.instrumentation.count("documents_total", result="skipped")
+                return False, state
+
+            checkpoint_keys.add(checkpoint_key(source.name, state.sha256, config_fingerprint))
+            if (manifest.failed_attempts(source, state) >= max_attempts) and not force:
+                if not retry_quarantined:
+                    report.add_quarantined(str(source))
+                    self.instrumentation.count("documents_total", result="quarantined")
+                    return False, state
+                manifest.reset_failures(source)
+
+            return True, state
+
+        # Names of sources whose jobs are in the pipeline or waiting for retries,
+        # and sources written again while their jobs are active, which are checked again when the jobs end.
+        active_sources: set[str] = set()
+        written_while_active: dict[str, pathlib.Path] = {}
+        ended_sources: list[pathlib.Path] = []
+        active_lock = Lock()
+
+        def defer_if_active(source: pathlib.Path) -> bool:
+            """Defer the source written again until its active job ends, so that it never has two jobs at a time."""
+
+            with active_lock:
+                if source.name not in active_sources:
+                    return False
+                written_while_active[source.name] = source
+                return True
+
+        def end(job: DocumentJob) -> None:
+            with active_lock:
+                active_sources.discard(job.source.name)
+                source = written_while_active.pop(job.source.name, None)
+                if source is not None:
+                    ended_sources.append(source)
+
+        def take_ended() -> list[pathlib.Path]:
+            with active_lock:
+                taken = list(ended_sources)
+                ended_sources.clear()
+            return taken
+
+        def create_job(idx: int, source: pathlib.Path) -> DocumentJob | object | None:
+            """Create job of the source, or get leased_by_others if another node is converting it."""
+
+            must_convert, state = check(source)
+            if not must_convert:
+                return None
+
+            key = checkpoint_key(source.name, state.sha256, config_fingerprint)
+            if work_queue is not None:
+                if not work_queue.claim(key):
+                    return leased_by_others
+
+                # Another node may have finished the source since the manifest was read.
+                manifest.refresh()
+                must_convert, claimed_state = check(source)
+                if (not must_convert) or (claimed_state.sha256 != state.sha256):
+                    work_queue.release(key)
+                    return leased_by_others if must_convert else None
+
+            if source.name in manifest.in_flight:
+                report.add_resumed(str(source))
+                self.instrumentation.count("documents_total", result="resumed")
+
+            job = DocumentJob(source, pathlib.Path(tempdir) / str(idx))
+            job.source_state = state
+            job.key = key
+            job.checkpoint = DocumentCheckpoint(str(checkpoint_root / key))
+            job.span = self.instrumentation.span("document", document=source.name, bytes=state.size)
+            manifest.start(source)
+            with active_lock:
+                active_sources.add(source.name)
+            return job
+
+        # Failed jobs waiting for their retry_at. Failures are handled by the worker threads of the pipeline.
+        retry_jobs: list[DocumentJob] = []
+        retry_lock = Lock()
+
+        def due_retries() -> list[DocumentJob]:
+            """Take failed jobs whose delays have passed."""
+
+            now = time.monotonic()
+            with retry_lock:
+                due = [job for job in retry_jobs if job.retry_at <= now]
+                retry_jobs[:] = [job for job in retry_jobs if job.retry_at > now]
+
+            for job in due:
+                job.span = self.instrumentation.span("document", document=job.source.name, attempt=job.attempt)
+            return due
+
+        def wait_retries() -> Iterator[DocumentJob]:
+            """Yield failed jobs as their delays pass, until none is waiting."""
+
+            while True:
+                with retry_lock:
+                    if not retry_jobs:
+                        return
+                    retry_at = min(job.retry_at for job in retry_jobs)
+                time.sleep(max(0.0, retry_at - time.monotonic()))
+                yield from due_retries()
+
+        def pending_jobs() -> Iterator[DocumentJob]:
+            # Sources leased by other nodes are checked again until they are converted,
+            # so they are taken over if their nodes stop.
+            waiting: list[tuple[int, pathlib.Path]] = []
+
+            def take(idx: int, source: pathlib.Path) -> DocumentJob | None:
+                job = create_job(idx, source)
+                if job is leased_by_others:
+                    waiting.append((idx, source))
+                    return None
+                return job
+
+            def take_waiting() -> Iterator[DocumentJob]:
+                manifest.refresh()
+                sources_to_check = list(waiting)
+                waiting.clear()
+                for idx, source in sources_to_check:
+                    job = take(idx, source)
+                    if job is not None:
+                        yield job
+
+            # Sources are checked lazily, so hashing changed sources overlaps with the pipeline.
+            for idx, source in enumerate(sources):
+                job = take(idx, source)
+                if job is not None:
+                    yield job
+
+            if written_sources is None:
+                while waiting:
+                    time.sleep(work_queue.heartbeat_sec)
+                    yield from take_waiting()
+                return
+
+            next_idx = len(sources)
+            checked_at = saved_at = missing_checked_at = time.monotonic()
+            for written in written_sources:
+                yield from due_retries()
+
+                for source in take_ended() + [source for source in written if not defer_if_active(source)]:
+                    if not source.exists():
+                        continue
+                    job = take(next_idx, source)
+                    next_idx += 1
+                    if job is not None:
+                        yield job
+
+                now = time.monotonic()
+                if now - missing_checked_at >= self.MISSING_CHECK_INTERVAL_SEC:
+                    missing_checked_at = now
+                    for output_path in manifest.remove_missing(self.__list_sources(source_dir)):
+                        report.add_removed(output_path)
+                if waiting and (now - checked_at >= work_queue.heartbeat_sec):
+                    checked_at = now
+                    yield from take_waiting()
+                if now - saved_at >= self.MANIFEST_SAVE_INTERVAL_SEC:
+                    saved_at = now
+                    manifest.save()
+
+            # Sources which were being converted by other nodes when watching stopped are left to them.
+
+        def hold(job: DocumentJob) -> None:
+            """Make sure this node still holds the lease of the job before a costly stage."""
+
+            if (work_queue is not None) and (not work_queue.holds(job.key)):
+                raise LeaseLostError(f"lease of {job.source.name} has been taken over by another node.")
+
+        def begin_analyze(job: DocumentJob) -> Future:
+            hold(job)
+            return self.__begin_analyze(job)
+
+        def release(job: DocumentJob) -> None:
+            """Release the lease of the job which has ended, and let its source be converted again if it has been written since."""
+
+            if work_queue is not None:
+                work_queue.release(job.key)
+            end(job)
+
+        def render(job: DocumentJob) -> None:
+            hold(job)
+            output_path = self.__render(job, output_dir)
+            manifest.record(job.source, job.source_state, output_path, config_fingerprint)
+            job.checkpoint.remove()
+            release(job)
+            report.add_converted(output_path)
+            if job.skipped_figures:
+                report.add_skipped_figures(str(job.source), len(job.skipped_figures))
+            self.instrumentation.count("documents_total", result="converted")
+            job.span.end()
+
+        pipeline = DocumentPipeline([
+            PipelineStage("convert", self.__traced_batch("convert", self.__convert_batch), convert_workers, convert_batch_size)
+                if convert_batch_size > 1 else PipelineStage("convert", self.__traced("convert", self.__convert), convert_workers),
+            PipelineStage(
+                "analyze", begin_analyze, analyze_workers,
+                max_in_flight=max(analyze_workers, analyze_in_flight), finish=self.__finish_analyze
+            ),
+            PipelineStage("render", self.__traced("render", render), render_workers)
+        ])
+
+        def give_up(job: DocumentJob, error: str) -> None:
+            report.add_failed(str(job.source), error)
+            self.instrumentation.count("documents_total", result="failed")
+            release(job)
+
+        def handle_failure(failure: PipelineFailure) -> None:
+            job = failure.job
+            if isinstance(failure.error, LeaseLostError):
+                # The node which has taken over the lease converts the source. It is not a failure of the source.
+                print(f"Error: {job.source} is dropped before {failure.stage_name} stage. {failure.error}")
+                job.span.set(dropped_stage=failure.stage_name)
+                job.span.end(failure.error)
+                report.add_dropped(str(job.source))
+                self.instrumentation.count("documents_total", result="dropped")
+                end(job)
+                return
+
+            error = f"{failure.stage_name}: {failure.error}"
+            transient = is_transient_error(failure.error)
+            attempts = manifest.record_failure(job.source, job.source_state, error, transient)
+            print(
+                f"Error: {job.source} failed in {failure.stage_name} stage "
+                f"(attempt {job.attempt} of {max_attempts}{', transient' if transient else ''}). {failure.error}"
+            )
+            job.span.set(failed_stage=failure.stage_name, attempt=job.attempt, transient=transient)
+            job.span.end(failure.error)
+            if (job.attempt < max_attempts) and (attempts < max_attempts):
+                delay_sec = min(retry_delay_sec * 2 ** (job.attempt - 1), self.RETRY_MAX_DELAY_SEC)
+                with retry_lock:
+                    retry_jobs.append(job.retry(delay_sec, error))
+            else:
+                give_up(job, error)
+
+        try:
+            jobs = pending_jobs()
+            while True:
+                # Failed jobs are retried by pending_jobs while it is watching source_dir, or after the pipeline here.
+                pipeline.run(jobs, on_failure=handle_failure)
+                if written_sources is not None:
+                    # Watching has stopped. Failed jobs waiting for their retries are left to the next run.
+                    with retry_lock:
+                        for job in retry_jobs:
+                            give_up(job, job.error)
+                        retry_jobs.clear()
+                with retry_lock:
+                    if not retry_jobs:
+                        break
+                jobs = wait_retries()
+
+            # Checkpoints of documents which are no longer converted, such as changed or deleted ones.
+            if checkpoint_root.exists():
+                for checkpoint_dir in checkpoint_root.iterdir():
+                    if checkpoint_dir.name in checkpoint_keys:
+                        continue
+                    if (work_queue is not None) and work_queue.is_leased(checkpoint_dir.name):
+                        continue
+                    shutil.rmtree(checkpoint_dir, ignore_errors=True)
+        finally:
+            shutil.rmtree(tempdir)
+            if work_queue is not None:
+                work_queue.close()
+            manifest.save()
+            manifest.close()
+
+        return report
+
+    def __traced(self, stage_name: str, handler: Callable[[DocumentJob], None]) -> Callable[[DocumentJob], None]:
+        """Wrap handler of a stage to record span of the stage as a child of the span of the document."""
+
+        if not self.instrumentation.enabled:
+            return handler
+
+        def handle(job: DocumentJob) -> None:
+            with self.instrumentation.span(stage_name, parent=job.span, document=job.source.name):
+                handler(job)
+
+        return handle
+
+    def __traced_batch(
+        self,
+        stage_name: str,
+        handler: Callable[[list[DocumentJob]], list[tuple[DocumentJob, Exception]]]
+    ) -> Callable[[list[DocumentJob]], list[tuple[DocumentJob, Exception]]]:
+        """Wrap handler of a stage of batches to record span of each batch."""
+
+        if not self.instrumentation.enabled:
+            return handler
+
+        def handle(jobs: list[DocumentJob]) -> list[tuple[DocumentJob, Exception]]:
+            with self.instrumentation.span(stage_name, documents=len(jobs)):
+                return handler(jobs)
+
+        return handle
+
+    def __convert(self, job: DocumentJob) -> None:
+        if job.source.suffix == '.docx':
+            job.workdir.mkdir(parents=True, exist_ok=True)
+            self.pdf_generator.generate(str(job.source), str(job.workdir))
+            job.pdf_path = job.workdir / (job.source.stem + '.pdf')
+        else:
+            # PDFs are only read, so they are used in place.
+            job.pdf_path = job.source
+
+    def __convert_batch(self, jobs: list[DocumentJob]) -> list[tuple[DocumentJob, Exception]]:
+        """Convert DOCX files of jobs by one LibreOffice process.
+
+        A DOCX file whose name is already in the batch is converted alone,
+        because PDFs of the same name would overwrite each other.
+        """
+
+        failures = []
+        batch_jobs = {}
+        for job in jobs:
+            if (job.source.suffix == '.docx') and (job.source.stem not in batch_jobs):
+                batch_jobs[job.source.stem] = job
+                continue
+
+            try:
+                self.__convert(job)
+            except Exception as e:
+                failures.append((job, e))
+
+        if not batch_jobs:
+            return failures
+
+        batch_dir = tempfile.mkdtemp(dir=str(next(iter(batch_jobs.values())).workdir.parent))
+        batch_failures = self.pdf_generator.generate_many(
+            [str(job.source) for job in batch_jobs.values()],
+            batch_dir,
+            chunk_size=len(batch_jobs)
+        )
+
+        for stem, job in batch_jobs.items():
+            if str(job.source) in batch_failures:
+                failures.append((job, RuntimeError(batch_failures[str(job.source)])))
+                continue
+
+            job.workdir.mkdir(parents=True, exist_ok=True)
+            job.pdf_path = job.workdir / (stem + '.pdf')
+            shutil.move(str(pathlib.Path(batch_dir) / (stem + '.pdf')), str(job.pdf_path))
+
+        shutil.rmtree(batch_dir)
+        return failures
+
+    def __begin_analyze(self, job: DocumentJob) -> Future:
+        """Submit the document of the job to be analyzed, and get a future of the result.
+
+        The analyze result of the checkpoint is used if any. The span of the stage ends when the future is done.
+        """
+
+        span = self.instrumentation.span("analyze", parent=job.span, document=job.source.name)
+        try:
+            job.analyze_result = job.checkpoint.load_analyze_result()
+            if job.analyze_result is not None:
+                self.instrumentation.count("cache_hits_total", cache="checkpoint")
+                future = Future()
+                future.set_result(job.analyze_result)
+            else:
+                with open(str(job.pdf_path), "rb") as file:
+                    future = self.extractor.begin_extract(file)
+        except Exception as e:
+            span.end(e)
+            raise
+
+        future.add_done_callback(lambda done: span.end(None if done.cancelled() else done.exception()))
+        return future
+
+    def __finish_analyze(self, job: DocumentJob, future: Future) -> None:
+        """Store the analyze result of the job, and save it to the checkpoint if it is new."""
+
+        if job.analyze_result is None:
+            job.analyze_result = future.result()
+            job.checkpoint.save_analyze_result(job.analyze_result)
+
+        if self.instrumentation.enabled:
+            job.span.set(pages=len(job.analyze_result.get("pages") or []))
 
-    def extractDocument(self, source_dir: str, output_dir: str) -> None:
-        tempdir = "./temp"
+    def __render(self, job: DocumentJob, output_dir: str) -> str:
+        """Write markdown of the job chunk by chunk, and move it into place when it is complete.
 
-        if not pathlib.Path(tempdir).exists():
-            pathlib.Path(tempdir).mkdir(parents=True, exist_ok=True)
+        The markdown is written to a hidden temporary file in output_dir, which shows the progress.
+        The output file never has partial markdown, even if rendering fails.
+        """
 
-        for docx in pathlib.Path(source_dir).glob('*.docx'):
-            self.pdf_generator.generate(str(docx), tempdir)
+        output_path = self.__output_path(job.source, output_dir)
+        temp_path = output_dir + '/.' + pathlib.Path(output_path).name + '.' + uuid.uuid4().hex + ".part"
+        try:
+            with open(temp_path, "xb") as file:
+                chunks = self.md_creator.create_chunks(
+                    job.analyze_result, str(job.pdf_path), job.checkpoint.figure_summaries(), job.skipped_figures
+                )
+                for chunk in chunks:
+                    file.write(chunk.encode())
+                    file.flush()
+            os.replace(temp_path, output_path)
+        except BaseException:
+            pathlib.Path(temp_path).unlink(missing_ok=True)
+            raise
+        finally:
+            job.analyze_result = None
 
-        for pdf in pathlib.Path(source_dir).glob('*.pdf'):
-            shutil.copy(str(pdf), tempdir)
+        return output_path
 
-        for source in pathlib.Path(tempdir).glob('*.pdf'):
-            with open(str(source), "rb") as file:
-                paragraphs = self.extractor.extract(file)
-                pathlib.Path(
-                        output_dir + '/' + source.name.split('.')[0] + ".md"
-                    ).write_bytes(
-                        self.md_creator.create(paragraphs, str(source)).encode()
-                    )
+    def __list_sources(self, source_dir: str) -> list[pathlib.Path]:
+        return [source for suffix in self.SOURCE_SUFFIXES for source in pathlib.Path(source_dir).glob('*' + suffix)]
 
-        shutil.rmtree(tempdir)
+    def __output_path(self, source: pathlib.Path, output_dir: str) -> str:
+        return output_dir + '/' + source.name.split('.')[0] + ".md"
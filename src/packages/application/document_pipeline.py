@@ -0,0 +1,281 @@
+"""Running documents through concurrent stages.
+
+This module provides class to run documents through several stages at the same time.
+Every stage has its own worker threads and stages are connected by bounded queues,
+so a slow stage holds back the earlier stages instead of buffering the whole batch.
+
+A stage whose work mostly waits for a service, such as analyze, can keep jobs in flight without a thread for each:
+its workers only start the work of jobs and get futures, and the jobs go on when their futures are done.
+
+Typical usage example:
+
+    pipeline = DocumentPipeline([
+        PipelineStage("convert", convert_document, workers=2),
+        PipelineStage("analyze", begin_analyze_document, workers=2, max_in_flight=32, finish=finish_analyze),
+        PipelineStage("render", render_document, workers=2)
+    ])
+    failures = pipeline.run(jobs)
+"""
+from concurrent.futures import Future
+from queue import Empty, Queue
+from threading import Lock, Semaphore, Thread
+from typing import Any, Callable, Iterable
+
+class PipelineStage:
+    """Stage of DocumentPipeline."""
+
+    def __init__(
+            self,
+            name: str,
+            handler: Callable[[Any], Any],
+            workers: int = 1,
+            batch_size: int = 1,
+            max_in_flight: int = 0,
+            finish: Callable[[Any, Future], None] | None = None
+    ) -> None:
+        """
+        Args:
+            name:
+                Name of the stage. It is used in failure reports.
+            handler:
+                Function to process one job.
+                The job is passed to the next stage when handler returns,
+                and it is dropped from the pipeline when handler raises an exception.
+
+                If batch_size is more than 1, handler receives a list of jobs instead
+                and returns a list of (job, exception) tuples of failed jobs.
+                The other jobs are passed to the next stage.
+            workers:
+                Number of jobs (or batches of jobs) processed by this stage at the same time.
+            batch_size:
+                Maximum number of jobs passed to handler at once.
+                A batch has fewer jobs when no more jobs are waiting for this stage.
+            max_in_flight:
+                If more than 0, handler starts the work of a job and returns a future without waiting for it,
+                and the job is passed to the next stage when the future is done.
+                Up to this number of jobs are in flight in this stage at the same time,
+                while workers are the number of threads starting them. batch_size must be 1.
+            finish:
+                Function called with a job and its done future when max_in_flight is more than 0,
+                such as to store the result of the future in the job.
+                It is called by a thread of this stage, not by the thread which completed the future.
+                The job is dropped from the pipeline if it raises an exception,
+                or if finish is None and the future has an exception.
+        """
+
+        if workers < 1:
+            raise ValueError(f"workers of {name} stage must be 1 or more.")
+        if batch_size < 1:
+            raise ValueError(f"batch_size of {name} stage must be 1 or more.")
+        if max_in_flight < 0:
+            raise ValueError(f"max_in_flight of {name} stage must be 0 or more.")
+        if (max_in_flight > 0) and (batch_size > 1):
+            raise ValueError(f"batch_size of {name} stage must be 1 when max_in_flight is set.")
+
+        self.name = name
+        self.handler = handler
+        self.workers = workers
+        self.batch_size = batch_size
+        self.max_in_flight = max_in_flight
+        self.finish = finish
+
+class PipelineFailure:
+    """Job which failed in DocumentPipeline."""
+
+    def __init__(
+            self,
+            job: Any,
+            stage_name: str,
+            error: Exception
+    ) -> None:
+        self.job = job
+        self.stage_name = stage_name
+        self.error = error
+
+class DocumentPipeline:
+    """Run jobs through stages concurrently."""
+
+    __END = object()
+
+    def __init__(
+            self,
+            stages: list[PipelineStage]
+    ) -> None:
+        if not stages:
+            raise ValueError("stages must not be empty.")
+
+        self.stages = stages
+
+    def run(
+            self,
+            jobs: Iterable[Any],
+            on_failure: Callable[[PipelineFailure], None] | None = None
+    ) -> list[PipelineFailure]:
+        """Run jobs through all stages.
+
+        Jobs are fed to the first stage in order, but they may leave the last stage in any order.
+        This method returns when all jobs have left the pipeline.
+
+        Args:
+            jobs:
+                Jobs to be processed. This may be a generator which blocks until the next job arrives.
+            on_failure:
+                Function called by the worker thread as soon as a job fails.
+                It lets a generator of jobs which never ends, such as one watching a directory, react to failures.
+
+        Returns:
+            Failures of jobs. Empty list if all jobs succeeded.
+        """
+
+        # Queue in front of each stage. It holds up to twice the number of jobs processed by the stage at once.
+        queues = [Queue(maxsize=max(stage.workers * stage.batch_size, stage.max_in_flight) * 2) for stage in self.stages]
+        running = [stage.workers for stage in self.stages]
+        failures = []
+        lock = Lock()
+
+        # Jobs whose futures are done, and slots of jobs in flight, of each stage with max_in_flight.
+        finished = [Queue() for _ in self.stages]
+        slots = [Semaphore(stage.max_in_flight) for stage in self.stages]
+
+        def complete(stage_idx: int, batch: list[Any], batch_failures: list[tuple[Any, Exception]]) -> None:
+            """Record failed jobs of the batch, and pass the others to the next stage."""
+
+            stage = self.stages[stage_idx]
+            if batch_failures:
+                stage_failures = [PipelineFailure(job, stage.name, e) for job, e in batch_failures]
+                with lock:
+                    failures.extend(stage_failures)
+                if on_failure is not None:
+                    for failure in stage_failures:
+                        try:
+                            on_failure(failure)
+                        except Exception as e:
+                            # The worker must go on, or the stages after it would wait forever.
+                            print(f"Error: failure of {failure.job} in {stage.name} stage could not be handled. {e}")
+
+            if stage_idx + 1 < len(self.stages):
+                failed_jobs = {id(job) for job, _ in batch_failures}
+                for job in batch:
+                    if id(job) not in failed_jobs:
+                        queues[stage_idx + 1].put(job)
+
+        def work(stage_idx: int) -> None:
+            stage = self.stages[stage_idx]
+            is_end = False
+            while not is_end:
+                job = queues[stage_idx].get()
+                if job is self.__END:
+                    break
+
+                batch = [job]
+                while len(batch) < stage.batch_size:
+                    try:
+                        job = queues[stage_idx].get_nowait()
+                    except Empty:
+                        break
+                    if job is self.__END:
+                        is_end = True
+                        break
+                    batch.append(job)
+
+                if stage.batch_size == 1:
+                    try:
+                        stage.handler(batch[0])
+                        batch_failures = []
+                    except Exception as e:
+                        batch_failures = [(batch[0], e)]
+                else:
+                    try:
+                        batch_failures = stage.handler(batch)
+                    except Exception as e:
+                        batch_failures = [(job, e) for job in batch]
+
+                complete(stage_idx, batch, batch_failures)
+
+            end_worker(stage_idx)
+
+        def start(stage_idx: int) -> None:
+            """Start the work of jobs of a stage with max_in_flight, without waiting for it."""
+
+            stage = self.stages[stage_idx]
+            while True:
+                slots[stage_idx].acquire()
+                job = queues[stage_idx].get()
+                if job is self.__END:
+                    slots[stage_idx].release()
+                    break
+
+                try:
+                    future = stage.handler(job)
+                except Exception as e:
+                    complete(stage_idx, [job], [(job, e)])
+                    slots[stage_idx].release()
+                    continue
+
+                future.add_done_callback(lambda done, job=job: finished[stage_idx].put((job, done)))
+
+            end_worker(stage_idx)
+
+        def finish(stage_idx: int) -> None:
+            """Pass jobs of a stage with max_in_flight to the next stage as their futures are done."""
+
+            stage = self.stages[stage_idx]
+            while True:
+                item = finished[stage_idx].get()
+                if item is self.__END:
+                    break
+
+                job, future = item
+                try:
+                    if stage.finish is not None:
+                        stage.finish(job, future)
+                    else:
+                        future.result()
+                    batch_failures = []
+                except Exception as e:
+                    batch_failures = [(job, e)]
+                complete(stage_idx, [job], batch_failures)
+                slots[stage_idx].release()
+
+        def end_worker(stage_idx: int) -> None:
+            stage = self.stages[stage_idx]
+            with lock:
+                running[stage_idx] -= 1
+                is_last_worker = running[stage_idx] == 0
+
+            if not is_last_worker:
+                return
+
+            if stage.max_in_flight > 0:
+                # All slots are free when all jobs in flight have been passed on.
+                for _ in range(stage.max_in_flight):
+                    slots[stage_idx].acquire()
+                finished[stage_idx].put(self.__END)
+
+            if stage_idx + 1 < len(self.stages):
+                for _ in range(self.stages[stage_idx + 1].workers):
+                    queues[stage_idx + 1].put(self.__END)
+
+        threads = []
+        for stage_idx, stage in enumerate(self.stages):
+            for worker_idx in range(stage.workers):
+                target = start if stage.max_in_flight > 0 else work
+                thread = Thread(target=target, args=(stage_idx,), name=f"{stage.name}-{worker_idx}", daemon=True)
+                thread.start()
+                threads.append(thread)
+            if stage.max_in_flight > 0:
+                thread = Thread(target=finish, args=(stage_idx,), name=f"{stage.name}-finish", daemon=True)
+                thread.start()
+                threads.append(thread)
+
+        try:
+            for job in jobs:
+                queues[0].put(job)
+        finally:
+            for _ in range(self.stages[0].workers):
+                queues[0].put(self.__END)
+
+        for thread in threads:
+            thread.join()
+
+        return failures
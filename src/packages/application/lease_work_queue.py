@@ -0,0 +1,206 @@
+"""Sharing documents of a batch between nodes.
+
+This module provides class to let several converter nodes split one batch of documents
+through leases in a SQLite database on shared storage.
+
+A node converts a document only while it holds the lease of the document.
+Leases are renewed by a heartbeat thread, and a lease which has not been renewed for lease_sec,
+because its node has stopped, expires and can be claimed by another node.
+A lease is deleted when its document has been converted or has failed,
+so the database only has documents being converted.
+A node checks that it still holds the lease by holds before each costly step,
+and leaves the document to the other node if the lease has been taken over.
+
+Clocks of the nodes must be synchronized, for example by NTP,
+since expiry of leases is compared with the clock of each node.
+
+Typical usage example:
+
+    work_queue = LeaseWorkQueue("output/.convert_work_queue.sqlite", "node-1", lease_sec=60)
+    if work_queue.claim(key):
+        if work_queue.holds(key):
+            convert(document)
+        work_queue.release(key)
+    work_queue.close()
+"""
+import sqlite3
+import time
+from threading import Event, Lock, Thread
+
+class LeaseLostError(RuntimeError):
+    """Lease of a document has been taken over by another node while this node was converting it."""
+
+class LeaseWorkQueue:
+    """Leases of documents shared by nodes through a SQLite database."""
+
+    def __init__(
+            self,
+            path: str,
+            node_id: str,
+            lease_sec: float = 60
+    ) -> None:
+        """
+        Args:
+            path:
+                SQLite database on storage shared by the nodes. It is created if it does not exist.
+            node_id:
+                Name of this node, unique among the nodes.
+            lease_sec:
+                Time after the last heartbeat when a lease expires.
+                Heartbeats are sent three times in this time.
+        """
+
+        if lease_sec <= 0:
+            raise ValueError("lease_sec must be more than 0.")
+
+        self.node_id = node_id
+        self.lease_sec = lease_sec
+        self.heartbeat_sec = lease_sec / 3
+        self.lock = Lock()
+        self.held: set[str] = set()
+        # keys of leases which have been taken over by other nodes while held
+        self.lost: set[str] = set()
+
+        # Rollback journal is used instead of WAL, because WAL does not work on network file systems.
+        self.connection = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS leases (key TEXT PRIMARY KEY, owner TEXT NOT NULL, expires_at REAL NOT NULL)"
+        )
+
+        self.closed = Event()
+        self.heartbeat = Thread(target=self.__heartbeat, name="lease-heartbeat", daemon=True)
+        self.heartbeat.start()
+
+    def claim(
+            self,
+            key: str
+    ) -> bool:
+        """Claim lease of a document.
+
+        Args:
+            key:
+                Key of the document, same on all nodes.
+
+        Returns:
+            True if this node holds the lease now,
+            False if another node holds it and it has not expired.
+        """
+
+        now = time.time()
+        with self.lock:
+            self.connection.execute("BEGIN IMMEDIATE")
+            try:
+                row = self.connection.execute("SELECT owner, expires_at FROM leases WHERE key = ?", (key,)).fetchone()
+                claimed = (row is None) or (row[0] == self.node_id) or (row[1] <= now)
+                if claimed:
+                    self.connection.execute(
+                        "INSERT OR REPLACE INTO leases (key, owner, expires_at) VALUES (?, ?, ?)",
+                        (key, self.node_id, now + self.lease_sec)
+                    )
+                self.connection.execute("COMMIT")
+            except BaseException:
+                self.connection.execute("ROLLBACK")
+                raise
+
+            if claimed:
+                self.held.add(key)
+                self.lost.discard(key)
+
+        return claimed
+
+    def release(
+            self,
+            key: str
+    ) -> None:
+        """Release lease of a document held by this node.
+
+        Args:
+            key:
+                Key of the document.
+        """
+
+        with self.lock:
+            self.held.discard(key)
+            self.connection.execute("DELETE FROM leases WHERE key = ? AND owner = ?", (key, self.node_id))
+
+    def holds(
+            self,
+            key: str
+    ) -> bool:
+        """Check whether this node still holds lease of the document.
+
+        The database is read, so that a lease taken over since the last heartbeat is also found.
+
+        Args:
+            key:
+                Key of the document.
+
+        Returns:
+            True if this node holds the lease, False if it has not claimed the lease or has lost it.
+        """
+
+        with self.lock:
+            if key not in self.held:
+                return False
+
+            row = self.connection.execute("SELECT owner FROM leases WHERE key = ?", (key,)).fetchone()
+            if (row is not None) and (row[0] == self.node_id):
+                return True
+
+            self.held.discard(key)
+            self.lost.add(key)
+
+        print(f"Error: lease of {key} has been taken over by another node.")
+        return False
+
+    def is_leased(
+            self,
+            key: str
+    ) -> bool:
+        """Check whether any node holds lease of the document now."""
+
+        with self.lock:
+            row = self.connection.execute(
+                "SELECT 1 FROM leases WHERE key = ? AND expires_at > ?", (key, time.time())
+            ).fetchone()
+
+        return row is not None
+
+    def renew(self) -> None:
+        """Extend all leases held by this node.
+
+        Leases which have been claimed by another node, because this node has not renewed them in time,
+        are reported and moved to lost.
+        """
+
+        with self.lock:
+            if not self.held:
+                return
+
+            self.connection.execute(
+                "UPDATE leases SET expires_at = ? WHERE owner = ?", (time.time() + self.lease_sec, self.node_id)
+            )
+            owned = {row[0] for row in self.connection.execute("SELECT key FROM leases WHERE owner = ?", (self.node_id,))}
+            lost = self.held - owned
+            self.held &= owned
+            self.lost |= lost
+
+        for key in lost:
+            print(f"Error: lease of {key} has been taken over by another node.")
+
+    def close(self) -> None:
+        """Stop heartbeats and release all leases held by this node, so that other nodes can claim them at once."""
+
+        self.closed.set()
+        self.heartbeat.join()
+        with self.lock:
+            self.connection.execute("DELETE FROM leases WHERE owner = ?", (self.node_id,))
+            self.held.clear()
+            self.connection.close()
+
+    def __heartbeat(self) -> None:
+        while not self.closed.wait(self.heartbeat_sec):
+            try:
+                self.renew()
+            except sqlite3.Error as e:
+                print(f"Error: leases could not be renewed. {e}")
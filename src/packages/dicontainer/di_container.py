@@ -1,14 +1,348 @@
-from injector import Binder, Module, singleton
+"""Wiring of the interfaces to their implementations.
 
+Modules of the implementations are imported by the providers which select them, not at the top of this module,
+so that a run imports only the clients and libraries of the configuration it uses.
+Keep new implementations imported in their providers, and check the startup time with benchmarks/bench_startup.py.
+
+Typical usage example:
+
+    injector = Injector([DIContainer(analyze_cache_dir="./cache/analyze")])
+    controller = injector.get(DocumentConvertController)
+"""
+from typing import TYPE_CHECKING
+
+from injector import Binder, Injector, Module, provider, singleton
+
+from packages.domain.directory_watcher import DirectoryWatcher
 from packages.domain.document_extractor import DocumentExtractor
 from packages.domain.document_intelligence_md_creator import DocumentIntelligenceMdCreator
+from packages.domain.figure_classifier import FigureClassifier
+from packages.domain.image_extractor import ImageExtractor
 from packages.domain.image_summarizer import ImageSummarizer
+from packages.domain.instrumentation import Instrumentation, NullInstrumentation
 from packages.domain.md_creator import MdCreator
-from packages.infrastructure.azure_document_extractor import AzureDocumentExtractor
-from packages.infrastructure.azureoai_imgsummarizer import AzureOaiImgSummarizer
+from packages.domain.pdf_generator import PdfGenerator
+from packages.domain.profiler import NullProfiler, Profiler
+from packages.domain.render_policy import RenderPolicy
+from packages.infrastructure.http_pool_settings import HttpPoolSettings
+from packages.infrastructure.rate_limiter import AdaptiveRateLimiter, RetryPolicy
+
+if TYPE_CHECKING:
+    from packages.infrastructure.event_loop_runner import EventLoopRunner
 
 class DIContainer(Module):
+    def __init__(
+            self,
+            analyze_cache_dir: str | None = None,
+            analyze_cache_max_bytes: int = 1024 * 1024 * 1024,
+            summary_cache_dir: str | None = None,
+            summary_cache_max_bytes: int = 64 * 1024 * 1024,
+            summary_cache_max_distance: int | None = None,
+            office_pool_size: int = 0,
+            figure_debug_dir: str | None = None,
+            render_policy: RenderPolicy | None = None,
+            figure_classifier: FigureClassifier | None = None,
+            http_pool_settings: HttpPoolSettings | None = None,
+            use_async: bool = False,
+            async_max_concurrency: int = 64,
+            analyze_rate_limiter: AdaptiveRateLimiter | None = None,
+            summary_rate_limiter: AdaptiveRateLimiter | None = None,
+            retry_policy: RetryPolicy | None = None,
+            analyze_shard_pages: int = 0,
+            analyze_shard_workers: int = 4,
+            figure_render_processes: int = 0,
+            watch_polling: bool = False,
+            watch_poll_sec: float = 1,
+            watch_settle_sec: float = 2,
+            metrics_log_path: str | None = None,
+            metrics_port: int = 0,
+            metrics_host: str = "127.0.0.1",
+            profile_mode: str | None = None,
+            profile_sample_interval_sec: float = 0.01
+    ) -> None:
+        """
+        Args:
+            analyze_cache_dir:
+                Directory to cache results of Azure Document Intelligence.
+                Results are not cached if None.
+            analyze_cache_max_bytes:
+                Upper limit of the size of analyze_cache_dir.
+            summary_cache_dir:
+                Directory to cache summaries of images.
+                Summaries are not cached if None.
+            summary_cache_max_bytes:
+                Upper limit of the size of summary_cache_dir.
+            summary_cache_max_distance:
+                Maximum number of different bits between perceptual hashes of images sharing a cached summary.
+                Images share a cached summary only if their bytes are the same if None.
+            office_pool_size:
+                Number of running LibreOffice used to convert documents to PDF.
+                A new LibreOffice is started for each document if 0.
+            figure_debug_dir:
+                Directory to save a copy of every rendered figure image for debugging.
+                Figure images are kept only in memory if None.
+            render_policy:
+                Resolution and format of figure images sent to Azure Open AI.
+                Default RenderPolicy if None.
+            figure_classifier:
+                Thresholds of trivial figures which are not sent to Azure Open AI.
+                All figures are sent if None.
+            http_pool_settings:
+                Connection pool of the clients of Azure services.
+                Default HttpPoolSettings if None.
+            use_async:
+                Send requests to Azure services from one event loop instead of worker threads.
+            async_max_concurrency:
+                Maximum number of requests in flight on the event loop if use_async.
+            analyze_rate_limiter:
+                Limiter of requests to Azure Document Intelligence shared by all workers.
+                Requests are not limited if None.
+            summary_rate_limiter:
+                Limiter of requests to Azure Open AI shared by all workers.
+                Requests are not limited if None.
+            retry_policy:
+                Policy of retries of requests throttled under the limiters.
+                Default RetryPolicy if None.
+            analyze_shard_pages:
+                PDFs with more pages are split into shards of this number of pages and analyzed concurrently.
+                PDFs are not split if 0.
+            analyze_shard_workers:
+                Maximum number of shards of a PDF analyzed at the same time.
+            figure_render_processes:
+                Number of worker processes to render figure images.
+                Figures are rendered in the threads of the render stage if 0.
+            watch_polling:
+                Watch the source directory by listing it instead of inotify,
+                for example because it is on a network file system.
+                Listing is also used where inotify is not available.
+            watch_poll_sec:
+                Interval of listing the source directory, or of checking files being written with inotify.
+            watch_settle_sec:
+                Time a written file must stay unchanged before it is converted.
+            metrics_log_path:
+                JSON-lines file to append spans of documents and stages and the final metrics to.
+                Spans are not logged if None.
+            metrics_port:
+                Port to serve metrics for Prometheus at /metrics.
+                Metrics are not served if 0.
+                Nothing is recorded if neither metrics_log_path nor metrics_port is given.
+            metrics_host:
+                Address to serve metrics on.
+            profile_mode:
+                'sampling' or 'cprofile' to make Profiler available to profile runs.
+                Profiler does nothing if None.
+            profile_sample_interval_sec:
+                Time between samples of stacks in 'sampling' mode.
+        """
+
+        self.analyze_cache_dir = analyze_cache_dir
+        self.analyze_cache_max_bytes = analyze_cache_max_bytes
+        self.summary_cache_dir = summary_cache_dir
+        self.summary_cache_max_bytes = summary_cache_max_bytes
+        self.summary_cache_max_distance = summary_cache_max_distance
+        self.office_pool_size = office_pool_size
+        self.figure_debug_dir = figure_debug_dir
+        self.render_policy = render_policy
+        self.figure_classifier = figure_classifier if figure_classifier is not None else FigureClassifier()
+        self.http_pool_settings = http_pool_settings if http_pool_settings is not None else HttpPoolSettings()
+        self.use_async = use_async
+        self.async_max_concurrency = async_max_concurrency
+        self.analyze_rate_limiter = analyze_rate_limiter
+        self.summary_rate_limiter = summary_rate_limiter
+        self.retry_policy = retry_policy if retry_policy is not None else RetryPolicy()
+        self.analyze_shard_pages = analyze_shard_pages
+        self.analyze_shard_workers = analyze_shard_workers
+        self.figure_render_processes = figure_render_processes
+        self.watch_polling = watch_polling
+        self.watch_poll_sec = watch_poll_sec
+        self.watch_settle_sec = watch_settle_sec
+        self.metrics_log_path = metrics_log_path
+        self.metrics_port = metrics_port
+        self.metrics_host = metrics_host
+        self.profile_mode = profile_mode
+        self.profile_sample_interval_sec = profile_sample_interval_sec
+        self.event_loop_runner: "EventLoopRunner | None" = None
+
     def configure(self, binder: Binder) -> None:
-        binder.bind(DocumentExtractor, to=AzureDocumentExtractor, scope=singleton)
-        binder.bind(ImageSummarizer, to=AzureOaiImgSummarizer, scope=singleton)
         binder.bind(MdCreator, to=DocumentIntelligenceMdCreator, scope=singleton)
+        binder.bind(HttpPoolSettings, to=self.http_pool_settings)
+        binder.bind(FigureClassifier, to=self.figure_classifier)
+
+    def close(self) -> None:
+        """Close the clients on the event loop and stop the event loop, if they have been created.
+
+        Call it when the objects provided by the injector are no longer used.
+        """
+
+        if self.event_loop_runner is not None:
+            self.event_loop_runner.close()
+
+    def __get_event_loop_runner(self) -> "EventLoopRunner":
+        """Get the event loop shared by the clients of both services if use_async.
+
+        It is not provided by the injector, because a provider needs its class imported even if use_async is False.
+        """
+
+        if self.event_loop_runner is None:
+            from packages.infrastructure.event_loop_runner import EventLoopRunner
+
+            self.event_loop_runner = EventLoopRunner(max_concurrency=self.async_max_concurrency)
+
+        return self.event_loop_runner
+
+    @provider
+    @singleton
+    def provide_instrumentation(self) -> Instrumentation:
+        exporters = []
+        if self.metrics_log_path is not None:
+            from packages.infrastructure.json_lines_exporter import JsonLinesExporter
+
+            exporters.append(JsonLinesExporter(self.metrics_log_path))
+        if self.metrics_port:
+            from packages.infrastructure.prometheus_exporter import PrometheusExporter
+
+            exporters.append(PrometheusExporter(self.metrics_port, host=self.metrics_host))
+
+        if self.profile_mode is not None:
+            from packages.infrastructure.profiling_instrumentation import ProfilingInstrumentation
+
+            return ProfilingInstrumentation(self.profile_mode, self.profile_sample_interval_sec, exporters)
+
+        if not exporters:
+            return NullInstrumentation()
+
+        from packages.infrastructure.metrics_instrumentation import MetricsInstrumentation
+
+        return MetricsInstrumentation(exporters)
+
+    @provider
+    @singleton
+    def provide_profiler(self, injector: Injector) -> Profiler:
+        instrumentation = injector.get(Instrumentation)
+        if isinstance(instrumentation, Profiler):
+            return instrumentation
+
+        return NullProfiler()
+
+    @provider
+    @singleton
+    def provide_document_extractor(self, injector: Injector) -> DocumentExtractor:
+        from packages.infrastructure.azure_document_extractor import AzureDocumentExtractor
+
+        instrumentation = injector.get(Instrumentation)
+        if self.use_async:
+            from packages.infrastructure.azure_async_document_extractor import AzureAsyncDocumentExtractor
+            from packages.infrastructure.event_loop_bridge import LoopDocumentExtractor
+
+            async_extractor = injector.get(AzureAsyncDocumentExtractor)
+            self.__get_event_loop_runner().on_close(async_extractor.close)
+            extractor = LoopDocumentExtractor(async_extractor, self.__get_event_loop_runner())
+        else:
+            extractor = injector.get(AzureDocumentExtractor)
+
+        if instrumentation.enabled:
+            from packages.infrastructure.instrumented_document_extractor import InstrumentedDocumentExtractor
+
+            extractor = InstrumentedDocumentExtractor(extractor, instrumentation)
+
+        if self.analyze_rate_limiter is not None:
+            from packages.infrastructure.rate_limited_document_extractor import RateLimitedDocumentExtractor
+
+            extractor = RateLimitedDocumentExtractor(extractor, self.analyze_rate_limiter, self.retry_policy, instrumentation)
+
+        if self.analyze_shard_pages > 0:
+            from packages.infrastructure.sharding_document_extractor import ShardingDocumentExtractor
+
+            extractor = ShardingDocumentExtractor(extractor, self.analyze_shard_pages, self.analyze_shard_workers)
+
+        if self.analyze_cache_dir is None:
+            return extractor
+
+        from packages.infrastructure.cached_document_extractor import CachedDocumentExtractor
+        from packages.infrastructure.disk_lru_cache import DiskLruCache
+
+        return CachedDocumentExtractor(
+            extractor,
+            DiskLruCache(self.analyze_cache_dir, self.analyze_cache_max_bytes),
+            AzureDocumentExtractor.MODEL_ID,
+            AzureDocumentExtractor.OUTPUT_CONTENT_FORMAT,
+            instrumentation
+        )
+
+    @provider
+    @singleton
+    def provide_image_summarizer(self, injector: Injector) -> ImageSummarizer:
+        instrumentation = injector.get(Instrumentation)
+        if self.use_async:
+            from packages.infrastructure.azureoai_async_imgsummarizer import AzureOaiAsyncImgSummarizer
+            from packages.infrastructure.event_loop_bridge import LoopImageSummarizer
+
+            async_summarizer = injector.get(AzureOaiAsyncImgSummarizer)
+            deployment = async_summarizer.deployment
+            self.__get_event_loop_runner().on_close(async_summarizer.close)
+            summarizer = LoopImageSummarizer(async_summarizer, self.__get_event_loop_runner())
+        else:
+            from packages.infrastructure.azureoai_imgsummarizer import AzureOaiImgSummarizer
+
+            summarizer = injector.get(AzureOaiImgSummarizer)
+            deployment = summarizer.deployment
+
+        if instrumentation.enabled:
+            from packages.infrastructure.instrumented_image_summarizer import InstrumentedImageSummarizer
+
+            summarizer = InstrumentedImageSummarizer(summarizer, instrumentation)
+
+        if self.summary_rate_limiter is not None:
+            from packages.infrastructure.rate_limited_image_summarizer import RateLimitedImageSummarizer
+
+            summarizer = RateLimitedImageSummarizer(summarizer, self.summary_rate_limiter, self.retry_policy, instrumentation)
+
+        if self.summary_cache_dir is None:
+            return summarizer
+
+        from packages.infrastructure.azureoai_imgsummarizer import summary_cache_namespace
+        from packages.infrastructure.cached_image_summarizer import CachedImageSummarizer
+        from packages.infrastructure.disk_lru_cache import DiskLruCache
+
+        return CachedImageSummarizer(
+            summarizer,
+            DiskLruCache(self.summary_cache_dir, self.summary_cache_max_bytes),
+            max_distance=self.summary_cache_max_distance,
+            namespace=summary_cache_namespace(deployment),
+            instrumentation=instrumentation
+        )
+
+    @provider
+    @singleton
+    def provide_pdf_generator(self) -> PdfGenerator:
+        if self.office_pool_size == 0:
+            return PdfGenerator()
+
+        from packages.infrastructure.office_pool_pdf_generator import OfficePoolPdfGenerator
+
+        return OfficePoolPdfGenerator(pool_size=self.office_pool_size)
+
+    @provider
+    @singleton
+    def provide_image_extractor(self) -> ImageExtractor:
+        if self.figure_render_processes > 0:
+            from packages.infrastructure.process_pool_image_extractor import ProcessPoolImageExtractor
+
+            return ProcessPoolImageExtractor(
+                self.figure_render_processes,
+                debug_dir=self.figure_debug_dir,
+                render_policy=self.render_policy
+            )
+
+        return ImageExtractor(debug_dir=self.figure_debug_dir, render_policy=self.render_policy)
+
+    @provider
+    @singleton
+    def provide_directory_watcher(self) -> DirectoryWatcher:
+        from packages.infrastructure.inotify_directory_watcher import InotifyDirectoryWatcher
+        from packages.infrastructure.polling_directory_watcher import PollingDirectoryWatcher
+
+        if (not self.watch_polling) and InotifyDirectoryWatcher.is_available():
+            return InotifyDirectoryWatcher(poll_sec=self.watch_poll_sec, settle_sec=self.watch_settle_sec)
+
+        return PollingDirectoryWatcher(poll_sec=self.watch_poll_sec, settle_sec=self.watch_settle_sec)
@@ -0,0 +1,92 @@
+"""Looking up elements of Azure Document Intelligence result.
+
+This module provides class to resolve references such as "/paragraphs/3" in sections
+to the elements of the result on demand.
+
+The index reads the JSON response as it is. Nothing is copied or converted
+until an element is looked up, so elements which are never referenced cost nothing.
+
+Typical usage example:
+
+    index = AnalyzeResultIndex(analyze_result)
+    for elements in index.section_elements():
+        for reference in elements:
+            kind, idx = index.resolve(reference)
+            if kind == AnalyzeResultIndex.PARAGRAPHS:
+                paragraph = index.paragraph(idx)
+                print(paragraph.role, paragraph.content)
+"""
+from typing import Iterator, Mapping
+
+class ParagraphRecord:
+    """Role and content of a paragraph."""
+
+    __slots__ = ("role", "content")
+
+    def __init__(self, role: str, content: str) -> None:
+        self.role = role
+        self.content = content
+
+class AnalyzeResultIndex:
+    """Resolve references of elements of Azure Document Intelligence result on demand."""
+
+    PARAGRAPHS = "paragraphs"
+    TABLES = "tables"
+    FIGURES = "figures"
+    SECTIONS = "sections"
+
+    def __init__(self, analyze_result: Mapping[str, any]) -> None:
+        """
+        Args:
+            analyze_result:
+                Azure Document Intelligence result of extracting file, as JSON response.
+        """
+
+        self.analyze_result = analyze_result
+
+    def resolve(self, reference: str) -> tuple[str, int] | None:
+        """Parse reference of an element.
+
+        Args:
+            reference:
+                Reference such as "/paragraphs/3".
+
+        Returns:
+            Kind of the element (PARAGRAPHS, TABLES, FIGURES or SECTIONS) and its index,
+            or None if the reference has another form.
+        """
+
+        head, _, idx = reference.rpartition('/')
+        if (not idx.isdigit()) or (not head.startswith('/')):
+            return None
+
+        return head[1:], int(idx)
+
+    def section_elements(self) -> Iterator[list[str]]:
+        """Iterate references of elements of each section in the order of the result."""
+
+        for section in self.__items(self.SECTIONS):
+            yield section.get("elements") or []
+
+    def paragraph(self, idx: int) -> ParagraphRecord:
+        """Get role and content of the paragraph.
+
+        Missing role and content are empty strings.
+        """
+
+        paragraph = self.__items(self.PARAGRAPHS)[idx]
+
+        return ParagraphRecord(paragraph.get("role") or "", paragraph.get("content") or "")
+
+    def table(self, idx: int) -> Mapping[str, any]:
+        """Get the table as JSON response."""
+
+        return self.__items(self.TABLES)[idx]
+
+    def figures(self) -> list[Mapping[str, any]]:
+        """Get all figures as JSON response."""
+
+        return self.__items(self.FIGURES)
+
+    def __items(self, kind: str) -> list[Mapping[str, any]]:
+        return self.analyze_result.get(kind) or []
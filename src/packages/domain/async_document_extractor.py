@@ -0,0 +1,56 @@
+"""Extracting documents asynchronously.
+
+This module provides class to extract various document on asyncio event loop.
+"""
+from abc import ABCMeta, abstractmethod
+from typing import Awaitable, Callable
+
+class AsyncDocumentExtractor(metaclass=ABCMeta):
+    """Extract document asynchronously"""
+
+    @abstractmethod
+    async def extract(
+        self,
+        document: bytes
+    ) -> dict[str, any]:
+        """Extract document by using Cloud Service.
+
+        Args:
+            document:
+                Bytes of document to be extracted.
+
+        Returns:
+            JSON response of extracted document.
+        """
+
+        raise NotImplementedError()
+
+    async def begin_extract(
+        self,
+        document: bytes
+    ) -> Callable[[], Awaitable[dict[str, any]]]:
+        """Submit document to Cloud Service, and get a coroutine function to wait for the result.
+
+        Like DocumentExtractor.begin_extract, errors of the submission are raised by this method
+        and errors of waiting are raised by the coroutine.
+        By default, the document is extracted by extract before this method returns.
+
+        Args:
+            document:
+                Bytes of document to be extracted.
+
+        Returns:
+            Coroutine function which waits for the JSON response of extracted document and returns it.
+        """
+
+        result = await self.extract(document)
+
+        async def wait() -> dict[str, any]:
+            return result
+
+        return wait
+
+    async def close(self) -> None:
+        """Close clients of the event loop used by this extractor. It must be called in the same event loop."""
+
+        pass
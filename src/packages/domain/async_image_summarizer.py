@@ -0,0 +1,39 @@
+"""Summarize image asynchronously.
+
+This module provides class to summarize image on asyncio event loop.
+
+Typical usage example:
+    async def some_method(
+            image_summarizer: AsyncImageSummarizer,
+            images: list[bytes]
+    ):
+        summaries = await asyncio.gather(*[image_summarizer.summarize(img) for img in images])
+"""
+
+from abc import ABCMeta, abstractmethod
+
+class AsyncImageSummarizer(metaclass=ABCMeta):
+    """Summarize image asynchronously."""
+    @abstractmethod
+    async def summarize(
+           self,
+           img: bytes | str
+    ) -> str:
+        """Summarize image.
+
+        Summarize png, jpeg or webp image.
+
+        Args:
+            img:
+                Image bytes, or path to image file.
+
+        Returns:
+            Summary of the image as str.
+        """
+
+        raise NotImplementedError()
+
+    async def close(self) -> None:
+        """Close clients of the event loop used by this summarizer. It must be called in the same event loop."""
+
+        pass
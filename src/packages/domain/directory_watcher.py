@@ -0,0 +1,38 @@
+"""Watching directory for new documents.
+
+This module provides class to find files which are added to or modified in a directory.
+"""
+from abc import ABCMeta, abstractmethod
+from threading import Event
+from typing import Iterator
+import pathlib
+
+class DirectoryWatcher(metaclass=ABCMeta):
+    """Watch directory for written files"""
+
+    @abstractmethod
+    def watch(
+        self,
+        directory: str,
+        suffixes: list[str],
+        stop: Event
+    ) -> Iterator[list[pathlib.Path]]:
+        """Watch directory for files which are added or modified after this method is called.
+
+        A file is reported only after it has stopped changing,
+        so files being copied or uploaded are not read partially.
+
+        Args:
+            directory:
+                Directory to watch. Subdirectories are not watched.
+            suffixes:
+                Suffixes of files to watch, such as ".pdf".
+            stop:
+                Event to stop watching. The iterator ends soon after it is set.
+
+        Returns:
+            Iterator which blocks until the next check and yields files written since the last check.
+            The list is empty if no file has been written, so the caller can do other work regularly.
+        """
+
+        raise NotImplementedError()
@@ -3,6 +3,7 @@
 This module provides class to extract various document.
 """
 from abc import ABCMeta, abstractmethod
+from concurrent.futures import Future
 from typing import IO
 
 class DocumentExtractor(metaclass=ABCMeta):
@@ -24,3 +25,26 @@ class DocumentExtractor(metaclass=ABCMeta):
         """
 
         raise NotImplementedError()
+
+    def begin_extract(
+        self,
+        document: IO
+    ) -> Future:
+        """Submit document to Cloud Service, and get a future of the result without waiting for it.
+
+        Errors of the request submitting the document are raised by this method,
+        and errors of waiting for the result are set to the future,
+        so that wrappers can retry the submission without submitting a document twice.
+        By default, the document is extracted by extract before this method returns.
+
+        Args:
+            document:
+                Document to be extracted.
+
+        Returns:
+            Future of JSON response of extracted document.
+        """
+
+        future = Future()
+        future.set_result(self.extract(document))
+        return future
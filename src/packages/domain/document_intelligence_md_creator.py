@@ -22,26 +22,43 @@ Typical usage example:
 
             context = self.md_creator.create(result.as_dict(), source_pdf_path)
 """
-from azure.ai.documentintelligence.models import AnalyzeResult, DocumentTableCell, DocumentTableCellKind
+from contextlib import ExitStack
+from typing import Iterator, Mapping, MutableMapping
+
 from injector import inject, singleton
 
-from packages.domain.image_extractor import ImageExtractor
+from packages.domain.analyze_result_index import AnalyzeResultIndex
+from packages.domain.figure_classifier import FigureClassifier
+from packages.domain.image_extractor import ImageExtractionSession, ImageExtractor
 from packages.domain.image_summarizer import ImageSummarizer
+from packages.domain.instrumentation import Instrumentation, NullInstrumentation
 from packages.domain.md_creator import MdCreator
 
+# Values of DocumentTableCellKind of Azure SDK rendered as headers, in results converted to dict.
+# They are written here, so that rendering does not import the SDK.
+HEADER_CELL_KINDS = ("columnHeader", "rowHeader")
+
 @singleton
 class DocumentIntelligenceMdCreator(MdCreator):
     """Create MarkDown context from Azure Document Intelligence result."""
 
+    # Number of figures rendered and summarized at a time, ahead of the sections referencing them.
+    # Images of a batch are released as soon as they are summarized, so at most this many images are held.
+    FIGURE_SUMMARY_BATCH_SIZE = 16
+
     @inject
     def __init__(
             self,
             img_extractor: ImageExtractor,
-            img_summarizer: ImageSummarizer
+            img_summarizer: ImageSummarizer,
+            instrumentation: Instrumentation = None,
+            figure_classifier: FigureClassifier = None
     ) -> None:
 
         self.img_extractor = img_extractor
         self.img_summarizer = img_summarizer
+        self.instrumentation = instrumentation if instrumentation is not None else NullInstrumentation()
+        self.figure_classifier = figure_classifier if figure_classifier is not None else FigureClassifier()
 
     def create(
             self,
@@ -64,127 +81,141 @@ class DocumentIntelligenceMdCreator(MdCreator):
             '# 1 Title\n\n\n## 1.1 SubTitle\n\nHello\n\nWorld.'
         """
 
-        all_markdown = ''
-
-        document_intelligence_result = AnalyzeResult(analyze_result)
-
-        paragraphs = self.__get_paragraphs(document_intelligence_result)
-        tables = self.__get_markdown_tables(document_intelligence_result)
+        return ''.join(self.create_chunks(analyze_result, source_pdf_path))
 
-        section_elements = self.__get_section_elements(document_intelligence_result)
-        for element in section_elements:
-            if element.startswith('/paragraphs/'):
-                is_first_line = all_markdown == ''
-                all_markdown += self.__get_markdown_paragraph(
-                    paragraphs[element]['role'],
-                    paragraphs[element]['content'],
-                    is_first_line
-                )
-            elif element.startswith('/figures/'):
-                idx = int(element.split('/')[-1])
-                all_markdown += self.__get_figure_summarize(idx, document_intelligence_result, source_pdf_path)
-            elif element.startswith('/tables/'):
-                idx = int(element.split('/')[-1])
-                all_markdown += tables[element]
-            else:
-                continue
-
-            all_markdown += '\n'
-        return all_markdown
-
-    def __get_paragraphs(
+    def create_chunks(
             self,
-            analyze_result: AnalyzeResult
-    ) -> dict[str, dict[str, str]]:
-        """Get paragraphs from Azure Document Intelligence response.
-        paragraphs is one of the JSON attributes in the response.
+            analyze_result: dict[str, any],
+            source_pdf_path: str,
+            figure_summaries: MutableMapping[int, str] | None = None,
+            skipped_figures: MutableMapping[int, str] | None = None
+    ) -> Iterator[str]:
+        """Create MarkDown context from Azure Document Intelligence result section by section.
+
+        Each section is yielded as soon as it is rendered, so only one section of markdown is held at a time.
+        Figures are rendered and summarized FIGURE_SUMMARY_BATCH_SIZE at a time in the order sections reference them,
+        when the section referencing the first figure of the batch is reached,
+        so the first sections are yielded before later figures are rendered.
+        Figures found trivial by figure_classifier are not summarized.
 
         Args:
             analyze_result:
                 Azure Document Intelligence result of extracting file.
-
-        Returns:
-            paragraphs dictionary.
-            this dictionary has paragraph id as key. ex) "/paragraphs/0"
-            and a paragraph is also dictionary whitch has id, content, role, polygon and pageNumber as key.
+            source_pdf_path:
+                Extracted Source file by Azure Document Intelligence.
+                This path is consistent with the file used in the analyze_result.
+            figure_summaries:
+                Summaries of figures by index of figure, kept by the caller.
+                Figures in it are not summarized again, and new summaries are stored to it
+                after each batch of figures, so that they survive a failure of later figures.
+            skipped_figures:
+                Reasons of figures found trivial by index of figure, stored by this method.
+                Trivial figures are not stored to figure_summaries, so they are checked again when resumed.
+
+        Yields:
+            MarkDown context of each section. Empty sections are not yielded.
         """
 
-        paragraphs = {}
-        for idx, paragraph in enumerate(analyze_result.paragraphs):
-            item = {
-                "id": "/paragraphs/" + str(idx),
-                "content": paragraph.content if paragraph.content else "",
-                "role": paragraph.role if paragraph.role else "",
-                "polygon": paragraph.get("boundingRegions")[0]["polygon"],
-                "pageNumber": paragraph.get("boundingRegions")[0]["pageNumber"]
-            }
-            paragraphs["/paragraphs/" + str(idx)] = item
-        return paragraphs
-
-    def __get_section_elements(
+        # Elements are looked up in the result while sections are walked, and only referenced ones are rendered.
+        index = AnalyzeResultIndex(analyze_result)
+        stored_summaries = figure_summaries
+        summaries = dict(stored_summaries) if stored_summaries is not None else {}
+        skipped_figures = skipped_figures if skipped_figures is not None else {}
+        figures = self.__find_figures(index, summaries, skipped_figures)
+        # position of each figure to summarize in figures
+        positions = {idx: position for position, (idx, _) in enumerate(figures)}
+        summarized = 0
+
+        is_first_line = True
+        with ExitStack() as stack:
+            session = None
+            for section_elements in index.section_elements():
+                references = [reference for reference in map(index.resolve, section_elements) if reference is not None]
+                last_figure = max(
+                    (positions[idx] for kind, idx in references if (kind == AnalyzeResultIndex.FIGURES) and (idx in positions)),
+                    default=-1
+                )
+                while summarized <= last_figure:
+                    if session is None:
+                        session = stack.enter_context(self.img_extractor.open(source_pdf_path))
+                    batch = figures[summarized:summarized + self.FIGURE_SUMMARY_BATCH_SIZE]
+                    self.__summarize_figures(session, batch, summaries, stored_summaries, skipped_figures)
+                    summarized += len(batch)
+
+                markdown = self.__render_section(index, references, summaries, is_first_line)
+                if markdown:
+                    yield markdown
+                    is_first_line = False
+
+    def __render_section(
             self,
-            analyze_result: AnalyzeResult
-    ) -> list[str]:
-        """Get elements from Azure Document Intelligence response.
-        elements is part of sections whitch is one of the JSON attributes in the response.
-        element represents a paragraph, table, figure, or other in the extracted document.
-
-        Args:
-            analyze_result:
-                Azure Document Intelligence result of extracting file.
+            index: AnalyzeResultIndex,
+            references: list[tuple[str, int]],
+            figure_summaries: dict[int, str],
+            is_first_line: bool
+    ) -> str:
+        """Render markdown of the elements of a section, or an empty string if the section has none to render."""
+
+        # Parts of the section are joined once, so the time is linear in the size of the output.
+        markdown_parts: list[str] = []
+        for kind, idx in references:
+            if kind == AnalyzeResultIndex.PARAGRAPHS:
+                paragraph = index.paragraph(idx)
+                markdown_parts.append(self.__get_markdown_paragraph(
+                    paragraph.role,
+                    paragraph.content,
+                    is_first_line
+                ))
+            elif kind == AnalyzeResultIndex.FIGURES:
+                markdown_parts.append(self.__get_figure_summarize(idx, figure_summaries))
+            elif kind == AnalyzeResultIndex.TABLES:
+                markdown_parts.append(self.__get_markdown_table(index.table(idx)))
+                self.instrumentation.count("tables_total")
+            else:
+                continue
 
-        Returns:
-            elements
-        """
+            markdown_parts.append('\n')
+            is_first_line = False
 
-        section_elements = []
-        for section in analyze_result.sections:
-            section_elements.extend(section.elements) 
-        return section_elements
+        return ''.join(markdown_parts)
 
-    def __get_markdown_tables(
+    def __get_markdown_table(
             self,
-            analyze_result: AnalyzeResult
-    ) -> dict[str, str]:
-        """Get markdown tables from Azure Document Intelligence response.
+            table: Mapping[str, any]
+    ) -> str:
+        """Get markdown table from a table of Azure Document Intelligence response.
 
         Args:
-            analyze_result:
-                Azure Document Intelligence result of extracting file.
+            table:
+                Table of Azure Document Intelligence result as JSON response.
 
         Returns:
-            dictionary of markdown tables.
+            markdown table.
             example: 
 
-            {
-                "/tables/0" : "<table>\n<tr>\n<th>HEADER1</th>\n<th>HEADER2</th>\n</tr>\n<tr>\n<td>DATA1</td>\n<td>DATA2</td>\n</tr>\n</table>",
-                "/tables/1" : "<table>\n<tr>\n<th>FOO</th>\n<th>BAR</th>\n</tr>\n<tr>\n<td>foo</td>\n<td>bar</td>\n</tr>\n</table>"
-            }
+            "<table>\n<tr>\n<th>HEADER1</th>\n<th>HEADER2</th>\n</tr>\n<tr>\n<td>DATA1</td>\n<td>DATA2</td>\n</tr>\n</table>"
         """
 
-        tables = {}
+        cells = table.get("cells") or []
+        table_parts = ["<table>\n<tr>\n"]
 
-        for idx, table in enumerate(analyze_result.tables):
-            table_data = "<table>\n<tr>\n"
+        for cell_idx, cell in enumerate(cells):
+            if self.__check_new_row(cell_idx, cells):
+                table_parts.append("</tr>\n<tr>\n")
 
-            for cell_idx, cell in enumerate(table.cells):
-                if self.__check_new_row(cell_idx, table.cells):
-                    table_data += "</tr>\n<tr>\n"
-                
-                if (cell.kind == DocumentTableCellKind.COLUMN_HEADER) | (cell.kind == DocumentTableCellKind.ROW_HEADER):
-                    table_data += self.__create_table_header(cell)
-                else:
-                    table_data += self.__create_table_data(cell)
+            if cell.get("kind") in HEADER_CELL_KINDS:
+                table_parts.append(self.__create_table_header(cell))
+            else:
+                table_parts.append(self.__create_table_data(cell))
 
-            table_data += "</tr>\n</table>"
-            tables["/tables/" + str(idx)] = table_data
+        table_parts.append("</tr>\n</table>")
 
-        return tables
+        return ''.join(table_parts)
 
     def __check_new_row(
             self,
             cell_idx: int,
-            cell_list: list[DocumentTableCell]
+            cell_list: list[Mapping[str, any]]
     ) -> bool:
         """Check wheather the new row or not.
 
@@ -201,17 +232,17 @@ class DocumentIntelligenceMdCreator(MdCreator):
         if cell_idx == 0:
             return False
         else:
-            return cell_list[cell_idx - 1].row_index != cell_list[cell_idx].row_index
+            return cell_list[cell_idx - 1].get("rowIndex") != cell_list[cell_idx].get("rowIndex")
 
     def __create_table_header(
             self,
-            cell: DocumentTableCell 
+            cell: Mapping[str, any]
     ) -> str:
         """Create markdown table header string.
 
         Args:
             cell:
-                Cell data of Azure Document Intelligence result.
+                Cell data of Azure Document Intelligence result as JSON response.
 
         Returns:
             markdown table header string
@@ -224,24 +255,28 @@ class DocumentIntelligenceMdCreator(MdCreator):
                     "<th colspan="2">HEADER1</th>\n"
         """
 
-        if (cell.column_span is not None) and (cell.row_span is not None):
-            return f"<th colspan=\"{cell.column_span}\" rowspan=\"{cell.row_span}\">{cell.content}</th>\n"
-        elif cell.column_span is not None:
-            return f"<th colspan=\"{cell.column_span}\">{cell.content}</th>\n"
-        elif cell.row_span is not None:
-            return f"<th rowspan=\"{cell.row_span}\">{cell.content}</th>\n"
+        column_span = cell.get("columnSpan")
+        row_span = cell.get("rowSpan")
+        content = cell.get("content")
+
+        if (column_span is not None) and (row_span is not None):
+            return f"<th colspan=\"{column_span}\" rowspan=\"{row_span}\">{content}</th>\n"
+        elif column_span is not None:
+            return f"<th colspan=\"{column_span}\">{content}</th>\n"
+        elif row_span is not None:
+            return f"<th rowspan=\"{row_span}\">{content}</th>\n"
         else:
-            return f"<th>{cell.content}</th>\n"
+            return f"<th>{content}</th>\n"
 
     def __create_table_data(
             self,
-            cell: DocumentTableCell 
+            cell: Mapping[str, any]
     ) -> str:
         """Create markdown table data string.
 
         Args:
             cell:
-                Cell data of Azure Document Intelligence result.
+                Cell data of Azure Document Intelligence result as JSON response.
 
         Returns:
             markdown table data string
@@ -254,14 +289,18 @@ class DocumentIntelligenceMdCreator(MdCreator):
                     "<td colspan="2">data1</td>\n"
         """
 
-        if (cell.column_span is not None) and (cell.row_span is not None):
-            return f"<td colspan=\"{cell.column_span}\" rowspan=\"{cell.row_span}\">{cell.content}</td>\n"
-        elif cell.column_span is not None:
-            return  f"<td colspan=\"{cell.column_span}\">{cell.content}</td>\n"
-        elif cell.row_span is not None:
-            return f"<td rowspan=\"{cell.row_span}\">{cell.content}</td>\n"
+        column_span = cell.get("columnSpan")
+        row_span = cell.get("rowSpan")
+        content = cell.get("content")
+
+        if (column_span is not None) and (row_span is not None):
+            return f"<td colspan=\"{column_span}\" rowspan=\"{row_span}\">{content}</td>\n"
+        elif column_span is not None:
+            return  f"<td colspan=\"{column_span}\">{content}</td>\n"
+        elif row_span is not None:
+            return f"<td rowspan=\"{row_span}\">{content}</td>\n"
         else:
-            return f"<td>{cell.content}</td>\n"
+            return f"<td>{content}</td>\n"
 
     def __get_markdown_paragraph(
             self,
@@ -292,33 +331,140 @@ class DocumentIntelligenceMdCreator(MdCreator):
         else:
             return '\n' + content
 
+    def __find_figures(
+            self,
+            index: AnalyzeResultIndex,
+            summaries: dict[int, str],
+            skipped_figures: MutableMapping[int, str]
+    ) -> list[tuple[int, tuple[int, list[float]]]]:
+        """Find figures to summarize in the order sections reference them.
+
+        Figures which have summaries, have no bounding regions or are not referenced by any section are left out.
+        Small figures are skipped here, before they are rendered.
+
+        Args:
+            index:
+                Index of Azure Document Intelligence result of extracting file.
+            summaries:
+                Summaries of figures known so far. Summaries of skipped figures are added to it.
+            skipped_figures:
+                Reasons of trivial figures are added to it.
+
+        Returns:
+            Index of each figure in the analyze result, with its page number and bounding box in points.
+        """
+
+        all_figures = index.figures()
+        referenced = {}
+        for section_elements in index.section_elements():
+            for reference in map(index.resolve, section_elements):
+                if (reference is not None) and (reference[0] == AnalyzeResultIndex.FIGURES) and (reference[1] < len(all_figures)):
+                    referenced.setdefault(reference[1], None)
+
+        figures = []
+        figure_count = 0
+        for idx in referenced:
+            figure = all_figures[idx]
+            if figure.get('boundingRegions') and (idx not in summaries):
+                br = figure['boundingRegions'][0]
+                bbox = br['polygon']
+                cordinates = [bbox[0] * 72, bbox[1] * 72, bbox[4] * 72, bbox[5] * 72]
+                figure_count += 1
+                reason = self.figure_classifier.classify_region(cordinates)
+                if reason is not None:
+                    self.__skip_figure(idx, reason, summaries, skipped_figures)
+                    continue
+                figures.append((idx, (br['pageNumber'], cordinates)))
+
+        if figure_count > 0:
+            self.instrumentation.count("figures_total", figure_count)
+
+        return figures
+
+    def __summarize_figures(
+            self,
+            session: ImageExtractionSession,
+            figures: list[tuple[int, tuple[int, list[float]]]],
+            summaries: dict[int, str],
+            stored_summaries: MutableMapping[int, str] | None,
+            skipped_figures: MutableMapping[int, str]
+    ) -> None:
+        """Render images of a batch of figures from the opened PDF in memory and summarize them.
+
+        Trivial figures are skipped after they are rendered.
+        The images are released when this method returns, so only one batch of images is held at a time.
+
+        Args:
+            session:
+                Session of the source PDF.
+            figures:
+                Index of each figure in the analyze result, with its page number and bounding box in points.
+            summaries:
+                Summaries of figures. New summaries are added to it.
+            stored_summaries:
+                Summaries stored by earlier attempts. New summaries are added to it.
+            skipped_figures:
+                Reasons of trivial figures are added to it.
+        """
+
+        figure_indexes = [idx for idx, _ in figures]
+        with self.instrumentation.span("render_figures", figures=len(figures)):
+            images = session.render_all([region for _, region in figures])
+
+        if self.figure_classifier.checks_image():
+            kept_indexes = []
+            kept_images = []
+            for idx, image in zip(figure_indexes, images):
+                reason = self.figure_classifier.classify_image(image)
+                if reason is not None:
+                    self.__skip_figure(idx, reason, summaries, skipped_figures)
+                    continue
+                kept_indexes.append(idx)
+                kept_images.append(image)
+            figure_indexes, images = kept_indexes, kept_images
+            if not images:
+                return
+
+        with self.instrumentation.span("summarize_figures", figures=len(images)):
+            batch = dict(zip(figure_indexes, self.img_summarizer.summarize_many(images)))
+        summaries.update(batch)
+        if stored_summaries is not None:
+            stored_summaries.update(batch)
+
+    def __skip_figure(
+            self,
+            figure_idx: int,
+            reason: str,
+            summaries: dict[int, str],
+            skipped_figures: MutableMapping[int, str]
+    ) -> None:
+        """Record a trivial figure, and give it skipped_summary of figure_classifier if any."""
+
+        skipped_figures[figure_idx] = reason
+        self.instrumentation.count("figures_skipped_total", reason=reason)
+        if self.figure_classifier.skipped_summary:
+            summaries[figure_idx] = self.figure_classifier.skipped_summary
+
     def __get_figure_summarize(
             self,
             figure_idx: int,
-            analyze_result: AnalyzeResult,
-            source_pdf_path: str
+            figure_summaries: dict[int, str]
     ) -> str:
         """Create markdown paragraph string whitch is summarize of image information.
 
         Args:
             figure_idx:
                 Index of figure in the analyze result.
-            analyze_result:
-                Azure Document Intelligence result of extracting file.
-            source_pdf_path:
-                Extracted Source file by Azure Document Intelligence.
+            figure_summaries:
+                summaries of figures created by __summarize_figures so far.
 
         Returns:
             markdown paragraph string whitch is summarize of image information.
+            empty string if the figure has no summary, such as a trivial figure left out.
         """
 
-        figure = analyze_result.figures[figure_idx]
-        tempdir = "./temp"
-        if 'boundingRegions' in figure:
-            for i, br in enumerate(figure['boundingRegions']):
-                page_number = br['pageNumber']
-                bbox = br['polygon']
-                cordinates = [bbox[0] * 72, bbox[1] * 72, bbox[4] * 72, bbox[5] * 72]
-                img = self.img_extractor.extract(source_pdf_path, page_number, tempdir, cordinates)
-                img_summary = self.img_summarizer.summarize(img)
-                return f'[この部分にはもともと画像情報が添付されていました。画像情報の要約は以下になります。]\n({img_summary})'
+        if figure_idx in figure_summaries:
+            img_summary = figure_summaries[figure_idx]
+            return f'[この部分にはもともと画像情報が添付されていました。画像情報の要約は以下になります。]\n({img_summary})'
+
+        return ''
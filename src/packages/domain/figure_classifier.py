@@ -0,0 +1,182 @@
+"""Finding trivial figures which are not worth summarizing.
+
+This module provides class to find figures such as icons, bullets, rules, blank boxes and solid fills
+with cheap local checks, so that they are not sent to a vision model.
+
+Small figures are found from their bounding boxes before they are rendered.
+Other figures are found from the gray levels of their rendered images:
+a uniform color, little ink on the background, or little information (entropy) in the levels.
+
+Every check is disabled by default, and it is enabled by giving its threshold.
+
+Typical usage example:
+
+    classifier = FigureClassifier(min_edge_pt=16, min_area_pt=1024, min_ink_coverage=0.005)
+    reason = classifier.classify_region([72, 72, 88, 88])
+    if reason is None:
+        reason = classifier.classify_image(png_bytes)
+    if reason is not None:
+        print(f"Skipped a {reason} figure.")
+"""
+from collections import Counter
+import math
+from typing import List
+
+class FigureClassifier:
+    """Find trivial figures by their sizes and the gray levels of their images."""
+
+    SMALL = "small"
+    UNIFORM = "uniform"
+    BLANK = "blank"
+    LOW_ENTROPY = "low_entropy"
+
+    # Images are shrunk by halves to this number of pixels or less before their gray levels are counted.
+    # Halving at most a few times keeps lines of one pixel visible as ink.
+    MAX_ANALYZED_PIXELS = 512 * 512
+    # Pixels whose gray level differs from the background by more than this are ink.
+    INK_LEVEL_DIFFERENCE = 32
+
+    def __init__(
+            self,
+            min_edge_pt: float = 0,
+            min_area_pt: float = 0,
+            uniform_max_stddev: float = 0,
+            min_ink_coverage: float = 0,
+            min_entropy_bits: float = 0,
+            skipped_summary: str = ""
+    ) -> None:
+        """
+        Args:
+            min_edge_pt:
+                Figures with a shorter width or height in points (1/72 inch) are small, such as rules and bullets.
+            min_area_pt:
+                Figures with a smaller area in square points are small, such as icons.
+            uniform_max_stddev:
+                Figures whose gray levels have a smaller standard deviation (0 to 255) are of a uniform color,
+                such as blank boxes and solid fills.
+            min_ink_coverage:
+                Figures with a smaller ratio of pixels differing from the most common gray level are blank,
+                such as empty frames.
+            min_entropy_bits:
+                Figures whose gray levels have smaller entropy in bits (0 to 8) are low in information.
+            skipped_summary:
+                Summary written in place of trivial figures.
+                Trivial figures are left out of markdown if empty.
+        """
+
+        if min(min_edge_pt, min_area_pt, uniform_max_stddev, min_ink_coverage, min_entropy_bits) < 0:
+            raise ValueError("thresholds must be 0 or more.")
+
+        self.min_edge_pt = min_edge_pt
+        self.min_area_pt = min_area_pt
+        self.uniform_max_stddev = uniform_max_stddev
+        self.min_ink_coverage = min_ink_coverage
+        self.min_entropy_bits = min_entropy_bits
+        self.skipped_summary = skipped_summary
+
+    @property
+    def enabled(self) -> bool:
+        """True if any check is enabled."""
+
+        return self.checks_region() or self.checks_image()
+
+    def checks_region(self) -> bool:
+        """True if figures are checked by their bounding boxes."""
+
+        return (self.min_edge_pt > 0) or (self.min_area_pt > 0)
+
+    def checks_image(self) -> bool:
+        """True if figures are checked by their rendered images."""
+
+        return (self.uniform_max_stddev > 0) or (self.min_ink_coverage > 0) or (self.min_entropy_bits > 0)
+
+    def classify_region(
+            self,
+            bounding_box: List[float]
+    ) -> str | None:
+        """Check whether the figure is too small to summarize.
+
+        Args:
+            bounding_box:
+                Bounding box of the figure on its page in points, [x0, y0, x1, y1].
+
+        Returns:
+            SMALL if the figure is small, or None.
+        """
+
+        width = abs(bounding_box[2] - bounding_box[0])
+        height = abs(bounding_box[3] - bounding_box[1])
+        if min(width, height) < self.min_edge_pt:
+            return self.SMALL
+        if width * height < self.min_area_pt:
+            return self.SMALL
+
+        return None
+
+    def classify_image(
+            self,
+            image: bytes
+    ) -> str | None:
+        """Check whether the rendered figure has too little to summarize.
+
+        Args:
+            image:
+                Rendered image of the figure in png, jpeg or webp.
+
+        Returns:
+            UNIFORM, BLANK or LOW_ENTROPY if the figure is trivial,
+            or None if it is not, or its image can not be decoded.
+        """
+
+        if not self.checks_image():
+            return None
+
+        histogram = self.__gray_histogram(image)
+        if histogram is None:
+            return None
+
+        pixels = sum(histogram.values())
+        mean = sum(level * count for level, count in histogram.items()) / pixels
+        variance = sum((level - mean) ** 2 * count for level, count in histogram.items()) / pixels
+        if math.sqrt(variance) < self.uniform_max_stddev:
+            return self.UNIFORM
+
+        background, _ = histogram.most_common(1)[0]
+        ink = sum(count for level, count in histogram.items() if abs(level - background) > self.INK_LEVEL_DIFFERENCE)
+        if ink / pixels < self.min_ink_coverage:
+            return self.BLANK
+
+        entropy = -sum(count / pixels * math.log2(count / pixels) for count in histogram.values())
+        if entropy < self.min_entropy_bits:
+            return self.LOW_ENTROPY
+
+        return None
+
+    def __gray_histogram(
+            self,
+            image: bytes
+    ) -> Counter | None:
+        """Count pixels of each gray level of the image, or get None if the image can not be decoded."""
+
+        # PyMuPDF is imported on first use, so that creating the classifier at startup does not import it.
+        import fitz
+
+        try:
+            pix = fitz.Pixmap(image)
+        except Exception:
+            return None
+        if pix.alpha:
+            pix = fitz.Pixmap(pix, 0)
+        if pix.n != 1:
+            pix = fitz.Pixmap(fitz.csGRAY, pix)
+
+        shrink = 0
+        while ((pix.width >> shrink) * (pix.height >> shrink) > self.MAX_ANALYZED_PIXELS) and (min(pix.width, pix.height) >> (shrink + 1) > 0):
+            shrink += 1
+        if shrink > 0:
+            pix.shrink(shrink)
+
+        if pix.width * pix.height == 0:
+            return None
+
+        return Counter(pix.samples)
@@ -11,16 +11,215 @@ Typical usage example:
                                              page_number,
                                              "path/to/outputdir",
                                              bounding_box)
+
+  # Render many images from the same PDF file in memory without opening it again.
+  with image_extractor.open("path/to/pdffile") as session:
+      png_images = session.render_all([(1, [0, 0, 100, 100]),
+                                       (3, [50, 50, 200, 200])])
 """
 
-from typing import List
+from collections import OrderedDict
+from typing import List, Tuple, TYPE_CHECKING
 import pathlib
 import time
 
-import fitz
+from packages.domain.render_policy import RenderPolicy
+
+# PyMuPDF is imported when a PDF is opened, so that runs with nothing to render do not import it.
+if TYPE_CHECKING:
+    import fitz
+
+class ImageExtractionSession:
+    """Extract images from one opened PDF.
+
+    The PDF is opened once for the session, and recently loaded pages are reused.
+    """
+
+    MAX_CACHED_PAGES = 8
+
+    def __init__(self, pdf_path: str,
+                 render_policy: RenderPolicy,
+                 debug_dir: str | None = None
+                 ) -> None:
+        self.pdf_path = pdf_path
+        self.render_policy = render_policy
+        self.debug_dir = debug_dir
+        self.pdf_name = pathlib.Path(pdf_path).name.split('.')[0]
+        self.pages: "OrderedDict[int, fitz.Page]" = OrderedDict()
+
+        import fitz
+
+        try:
+            self.doc = fitz.open(pdf_path)
+        except (fitz.FileDataError, fitz.FileNotFoundError) as e:
+            print(f"Error: {e}")
+            self.doc = None
+
+    def __enter__(self) -> 'ImageExtractionSession':
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """Release loaded pages and close the PDF."""
+
+        self.pages.clear()
+        if self.doc is not None:
+            self.doc.close()
+            self.doc = None
+
+    def render(self, page_number: int,
+               bounding_box: List[float]
+               ) -> bytes | None:
+        """Render image of the PDF in memory.
+
+        Args:
+            page_number:
+                Page number to render image from.
+            bounding_box:
+                Bounding box coordinates of the image to render.
+                Requires the coordinates in the format (x0, y0, x1, y1).
+                The coordinates are in points. 1point equals 1/72 inch.
+
+        Returns:
+            image bytes if successful, None otherwise.
+            Resolution and format of the image follow the render policy.
+        """
+
+        if self.doc is None:
+            return None
+
+        return self.__render(self.__page(page_number - 1), bounding_box)
+
+    def render_all(self, regions: List[Tuple[int, List[float]]]
+                   ) -> List[bytes | None]:
+        """Render images of all regions of the PDF in memory.
+
+        Regions are rendered page by page, so each page is loaded only once
+        however the regions are ordered.
+
+        Args:
+            regions:
+                Page numbers and bounding boxes of images to render.
+                The format of bounding box is same as render.
+
+        Returns:
+            image bytes in the same order as regions.
+            An item is None if the image could not be rendered.
+        """
+
+        images: List[bytes | None] = [None] * len(regions)
+        if self.doc is None:
+            return images
+
+        regions_by_page: dict[int, List[int]] = {}
+        for idx, (page_number, _) in enumerate(regions):
+            regions_by_page.setdefault(page_number, []).append(idx)
+
+        for page_number in sorted(regions_by_page):
+            page = self.__page(page_number - 1)
+            for idx in regions_by_page[page_number]:
+                images[idx] = self.__render(page, regions[idx][1])
+
+        return images
+
+    def extract(self, page_number: int,
+                outdir: str,
+                bounding_box: List[float]
+                ) -> str | None:
+        """Extract image from the PDF to a file.
+
+        Args:
+            page_number:
+                Page number to extract image from.
+            outdir:
+                Directory to save image.
+            bounding_box:
+                Bounding box coordinates of the image to extract.
+                The format is same as render.
+
+        Returns:
+            output file name if successful, None otherwise.
+        """
+
+        image = self.render(page_number, bounding_box)
+        if image is None:
+            return None
+
+        return self.__write(image, outdir)
+
+    def __page(self, pdx: int) -> "fitz.Page":
+        """Load page, or reuse it if it has been loaded recently."""
+
+        if pdx in self.pages:
+            self.pages.move_to_end(pdx)
+            return self.pages[pdx]
+
+        page = self.doc.load_page(pdx)
+        self.pages[pdx] = page
+        if len(self.pages) > self.MAX_CACHED_PAGES:
+            self.pages.popitem(last=False)
+
+        return page
+
+    def __render(self, page: "fitz.Page",
+                 bounding_box: List[float]
+                 ) -> bytes:
+        import fitz
+
+        rect = fitz.Rect(bounding_box)
+        zoom = self.render_policy.dpi(bounding_box) / 72
+        pix = page.get_pixmap(matrix=fitz.Matrix(zoom, zoom), clip=rect)
+        image = self.render_policy.encode(pix)
+
+        if self.debug_dir is not None:
+            self.__write(image, self.debug_dir)
+
+        return image
+
+    def __write(self, image: bytes,
+                outdir: str
+                ) -> str:
+        output_file_path = outdir + '/' + self.pdf_name + "_" + str(time.time_ns()) + "." + self.render_policy.image_format
+
+        if not pathlib.Path(outdir).exists():
+            pathlib.Path(outdir).mkdir(parents=True, exist_ok=True)
+
+        pathlib.Path(output_file_path).write_bytes(image)
+
+        return output_file_path
 
 class ImageExtractor:
     """Extract image from PDF."""
+    def __init__(self, debug_dir: str | None = None,
+                 render_policy: RenderPolicy | None = None
+                 ) -> None:
+        """
+        Args:
+            debug_dir:
+                Directory to save a copy of every rendered image for debugging.
+                Rendered images are kept only in memory if None.
+            render_policy:
+                Resolution and format of rendered images. Default RenderPolicy if None.
+        """
+
+        self.debug_dir = debug_dir
+        self.render_policy = render_policy if render_policy is not None else RenderPolicy()
+
+    def open(self, pdf_path: str) -> ImageExtractionSession:
+        """Open PDF to extract many images from it.
+
+        Args:
+            pdf_path:
+                Path to PDF file.
+
+        Returns:
+            Session to extract images. Close it or use it in with statement when done.
+        """
+
+        return ImageExtractionSession(pdf_path, self.render_policy, self.debug_dir)
+
     def extract(self, pdf_path: str,
                 page_number: int,
                 outdir: str,
@@ -29,6 +228,7 @@ class ImageExtractor:
         """Extract image from PDF.
 
         Retrieves image and saves it to outdir as 'png' file.
+        (or the format of the render policy)
 
         Args:
             pdf_path:
@@ -45,29 +245,11 @@ class ImageExtractor:
 
         Returns:
             output file name if successful, None otherwise.
-            example: 
+            example:
 
             'foo/bar/foobar_123456789.png'
             if you have a pdf file named 'foobar.pdf' and you set the outdir to 'foo/bar/'.
         """
 
-        pdx = page_number - 1
-        pdf_name = pathlib.Path(pdf_path).name.split('.')[0]
-        output_file_path = outdir + '/' + pdf_name + "_" + str(time.time_ns()) + ".png"
-
-        if not pathlib.Path(outdir).exists():
-            pathlib.Path(outdir).mkdir(parents=True, exist_ok=True)
-
-        try:
-            with fitz.open(pdf_path) as doc:
-                page = doc.load_page(pdx)
-
-                rect = fitz.Rect(bounding_box)
-                pix = page.get_pixmap(matrix=fitz.Matrix(300 / 72, 300 / 72), clip=rect)
-
-                pathlib.Path(output_file_path).write_bytes(pix.tobytes())
-
-                return output_file_path
-        except (fitz.FileDataError, fitz.FileNotFoundError) as e:
-            print(f"Error: {e}")
-            return None
+        with self.open(pdf_path) as session:
+            return session.extract(page_number, outdir, bounding_box)
@@ -13,29 +13,114 @@ Typical usage example:
         def some_method(
                 self
         ):
+            summary = self.image_summarizer.summarize(png_bytes)
+            # or
             summary = self.image_summarizer.summarize("path/to/image.png")
 
 """
 
 from abc import ABCMeta, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from typing import List
+import pathlib
+
+def load_image(
+        img: bytes | str
+) -> bytes:
+    """Get bytes of image.
+
+    Args:
+        img:
+            Image bytes, or path to image file.
+
+    Returns:
+        Image bytes.
+    """
+
+    if isinstance(img, str):
+        return pathlib.Path(img).read_bytes()
+
+    return bytes(img)
+
+def image_mime_type(
+        img: bytes
+) -> str:
+    """Get MIME type of image from its signature.
+
+    Args:
+        img:
+            Image bytes.
+
+    Returns:
+        MIME type of the image. 'image/png' if the signature is unknown.
+    """
+
+    if img.startswith(b"\xff\xd8\xff"):
+        return "image/jpeg"
+    if img.startswith(b"RIFF") and img[8:12] == b"WEBP":
+        return "image/webp"
+
+    return "image/png"
 
 class ImageSummarizer(metaclass=ABCMeta):
     """Summarize image."""
+
+    # Number of images summarized at the same time by summarize_many.
+    MAX_CONCURRENCY = 8
+
     @abstractmethod
     def summarize(
            self,
-           img_path: str
+           img: bytes | str
     ) -> str:
         """Summarize image.
 
-        Summarize png image file.
+        Summarize png, jpeg or webp image.
 
         Args:
-            img_path:
-                Path to image file.
+            img:
+                Image bytes, or path to image file.
 
         Returns:
             Summary of the image as str.
         """
 
         raise NotImplementedError()
+
+    def summarize_many(
+           self,
+           imgs: List[bytes | str],
+           return_exceptions: bool = False
+    ) -> List[str | Exception]:
+        """Summarize images concurrently.
+
+        This method calls summarize from up to MAX_CONCURRENCY threads.
+        Subclasses which can wait for many images without threads should override it,
+        and wrappers of summarizers should pass it on to the summarizers they wrap.
+
+        Args:
+            imgs:
+                Image bytes, or paths to image files.
+            return_exceptions:
+                If True, the error of an image which failed is returned in place of its summary, like asyncio.gather.
+                Otherwise the error of the first image which failed is raised.
+
+        Returns:
+            Summaries of the images in the same order as imgs.
+        """
+
+        summarize = self.summarize if not return_exceptions else self.__summarize_or_error
+        if len(imgs) <= 1:
+            return [summarize(img) for img in imgs]
+
+        with ThreadPoolExecutor(max_workers=min(self.MAX_CONCURRENCY, len(imgs))) as executor:
+            return list(executor.map(summarize, imgs))
+
+    def __summarize_or_error(
+           self,
+           img: bytes | str
+    ) -> str | Exception:
+        try:
+            return self.summarize(img)
+        except Exception as e:
+            return e
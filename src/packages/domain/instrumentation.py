@@ -0,0 +1,168 @@
+"""Instrumenting the conversion pipeline.
+
+This module provides the interface to record where the time of a batch goes:
+spans of documents and stages, counters of events such as cache hits and retries,
+and histograms of values such as latencies.
+
+NullInstrumentation records nothing and is used when instrumentation is disabled.
+Its spans are one shared object whose methods do nothing, so instrumented code costs only a few method calls.
+Code which computes values only to record them should check enabled first.
+
+Typical usage example:
+
+    class SomeClass:
+        def __init__(
+                self,
+                instrumentation: Instrumentation
+        ) -> None:
+            self.instrumentation = instrumentation
+
+        def some_method(
+                self,
+                document: IO
+        ):
+            with self.instrumentation.span("analyze", document=document.name):
+                result = analyze(document)
+            self.instrumentation.count("tables_total", len(result["tables"]))
+"""
+from abc import ABCMeta, abstractmethod
+
+class Span:
+    """Work which started when the span was created and ends by end or at the end of with statement.
+
+    This class does nothing by itself. Instrumentation returns its subclasses to record spans.
+    """
+
+    def set(
+            self,
+            **attributes: any
+    ) -> None:
+        """Add attributes to the span, such as sizes known only after the work."""
+
+        pass
+
+    def end(
+            self,
+            error: BaseException | None = None
+    ) -> None:
+        """End the span. Calls after the first one are ignored.
+
+        Args:
+            error:
+                Error which stopped the work, if any.
+        """
+
+        pass
+
+    def __enter__(self) -> 'Span':
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.end(exc_value)
+
+# Span returned when instrumentation is disabled. It is shared, because it has no state.
+NULL_SPAN = Span()
+
+class Instrumentation(metaclass=ABCMeta):
+    """Record spans, counters and histograms."""
+
+    # False if nothing is recorded, so callers can skip computing values to record.
+    enabled = True
+
+    @abstractmethod
+    def span(
+            self,
+            name: str,
+            parent: Span | None = None,
+            **attributes: any
+    ) -> Span:
+        """Start a span.
+
+        Args:
+            name:
+                Name of the work, such as a stage of the pipeline.
+            parent:
+                Span which this work is part of.
+                The innermost span entered by with statement on this thread if None.
+            attributes:
+                Attributes of the span, such as the name of the document.
+
+        Returns:
+            Started span. End it, or use it in with statement.
+        """
+
+        raise NotImplementedError()
+
+    @abstractmethod
+    def count(
+            self,
+            name: str,
+            value: float = 1,
+            **labels: str
+    ) -> None:
+        """Add value to a counter.
+
+        Args:
+            name:
+                Name of the counter, ending with '_total'.
+            value:
+                Value added to the counter.
+            labels:
+                Labels of the counter. Each combination of labels is counted separately.
+        """
+
+        raise NotImplementedError()
+
+    @abstractmethod
+    def observe(
+            self,
+            name: str,
+            value: float,
+            **labels: str
+    ) -> None:
+        """Add a value to a histogram.
+
+        Args:
+            name:
+                Name of the histogram.
+            value:
+                Observed value, such as seconds of a request.
+            labels:
+                Labels of the histogram. Each combination of labels has its own histogram.
+        """
+
+        raise NotImplementedError()
+
+    def close(self) -> None:
+        """Flush recorded values and stop exporting them."""
+
+        pass
+
+class NullInstrumentation(Instrumentation):
+    """Instrumentation which records nothing."""
+
+    enabled = False
+
+    def span(
+            self,
+            name: str,
+            parent: Span | None = None,
+            **attributes: any
+    ) -> Span:
+        return NULL_SPAN
+
+    def count(
+            self,
+            name: str,
+            value: float = 1,
+            **labels: str
+    ) -> None:
+        pass
+
+    def observe(
+            self,
+            name: str,
+            value: float,
+            **labels: str
+    ) -> None:
+        pass
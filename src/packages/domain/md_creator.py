@@ -3,6 +3,7 @@
 This module provides class to create markdown context from various API result.
 """
 from abc import ABCMeta, abstractmethod
+from typing import Iterator, MutableMapping
 
 class MdCreator(metaclass=ABCMeta):
     """Create MarkDown context"""
@@ -31,3 +32,37 @@ class MdCreator(metaclass=ABCMeta):
         """
 
         raise NotImplementedError()
+
+    def create_chunks(
+        self,
+        analyze_result: dict[str, any],
+        source_pdf_path: str,
+        figure_summaries: MutableMapping[int, str] | None = None,
+        skipped_figures: MutableMapping[int, str] | None = None
+    ) -> Iterator[str]:
+        """Create MarkDown context chunk by chunk.
+
+        Joining the chunks gives the same context as create.
+        This method yields the whole context as one chunk.
+        Subclasses which can create the context in parts should override it.
+
+        Args:
+            analyze_result:
+                result of extracting file.
+                this represents API JSON response.
+            source_pdf_path:
+                Extracted Source file by Azure Document Intelligence.
+                This path is consistent with the file used in the analyze_result.
+            figure_summaries:
+                Summaries of figures kept by the caller to resume an interrupted document.
+                Summaries in it are reused and new summaries are stored to it.
+                The default implementation ignores it.
+            skipped_figures:
+                Reasons of figures which were not summarized because they are trivial, by index of figure.
+                They are stored to it by the creator. The default implementation ignores it.
+
+        Yields:
+            Chunks of MarkDown context.
+        """
+
+        yield self.create(analyze_result, source_pdf_path)
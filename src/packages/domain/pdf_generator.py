@@ -1,5 +1,25 @@
+"""Generating PDF from documents.
+
+This module provides class to convert documents to PDF by LibreOffice.
+
+Typical usage example:
+
+    pdf_generator = PdfGenerator()
+    pdf_generator.generate("path/to/document.docx", "path/to/outdir")
+
+    failures = pdf_generator.generate_many(
+        ["path/to/document1.docx", "path/to/document2.docx"],
+        "path/to/outdir",
+        chunk_size=50,
+        parallelism=4
+    )
+"""
+from concurrent.futures import ThreadPoolExecutor
 from typing import List
+import pathlib
+import shutil
 import subprocess
+import tempfile
 
 class PdfGenerator:
     def generate(self, document_path: str, outdir: str, timeout_sec: int = None) -> None:
@@ -9,3 +29,111 @@ class PdfGenerator:
                 timeout=timeout_sec,
                 check=True,
                 text=True)
+
+    def generate_many(
+            self,
+            document_paths: List[str],
+            outdir: str,
+            chunk_size: int = 50,
+            parallelism: int = 1,
+            timeout_sec: int = None
+    ) -> dict[str, str]:
+        """Convert many documents to PDF with a few LibreOffice processes.
+
+        Documents are split into chunks and each chunk is converted by one LibreOffice process,
+        so LibreOffice starts once per chunk instead of once per document.
+        Processes running at the same time have their own user profiles.
+        Documents which are not converted in their chunk are retried one by one,
+        so that a broken document does not fail the other documents of the chunk.
+
+        Args:
+            document_paths:
+                Paths to documents to be converted.
+            outdir:
+                Directory to write PDF. Each PDF has the same name as its document,
+                so documents must have different names.
+            chunk_size:
+                Maximum number of documents converted by one LibreOffice process.
+            parallelism:
+                Number of LibreOffice processes running at the same time.
+            timeout_sec:
+                Timeout of converting one document.
+                A chunk times out after timeout_sec multiplied by the number of its documents.
+
+        Returns:
+            Documents which could not be converted.
+            this dictionary has document path as key and the reason as value.
+        """
+
+        if chunk_size < 1:
+            raise ValueError("chunk_size must be 1 or more.")
+        if parallelism < 1:
+            raise ValueError("parallelism must be 1 or more.")
+
+        chunks = [document_paths[i:i + chunk_size] for i in range(0, len(document_paths), chunk_size)]
+        failures = {}
+        profile_dirs = [tempfile.mkdtemp(prefix="soffice_profile_") for _ in range(min(parallelism, len(chunks)))]
+        idle_profile_dirs = list(profile_dirs)
+
+        def convert_chunk(chunk: List[str]) -> dict[str, str]:
+            profile_dir = idle_profile_dirs.pop()
+            try:
+                for path in chunk:
+                    self.__output_path(path, outdir).unlink(missing_ok=True)
+
+                reason = self.__run_soffice(chunk, outdir, profile_dir, timeout_sec)
+                missing = [path for path in chunk if not self.__output_path(path, outdir).exists()]
+                if len(chunk) == 1:
+                    return {path: reason or "PDF was not written." for path in missing}
+
+                chunk_failures = {}
+                for path in missing:
+                    reason = self.__run_soffice([path], outdir, profile_dir, timeout_sec)
+                    if not self.__output_path(path, outdir).exists():
+                        chunk_failures[path] = reason or "PDF was not written."
+                return chunk_failures
+            finally:
+                idle_profile_dirs.append(profile_dir)
+
+        try:
+            with ThreadPoolExecutor(max_workers=max(len(profile_dirs), 1)) as executor:
+                for chunk_failures in executor.map(convert_chunk, chunks):
+                    failures.update(chunk_failures)
+        finally:
+            for profile_dir in profile_dirs:
+                shutil.rmtree(profile_dir, ignore_errors=True)
+
+        return failures
+
+    def __output_path(
+            self,
+            document_path: str,
+            outdir: str
+    ) -> pathlib.Path:
+        return pathlib.Path(outdir) / (pathlib.Path(document_path).stem + ".pdf")
+
+    def __run_soffice(
+            self,
+            document_paths: List[str],
+            outdir: str,
+            profile_dir: str,
+            timeout_sec: int | None
+    ) -> str | None:
+        """Run one LibreOffice process to convert documents.
+
+        Returns:
+            Reason if LibreOffice failed, None otherwise.
+        """
+
+        try:
+            subprocess.run(["soffice", "--headless", "-env:UserInstallation=" + pathlib.Path(profile_dir).as_uri(),
+                    "--convert-to", "pdf", *document_paths, "--outdir", outdir],
+                    stdout=subprocess.DEVNULL,
+                    stderr=subprocess.DEVNULL,
+                    timeout=timeout_sec * len(document_paths) if timeout_sec is not None else None,
+                    check=True,
+                    text=True)
+        except (subprocess.CalledProcessError, subprocess.TimeoutExpired) as e:
+            return str(e)
+
+        return None
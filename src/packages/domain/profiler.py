@@ -0,0 +1,57 @@
+"""Profiling a batch conversion.
+
+This module provides the interface to profile a run of the conversion,
+so that hot spots can be found on real documents without changing the code.
+
+Typical usage example:
+
+    profiler.start()
+    try:
+        convert_documents()
+    finally:
+        paths = profiler.stop("output/.profile")
+"""
+from abc import ABCMeta, abstractmethod
+
+class Profiler(metaclass=ABCMeta):
+    """Profile the work done between start and stop."""
+
+    # False if profiling is not available in this configuration.
+    enabled = True
+
+    @abstractmethod
+    def start(self) -> None:
+        """Start profiling."""
+
+        raise NotImplementedError()
+
+    @abstractmethod
+    def stop(
+            self,
+            output_dir: str
+    ) -> list[str]:
+        """Stop profiling and write the results.
+
+        Args:
+            output_dir:
+                Directory to write the results to. It is created if it does not exist.
+
+        Returns:
+            Paths to the written files.
+        """
+
+        raise NotImplementedError()
+
+class NullProfiler(Profiler):
+    """Profiler which does nothing, used when profiling is not configured."""
+
+    enabled = False
+
+    def start(self) -> None:
+        pass
+
+    def stop(
+            self,
+            output_dir: str
+    ) -> list[str]:
+        return []
@@ -0,0 +1,120 @@
+"""Deciding how figures are rendered.
+
+This module provides class to decide resolution and image format of figures
+rendered from PDF before they are sent to a vision model.
+
+Vision models scale large images down before reading them,
+so pixels over the limits of this policy only make rendering and uploading slower.
+
+Typical usage example:
+
+    policy = RenderPolicy(max_edge_px=2048, max_pixels=2048 * 768, image_format="jpeg", quality=85)
+    dpi = policy.dpi([0, 0, 595, 842])
+    pix = page.get_pixmap(dpi=dpi, clip=fitz.Rect([0, 0, 595, 842]))
+    image = policy.encode(pix)
+"""
+import io
+import math
+from typing import List, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    import fitz
+
+class RenderPolicy:
+    """Decide resolution and image format of rendered figures."""
+
+    IMAGE_FORMATS = ["png", "jpeg", "webp"]
+
+    def __init__(
+            self,
+            max_dpi: float = 300,
+            max_edge_px: int | None = 2048,
+            max_pixels: int | None = 2048 * 768,
+            image_format: str = "png",
+            quality: int = 85
+    ) -> None:
+        """
+        Args:
+            max_dpi:
+                Resolution of figures small enough for the limits below.
+            max_edge_px:
+                Upper limit of width and height of rendered figures. Not limited if None.
+            max_pixels:
+                Upper limit of width multiplied by height of rendered figures. Not limited if None.
+            image_format:
+                "png", "jpeg" or "webp". "webp" requires Pillow.
+            quality:
+                Quality of "jpeg" and "webp" from 1 to 100. Ignored for "png".
+        """
+
+        if image_format not in self.IMAGE_FORMATS:
+            raise ValueError(f"image_format must be one of {self.IMAGE_FORMATS}.")
+        if not 1 <= quality <= 100:
+            raise ValueError("quality must be from 1 to 100.")
+
+        self.max_dpi = max_dpi
+        self.max_edge_px = max_edge_px
+        self.max_pixels = max_pixels
+        self.image_format = image_format
+        self.quality = quality
+
+    def dpi(
+            self,
+            bounding_box: List[float]
+    ) -> float:
+        """Decide resolution of the figure from its size.
+
+        Args:
+            bounding_box:
+                Bounding box coordinates of the figure in the format (x0, y0, x1, y1).
+                The coordinates are in points. 1point equals 1/72 inch.
+
+        Returns:
+            The highest resolution up to max_dpi which keeps the figure within the limits.
+        """
+
+        width_inch = max(bounding_box[2] - bounding_box[0], 1) / 72
+        height_inch = max(bounding_box[3] - bounding_box[1], 1) / 72
+
+        dpi = self.max_dpi
+        if self.max_edge_px is not None:
+            dpi = min(dpi, self.max_edge_px / max(width_inch, height_inch))
+        if self.max_pixels is not None:
+            dpi = min(dpi, math.sqrt(self.max_pixels / (width_inch * height_inch)))
+
+        return dpi
+
+    def encode(
+            self,
+            pix: "fitz.Pixmap"
+    ) -> bytes:
+        """Encode rendered figure.
+
+        Args:
+            pix:
+                Rendered figure.
+
+        Returns:
+            Image bytes in image_format.
+        """
+
+        if self.image_format == "png":
+            return pix.tobytes("png")
+
+        if pix.alpha:
+            import fitz
+
+            pix = fitz.Pixmap(pix, 0)
+
+        if self.image_format == "jpeg":
+            return pix.tobytes("jpeg", jpg_quality=self.quality)
+
+        try:
+            from PIL import Image
+        except ImportError as e:
+            raise RuntimeError("Pillow is required to encode figures to webp.") from e
+
+        mode = "L" if pix.n == 1 else "RGB"
+        buffer = io.BytesIO()
+        Image.frombytes(mode, (pix.width, pix.height), pix.samples).save(buffer, format="WEBP", quality=self.quality)
+        return buffer.getvalue()
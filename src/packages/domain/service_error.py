@@ -0,0 +1,70 @@
+"""Classifying errors of requests to cloud services.
+
+This module provides functions to tell errors which may go away by themselves,
+such as throttling, errors of the service and timeouts, from errors which happen again,
+such as a broken document. Errors of Azure SDK, openai, requests and httpx are supported without importing them.
+
+Typical usage example:
+
+    try:
+        result = extractor.extract(document)
+    except Exception as e:
+        if is_transient_error(e):
+            retry_later(document)
+"""
+
+# Status codes of responses which may succeed if the request is sent again later.
+RETRYABLE_STATUS_CODES = {408, 429, 500, 502, 503, 504}
+
+# Names of classes of errors which the clients raise when a request is not sent or not answered, such as timeouts.
+TRANSIENT_ERROR_NAMES = {
+    "ServiceRequestError", "ServiceResponseError",  # Azure SDK
+    "APIConnectionError",  # openai
+    "ConnectionError", "Timeout",  # requests
+    "TransportError"  # httpx
+}
+
+def status_code_of(
+        error: BaseException
+) -> int | None:
+    """Get HTTP status code of the error raised by a client.
+
+    Errors of Azure SDK, openai and requests are supported.
+
+    Returns:
+        Status code, or None if the error has no response.
+    """
+
+    status_code = getattr(error, "status_code", None)
+    if status_code is None:
+        status_code = getattr(getattr(error, "response", None), "status_code", None)
+
+    return status_code
+
+def is_transient_error(
+        error: BaseException
+) -> bool:
+    """Check whether the error may go away by itself, such as throttling, an error of the service or a timeout.
+
+    Errors which the error was raised from are also checked, because wrappers of clients may raise errors of their own.
+
+    Args:
+        error:
+            Error raised by a request or by a stage of the conversion.
+
+    Returns:
+        True if the same request may succeed later.
+    """
+
+    checked = 0
+    while (error is not None) and (checked < 8):
+        if status_code_of(error) in RETRYABLE_STATUS_CODES:
+            return True
+        if isinstance(error, (ConnectionError, TimeoutError)):
+            return True
+        if any(cls.__name__ in TRANSIENT_ERROR_NAMES for cls in type(error).__mro__):
+            return True
+        error = error.__cause__
+        checked += 1
+
+    return False
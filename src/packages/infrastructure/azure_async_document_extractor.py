@@ -0,0 +1,127 @@
+"""Extracting documents asynchronously by using Azure Document Intelligence.
+
+This module provides class to extract various document on asyncio event loop.
+aiohttp and Azure SDK are imported when the client is created on the first request.
+Like AzureDocumentExtractor, polling which fails for a transient reason resumes the operation.
+"""
+import asyncio
+from os import environ
+from typing import TYPE_CHECKING, Awaitable, Callable
+
+from injector import inject, singleton
+
+from packages.domain.async_document_extractor import AsyncDocumentExtractor
+from packages.domain.service_error import is_transient_error
+from packages.infrastructure.azure_document_extractor import AzureDocumentExtractor
+from packages.infrastructure.http_pool_settings import HttpPoolSettings
+from packages.infrastructure.rate_limiter import retry_after_of
+
+if TYPE_CHECKING:
+    import aiohttp
+    from azure.ai.documentintelligence.aio import DocumentIntelligenceClient
+    from azure.core.polling import AsyncLROPoller
+
+@singleton
+class AzureAsyncDocumentExtractor(AsyncDocumentExtractor):
+    """Extract document asynchronously by using Azure Document Intelligence."""
+
+    @inject
+    def __init__(self, http_pool_settings: HttpPoolSettings) -> None:
+        self.key = environ.get('DI_KEY')
+        self.endpoint = environ.get('DI_ENDPOINT')
+        self.http_pool_settings = http_pool_settings
+        self.client: "DocumentIntelligenceClient | None" = None
+        self.session: "aiohttp.ClientSession | None" = None
+
+    async def extract(self, document: bytes) -> dict[str, any]:
+        """Extract document by using Azure Document Intelligence.
+
+        Args:
+            document:
+                Bytes of document to be extracted.
+
+        Returns:
+            JSON response of extracted document.
+        """
+
+        return await (await self.begin_extract(document))()
+
+    async def begin_extract(self, document: bytes) -> Callable[[], Awaitable[dict[str, any]]]:
+        """Submit document to Azure Document Intelligence, and get a coroutine function to poll for the result.
+
+        Args:
+            document:
+                Bytes of document to be extracted.
+
+        Returns:
+            Coroutine function which polls the operation until it ends, and returns JSON response of extracted document.
+        """
+
+        poller = await self.__get_client().begin_analyze_document(
+            AzureDocumentExtractor.MODEL_ID,
+            analyze_request=document,
+            content_type="application/octet-stream",
+            output_content_format=AzureDocumentExtractor.OUTPUT_CONTENT_FORMAT
+        )
+
+        return lambda: self.__wait(poller)
+
+    async def __wait(self, poller: "AsyncLROPoller") -> dict[str, any]:
+        """Poll the operation until it ends, resuming polling which fails for a transient reason."""
+
+        retry_policy = AzureDocumentExtractor.POLL_RETRY_POLICY
+        continuation_token = poller.continuation_token()
+        attempt = 0
+        while True:
+            try:
+                return (await poller.result()).as_dict()
+            except Exception as e:
+                attempt += 1
+                if (not is_transient_error(e)) or (attempt > retry_policy.max_retries):
+                    raise
+
+                await asyncio.sleep(retry_policy.delay(attempt, retry_after_of(e)))
+                poller = await self.__get_client().begin_analyze_document(
+                    AzureDocumentExtractor.MODEL_ID, continuation_token=continuation_token
+                )
+
+    async def close(self) -> None:
+        """Close the client and its aiohttp session."""
+
+        if self.client is not None:
+            await self.client.close()
+            self.client = None
+        if self.session is not None:
+            await self.session.close()
+            self.session = None
+
+    def __get_client(self) -> "DocumentIntelligenceClient":
+        """Get the client shared by all documents.
+
+        The client is created on first use in the event loop, and must not be used in other loops.
+        """
+
+        if self.client is None:
+            import aiohttp
+            from azure.ai.documentintelligence.aio import DocumentIntelligenceClient
+            from azure.core.credentials import AzureKeyCredential
+            from azure.core.pipeline.transport import AioHttpTransport
+
+            self.session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(
+                    limit=self.http_pool_settings.pool_size,
+                    keepalive_timeout=self.http_pool_settings.keepalive_expiry_sec
+                )
+            )
+            transport = AioHttpTransport(
+                session=self.session,
+                session_owner=False,
+                connection_timeout=self.http_pool_settings.connect_timeout_sec,
+                read_timeout=self.http_pool_settings.read_timeout_sec
+            )
+            self.client = DocumentIntelligenceClient(
+                endpoint=self.endpoint, credential=AzureKeyCredential(self.key), transport=transport,
+                **self.http_pool_settings.sdk_retry_options("retry_total")
+            )
+
+        return self.client
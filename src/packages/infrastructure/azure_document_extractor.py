@@ -1,25 +1,48 @@
 """Extracting documents by using Azure Document Intelligence.
 
 This module provides class to extract various document.
+Azure SDK is imported when the client is created on the first request,
+so that runs answered from the cache do not pay for importing it.
+
+The document is submitted by one request and its result is polled by others.
+Polling which fails for a transient reason, such as throttling, resumes the operation
+from its continuation token, so the document is not submitted and billed again.
 """
+from concurrent.futures import Future
 from os import environ
-from typing import IO
+from threading import Lock, Thread
+import time
+from typing import IO, TYPE_CHECKING
 
-from azure.core.credentials import AzureKeyCredential
-from azure.ai.documentintelligence import DocumentIntelligenceClient
-from azure.ai.documentintelligence.models import AnalyzeResult
-from injector import singleton
+from injector import inject, singleton
 
 from packages.domain.document_extractor import DocumentExtractor
+from packages.domain.service_error import is_transient_error
+from packages.infrastructure.http_pool_settings import HttpPoolSettings
+from packages.infrastructure.rate_limiter import RetryPolicy, retry_after_of
+
+if TYPE_CHECKING:
+    from azure.ai.documentintelligence import DocumentIntelligenceClient
+    from azure.core.polling import LROPoller
 
 @singleton
 class AzureDocumentExtractor(DocumentExtractor):
     """Extract document by using Azure Document Intelligence."""
-    def __init__(self) -> None:
+
+    MODEL_ID = "prebuilt-layout"
+    OUTPUT_CONTENT_FORMAT = "markdown"
+    # Polling which fails for a transient reason is resumed up to max_retries times, with these delays.
+    POLL_RETRY_POLICY = RetryPolicy(max_retries=5)
+
+    @inject
+    def __init__(self, http_pool_settings: HttpPoolSettings) -> None:
         self.key = environ.get('DI_KEY')
         self.endpoint = environ.get('DI_ENDPOINT')
+        self.http_pool_settings = http_pool_settings
+        self.client: "DocumentIntelligenceClient | None" = None
+        self.lock = Lock()
 
-    def extract(self, document: IO) -> AnalyzeResult:
+    def extract(self, document: IO) -> dict[str, any]:
         """Extract document by using Azure Document Intelligence.
 
         Args:
@@ -30,9 +53,72 @@ class AzureDocumentExtractor(DocumentExtractor):
             JSON response of extracted document.
         """
 
-        document_intelligence_client = DocumentIntelligenceClient(endpoint=self.endpoint, credential=AzureKeyCredential(self.key))
-        poller = document_intelligence_client.begin_analyze_document(
-            "prebuilt-layout", analyze_request=document, content_type="application/octet-stream", output_content_format="markdown"
+        return self.begin_extract(document).result()
+
+    def begin_extract(self, document: IO) -> Future:
+        """Submit document to Azure Document Intelligence, and get a future of the result.
+
+        The operation is polled by a thread of its own, like the poller of the SDK does.
+
+        Args:
+            document:
+                Document to be extracted.
+
+        Returns:
+            Future of JSON response of extracted document.
+        """
+
+        poller = self.__get_client().begin_analyze_document(
+            self.MODEL_ID, analyze_request=document, content_type="application/octet-stream", output_content_format=self.OUTPUT_CONTENT_FORMAT
         )
 
-        return poller.result().as_dict()
+        future = Future()
+        Thread(target=self.__complete, args=(future, poller), name="analyze-poll", daemon=True).start()
+        return future
+
+    def __complete(self, future: Future, poller: "LROPoller") -> None:
+        try:
+            future.set_result(self.__wait(poller))
+        except Exception as e:
+            future.set_exception(e)
+
+    def __wait(self, poller: "LROPoller") -> dict[str, any]:
+        """Poll the operation until it ends, resuming polling which fails for a transient reason."""
+
+        continuation_token = poller.continuation_token()
+        attempt = 0
+        while True:
+            try:
+                return poller.result().as_dict()
+            except Exception as e:
+                attempt += 1
+                if (not is_transient_error(e)) or (attempt > self.POLL_RETRY_POLICY.max_retries):
+                    raise
+
+                time.sleep(self.POLL_RETRY_POLICY.delay(attempt, retry_after_of(e)))
+                poller = self.__get_client().begin_analyze_document(self.MODEL_ID, continuation_token=continuation_token)
+
+    def __get_client(self) -> "DocumentIntelligenceClient":
+        """Get the client shared by all documents.
+
+        The client is created on first use, and its connections are kept alive in the pool for later documents.
+        """
+
+        with self.lock:
+            if self.client is None:
+                from azure.ai.documentintelligence import DocumentIntelligenceClient
+                from azure.core.credentials import AzureKeyCredential
+                from azure.core.pipeline.transport import RequestsTransport
+
+                transport = RequestsTransport(
+                    session=self.http_pool_settings.create_requests_session(),
+                    session_owner=False,
+                    connection_timeout=self.http_pool_settings.connect_timeout_sec,
+                    read_timeout=self.http_pool_settings.read_timeout_sec
+                )
+                self.client = DocumentIntelligenceClient(
+                    endpoint=self.endpoint, credential=AzureKeyCredential(self.key), transport=transport,
+                    **self.http_pool_settings.sdk_retry_options("retry_total")
+                )
+
+            return self.client
@@ -0,0 +1,62 @@
+from os import environ
+from typing import TYPE_CHECKING
+
+from injector import inject, singleton
+
+from packages.domain.async_image_summarizer import AsyncImageSummarizer
+from packages.infrastructure.azureoai_imgsummarizer import create_prompt, create_prompt_input
+from packages.infrastructure.http_pool_settings import HttpPoolSettings
+
+if TYPE_CHECKING:
+    import httpx
+    from langchain_core.runnables import Runnable
+
+@singleton
+class AzureOaiAsyncImgSummarizer(AsyncImageSummarizer):
+    @inject
+    def __init__(self, http_pool_settings: HttpPoolSettings) -> None:
+        self.key = environ.get('AZURE_OPENAI_API_KEY')
+        self.endpoint = environ.get('AZURE_OPENAI_ENDPOINT')
+        self.api_version = environ.get('AZURE_OPENAI_API_VERSION')
+        self.deployment = environ.get('AZURE_OPENAI_DEPLOYMENT')
+        self.http_pool_settings = http_pool_settings
+        self.chain: "Runnable | None" = None
+        self.http_client: "httpx.AsyncClient | None" = None
+
+    async def summarize(
+            self,
+            img: bytes | str
+    ) -> str:
+        res = await self.__get_chain().ainvoke(create_prompt_input(img))
+
+        return res.content
+
+    async def close(self) -> None:
+        """Close the httpx client of the chain."""
+
+        if self.http_client is not None:
+            await self.http_client.aclose()
+            self.http_client = None
+            self.chain = None
+
+    def __get_chain(self) -> "Runnable":
+        """Get the prompt chain shared by all images.
+
+        The chain is built on first use in the event loop, and must not be used in other loops.
+        """
+
+        if self.chain is None:
+            from langchain_openai.chat_models import AzureChatOpenAI
+
+            self.http_client = self.http_pool_settings.create_httpx_async_client()
+            llm = AzureChatOpenAI(
+                azure_endpoint = self.endpoint,
+                azure_deployment = self.deployment,
+                openai_api_version = self.api_version,
+                http_async_client = self.http_client,
+                **self.http_pool_settings.sdk_retry_options("max_retries")
+            )
+
+            self.chain = create_prompt() | llm
+
+        return self.chain
@@ -1,45 +1,107 @@
 import base64
+import json
 from os import environ
+from threading import Lock
+from typing import TYPE_CHECKING
 
-from injector import singleton
-from langchain_core.prompts import ChatPromptTemplate
-from langchain_core.prompts.chat import HumanMessagePromptTemplate
-from langchain_openai.chat_models import AzureChatOpenAI
+from injector import inject, singleton
 
-from packages.domain.image_summarizer import ImageSummarizer
+from packages.domain.image_summarizer import ImageSummarizer, image_mime_type, load_image
+from packages.infrastructure.http_pool_settings import HttpPoolSettings
+
+if TYPE_CHECKING:
+    from langchain_core.prompts import ChatPromptTemplate
+    from langchain_core.runnables import Runnable
+
+SYSTEM_PROMPT = "あなたは有能なアシスタントです。ユーザーの問いに回答してください"
+QUESTION = "何についての画像なのか、内容を要約して回答してください。"
+
+def summary_cache_namespace(
+        deployment: str | None
+) -> str:
+    """Get namespace of summaries cached for the deployment and the prompt.
+
+    Summaries made by another deployment or with another prompt are in other namespaces,
+    so that changing either of them does not reuse old summaries.
+    """
+
+    return json.dumps({"deployment": deployment, "system": SYSTEM_PROMPT, "question": QUESTION}, ensure_ascii=False)
+
+def create_prompt() -> "ChatPromptTemplate":
+    """Create the prompt to ask for a summary of an image.
+
+    LangChain is imported here rather than at the top of the module, because importing it takes about a second,
+    which runs answered from the summary cache do not need to pay.
+    """
+
+    from langchain_core.prompts import ChatPromptTemplate
+    from langchain_core.prompts.chat import HumanMessagePromptTemplate
+
+    image_template = {"image_url": {"url": "data:{mime_type};base64,{img_base64}"}}
+
+    system = SYSTEM_PROMPT
+    human_prompt = "{question}"
+    human_message_template = HumanMessagePromptTemplate.from_template([human_prompt, image_template])
+
+    return ChatPromptTemplate([("system", system), human_message_template])
+
+def create_prompt_input(
+        img: bytes | str
+) -> dict[str, str]:
+    """Create the input of the prompt for the image.
+
+    Args:
+        img:
+            Image bytes, or path to image file.
+    """
+
+    img = load_image(img)
+    img_base64 = base64.b64encode(img).decode('utf-8')
+
+    return {
+        "question": QUESTION,
+        "mime_type": image_mime_type(img),
+        "img_base64": img_base64
+    }
 
 @singleton
 class AzureOaiImgSummarizer(ImageSummarizer):
-    def __init__(self) -> None:
+    @inject
+    def __init__(self, http_pool_settings: HttpPoolSettings) -> None:
         self.key = environ.get('AZURE_OPENAI_API_KEY')
         self.endpoint = environ.get('AZURE_OPENAI_ENDPOINT')
         self.api_version = environ.get('AZURE_OPENAI_API_VERSION')
         self.deployment = environ.get('AZURE_OPENAI_DEPLOYMENT')
+        self.http_pool_settings = http_pool_settings
+        self.chain: "Runnable | None" = None
+        self.lock = Lock()
 
     def summarize(
             self,
-            img_path: str
+            img: bytes | str
     ) -> str:
-        llm = AzureChatOpenAI(
-            azure_endpoint = self.endpoint,
-            azure_deployment = self.deployment,
-            openai_api_version = self.api_version
-        )
+        res = self.__get_chain().invoke(create_prompt_input(img))
+
+        return res.content
 
-        with open(img_path, "rb") as f:
-            img_base64 = base64.b64encode(f.read()).decode('utf-8')
+    def __get_chain(self) -> "Runnable":
+        """Get the prompt chain shared by all images.
 
-        image_template = {"image_url": {"url": f"data:image/png;base64,{img_base64}"}}
+        The chain is built on first use. Its client keeps connections alive in the pool for later images.
+        """
 
-        system = (
-            "あなたは有能なアシスタントです。ユーザーの問いに回答してください"
-        )
-        human_prompt = "{question}"
-        human_message_template = HumanMessagePromptTemplate.from_template([human_prompt, image_template])
-        prompt = ChatPromptTemplate([("system", system), human_message_template])
+        with self.lock:
+            if self.chain is None:
+                from langchain_openai.chat_models import AzureChatOpenAI
 
-        chain = prompt | llm
+                llm = AzureChatOpenAI(
+                    azure_endpoint = self.endpoint,
+                    azure_deployment = self.deployment,
+                    openai_api_version = self.api_version,
+                    http_client = self.http_pool_settings.create_httpx_client(),
+                    **self.http_pool_settings.sdk_retry_options("max_retries")
+                )
 
-        res = chain.invoke({"question": "何についての画像なのか、内容を要約して回答してください。"})
+                self.chain = create_prompt() | llm
 
-        return res.content
+            return self.chain
@@ -0,0 +1,155 @@
+"""Caching results of extracting documents.
+
+This module provides class to reuse extracted results of documents which have been extracted before.
+
+Typical usage example:
+
+    extractor = CachedDocumentExtractor(
+        AzureDocumentExtractor(),
+        DiskLruCache("path/to/cachedir", max_bytes=1024 * 1024 * 1024),
+        "prebuilt-layout",
+        "markdown"
+    )
+    with open("path/to/pdffile", "rb") as file:
+        result = extractor.extract(file)
+"""
+from concurrent.futures import Future
+import hashlib
+import io
+import json
+from threading import Thread
+from typing import IO
+
+from packages.domain.document_extractor import DocumentExtractor
+from packages.domain.instrumentation import Instrumentation, NullInstrumentation
+from packages.infrastructure.disk_lru_cache import DiskLruCache
+
+class CachedDocumentExtractor(DocumentExtractor):
+    """Extract document through a content-addressed cache."""
+
+    def __init__(
+            self,
+            extractor: DocumentExtractor,
+            cache: DiskLruCache,
+            model_id: str,
+            output_content_format: str,
+            instrumentation: Instrumentation | None = None
+    ) -> None:
+        """
+        Args:
+            extractor:
+                Extractor called when the document is not cached.
+            cache:
+                Cache to store extracted results.
+            model_id:
+                Model used by extractor. Results of different models are cached separately.
+            output_content_format:
+                Content format returned by extractor. Results of different formats are cached separately.
+            instrumentation:
+                Instrumentation to count hits and misses of the cache. They are not counted if None.
+        """
+
+        self.extractor = extractor
+        self.cache = cache
+        self.model_id = model_id
+        self.output_content_format = output_content_format
+        self.instrumentation = instrumentation if instrumentation is not None else NullInstrumentation()
+
+    def extract(
+            self,
+            document: IO
+    ) -> dict[str, any]:
+        """Extract document, or get the cached result if the same bytes have been extracted before.
+
+        Args:
+            document:
+                Document to be extracted.
+
+        Returns:
+            JSON response of extracted document.
+        """
+
+        data = document.read()
+        key = self.cache_key(data)
+
+        cached = self.cache.get(key)
+        if cached is not None:
+            self.instrumentation.count("cache_hits_total", cache="analyze")
+            return json.loads(cached)
+
+        self.instrumentation.count("cache_misses_total", cache="analyze")
+        result = self.extractor.extract(io.BytesIO(data))
+        self.__put(key, result)
+
+        return result
+
+    def begin_extract(
+            self,
+            document: IO
+    ) -> Future:
+        """Submit document if it is not cached, and get a future of the result.
+
+        The result is cached by a thread of its own when it is done,
+        so that the thread completing the future, such as an event loop, is not blocked by writing the cache.
+
+        Args:
+            document:
+                Document to be extracted.
+
+        Returns:
+            Future of JSON response of extracted document. It is already done if the document is cached.
+        """
+
+        data = document.read()
+        key = self.cache_key(data)
+
+        cached = self.cache.get(key)
+        if cached is not None:
+            self.instrumentation.count("cache_hits_total", cache="analyze")
+            future = Future()
+            future.set_result(json.loads(cached))
+            return future
+
+        self.instrumentation.count("cache_misses_total", cache="analyze")
+        future = self.extractor.begin_extract(io.BytesIO(data))
+        future.add_done_callback(lambda done: self.__put_later(key, done))
+
+        return future
+
+    def __put_later(
+            self,
+            key: str,
+            done: Future
+    ) -> None:
+        if (not done.cancelled()) and (done.exception() is None):
+            Thread(target=self.__put, args=(key, done.result()), name="analyze-cache").start()
+
+    def __put(
+            self,
+            key: str,
+            result: dict[str, any]
+    ) -> None:
+        self.cache.put(key, json.dumps(result, ensure_ascii=False).encode())
+
+    def cache_key(
+            self,
+            data: bytes
+    ) -> str:
+        """Get cache key of the document.
+
+        Args:
+            data:
+                Bytes of the document.
+
+        Returns:
+            SHA-256 hex digest of the model id, the output content format and the document.
+        """
+
+        digest = hashlib.sha256()
+        digest.update(self.model_id.encode())
+        digest.update(b"\0")
+        digest.update(self.output_content_format.encode())
+        digest.update(b"\0")
+        digest.update(data)
+
+        return digest.hexdigest()
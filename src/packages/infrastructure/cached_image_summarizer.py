@@ -0,0 +1,399 @@
+"""Caching summaries of images.
+
+This module provides class to reuse summaries of images which have been summarized before.
+Images are looked up by the exact hash of their bytes.
+If max_distance is given, they are also looked up by a perceptual hash,
+so that the same logo rendered with slightly different pixels also hits the cache.
+Summaries are cached in a namespace, such as the model and the prompt which made them,
+so that summaries made by another model or prompt are not reused.
+
+Typical usage example:
+
+    summarizer = CachedImageSummarizer(
+        AzureOaiImgSummarizer(),
+        DiskLruCache("path/to/cachedir", max_bytes=64 * 1024 * 1024),
+        max_distance=2,
+        namespace=summary_cache_namespace(deployment)
+    )
+    summary = summarizer.summarize(png_bytes)
+"""
+from collections import OrderedDict
+import hashlib
+from threading import Event, Lock
+from typing import List
+
+from packages.domain.image_summarizer import ImageSummarizer, load_image
+from packages.domain.instrumentation import Instrumentation, NullInstrumentation
+from packages.infrastructure.disk_lru_cache import DiskLruCache
+
+EXACT_KEY_PREFIX = "e"
+PERCEPTUAL_KEY_PREFIX = "p"
+
+def perceptual_cache_key(
+        perceptual_hash: int,
+        aspect_ratio: float,
+        namespace: str
+) -> str:
+    """Create cache key of perceptual hash in the namespace.
+
+    Aspect ratio is kept in the key, so that similar images can be found without reading cached values.
+    """
+
+    return f"{PERCEPTUAL_KEY_PREFIX}{perceptual_hash:016x}-{round(aspect_ratio * 1000)}-{namespace}"
+
+def parse_perceptual_key(
+        key: str
+) -> tuple[int, float]:
+    """Get perceptual hash and aspect ratio from cache key created by perceptual_cache_key."""
+
+    perceptual_hash, aspect_ratio, _ = key[len(PERCEPTUAL_KEY_PREFIX):].split("-")
+    return int(perceptual_hash, 16), int(aspect_ratio) / 1000
+
+def difference_hash(
+        img: bytes
+) -> tuple[int, float] | None:
+    """Calculate perceptual hash of image.
+
+    The image is reduced to 9x8 grayscale cells,
+    and each bit of the hash tells whether a cell is brighter than its right neighbour.
+
+    Args:
+        img:
+            Image bytes.
+
+    Returns:
+        64 bit hash and aspect ratio (width / height) of the image.
+        None if the image format can not be decoded.
+    """
+
+    # PyMuPDF is imported on first use, so that creating the summarizer at startup does not import it.
+    import fitz
+
+    try:
+        pix = fitz.Pixmap(img)
+    except Exception:
+        return None
+    if pix.alpha:
+        pix = fitz.Pixmap(pix, 0)
+    if pix.n != 1:
+        pix = fitz.Pixmap(fitz.csGRAY, pix)
+    aspect_ratio = pix.width / pix.height
+
+    # Halve the image until a cell is a few pixels wide, so the averaging below stays cheap.
+    shrink = 0
+    while (pix.width >> (shrink + 1)) >= 36 and (pix.height >> (shrink + 1)) >= 32:
+        shrink += 1
+    if shrink:
+        pix.shrink(shrink)
+
+    width, height, stride, samples = pix.width, pix.height, pix.stride, pix.samples
+    cells = []
+    for row in range(8):
+        y0, y1 = row * height // 8, max((row + 1) * height // 8, row * height // 8 + 1)
+        for column in range(9):
+            x0, x1 = column * width // 9, max((column + 1) * width // 9, column * width // 9 + 1)
+            total = 0
+            for y in range(y0, y1):
+                line = samples[y * stride + x0:y * stride + x1]
+                total += sum(line)
+            cells.append(total / ((y1 - y0) * (x1 - x0)))
+
+    value = 0
+    for row in range(8):
+        for column in range(8):
+            value = (value << 1) | (cells[row * 9 + column] > cells[row * 9 + column + 1])
+
+    return value, aspect_ratio
+
+class CachedImageSummarizer(ImageSummarizer):
+    """Summarize image through exact and perceptual hash caches."""
+
+    # Upper limits of the summaries of this run and of the perceptual hashes of the cache kept in memory.
+    # Older ones are forgotten first, so that a process watching a directory does not grow forever.
+    MAX_RUN_SUMMARIES = 4096
+    MAX_PERCEPTUAL_INDEX = 65536
+
+    def __init__(
+            self,
+            summarizer: ImageSummarizer,
+            cache: DiskLruCache,
+            max_distance: int | None = None,
+            max_aspect_ratio_diff: float = 0.1,
+            namespace: str = "",
+            instrumentation: Instrumentation | None = None
+    ) -> None:
+        """
+        Args:
+            summarizer:
+                Summarizer called when the image is not cached.
+            cache:
+                Cache to store summaries.
+            max_distance:
+                Maximum number of different bits between perceptual hashes of images regarded as the same.
+                Images are matched only by their exact hashes if None.
+            max_aspect_ratio_diff:
+                Maximum relative difference of aspect ratios of images regarded as the same.
+            namespace:
+                Namespace of the summaries, such as the model and the prompt which make them.
+                Summaries cached in other namespaces are not used.
+            instrumentation:
+                Instrumentation to count hits and misses of the cache. They are not counted if None.
+        """
+
+        self.summarizer = summarizer
+        self.cache = cache
+        self.max_distance = max_distance
+        self.max_aspect_ratio_diff = max_aspect_ratio_diff
+        # digest of the namespace kept at the end of cache keys
+        self.namespace = hashlib.sha256(namespace.encode()).hexdigest()[:16]
+        self.instrumentation = instrumentation if instrumentation is not None else NullInstrumentation()
+        self.lock = Lock()
+
+        # Recent summaries of this run by exact hash, and images being summarized now by exact hash.
+        self.summaries: OrderedDict[str, str] = OrderedDict()
+        self.in_flight: dict[str, Event] = {}
+
+        # cache key -> (perceptual hash, aspect ratio) of persisted summaries, from least recently used
+        self.perceptual_index: OrderedDict[str, tuple[int, float]] = OrderedDict()
+        if self.max_distance is not None:
+            for key in self.cache.keys():
+                if key.startswith(PERCEPTUAL_KEY_PREFIX) and key.endswith("-" + self.namespace):
+                    self.__add_to_index(self.perceptual_index, key, parse_perceptual_key(key), self.MAX_PERCEPTUAL_INDEX)
+
+    def summarize(
+            self,
+            img: bytes | str
+    ) -> str:
+        """Summarize image, or get the cached summary if the same image has been summarized before.
+
+        When the same image is being summarized by another thread,
+        this method waits for it instead of summarizing the image again.
+
+        Args:
+            img:
+                Image bytes, or path to image file.
+
+        Returns:
+            Summary of the image as str.
+        """
+
+        img = load_image(img)
+        exact_hash = hashlib.sha256(img).hexdigest()
+
+        while True:
+            with self.lock:
+                if exact_hash in self.summaries:
+                    self.instrumentation.count("cache_hits_total", cache="summary", match="run")
+                    self.summaries.move_to_end(exact_hash)
+                    return self.summaries[exact_hash]
+                event = self.in_flight.get(exact_hash)
+                if event is None:
+                    self.in_flight[exact_hash] = Event()
+                    break
+            event.wait()
+
+        summary = None
+        try:
+            summary, difference = self.__lookup(img, exact_hash)
+            if summary is None:
+                self.instrumentation.count("cache_misses_total", cache="summary")
+                summary = self.summarizer.summarize(img)
+                self.__store(exact_hash, difference, summary)
+            return summary
+        finally:
+            with self.lock:
+                if summary is not None:
+                    self.__add_to_index(self.summaries, exact_hash, summary, self.MAX_RUN_SUMMARIES)
+                self.in_flight.pop(exact_hash).set()
+
+    def summarize_many(
+            self,
+            imgs: List[bytes | str],
+            return_exceptions: bool = False
+    ) -> List[str | Exception]:
+        """Summarize images which are not cached together by the summarize_many of the summarizer.
+
+        Images of the same bytes are summarized once,
+        and images being summarized by other threads are waited for after the others.
+
+        Args:
+            imgs:
+                Image bytes, or paths to image files.
+            return_exceptions:
+                If True, the error of an image which failed is returned in place of its summary.
+
+        Returns:
+            Summaries of the images in the same order as imgs.
+        """
+
+        imgs = [load_image(img) for img in imgs]
+        exact_hashes = [hashlib.sha256(img).hexdigest() for img in imgs]
+
+        summaries: dict[str, str | Exception] = {}
+        claimed: dict[str, bytes] = {}
+        waited: dict[str, bytes] = {}
+        with self.lock:
+            for img, exact_hash in zip(imgs, exact_hashes):
+                if (exact_hash in summaries) or (exact_hash in claimed) or (exact_hash in waited):
+                    continue
+                if exact_hash in self.summaries:
+                    self.instrumentation.count("cache_hits_total", cache="summary", match="run")
+                    self.summaries.move_to_end(exact_hash)
+                    summaries[exact_hash] = self.summaries[exact_hash]
+                elif exact_hash in self.in_flight:
+                    waited[exact_hash] = img
+                else:
+                    self.in_flight[exact_hash] = Event()
+                    claimed[exact_hash] = img
+
+        try:
+            misses: dict[str, tuple[int, float] | None] = {}
+            for exact_hash, img in claimed.items():
+                summary, difference = self.__lookup(img, exact_hash)
+                if summary is None:
+                    misses[exact_hash] = difference
+                else:
+                    summaries[exact_hash] = summary
+
+            if misses:
+                self.instrumentation.count("cache_misses_total", len(misses), cache="summary")
+                results = self.summarizer.summarize_many([claimed[exact_hash] for exact_hash in misses], return_exceptions=True)
+                for (exact_hash, difference), summary in zip(misses.items(), results):
+                    summaries[exact_hash] = summary
+                    if not isinstance(summary, Exception):
+                        self.__store(exact_hash, difference, summary)
+        finally:
+            with self.lock:
+                for exact_hash in claimed:
+                    summary = summaries.get(exact_hash)
+                    if (summary is not None) and (not isinstance(summary, Exception)):
+                        self.__add_to_index(self.summaries, exact_hash, summary, self.MAX_RUN_SUMMARIES)
+                    self.in_flight.pop(exact_hash).set()
+
+        for exact_hash, img in waited.items():
+            try:
+                summaries[exact_hash] = self.summarize(img)
+            except Exception as e:
+                summaries[exact_hash] = e
+
+        results = [summaries[exact_hash] for exact_hash in exact_hashes]
+        if not return_exceptions:
+            for summary in results:
+                if isinstance(summary, Exception):
+                    raise summary
+
+        return results
+
+    def __lookup(
+            self,
+            img: bytes,
+            exact_hash: str
+    ) -> tuple[str | None, tuple[int, float] | None]:
+        """Find cached summary of the image.
+
+        Returns:
+            Cached summary or None, and perceptual hash and aspect ratio of the image to store its summary.
+        """
+
+        exact_key = self.__exact_key(exact_hash)
+        cached = self.cache.get(exact_key)
+        if cached is not None:
+            self.instrumentation.count("cache_hits_total", cache="summary", match="exact")
+            return cached.decode(), None
+
+        if self.max_distance is None:
+            return None, None
+
+        difference = difference_hash(img)
+        if difference is None:
+            return None, None
+
+        perceptual_hash, aspect_ratio = difference
+        perceptual_key = self.__find_similar(perceptual_hash, aspect_ratio)
+        if perceptual_key is not None:
+            cached = self.cache.get(perceptual_key)
+            if cached is not None:
+                self.instrumentation.count("cache_hits_total", cache="summary", match="perceptual")
+                self.cache.put(exact_key, cached)
+                return cached.decode(), None
+            with self.lock:
+                self.perceptual_index.pop(perceptual_key, None)
+
+        return None, difference
+
+    def __store(
+            self,
+            exact_hash: str,
+            difference: tuple[int, float] | None,
+            summary: str
+    ) -> None:
+        """Cache summary of the image by its exact hash, and by its perceptual hash if it has one."""
+
+        self.cache.put(self.__exact_key(exact_hash), summary.encode())
+        if difference is None:
+            return
+
+        perceptual_key = perceptual_cache_key(*difference, self.namespace)
+        self.cache.put(perceptual_key, summary.encode())
+        with self.lock:
+            self.__add_to_index(self.perceptual_index, perceptual_key, parse_perceptual_key(perceptual_key), self.MAX_PERCEPTUAL_INDEX)
+
+    def __exact_key(
+            self,
+            exact_hash: str
+    ) -> str:
+        """Create cache key of exact hash in the namespace."""
+
+        return f"{EXACT_KEY_PREFIX}{exact_hash}-{self.namespace}"
+
+    def __add_to_index(
+            self,
+            index: OrderedDict,
+            key: str,
+            value: any,
+            max_entries: int
+    ) -> None:
+        """Add the value to the index as the most recent one, and forget the oldest ones over max_entries.
+
+        Must be called with the lock held or from __init__.
+        """
+
+        index[key] = value
+        index.move_to_end(key)
+        while len(index) > max_entries:
+            index.popitem(last=False)
+
+    def __find_similar(
+            self,
+            perceptual_hash: int,
+            aspect_ratio: float
+    ) -> str | None:
+        """Find cache key of the most similar image.
+
+        Args:
+            perceptual_hash:
+                Perceptual hash of the image.
+            aspect_ratio:
+                Aspect ratio of the image.
+
+        Returns:
+            Cache key if a similar image has been summarized, None otherwise.
+        """
+
+        with self.lock:
+            candidates = list(self.perceptual_index.items())
+
+        best = None
+        for key, (candidate_hash, candidate_aspect_ratio) in candidates:
+            distance = (candidate_hash ^ perceptual_hash).bit_count()
+            if distance > self.max_distance:
+                continue
+            if abs(candidate_aspect_ratio - aspect_ratio) > aspect_ratio * self.max_aspect_ratio_diff:
+                continue
+            if (best is None) or (distance < best[0]):
+                best = (distance, key)
+
+        if best is None:
+            return None
+
+        return best[1]
@@ -0,0 +1,160 @@
+"""Caching bytes on local disk.
+
+This module provides class to store compressed values in a directory
+and to evict the least recently used values when the directory grows over its size limit.
+A value whose file is broken, such as one truncated by a crash, is deleted and regarded as not cached.
+
+Typical usage example:
+
+    cache = DiskLruCache("path/to/cachedir", max_bytes=1024 * 1024 * 1024)
+    cache.put("0123abcd", b"some value")
+    value = cache.get("0123abcd")
+"""
+import gzip
+import os
+import pathlib
+import tempfile
+import time
+import zlib
+from threading import Lock
+
+class DiskLruCache:
+    """Store compressed bytes on disk with LRU eviction."""
+
+    SUFFIX = ".gz"
+
+    def __init__(
+            self,
+            cache_dir: str,
+            max_bytes: int
+    ) -> None:
+        """
+        Args:
+            cache_dir:
+                Directory to store values. It is created if not exists.
+            max_bytes:
+                Upper limit of the total size of compressed values.
+        """
+
+        if max_bytes < 1:
+            raise ValueError("max_bytes must be 1 or more.")
+
+        self.cache_dir = pathlib.Path(cache_dir)
+        self.max_bytes = max_bytes
+        self.lock = Lock()
+
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+
+        # key -> [last access time in ns, compressed size]
+        self.entries: dict[str, list[int]] = {}
+        for path in self.cache_dir.glob("*/*" + self.SUFFIX):
+            stat = path.stat()
+            self.entries[path.name[:-len(self.SUFFIX)]] = [stat.st_mtime_ns, stat.st_size]
+        self.total_bytes = sum(size for _, size in self.entries.values())
+
+    def get(
+            self,
+            key: str
+    ) -> bytes | None:
+        """Get value and mark it as recently used.
+
+        Args:
+            key:
+                Key of the value. It must be usable as a file name.
+
+        Returns:
+            Value if cached, None otherwise. None if the cached value can not be read, and it is deleted.
+        """
+
+        path = self.__path(key)
+        try:
+            data = gzip.decompress(path.read_bytes())
+        except FileNotFoundError:
+            with self.lock:
+                self.__forget(key)
+            return None
+        except (gzip.BadGzipFile, EOFError, zlib.error, OSError) as e:
+            print(f"Error: cached value {key} is broken and deleted. {e}")
+            with self.lock:
+                path.unlink(missing_ok=True)
+                self.__forget(key)
+            return None
+
+        with self.lock:
+            if key in self.entries:
+                self.entries[key][0] = self.__touch(path)
+
+        return data
+
+    def put(
+            self,
+            key: str,
+            value: bytes
+    ) -> None:
+        """Store value and evict least recently used values if the cache is over its size limit.
+
+        Args:
+            key:
+                Key of the value. It must be usable as a file name.
+            value:
+                Value to be stored.
+        """
+
+        path = self.__path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+
+        compressed = gzip.compress(value)
+        fd, temp_path = tempfile.mkstemp(dir=str(path.parent), suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            f.write(compressed)
+        os.replace(temp_path, str(path))
+
+        with self.lock:
+            self.__forget(key)
+            self.entries[key] = [self.__touch(path), len(compressed)]
+            self.total_bytes += len(compressed)
+            self.__evict()
+
+    def keys(self) -> list[str]:
+        """Get keys of all cached values.
+
+        Returns:
+            Keys ordered from least recently used to most recently used.
+        """
+
+        with self.lock:
+            return sorted(self.entries, key=lambda key: self.entries[key][0])
+
+    def __path(
+            self,
+            key: str
+    ) -> pathlib.Path:
+        return self.cache_dir / key[:2] / (key + self.SUFFIX)
+
+    def __touch(
+            self,
+            path: pathlib.Path
+    ) -> int:
+        """Record access time to the file, so that it survives restarts of the process."""
+
+        now = time.time_ns()
+        os.utime(str(path), ns=(now, now))
+        return now
+
+    def __forget(
+            self,
+            key: str
+    ) -> None:
+        entry = self.entries.pop(key, None)
+        if entry is not None:
+            self.total_bytes -= entry[1]
+
+    def __evict(self) -> None:
+        if self.total_bytes <= self.max_bytes:
+            return
+
+        for key in sorted(self.entries, key=lambda key: self.entries[key][0]):
+            if self.total_bytes <= self.max_bytes:
+                break
+            self.__path(key).unlink(missing_ok=True)
+            self.__forget(key)
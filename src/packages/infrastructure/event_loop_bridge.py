@@ -0,0 +1,117 @@
+"""Using asynchronous extractor and summarizer from threads.
+
+This module provides classes which implement DocumentExtractor and ImageSummarizer
+on top of AsyncDocumentExtractor and AsyncImageSummarizer running on EventLoopRunner.
+Requests of all threads are in flight on the single event loop thread,
+and summarize_many waits for all images of a document without a thread per image.
+
+Typical usage example:
+
+    runner = EventLoopRunner(max_concurrency=64)
+    extractor = LoopDocumentExtractor(AzureAsyncDocumentExtractor(HttpPoolSettings()), runner)
+    summarizer = LoopImageSummarizer(AzureOaiAsyncImgSummarizer(HttpPoolSettings()), runner)
+"""
+from concurrent.futures import Future
+from typing import IO, List
+
+from packages.domain.async_document_extractor import AsyncDocumentExtractor
+from packages.domain.async_image_summarizer import AsyncImageSummarizer
+from packages.domain.document_extractor import DocumentExtractor
+from packages.domain.image_summarizer import ImageSummarizer
+from packages.infrastructure.event_loop_runner import EventLoopRunner
+
+class LoopDocumentExtractor(DocumentExtractor):
+    """Extract document by AsyncDocumentExtractor on event loop."""
+
+    def __init__(
+            self,
+            extractor: AsyncDocumentExtractor,
+            runner: EventLoopRunner
+    ) -> None:
+        self.extractor = extractor
+        self.runner = runner
+
+    def extract(
+            self,
+            document: IO
+    ) -> dict[str, any]:
+        """Extract document and wait for the result.
+
+        Args:
+            document:
+                Document to be extracted.
+
+        Returns:
+            JSON response of extracted document.
+        """
+
+        return self.runner.run(self.extractor.extract(document.read()))
+
+    def begin_extract(
+            self,
+            document: IO
+    ) -> Future:
+        """Submit document, and get a future of the result which is polled on the event loop.
+
+        No thread waits for the result, so the number of documents in flight is not limited by threads.
+
+        Args:
+            document:
+                Document to be extracted.
+
+        Returns:
+            Future of JSON response of extracted document.
+        """
+
+        wait = self.runner.run(self.extractor.begin_extract(document.read()))
+        return self.runner.submit(wait())
+
+class LoopImageSummarizer(ImageSummarizer):
+    """Summarize image by AsyncImageSummarizer on event loop."""
+
+    def __init__(
+            self,
+            summarizer: AsyncImageSummarizer,
+            runner: EventLoopRunner
+    ) -> None:
+        self.summarizer = summarizer
+        self.runner = runner
+
+    def summarize(
+            self,
+            img: bytes | str
+    ) -> str:
+        """Summarize image and wait for the summary.
+
+        Args:
+            img:
+                Image bytes, or path to image file.
+
+        Returns:
+            Summary of the image as str.
+        """
+
+        return self.runner.run(self.summarizer.summarize(img))
+
+    def summarize_many(
+            self,
+            imgs: List[bytes | str],
+            return_exceptions: bool = False
+    ) -> List[str | Exception]:
+        """Summarize all images at the same time on the event loop.
+
+        Args:
+            imgs:
+                Image bytes, or paths to image files.
+            return_exceptions:
+                If True, the error of an image which failed is returned in place of its summary.
+
+        Returns:
+            Summaries of the images in the same order as imgs.
+        """
+
+        futures = [self.runner.submit(self.summarizer.summarize(img)) for img in imgs]
+        if not return_exceptions:
+            return [future.result() for future in futures]
+
+        return [future.exception() or future.result() for future in futures]
@@ -0,0 +1,124 @@
+"""Running coroutines on a shared event loop.
+
+This module provides class to run coroutines from threads on one asyncio event loop
+which runs in a background thread, with a limit of coroutines running at the same time.
+
+Typical usage example:
+
+    runner = EventLoopRunner(max_concurrency=64)
+    runner.on_close(async_extractor.close)
+    future = runner.submit(async_extractor.extract(document))
+    result = future.result()
+    runner.close()
+"""
+import asyncio
+from concurrent.futures import Future
+from threading import Lock, Thread
+from typing import Any, Awaitable, Callable, Coroutine
+
+class EventLoopRunner:
+    """Run coroutines on an event loop in a background thread."""
+
+    def __init__(
+            self,
+            max_concurrency: int = 64
+    ) -> None:
+        """
+        Args:
+            max_concurrency:
+                Maximum number of coroutines running at the same time.
+                Coroutines over this number wait until others finish.
+        """
+
+        if max_concurrency < 1:
+            raise ValueError("max_concurrency must be 1 or more.")
+
+        self.max_concurrency = max_concurrency
+        self.loop: asyncio.AbstractEventLoop | None = None
+        self.thread: Thread | None = None
+        self.semaphore: asyncio.Semaphore | None = None
+        self.closers: list[Callable[[], Awaitable[None]]] = []
+        self.lock = Lock()
+
+    def submit(
+            self,
+            coroutine: Coroutine[Any, Any, Any]
+    ) -> Future:
+        """Schedule coroutine on the event loop.
+
+        The event loop is started on first call.
+
+        Args:
+            coroutine:
+                Coroutine to be run.
+
+        Returns:
+            Future of the result of the coroutine.
+        """
+
+        with self.lock:
+            if self.loop is None:
+                self.loop = asyncio.new_event_loop()
+                self.thread = Thread(target=self.loop.run_forever, name="event-loop", daemon=True)
+                self.thread.start()
+
+        return asyncio.run_coroutine_threadsafe(self.__limit(coroutine), self.loop)
+
+    def run(
+            self,
+            coroutine: Coroutine[Any, Any, Any]
+    ) -> Any:
+        """Run coroutine on the event loop and wait for its result.
+
+        Args:
+            coroutine:
+                Coroutine to be run.
+
+        Returns:
+            Result of the coroutine.
+        """
+
+        return self.submit(coroutine).result()
+
+    def on_close(
+            self,
+            closer: Callable[[], Awaitable[None]]
+    ) -> None:
+        """Register coroutine function run on the event loop by close before the loop stops.
+
+        Args:
+            closer:
+                Coroutine function to close clients of the event loop, such as aiohttp sessions.
+        """
+
+        with self.lock:
+            self.closers.append(closer)
+
+    def close(self) -> None:
+        """Run the closers registered by on_close on the event loop, and stop the event loop."""
+
+        with self.lock:
+            if self.loop is None:
+                return
+            for closer in self.closers:
+                try:
+                    asyncio.run_coroutine_threadsafe(closer(), self.loop).result()
+                except Exception as e:
+                    print(f"Error: a client of the event loop could not be closed. {e}")
+            self.loop.call_soon_threadsafe(self.loop.stop)
+            self.thread.join()
+            self.loop.close()
+            self.loop = None
+            self.thread = None
+            self.semaphore = None
+
+    async def __limit(
+            self,
+            coroutine: Coroutine[Any, Any, Any]
+    ) -> Any:
+        # The semaphore is created and used only in the event loop thread.
+        if self.semaphore is None:
+            self.semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        async with self.semaphore:
+            return await coroutine
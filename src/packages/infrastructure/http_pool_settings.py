@@ -0,0 +1,137 @@
+"""Settings of HTTP connection pools.
+
+This module provides class to hold settings of HTTP connection pools
+shared by the clients of Azure services.
+
+Typical usage example:
+
+    settings = HttpPoolSettings.from_environ()
+    session = settings.create_requests_session()
+    http_client = settings.create_httpx_client()
+    http_async_client = settings.create_httpx_async_client()
+"""
+from os import environ
+from typing import TYPE_CHECKING
+
+# The HTTP libraries are imported by the methods creating the clients,
+# so that reading the settings at startup does not import them.
+if TYPE_CHECKING:
+    import httpx
+    import requests
+
+class HttpPoolSettings:
+    """Settings of HTTP connection pools."""
+
+    def __init__(
+            self,
+            pool_size: int = 32,
+            connect_timeout_sec: float = 10,
+            read_timeout_sec: float = 120,
+            keepalive_expiry_sec: float = 60,
+            max_retries: int | None = None
+    ) -> None:
+        """
+        Args:
+            pool_size:
+                Maximum number of connections kept for each service.
+                It should be equal to or more than the number of requests in flight.
+            connect_timeout_sec:
+                Timeout of connecting to the service.
+            read_timeout_sec:
+                Timeout of waiting for a response from the service.
+            keepalive_expiry_sec:
+                Idle connections are closed after this seconds.
+            max_retries:
+                Number of retries by the clients themselves. Default of each SDK if None.
+                Set 0 when requests are retried by RateLimitedDocumentExtractor or RateLimitedImageSummarizer,
+                so that their limiters see every throttled response.
+        """
+
+        if pool_size < 1:
+            raise ValueError("pool_size must be 1 or more.")
+
+        self.pool_size = pool_size
+        self.connect_timeout_sec = connect_timeout_sec
+        self.read_timeout_sec = read_timeout_sec
+        self.keepalive_expiry_sec = keepalive_expiry_sec
+        self.max_retries = max_retries
+
+    @classmethod
+    def from_environ(cls) -> 'HttpPoolSettings':
+        """Create settings from HTTP_POOL_SIZE, HTTP_CONNECT_TIMEOUT_SEC, HTTP_READ_TIMEOUT_SEC, HTTP_KEEPALIVE_SEC and HTTP_MAX_RETRIES.
+
+        Default values are used for variables which are not set.
+        """
+
+        default = cls()
+        return cls(
+            pool_size=int(environ.get('HTTP_POOL_SIZE') or default.pool_size),
+            connect_timeout_sec=float(environ.get('HTTP_CONNECT_TIMEOUT_SEC') or default.connect_timeout_sec),
+            read_timeout_sec=float(environ.get('HTTP_READ_TIMEOUT_SEC') or default.read_timeout_sec),
+            keepalive_expiry_sec=float(environ.get('HTTP_KEEPALIVE_SEC') or default.keepalive_expiry_sec),
+            max_retries=int(environ['HTTP_MAX_RETRIES']) if environ.get('HTTP_MAX_RETRIES') else default.max_retries
+        )
+
+    def sdk_retry_options(self, name: str) -> dict[str, int]:
+        """Get keyword arguments of a client to apply max_retries.
+
+        Args:
+            name:
+                Name of the keyword argument of the client, such as "retry_total" or "max_retries".
+
+        Returns:
+            Empty if max_retries is None, so that the client uses its default.
+        """
+
+        if self.max_retries is None:
+            return {}
+
+        return {name: self.max_retries}
+
+    def create_requests_session(self) -> "requests.Session":
+        """Create requests session with a connection pool of pool_size.
+
+        requests keeps connections alive until the server closes them,
+        so keepalive_expiry_sec is not applied to this session.
+        """
+
+        import requests
+        from requests.adapters import HTTPAdapter
+
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size)
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+
+        return session
+
+    def create_httpx_client(self) -> "httpx.Client":
+        """Create httpx client with a connection pool of pool_size."""
+
+        import httpx
+
+        return httpx.Client(limits=self.__httpx_limits(), timeout=self.__httpx_timeout())
+
+    def create_httpx_async_client(self) -> "httpx.AsyncClient":
+        """Create asynchronous httpx client with a connection pool of pool_size.
+
+        The client must be used only on the event loop where it is used first.
+        """
+
+        import httpx
+
+        return httpx.AsyncClient(limits=self.__httpx_limits(), timeout=self.__httpx_timeout())
+
+    def __httpx_limits(self) -> "httpx.Limits":
+        import httpx
+
+        return httpx.Limits(
+            max_connections=self.pool_size,
+            max_keepalive_connections=self.pool_size,
+            keepalive_expiry=self.keepalive_expiry_sec
+        )
+
+    def __httpx_timeout(self) -> "httpx.Timeout":
+        import httpx
+
+        return httpx.Timeout(self.read_timeout_sec, connect=self.connect_timeout_sec)
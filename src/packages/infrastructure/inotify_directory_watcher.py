@@ -0,0 +1,163 @@
+"""Watching directory by inotify.
+
+This module provides class to find files written to a directory as soon as Linux notifies the changes,
+instead of listing the directory regularly. inotify is called through ctypes.
+
+inotify does not notice files written by other hosts to a network file system such as NFS.
+Use PollingDirectoryWatcher for such directories.
+
+Typical usage example:
+
+    if InotifyDirectoryWatcher.is_available():
+        watcher = InotifyDirectoryWatcher(settle_sec=2)
+    else:
+        watcher = PollingDirectoryWatcher(poll_sec=1, settle_sec=2)
+
+    for paths in watcher.watch("./source", [".docx", ".pdf"], stop):
+        for path in paths:
+            convert(path)
+"""
+import ctypes
+import ctypes.util
+import os
+import pathlib
+import select
+import struct
+import sys
+from threading import Event
+from typing import Iterator
+
+from packages.infrastructure.polling_directory_watcher import PollingDirectoryWatcher
+
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_Q_OVERFLOW = 0x00004000
+IN_NONBLOCK = os.O_NONBLOCK
+IN_CLOEXEC = 0o2000000
+
+# Events of files which may have been written.
+WATCH_MASK = IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE
+
+# struct inotify_event without name: wd, mask, cookie, len
+EVENT_HEADER = struct.Struct("iIII")
+
+def _load_libc() -> ctypes.CDLL | None:
+    if not sys.platform.startswith("linux"):
+        return None
+
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+    except OSError:
+        return None
+
+    if not (hasattr(libc, "inotify_init1") and hasattr(libc, "inotify_add_watch")):
+        return None
+
+    libc.inotify_init1.argtypes = [ctypes.c_int]
+    libc.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+
+    return libc
+
+_libc = _load_libc()
+
+class InotifyDirectoryWatcher(PollingDirectoryWatcher):
+    """Watch directory by inotify."""
+
+    def __init__(
+            self,
+            poll_sec: float = 1,
+            settle_sec: float = 2
+    ) -> None:
+        """
+        Args:
+            poll_sec:
+                Interval of checks of files which are being written, while no change is notified.
+            settle_sec:
+                Time a file must stay unchanged before it is reported.
+        """
+
+        if not self.is_available():
+            raise RuntimeError("inotify is not available on this system.")
+
+        super().__init__(poll_sec=poll_sec, settle_sec=settle_sec)
+
+    @staticmethod
+    def is_available() -> bool:
+        """Check whether inotify can be used on this system."""
+
+        return _libc is not None
+
+    def changes(
+            self,
+            root: pathlib.Path,
+            suffixes: list[str],
+            stop: Event
+    ) -> Iterator[set[pathlib.Path]]:
+        """Iterate files which may have been written, as soon as changes are notified.
+
+        The directory is watched when this method is called.
+
+        Returns:
+            Iterator of files notified since the last item. It yields an empty set every poll_sec without changes.
+        """
+
+        fd = _libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if fd < 0:
+            errno = ctypes.get_errno()
+            raise OSError(errno, f"inotify_init1 failed. {os.strerror(errno)}")
+
+        if _libc.inotify_add_watch(fd, os.fsencode(str(root)), WATCH_MASK) < 0:
+            errno = ctypes.get_errno()
+            os.close(fd)
+            raise OSError(errno, f"inotify_add_watch failed for {root}. {os.strerror(errno)}")
+
+        return self.__events(fd, root, suffixes, stop)
+
+    def __events(
+            self,
+            fd: int,
+            root: pathlib.Path,
+            suffixes: list[str],
+            stop: Event
+    ) -> Iterator[set[pathlib.Path]]:
+        try:
+            while not stop.is_set():
+                readable, _, _ = select.select([fd], [], [], self.poll_sec)
+                if not readable:
+                    yield set()
+                    continue
+
+                try:
+                    data = os.read(fd, 64 * 1024)
+                except BlockingIOError:
+                    data = b""
+
+                yield self.__parse(data, root, suffixes)
+        finally:
+            os.close(fd)
+
+    def __parse(
+            self,
+            data: bytes,
+            root: pathlib.Path,
+            suffixes: list[str]
+    ) -> set[pathlib.Path]:
+        """Get files of the suffixes from inotify events."""
+
+        paths = set()
+        offset = 0
+        while offset + EVENT_HEADER.size <= len(data):
+            _, mask, _, length = EVENT_HEADER.unpack_from(data, offset)
+            name = os.fsdecode(data[offset + EVENT_HEADER.size:offset + EVENT_HEADER.size + length].rstrip(b"\0"))
+            offset += EVENT_HEADER.size + length
+
+            if mask & IN_Q_OVERFLOW:
+                # Events have been dropped, so every file may have been written.
+                paths |= self.list_files(root, suffixes)
+            elif name and any(name.endswith(suffix) for suffix in suffixes):
+                paths.add(root / name)
+
+        return paths
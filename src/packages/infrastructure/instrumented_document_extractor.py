@@ -0,0 +1,92 @@
+"""Instrumenting requests to extract documents.
+
+This module provides class to record a span, the uploaded bytes and errors of each request
+sent by the extractor to the service.
+
+Typical usage example:
+
+    extractor = InstrumentedDocumentExtractor(AzureDocumentExtractor(), instrumentation)
+    with open("path/to/pdffile", "rb") as file:
+        result = extractor.extract(file)
+"""
+from concurrent.futures import Future
+import io
+from typing import IO
+
+from packages.domain.document_extractor import DocumentExtractor
+from packages.domain.instrumentation import Instrumentation, Span
+
+class InstrumentedDocumentExtractor(DocumentExtractor):
+    """Extract document, recording the request to the service."""
+
+    def __init__(
+            self,
+            extractor: DocumentExtractor,
+            instrumentation: Instrumentation,
+            service: str = "document_intelligence"
+    ) -> None:
+        """
+        Args:
+            extractor:
+                Extractor which sends requests to the service.
+            instrumentation:
+                Instrumentation to record requests.
+            service:
+                Name of the service, used as the label of the metrics and the name of the spans.
+        """
+
+        self.extractor = extractor
+        self.instrumentation = instrumentation
+        self.service = service
+
+    def extract(
+            self,
+            document: IO
+    ) -> dict[str, any]:
+        """Extract document in span '{service}_request'.
+
+        Args:
+            document:
+                Document to be extracted.
+
+        Returns:
+            JSON response of extracted document.
+        """
+
+        return self.begin_extract(document).result()
+
+    def begin_extract(
+            self,
+            document: IO
+    ) -> Future:
+        """Submit document in span '{service}_request', which ends when the result is done.
+
+        Args:
+            document:
+                Document to be extracted.
+
+        Returns:
+            Future of JSON response of extracted document.
+        """
+
+        data = document.read()
+        self.instrumentation.count("requests_total", service=self.service)
+        self.instrumentation.count("bytes_uploaded_total", len(data), service=self.service)
+        span = self.instrumentation.span(self.service + "_request", bytes=len(data))
+        try:
+            future = self.extractor.begin_extract(io.BytesIO(data))
+        except Exception as e:
+            self.__end(span, e)
+            raise
+
+        future.add_done_callback(lambda done: self.__end(span, done.exception()))
+        return future
+
+    def __end(
+            self,
+            span: Span,
+            error: BaseException | None
+    ) -> None:
+        if error is not None:
+            self.instrumentation.count("request_errors_total", service=self.service)
+        span.end(error)
@@ -0,0 +1,105 @@
+"""Instrumenting requests to summarize images.
+
+This module provides class to record a span, the uploaded bytes and errors of each request
+sent by the summarizer to the service.
+
+Typical usage example:
+
+    summarizer = InstrumentedImageSummarizer(AzureOaiImgSummarizer(), instrumentation)
+    summary = summarizer.summarize(png_bytes)
+"""
+from typing import List
+
+from packages.domain.image_summarizer import ImageSummarizer, load_image
+from packages.domain.instrumentation import Instrumentation
+
+class InstrumentedImageSummarizer(ImageSummarizer):
+    """Summarize image, recording the request to the service."""
+
+    def __init__(
+            self,
+            summarizer: ImageSummarizer,
+            instrumentation: Instrumentation,
+            service: str = "openai"
+    ) -> None:
+        """
+        Args:
+            summarizer:
+                Summarizer which sends requests to the service.
+            instrumentation:
+                Instrumentation to record requests.
+            service:
+                Name of the service, used as the label of the metrics and the name of the spans.
+        """
+
+        self.summarizer = summarizer
+        self.instrumentation = instrumentation
+        self.service = service
+
+    def summarize(
+            self,
+            img: bytes | str
+    ) -> str:
+        """Summarize image in span '{service}_request'.
+
+        Args:
+            img:
+                Image bytes, or path to image file.
+
+        Returns:
+            Summary of the image as str.
+        """
+
+        img = load_image(img)
+        self.__count(img)
+        try:
+            with self.instrumentation.span(self.service + "_request", bytes=len(img)):
+                return self.summarizer.summarize(img)
+        except Exception:
+            self.instrumentation.count("request_errors_total", service=self.service)
+            raise
+
+    def summarize_many(
+            self,
+            imgs: List[bytes | str],
+            return_exceptions: bool = False
+    ) -> List[str | Exception]:
+        """Summarize images concurrently.
+
+        If the summarizer has its own summarize_many, such as one waiting for all images on an event loop,
+        the images are summarized by it in one span '{service}_requests'.
+        Otherwise each image has its own span.
+
+        Args:
+            imgs:
+                Image bytes, or paths to image files.
+            return_exceptions:
+                If True, the error of an image which failed is returned in place of its summary.
+
+        Returns:
+            Summaries of the images in the same order as imgs.
+        """
+
+        if type(self.summarizer).summarize_many is ImageSummarizer.summarize_many:
+            return super().summarize_many(imgs, return_exceptions)
+
+        imgs = [load_image(img) for img in imgs]
+        for img in imgs:
+            self.__count(img)
+        with self.instrumentation.span(self.service + "_requests", images=len(imgs)):
+            summaries = self.summarizer.summarize_many(imgs, return_exceptions=True)
+
+        errors = [summary for summary in summaries if isinstance(summary, Exception)]
+        if errors:
+            self.instrumentation.count("request_errors_total", len(errors), service=self.service)
+            if not return_exceptions:
+                raise errors[0]
+
+        return summaries
+
+    def __count(
+            self,
+            img: bytes
+    ) -> None:
+        self.instrumentation.count("requests_total", service=self.service)
+        self.instrumentation.count("bytes_uploaded_total", len(img), service=self.service)
@@ -0,0 +1,48 @@
+"""Exporting spans and metrics to a JSON-lines file.
+
+This module provides exporter which appends one JSON object per line to a file:
+a record of each ended span, and a snapshot of all counters and histograms when instrumentation is closed.
+The file can be read by jq or loaded into a data frame to find slow documents and stages.
+
+Typical usage example:
+
+    instrumentation = MetricsInstrumentation([JsonLinesExporter("output/metrics.jsonl")])
+"""
+import json
+import pathlib
+from threading import Lock
+
+from packages.infrastructure.metrics_instrumentation import MetricsExporter
+
+class JsonLinesExporter(MetricsExporter):
+    """Append records to a JSON-lines file."""
+
+    def __init__(
+            self,
+            path: str
+    ) -> None:
+        """
+        Args:
+            path:
+                File to append records to. It is created with its directory if it does not exist.
+        """
+
+        pathlib.Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self.path = path
+        self.lock = Lock()
+        self.file = open(path, "a", encoding="utf-8")
+
+    def export(
+            self,
+            record: dict[str, any]
+    ) -> None:
+        # default=str keeps span attributes which are not JSON types, such as paths.
+        line = json.dumps(record, ensure_ascii=False, default=str) + "\n"
+        with self.lock:
+            if not self.file.closed:
+                self.file.write(line)
+                self.file.flush()
+
+    def close(self) -> None:
+        with self.lock:
+            self.file.close()
@@ -0,0 +1,277 @@
+"""Recording spans and metrics in memory.
+
+This module provides Instrumentation which keeps counters and histograms in memory
+and passes them and ended spans to exporters, such as a JSON-lines log or a Prometheus endpoint.
+
+Every ended span is also observed in the histogram 'span_seconds' labeled with its name,
+so latency of each stage is available without keeping spans.
+
+Typical usage example:
+
+    instrumentation = MetricsInstrumentation([JsonLinesExporter("metrics.jsonl"), PrometheusExporter(9464)])
+    with instrumentation.span("analyze", document="a.pdf"):
+        analyze(document)
+    instrumentation.count("cache_hits_total", cache="analyze")
+    instrumentation.close()
+"""
+import bisect
+import os
+import threading
+import time
+
+from packages.domain.instrumentation import Instrumentation, Span
+
+# Upper bounds of histogram buckets in seconds, from a fast cache hit to a long document.
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+class MetricsExporter:
+    """Export recorded values of MetricsInstrumentation. Subclasses override the methods they need."""
+
+    def start(
+            self,
+            instrumentation: 'MetricsInstrumentation'
+    ) -> None:
+        """Start exporting. Exporters which pull values take them from instrumentation.snapshot."""
+
+        pass
+
+    def export(
+            self,
+            record: dict[str, any]
+    ) -> None:
+        """Export an ended span, or the final snapshot of metrics when instrumentation is closed.
+
+        Args:
+            record:
+                JSON serializable record. Its 'type' is 'span' or 'metrics'.
+        """
+
+        pass
+
+    def close(self) -> None:
+        """Stop exporting."""
+
+        pass
+
+class Histogram:
+    """Counts of observed values by bucket."""
+
+    def __init__(
+            self,
+            buckets: tuple[float, ...]
+    ) -> None:
+        self.buckets = buckets
+        # The last count is of values more than the largest bucket.
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(
+            self,
+            value: float
+    ) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+class RecordedSpan(Span):
+    """Span recorded by MetricsInstrumentation."""
+
+    def __init__(
+            self,
+            instrumentation: 'MetricsInstrumentation',
+            name: str,
+            parent: 'RecordedSpan | None',
+            attributes: dict[str, any]
+    ) -> None:
+        self.instrumentation = instrumentation
+        self.name = name
+        self.span_id = os.urandom(8).hex()
+        self.trace_id = parent.trace_id if parent is not None else os.urandom(16).hex()
+        self.parent_id = parent.span_id if parent is not None else None
+        self.attributes = attributes
+        self.start_time = time.time()
+        self.started_at = time.perf_counter()
+        self.ended = False
+
+    def set(
+            self,
+            **attributes: any
+    ) -> None:
+        self.attributes.update(attributes)
+
+    def end(
+            self,
+            error: BaseException | None = None
+    ) -> None:
+        if self.ended:
+            return
+        self.ended = True
+        self.instrumentation.end_span(self, time.perf_counter() - self.started_at, error)
+
+    def __enter__(self) -> 'RecordedSpan':
+        self.instrumentation.enter_span(self)
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.instrumentation.exit_span(self)
+        self.end(exc_value)
+
+class MetricsInstrumentation(Instrumentation):
+    """Keep counters and histograms in memory and export them and spans."""
+
+    def __init__(
+            self,
+            exporters: list[MetricsExporter] | None = None,
+            buckets: tuple[float, ...] = DEFAULT_BUCKETS
+    ) -> None:
+        """
+        Args:
+            exporters:
+                Exporters of spans and metrics. They are started here and closed by close.
+            buckets:
+                Upper bounds of buckets of histograms.
+        """
+
+        self.exporters = exporters or []
+        self.buckets = tuple(sorted(buckets))
+        self.lock = threading.Lock()
+        self.local = threading.local()
+        self.counters: dict[tuple[str, tuple[tuple[str, str], ...]], float] = {}
+        self.histograms: dict[tuple[str, tuple[tuple[str, str], ...]], Histogram] = {}
+
+        for exporter in self.exporters:
+            exporter.start(self)
+
+    def span(
+            self,
+            name: str,
+            parent: Span | None = None,
+            **attributes: any
+    ) -> RecordedSpan:
+        if not isinstance(parent, RecordedSpan):
+            active_spans = self.active_spans()
+            parent = active_spans[-1] if active_spans else None
+
+        return RecordedSpan(self, name, parent, attributes)
+
+    def count(
+            self,
+            name: str,
+            value: float = 1,
+            **labels: str
+    ) -> None:
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe(
+            self,
+            name: str,
+            value: float,
+            **labels: str
+    ) -> None:
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = Histogram(self.buckets)
+            histogram.observe(value)
+
+    def active_spans(self) -> list[RecordedSpan]:
+        """Get spans entered by with statement on this thread, the innermost last."""
+
+        active_spans = getattr(self.local, "spans", None)
+        if active_spans is None:
+            active_spans = self.local.spans = []
+
+        return active_spans
+
+    def enter_span(
+            self,
+            span: RecordedSpan
+    ) -> None:
+        """Make span the innermost span of this thread. This is called when with statement of span starts."""
+
+        self.active_spans().append(span)
+
+    def exit_span(
+            self,
+            span: RecordedSpan
+    ) -> None:
+        """Remove span from spans of this thread. This is called when with statement of span ends."""
+
+        active_spans = self.active_spans()
+        if active_spans and (active_spans[-1] is span):
+            active_spans.pop()
+
+    def end_span(
+            self,
+            span: RecordedSpan,
+            duration_sec: float,
+            error: BaseException | None
+    ) -> None:
+        """Record an ended span. This is called by RecordedSpan.end."""
+
+        self.observe("span_seconds", duration_sec, span=span.name)
+        if error is not None:
+            self.count("span_errors_total", span=span.name)
+
+        if not self.exporters:
+            return
+
+        record = {
+            "type": "span",
+            "name": span.name,
+            "trace_id": span.trace_id,
+            "span_id": span.span_id,
+            "parent_id": span.parent_id,
+            "start_time": span.start_time,
+            "duration_sec": duration_sec,
+            "thread": threading.current_thread().name,
+            "attributes": span.attributes
+        }
+        if error is not None:
+            record["error"] = f"{type(error).__name__}: {error}"
+
+        for exporter in self.exporters:
+            exporter.export(record)
+
+    def snapshot(self) -> dict[str, any]:
+        """Get copy of all counters and histograms.
+
+        Returns:
+            JSON serializable dictionary.
+            'counters' has name, labels and value of each counter, and
+            'histograms' has name, labels, cumulative counts of buckets, sum and count of each histogram.
+        """
+
+        with self.lock:
+            counters = [
+                {"name": name, "labels": dict(labels), "value": value}
+                for (name, labels), value in sorted(self.counters.items())
+            ]
+            histograms = []
+            for (name, labels), histogram in sorted(self.histograms.items(), key=lambda item: item[0]):
+                cumulative = 0
+                buckets = []
+                for bound, count in zip(histogram.buckets, histogram.counts):
+                    cumulative += count
+                    buckets.append([bound, cumulative])
+                histograms.append({
+                    "name": name,
+                    "labels": dict(labels),
+                    "buckets": buckets,
+                    "sum": histogram.sum,
+                    "count": histogram.count
+                })
+
+        return {"counters": counters, "histograms": histograms}
+
+    def close(self) -> None:
+        """Export the final snapshot of metrics and close the exporters."""
+
+        record = {"type": "metrics", "time": time.time(), **self.snapshot()}
+        for exporter in self.exporters:
+            exporter.export(record)
+            exporter.close()
@@ -0,0 +1,344 @@
+"""Generating PDF by a pool of running LibreOffice.
+
+This module provides class to convert documents to PDF by long-lived headless LibreOffice processes.
+Each process has its own user profile and receives documents over a UNO named pipe,
+so conversions do not pay LibreOffice startup and do not collide on a shared profile.
+
+This module requires the Python-UNO bridge of LibreOffice (for example `python3-uno` package on Debian/Ubuntu).
+
+Typical usage example:
+
+    pdf_generator = OfficePoolPdfGenerator(pool_size=4)
+    pdf_generator.generate("path/to/document.docx", "path/to/outdir")
+    pdf_generator.close()
+"""
+import atexit
+import os
+import pathlib
+import shutil
+import subprocess
+import tempfile
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from queue import Queue
+from threading import Thread
+
+from packages.domain.pdf_generator import PdfGenerator
+
+class OfficeInstance:
+    """Headless LibreOffice process which accepts UNO connections."""
+
+    # PDF export filters by document service.
+    EXPORT_FILTERS = [
+        ("com.sun.star.text.TextDocument", "writer_pdf_Export"),
+        ("com.sun.star.sheet.SpreadsheetDocument", "calc_pdf_Export"),
+        ("com.sun.star.presentation.PresentationDocument", "impress_pdf_Export"),
+        ("com.sun.star.drawing.DrawingDocument", "draw_pdf_Export")
+    ]
+
+    def __init__(
+            self,
+            startup_timeout_sec: float
+    ) -> None:
+        self.startup_timeout_sec = startup_timeout_sec
+        self.process: subprocess.Popen | None = None
+        self.profile_dir: str | None = None
+        self.pipe_name: str | None = None
+        self.desktop = None
+        self.converted = 0
+
+    def start(self) -> None:
+        """Start LibreOffice with its own profile and connect to it."""
+
+        uno = import_uno()
+
+        self.profile_dir = tempfile.mkdtemp(prefix="soffice_profile_")
+        self.pipe_name = "document_converter_" + uuid.uuid4().hex
+        self.process = subprocess.Popen(
+            [
+                "soffice", "--headless", "--invisible", "--nologo", "--norestore", "--nodefault", "--nolockcheck",
+                "-env:UserInstallation=" + pathlib.Path(self.profile_dir).as_uri(),
+                f"--accept=pipe,name={self.pipe_name};urp;StarOffice.ComponentContext"
+            ],
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL
+        )
+
+        local_context = uno.getComponentContext()
+        resolver = local_context.ServiceManager.createInstanceWithContext(
+            "com.sun.star.bridge.UnoUrlResolver", local_context
+        )
+
+        deadline = time.monotonic() + self.startup_timeout_sec
+        while True:
+            try:
+                context = resolver.resolve(f"uno:pipe,name={self.pipe_name};urp;StarOffice.ComponentContext")
+                break
+            except Exception:
+                if (self.process.poll() is not None) or (time.monotonic() > deadline):
+                    self.stop()
+                    raise RuntimeError("LibreOffice did not start.")
+                time.sleep(0.2)
+
+        self.desktop = context.ServiceManager.createInstanceWithContext("com.sun.star.frame.Desktop", context)
+        self.converted = 0
+
+    def stop(self) -> None:
+        """Stop LibreOffice and remove its profile."""
+
+        if self.desktop is not None:
+            try:
+                self.desktop.terminate()
+            except Exception:
+                pass
+            self.desktop = None
+
+        if self.process is not None:
+            try:
+                self.process.wait(timeout=5)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+                self.process.wait()
+            self.process = None
+
+        if self.profile_dir is not None:
+            shutil.rmtree(self.profile_dir, ignore_errors=True)
+            self.profile_dir = None
+
+    def kill(self) -> None:
+        """Kill hung LibreOffice and remove its profile."""
+
+        if self.process is not None:
+            self.process.kill()
+            self.process.wait()
+            self.process = None
+        self.desktop = None
+        self.stop()
+
+    def is_healthy(self) -> bool:
+        """Check wheather LibreOffice is running and responds over UNO.
+
+        Returns:
+            True if LibreOffice can convert documents, False otherwise.
+        """
+
+        if (self.process is None) or (self.process.poll() is not None) or (self.desktop is None):
+            return False
+
+        try:
+            self.desktop.getComponents()
+            return True
+        except Exception:
+            return False
+
+    def convert(
+            self,
+            document_path: str,
+            output_path: str
+    ) -> None:
+        """Convert document to PDF.
+
+        Args:
+            document_path:
+                Path to document to be converted.
+            output_path:
+                Path to write PDF.
+        """
+
+        uno = import_uno()
+
+        document = self.desktop.loadComponentFromURL(
+            uno.systemPathToFileUrl(os.path.abspath(document_path)),
+            "_blank",
+            0,
+            (property_value(uno, "Hidden", True),)
+        )
+        if document is None:
+            raise RuntimeError(f"LibreOffice could not open {document_path}.")
+
+        try:
+            filter_name = next(
+                (name for service, name in self.EXPORT_FILTERS if document.supportsService(service)),
+                "writer_pdf_Export"
+            )
+            document.storeToURL(
+                uno.systemPathToFileUrl(os.path.abspath(output_path)),
+                (property_value(uno, "FilterName", filter_name),)
+            )
+        finally:
+            document.close(True)
+
+        self.converted += 1
+
+class OfficePoolPdfGenerator(PdfGenerator):
+    """Generate PDF by a pool of running LibreOffice."""
+
+    def __init__(
+            self,
+            pool_size: int = 2,
+            document_timeout_sec: float = 300,
+            startup_timeout_sec: float = 60,
+            max_documents_per_instance: int = 200
+    ) -> None:
+        """
+        Args:
+            pool_size:
+                Number of LibreOffice processes. It is also the number of documents converted at the same time.
+            document_timeout_sec:
+                Timeout of converting one document when timeout_sec of generate is None.
+                LibreOffice is restarted when a conversion times out.
+            startup_timeout_sec:
+                Timeout of starting LibreOffice.
+            max_documents_per_instance:
+                LibreOffice is restarted after converting this number of documents to release leaked memory.
+        """
+
+        if pool_size < 1:
+            raise ValueError("pool_size must be 1 or more.")
+
+        self.document_timeout_sec = document_timeout_sec
+        self.max_documents_per_instance = max_documents_per_instance
+        self.instances = [OfficeInstance(startup_timeout_sec) for _ in range(pool_size)]
+        self.idle_instances: Queue[OfficeInstance] = Queue()
+        for instance in self.instances:
+            self.idle_instances.put(instance)
+
+        atexit.register(self.close)
+
+    def generate(self, document_path: str, outdir: str, timeout_sec: int = None) -> None:
+        """Convert document to PDF by one of the running LibreOffice.
+
+        The PDF is written to outdir with the same name as the document, like `soffice --convert-to pdf` does.
+
+        Args:
+            document_path:
+                Path to document to be converted.
+            outdir:
+                Directory to write PDF.
+            timeout_sec:
+                Timeout of the conversion. document_timeout_sec is used if None.
+
+        Raises:
+            subprocess.TimeoutExpired: The conversion did not finish in time.
+        """
+
+        timeout_sec = timeout_sec if timeout_sec is not None else self.document_timeout_sec
+        output_path = str(pathlib.Path(outdir) / (pathlib.Path(document_path).stem + ".pdf"))
+
+        instance = self.idle_instances.get()
+        try:
+            if (not instance.is_healthy()) or (instance.converted >= self.max_documents_per_instance):
+                instance.stop()
+                instance.start()
+
+            errors = []
+
+            def convert() -> None:
+                try:
+                    instance.convert(document_path, output_path)
+                except Exception as e:
+                    errors.append(e)
+
+            thread = Thread(target=convert, daemon=True)
+            thread.start()
+            thread.join(timeout_sec)
+
+            if thread.is_alive():
+                # LibreOffice hangs. Killing it also releases the thread blocked on UNO call.
+                instance.kill()
+                raise subprocess.TimeoutExpired(["soffice", document_path], timeout_sec)
+            if errors:
+                raise errors[0]
+        finally:
+            self.idle_instances.put(instance)
+
+    def generate_many(
+            self,
+            document_paths: list[str],
+            outdir: str,
+            chunk_size: int = 50,
+            parallelism: int = 1,
+            timeout_sec: int = None
+    ) -> dict[str, str]:
+        """Convert many documents to PDF by all of the running LibreOffice.
+
+        Documents are already sent to running LibreOffice one by one,
+        so chunk_size is ignored and parallelism is limited by pool_size.
+
+        Args:
+            document_paths:
+                Paths to documents to be converted.
+            outdir:
+                Directory to write PDF. Each PDF has the same name as its document,
+                so documents must have different names.
+            chunk_size:
+                Ignored.
+            parallelism:
+                Number of documents converted at the same time.
+            timeout_sec:
+                Timeout of converting one document. document_timeout_sec is used if None.
+
+        Returns:
+            Documents which could not be converted.
+            this dictionary has document path as key and the reason as value.
+        """
+
+        if parallelism < 1:
+            raise ValueError("parallelism must be 1 or more.")
+
+        def convert(document_path: str) -> str | None:
+            try:
+                self.generate(document_path, outdir, timeout_sec)
+            except Exception as e:
+                return str(e)
+            return None
+
+        with ThreadPoolExecutor(max_workers=min(parallelism, len(self.instances))) as executor:
+            reasons = executor.map(convert, document_paths)
+            return {path: reason for path, reason in zip(document_paths, reasons) if reason is not None}
+
+    def close(self) -> None:
+        """Stop all LibreOffice processes."""
+
+        for instance in self.instances:
+            instance.stop()
+
+def import_uno():
+    """Import the Python-UNO bridge of LibreOffice.
+
+    Returns:
+        uno module.
+    """
+
+    try:
+        import uno
+    except ImportError as e:
+        raise RuntimeError("Python-UNO bridge of LibreOffice is required for OfficePoolPdfGenerator.") from e
+
+    return uno
+
+def property_value(
+        uno,
+        name: str,
+        value: any
+):
+    """Create com.sun.star.beans.PropertyValue.
+
+    Args:
+        uno:
+            uno module.
+        name:
+            Name of the property.
+        value:
+            Value of the property.
+
+    Returns:
+        PropertyValue struct.
+    """
+
+    prop = uno.createUnoStruct("com.sun.star.beans.PropertyValue")
+    prop.Name = name
+    prop.Value = value
+
+    return prop
@@ -0,0 +1,151 @@
+"""Watching directory by listing it regularly.
+
+This module provides class to find files written to a directory by comparing
+size and modification time of the files at every poll.
+It works on any file system, including network file systems where change notifications do not arrive.
+
+A file is reported when its size and modification time have stayed the same for settle_sec,
+so a file being copied or uploaded is reported once, after it is complete.
+
+Typical usage example:
+
+    watcher = PollingDirectoryWatcher(poll_sec=1, settle_sec=2)
+    for paths in watcher.watch("./source", [".docx", ".pdf"], stop):
+        for path in paths:
+            convert(path)
+"""
+from threading import Event
+from typing import Iterator
+import pathlib
+import time
+
+from packages.domain.directory_watcher import DirectoryWatcher
+
+class PollingDirectoryWatcher(DirectoryWatcher):
+    """Watch directory by listing it every poll_sec."""
+
+    def __init__(
+            self,
+            poll_sec: float = 1,
+            settle_sec: float = 2
+    ) -> None:
+        """
+        Args:
+            poll_sec:
+                Interval of checks of the directory.
+            settle_sec:
+                Time a file must stay unchanged before it is reported.
+        """
+
+        if poll_sec <= 0:
+            raise ValueError("poll_sec must be more than 0.")
+        if settle_sec < 0:
+            raise ValueError("settle_sec must be 0 or more.")
+
+        self.poll_sec = poll_sec
+        self.settle_sec = settle_sec
+
+    def watch(
+            self,
+            directory: str,
+            suffixes: list[str],
+            stop: Event
+    ) -> Iterator[list[pathlib.Path]]:
+        """Watch directory for files which are added or modified after this method is called.
+
+        Files in the directory when this method is called are not reported unless they change later.
+
+        Args:
+            directory:
+                Directory to watch. Subdirectories are not watched.
+            suffixes:
+                Suffixes of files to watch, such as ".pdf".
+            stop:
+                Event to stop watching. The iterator ends soon after it is set.
+
+        Returns:
+            Iterator which yields files written and settled since the last check, every poll_sec at most.
+        """
+
+        root = pathlib.Path(directory)
+        # Changes are watched before the files are listed, so a file written in between is not missed.
+        changes = self.changes(root, suffixes, stop)
+        reported = {}
+        for path in self.list_files(root, suffixes):
+            state = self.__state(path)
+            if state is not None:
+                reported[path] = state
+
+        return self.__settled_files(changes, stop, reported)
+
+    def list_files(
+            self,
+            root: pathlib.Path,
+            suffixes: list[str]
+    ) -> set[pathlib.Path]:
+        """List files of the suffixes in root."""
+
+        return {path for suffix in suffixes for path in root.glob('*' + suffix)}
+
+    def changes(
+            self,
+            root: pathlib.Path,
+            suffixes: list[str],
+            stop: Event
+    ) -> Iterator[set[pathlib.Path]]:
+        """Iterate files which may have been written, once every poll_sec.
+
+        Subclasses which are notified of changes override this method to yield as soon as a change arrives.
+        The iterator must yield at least every poll_sec, so that files being written are checked until they settle.
+
+        Returns:
+            Iterator of files which may have been added or modified since the last item.
+        """
+
+        while not stop.is_set():
+            stop.wait(self.poll_sec)
+            yield self.list_files(root, suffixes)
+
+    def __settled_files(
+            self,
+            changes: Iterator[set[pathlib.Path]],
+            stop: Event,
+            reported: dict[pathlib.Path, tuple[int, int]]
+    ) -> Iterator[list[pathlib.Path]]:
+        # path -> state of the file and time when the file was found in the state
+        changing: dict[pathlib.Path, tuple[tuple[int, int], float]] = {}
+
+        for candidates in changes:
+            if stop.is_set():
+                break
+            now = time.monotonic()
+
+            for path in candidates | set(changing):
+                state = self.__state(path)
+                if state is None:
+                    # Deleted, or moved away before it settled.
+                    changing.pop(path, None)
+                    reported.pop(path, None)
+                elif state == reported.get(path):
+                    changing.pop(path, None)
+                elif (path not in changing) or (changing[path][0] != state):
+                    changing[path] = (state, now)
+
+            settled = sorted(path for path, (_, since) in changing.items() if now - since >= self.settle_sec)
+            for path in settled:
+                reported[path] = changing.pop(path)[0]
+
+            yield settled
+
+    def __state(
+            self,
+            path: pathlib.Path
+    ) -> tuple[int, int] | None:
+        """Get size and modification time of the file, or None if it does not exist."""
+
+        try:
+            stat = path.stat()
+        except FileNotFoundError:
+            return None
+
+        return stat.st_size, stat.st_mtime_ns
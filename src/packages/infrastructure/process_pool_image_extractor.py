@@ -0,0 +1,195 @@
+"""Rendering figure images in worker processes.
+
+This module provides class to render images of figures from PDF in a pool of processes,
+so that rendering of large batches uses all CPU cores instead of one core behind the GIL.
+
+Only lightweight handles are sent to the workers: path of the PDF, page numbers and bounding boxes.
+Each worker opens the PDF by itself and keeps it open for later tasks of the same PDF,
+and only the encoded images are sent back.
+
+Typical usage example:
+
+    image_extractor = ProcessPoolImageExtractor(max_workers=8)
+    with image_extractor.open("path/to/pdffile") as session:
+        png_images = session.render_all([(1, [0, 0, 100, 100]),
+                                         (3, [50, 50, 200, 200])])
+    image_extractor.close()
+"""
+from concurrent.futures import Future, ProcessPoolExecutor
+import math
+import multiprocessing
+import os
+from threading import Lock
+from typing import List, Tuple
+
+from packages.domain.image_extractor import ImageExtractionSession, ImageExtractor
+from packages.domain.render_policy import RenderPolicy
+
+# Session of the PDF opened last by this worker process, and the key of the PDF.
+_worker_session: ImageExtractionSession | None = None
+_worker_session_key: tuple | None = None
+
+def _render_regions(
+        pdf_path: str,
+        render_policy: RenderPolicy,
+        debug_dir: str | None,
+        regions: List[Tuple[int, List[float]]]
+) -> List[bytes | None]:
+    """Render regions of the PDF in a worker process.
+
+    The PDF is opened again only if the worker rendered another PDF last, or the PDF has changed.
+    """
+
+    global _worker_session, _worker_session_key
+
+    stat = os.stat(pdf_path)
+    key = (pdf_path, stat.st_mtime_ns, stat.st_size, vars(render_policy), debug_dir)
+    if (_worker_session is None) or (_worker_session_key != key):
+        if _worker_session is not None:
+            _worker_session.close()
+        _worker_session = ImageExtractionSession(pdf_path, render_policy, debug_dir)
+        _worker_session_key = key
+
+    return _worker_session.render_all(regions)
+
+class ProcessPoolImageExtractionSession(ImageExtractionSession):
+    """Extract images from one opened PDF, rendering many images in worker processes."""
+
+    def __init__(self, pdf_path: str,
+                 render_policy: RenderPolicy,
+                 debug_dir: str | None,
+                 extractor: 'ProcessPoolImageExtractor'
+                 ) -> None:
+        super().__init__(pdf_path, render_policy, debug_dir)
+        self.extractor = extractor
+
+    def render_all(self, regions: List[Tuple[int, List[float]]]
+                   ) -> List[bytes | None]:
+        """Render images of all regions of the PDF in worker processes.
+
+        Regions are split into tasks of consecutive pages, so each page is loaded by only one worker.
+        A few regions are rendered in this process, because a task costs more than rendering them.
+
+        Args:
+            regions:
+                Page numbers and bounding boxes of images to render.
+                The format of bounding box is same as render.
+
+        Returns:
+            image bytes in the same order as regions.
+            An item is None if the image could not be rendered.
+        """
+
+        tasks = self.__split(regions)
+        if (self.doc is None) or (len(tasks) < 2):
+            return super().render_all(regions)
+
+        futures = [
+            self.extractor.submit(self.pdf_path, self.render_policy, self.debug_dir, [regions[idx] for idx in task])
+            for task in tasks
+        ]
+
+        images: List[bytes | None] = [None] * len(regions)
+        for task, future in zip(tasks, futures):
+            for idx, image in zip(task, future.result()):
+                images[idx] = image
+
+        return images
+
+    def __split(self, regions: List[Tuple[int, List[float]]]
+                ) -> List[List[int]]:
+        """Split indexes of regions into tasks of consecutive pages.
+
+        Returns:
+            Indexes of regions of each task. Regions of a page are in the same task.
+        """
+
+        regions_by_page: dict[int, List[int]] = {}
+        for idx, (page_number, _) in enumerate(regions):
+            regions_by_page.setdefault(page_number, []).append(idx)
+
+        # Twice as many tasks as workers, so that a slow task does not keep the other workers idle.
+        task_size = max(
+            self.extractor.MIN_REGIONS_PER_TASK,
+            math.ceil(len(regions) / (self.extractor.max_workers * 2))
+        )
+
+        tasks: List[List[int]] = [[]]
+        for page_number in sorted(regions_by_page):
+            if len(tasks[-1]) >= task_size:
+                tasks.append([])
+            tasks[-1].extend(regions_by_page[page_number])
+
+        return [task for task in tasks if task]
+
+class ProcessPoolImageExtractor(ImageExtractor):
+    """Extract image from PDF, rendering many images in a pool of processes."""
+
+    # Minimum number of regions sent to a worker at once.
+    MIN_REGIONS_PER_TASK = 4
+
+    def __init__(self, max_workers: int,
+                 debug_dir: str | None = None,
+                 render_policy: RenderPolicy | None = None
+                 ) -> None:
+        """
+        Args:
+            max_workers:
+                Number of worker processes. They are started on the first batch of images.
+            debug_dir:
+                Directory to save a copy of every rendered image for debugging.
+                Rendered images are kept only in memory if None.
+            render_policy:
+                Resolution and format of rendered images. Default RenderPolicy if None.
+        """
+
+        if max_workers < 1:
+            raise ValueError("max_workers must be 1 or more.")
+
+        super().__init__(debug_dir=debug_dir, render_policy=render_policy)
+        self.max_workers = max_workers
+        self.lock = Lock()
+        self.executor: ProcessPoolExecutor | None = None
+
+    def open(self, pdf_path: str) -> ProcessPoolImageExtractionSession:
+        """Open PDF to extract many images from it.
+
+        Args:
+            pdf_path:
+                Path to PDF file.
+
+        Returns:
+            Session to extract images. Close it or use it in with statement when done.
+        """
+
+        return ProcessPoolImageExtractionSession(pdf_path, self.render_policy, self.debug_dir, self)
+
+    def submit(self, pdf_path: str,
+               render_policy: RenderPolicy,
+               debug_dir: str | None,
+               regions: List[Tuple[int, List[float]]]
+               ) -> Future:
+        """Render regions of the PDF in a worker process.
+
+        Returns:
+            Future of image bytes in the same order as regions.
+        """
+
+        with self.lock:
+            if self.executor is None:
+                # Workers are spawned, because forking a process with running threads is not safe for PyMuPDF.
+                self.executor = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=multiprocessing.get_context("spawn")
+                )
+            executor = self.executor
+
+        return executor.submit(_render_regions, pdf_path, render_policy, debug_dir, regions)
+
+    def close(self) -> None:
+        """Stop the worker processes."""
+
+        with self.lock:
+            if self.executor is not None:
+                self.executor.shutdown()
+                self.executor = None
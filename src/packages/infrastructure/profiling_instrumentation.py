@@ -0,0 +1,304 @@
+"""Profiling a batch conversion through the spans of its stages.
+
+This module provides MetricsInstrumentation which also profiles the run between start and stop:
+
+- 'sampling' mode samples stacks of all threads and writes profile.folded for flame graphs.
+- 'cprofile' mode runs cProfile in each stage span on its worker thread,
+  and writes cprofile_{stage}.prof for pstats, snakeviz or flameprof, and the top functions in cprofile.txt.
+
+In both modes tracemalloc traces allocations. When a stage span ends with clearly more memory traced than ever before in that stage,
+a snapshot is taken, and the largest allocation sites of the last snapshot are written to tracemalloc_{stage}.txt.
+Only the line of each allocation is traced, because tracing more frames makes the run several times slower.
+
+The time, CPU time and counters of the spans of each document are written to documents.csv, slowest document first.
+Counters recorded in a span of a document on the thread of the span, such as figures and tables
+counted by the markdown creator, are added to the document.
+
+Typical usage example:
+
+    profiler = ProfilingInstrumentation("sampling")
+    profiler.start()
+    service.extractDocument(source_dir, output_dir)
+    paths = profiler.stop("output/.profile")
+"""
+import cProfile
+import csv
+import io
+import os
+import pstats
+import threading
+import time
+import tracemalloc
+
+from packages.domain.profiler import Profiler
+from packages.infrastructure.metrics_instrumentation import MetricsExporter, MetricsInstrumentation, RecordedSpan
+from packages.infrastructure import sampling_profiler
+from packages.infrastructure.sampling_profiler import SamplingProfiler
+
+PROFILE_MODES = ("sampling", "cprofile")
+
+# Spans of stages of the pipeline, which are profiled separately.
+STAGE_NAMES = ("convert", "analyze", "render")
+
+# Counters attributed to documents in documents.csv.
+DOCUMENT_COUNTERS = ("figures_total", "figures_skipped_total", "tables_total")
+
+class DocumentCost:
+    """Time and counters of one attempt of a document."""
+
+    def __init__(
+            self,
+            document: str,
+            attempt: int
+    ) -> None:
+        self.document = document
+        self.attempt = attempt
+        self.result = "unfinished"
+        self.total_sec = 0.0
+        self.stage_sec: dict[str, float] = {}
+        self.cpu_sec = 0.0
+        self.pages: int | None = None
+        self.counts: dict[str, float] = {}
+
+class ProfilingInstrumentation(MetricsInstrumentation, Profiler):
+    """Record spans and metrics, and profile stages and documents between start and stop."""
+
+    TRACEMALLOC_FRAMES = 1
+    # A new snapshot of a stage is taken only when traced memory has grown by this ratio since the last one.
+    TRACEMALLOC_SNAPSHOT_GROWTH = 1.1
+    TRACEMALLOC_TOP_LINES = 30
+    CPROFILE_TOP_FUNCTIONS = 40
+
+    def __init__(
+            self,
+            mode: str = "sampling",
+            sample_interval_sec: float = 0.01,
+            exporters: list[MetricsExporter] | None = None
+    ) -> None:
+        """
+        Args:
+            mode:
+                'sampling' to sample stacks of all threads, or 'cprofile' to trace calls in the stages.
+            sample_interval_sec:
+                Time between samples in 'sampling' mode.
+            exporters:
+                Exporters of spans and metrics, same as MetricsInstrumentation.
+        """
+
+        if mode not in PROFILE_MODES:
+            raise ValueError(f"mode must be one of {', '.join(PROFILE_MODES)}.")
+
+        super().__init__(exporters)
+        self.mode = mode
+        self.sampler = SamplingProfiler(sample_interval_sec) if mode == "sampling" else None
+        self.profiling = False
+        self.profile_lock = threading.Lock()
+        self.stage_stats: dict[str, pstats.Stats] = {}
+        self.stage_max_traced: dict[str, int] = {}
+        self.stage_snapshots: dict[str, tracemalloc.Snapshot] = {}
+        self.documents: dict[str, DocumentCost] = {}
+        self.started_tracemalloc = False
+
+    def start(self) -> None:
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(self.TRACEMALLOC_FRAMES)
+            self.started_tracemalloc = True
+        if self.sampler is not None:
+            self.sampler.start()
+        self.profiling = True
+
+    def stop(
+            self,
+            output_dir: str
+    ) -> list[str]:
+        self.profiling = False
+        if self.sampler is not None:
+            self.sampler.stop()
+        if self.started_tracemalloc:
+            tracemalloc.stop()
+            self.started_tracemalloc = False
+
+        os.makedirs(output_dir, exist_ok=True)
+        paths = []
+        if self.sampler is not None:
+            paths.append(os.path.join(output_dir, "profile.folded"))
+            self.sampler.write(paths[-1])
+        paths.extend(self.__write_cprofile(output_dir))
+        paths.extend(self.__write_tracemalloc(output_dir))
+        paths.append(self.__write_documents(os.path.join(output_dir, "documents.csv")))
+
+        return paths
+
+    def span(
+            self,
+            name: str,
+            parent: RecordedSpan | None = None,
+            **attributes: any
+    ) -> RecordedSpan:
+        span = super().span(name, parent, **attributes)
+        if self.profiling and (name == "document"):
+            with self.profile_lock:
+                self.documents[span.trace_id] = DocumentCost(str(attributes.get("document")), attributes.get("attempt", 1))
+
+        return span
+
+    def count(
+            self,
+            name: str,
+            value: float = 1,
+            **labels: str
+    ) -> None:
+        super().count(name, value, **labels)
+        if (not self.profiling) or (name not in DOCUMENT_COUNTERS):
+            return
+
+        active_spans = self.active_spans()
+        if not active_spans:
+            return
+        with self.profile_lock:
+            cost = self.documents.get(active_spans[-1].trace_id)
+            if cost is not None:
+                cost.counts[name] = cost.counts.get(name, 0) + value
+
+    def enter_span(
+            self,
+            span: RecordedSpan
+    ) -> None:
+        super().enter_span(span)
+        if (not self.profiling) or (span.name not in STAGE_NAMES):
+            return
+
+        # A profile of cProfile covers only the thread which enables it, so each stage span has its own.
+        span.profile = None
+        if self.mode == "cprofile":
+            span.profile = cProfile.Profile()
+            span.profile.enable()
+        span.thread_time_started = time.thread_time()
+
+    def exit_span(
+            self,
+            span: RecordedSpan
+    ) -> None:
+        super().exit_span(span)
+        if not hasattr(span, "thread_time_started"):
+            return
+
+        cpu_sec = time.thread_time() - span.thread_time_started
+        if span.profile is not None:
+            span.profile.disable()
+            stats = pstats.Stats(span.profile)
+            with self.profile_lock:
+                if span.name in self.stage_stats:
+                    self.stage_stats[span.name].add(stats)
+                else:
+                    self.stage_stats[span.name] = stats
+
+        snapshot = None
+        if tracemalloc.is_tracing():
+            traced, _ = tracemalloc.get_traced_memory()
+            if traced > self.stage_max_traced.get(span.name, 0) * self.TRACEMALLOC_SNAPSHOT_GROWTH:
+                self.stage_max_traced[span.name] = traced
+                snapshot = tracemalloc.take_snapshot()
+
+        with self.profile_lock:
+            if snapshot is not None:
+                self.stage_snapshots[span.name] = snapshot
+            cost = self.documents.get(span.trace_id)
+            if cost is not None:
+                cost.cpu_sec += cpu_sec
+
+    def end_span(
+            self,
+            span: RecordedSpan,
+            duration_sec: float,
+            error: BaseException | None
+    ) -> None:
+        super().end_span(span, duration_sec, error)
+        with self.profile_lock:
+            cost = self.documents.get(span.trace_id)
+            if cost is None:
+                return
+            if span.name == "document":
+                cost.total_sec = duration_sec
+                cost.result = "failed" if error is not None else "converted"
+                cost.pages = span.attributes.get("pages")
+            elif span.name in STAGE_NAMES:
+                cost.stage_sec[span.name] = cost.stage_sec.get(span.name, 0) + duration_sec
+
+    def __write_cprofile(
+            self,
+            output_dir: str
+    ) -> list[str]:
+        if not self.stage_stats:
+            return []
+
+        paths = []
+        summary = io.StringIO()
+        for stage_name in STAGE_NAMES:
+            stats = self.stage_stats.get(stage_name)
+            if stats is None:
+                continue
+            paths.append(os.path.join(output_dir, f"cprofile_{stage_name}.prof"))
+            stats.dump_stats(paths[-1])
+            summary.write(f"## {stage_name}\n")
+            stats.stream = summary
+            stats.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(self.CPROFILE_TOP_FUNCTIONS)
+
+        paths.append(os.path.join(output_dir, "cprofile.txt"))
+        with open(paths[-1], "w", encoding="utf-8") as file:
+            file.write(summary.getvalue())
+
+        return paths
+
+    def __write_tracemalloc(
+            self,
+            output_dir: str
+    ) -> list[str]:
+        paths = []
+        ignored = [
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            # Stacks counted by the profiler itself.
+            tracemalloc.Filter(False, sampling_profiler.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap*>"),
+            tracemalloc.Filter(False, "<unknown>")
+        ]
+        for stage_name in STAGE_NAMES:
+            snapshot = self.stage_snapshots.get(stage_name)
+            if snapshot is None:
+                continue
+            snapshot = snapshot.filter_traces(ignored)
+            statistics = snapshot.statistics("lineno")
+            paths.append(os.path.join(output_dir, f"tracemalloc_{stage_name}.txt"))
+            with open(paths[-1], "w", encoding="utf-8") as file:
+                file.write(
+                    f"# Largest allocation sites when {stage_name} stage had the most memory traced: "
+                    f"{self.stage_max_traced[stage_name] / 1024 / 1024:.1f} MB\n"
+                )
+                for statistic in statistics[:self.TRACEMALLOC_TOP_LINES]:
+                    file.write(f"{statistic}\n")
+
+        return paths
+
+    def __write_documents(
+            self,
+            path: str
+    ) -> str:
+        with self.profile_lock:
+            costs = sorted(self.documents.values(), key=lambda cost: cost.total_sec, reverse=True)
+
+        with open(path, "w", encoding="utf-8", newline="") as file:
+            writer = csv.writer(file)
+            writer.writerow(
+                ["document", "attempt", "result", "total_sec"]
+                + [f"{stage_name}_sec" for stage_name in STAGE_NAMES]
+                + ["cpu_sec", "pages"] + [name.removesuffix("_total") for name in DOCUMENT_COUNTERS]
+            )
+            for cost in costs:
+                writer.writerow(
+                    [cost.document, cost.attempt, cost.result, f"{cost.total_sec:.3f}"]
+                    + [f"{cost.stage_sec.get(stage_name, 0):.3f}" for stage_name in STAGE_NAMES]
+                    + [f"{cost.cpu_sec:.3f}", cost.pages if cost.pages is not None else ""]
+                    + [int(cost.counts.get(name, 0)) for name in DOCUMENT_COUNTERS]
+                )
+
+        return path
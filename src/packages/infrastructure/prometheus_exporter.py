@@ -0,0 +1,127 @@
+"""Exporting metrics to Prometheus.
+
+This module provides exporter which serves counters and histograms of MetricsInstrumentation
+in the Prometheus text format at /metrics, so a running batch or a watching converter can be scraped.
+Spans are not served, but their durations are in the histogram 'span_seconds'.
+
+Typical usage example:
+
+    instrumentation = MetricsInstrumentation([PrometheusExporter(port=9464)])
+    # curl http://localhost:9464/metrics
+"""
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from threading import Thread
+
+from packages.infrastructure.metrics_instrumentation import MetricsExporter, MetricsInstrumentation
+
+def escape_label_value(
+        value: str
+) -> str:
+    return str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+def format_labels(
+        labels: dict[str, str],
+        extra: tuple[str, str] | None = None
+) -> str:
+    items = list(labels.items()) + ([extra] if extra is not None else [])
+    if not items:
+        return ""
+
+    return "{" + ",".join(f"{name}=\"{escape_label_value(value)}\"" for name, value in items) + "}"
+
+def prometheus_text(
+        snapshot: dict[str, any],
+        namespace: str = "document_converter"
+) -> str:
+    """Format snapshot of MetricsInstrumentation in the Prometheus text format.
+
+    Args:
+        snapshot:
+            Result of MetricsInstrumentation.snapshot.
+        namespace:
+            Prefix of the names of the metrics.
+
+    Returns:
+        Text of version 0.0.4 of the format.
+    """
+
+    lines = []
+    typed = set()
+    for counter in snapshot["counters"]:
+        name = f"{namespace}_{counter['name']}"
+        if name not in typed:
+            typed.add(name)
+            lines.append(f"# TYPE {name} counter")
+        lines.append(f"{name}{format_labels(counter['labels'])} {counter['value']}")
+
+    for histogram in snapshot["histograms"]:
+        name = f"{namespace}_{histogram['name']}"
+        if name not in typed:
+            typed.add(name)
+            lines.append(f"# TYPE {name} histogram")
+        for bound, count in histogram["buckets"]:
+            lines.append(f"{name}_bucket{format_labels(histogram['labels'], ('le', repr(float(bound))))} {count}")
+        lines.append(f"{name}_bucket{format_labels(histogram['labels'], ('le', '+Inf'))} {histogram['count']}")
+        lines.append(f"{name}_sum{format_labels(histogram['labels'])} {histogram['sum']}")
+        lines.append(f"{name}_count{format_labels(histogram['labels'])} {histogram['count']}")
+
+    return "\n".join(lines) + "\n"
+
+class MetricsRequestHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+
+        exporter: PrometheusExporter = self.server.exporter
+        data = prometheus_text(exporter.instrumentation.snapshot(), exporter.namespace).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+class PrometheusExporter(MetricsExporter):
+    """Serve metrics at /metrics for Prometheus to scrape."""
+
+    def __init__(
+            self,
+            port: int,
+            host: str = "127.0.0.1",
+            namespace: str = "document_converter"
+    ) -> None:
+        """
+        Args:
+            port:
+                Port to listen on. A free port is chosen if 0.
+            host:
+                Address to listen on. Use "0.0.0.0" to be scraped from other hosts.
+            namespace:
+                Prefix of the names of the metrics.
+        """
+
+        self.port = port
+        self.host = host
+        self.namespace = namespace
+        self.instrumentation: MetricsInstrumentation | None = None
+        self.http_server: ThreadingHTTPServer | None = None
+
+    def start(
+            self,
+            instrumentation: MetricsInstrumentation
+    ) -> None:
+        self.instrumentation = instrumentation
+        self.http_server = ThreadingHTTPServer((self.host, self.port), MetricsRequestHandler)
+        self.http_server.daemon_threads = True
+        self.http_server.exporter = self
+        self.port = self.http_server.server_address[1]
+        Thread(target=self.http_server.serve_forever, name="prometheus-exporter", daemon=True).start()
+
+    def close(self) -> None:
+        if self.http_server is not None:
+            self.http_server.shutdown()
+            self.http_server.server_close()
+            self.http_server = None
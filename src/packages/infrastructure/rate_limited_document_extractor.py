@@ -0,0 +1,97 @@
+"""Extracting documents within the rate limit of the service.
+
+This module provides class to send documents to the extractor within the rate of a shared limiter,
+and to retry documents throttled by the service.
+Only the request submitting the document is limited and retried.
+Waiting for the result is left to the extractor, so a failed poll never submits the document again.
+
+Typical usage example:
+
+    extractor = RateLimitedDocumentExtractor(
+        AzureDocumentExtractor(),
+        AdaptiveRateLimiter(max_rate_per_sec=1, burst=2),
+        RetryPolicy(max_retries=5)
+    )
+    with open("path/to/pdffile", "rb") as file:
+        result = extractor.extract(file)
+"""
+from concurrent.futures import Future
+import io
+from typing import IO
+
+from packages.domain.document_extractor import DocumentExtractor
+from packages.domain.instrumentation import Instrumentation, NullInstrumentation
+from packages.infrastructure.rate_limiter import AdaptiveRateLimiter, RetryPolicy, call_with_retry
+
+class RateLimitedDocumentExtractor(DocumentExtractor):
+    """Extract document within the rate of a limiter."""
+
+    def __init__(
+            self,
+            extractor: DocumentExtractor,
+            limiter: AdaptiveRateLimiter,
+            retry_policy: RetryPolicy,
+            instrumentation: Instrumentation | None = None,
+            service: str = "document_intelligence"
+    ) -> None:
+        """
+        Args:
+            extractor:
+                Extractor which sends requests to the service.
+            limiter:
+                Limiter shared by all workers extracting documents.
+            retry_policy:
+                Policy of retries of throttled documents.
+            instrumentation:
+                Instrumentation to count retries. Retries are not counted if None.
+            service:
+                Name of the service, used as the label of the counter of retries.
+        """
+
+        self.extractor = extractor
+        self.limiter = limiter
+        self.retry_policy = retry_policy
+        self.instrumentation = instrumentation if instrumentation is not None else NullInstrumentation()
+        self.service = service
+
+    def extract(
+            self,
+            document: IO
+    ) -> dict[str, any]:
+        """Extract document, waiting for the limiter and retrying on throttling.
+
+        Args:
+            document:
+                Document to be extracted.
+
+        Returns:
+            JSON response of extracted document.
+        """
+
+        return self.begin_extract(document).result()
+
+    def begin_extract(
+            self,
+            document: IO
+    ) -> Future:
+        """Submit document, waiting for the limiter and retrying on throttling.
+
+        Args:
+            document:
+                Document to be extracted.
+
+        Returns:
+            Future of JSON response of extracted document.
+        """
+
+        data = document.read()
+
+        return call_with_retry(
+            lambda: self.extractor.begin_extract(io.BytesIO(data)), self.limiter, self.retry_policy, on_retry=self.__count_retry
+        )
+
+    def __count_retry(
+            self,
+            status_code: int | None
+    ) -> None:
+        self.instrumentation.count("retries_total", service=self.service, status=str(status_code))
@@ -0,0 +1,111 @@
+"""Summarizing images within the rate limit of the service.
+
+This module provides class to send images to the summarizer within the rate of a shared limiter,
+and to retry images throttled by the service.
+
+Typical usage example:
+
+    summarizer = RateLimitedImageSummarizer(
+        AzureOaiImgSummarizer(),
+        AdaptiveRateLimiter(max_rate_per_sec=10, burst=10),
+        RetryPolicy(max_retries=5)
+    )
+    summary = summarizer.summarize(png_bytes)
+"""
+from typing import List
+
+from packages.domain.image_summarizer import ImageSummarizer, load_image
+from packages.domain.instrumentation import Instrumentation, NullInstrumentation
+from packages.infrastructure.rate_limiter import AdaptiveRateLimiter, RetryPolicy, call_many_with_retry, call_with_retry
+
+class RateLimitedImageSummarizer(ImageSummarizer):
+    """Summarize image within the rate of a limiter."""
+
+    def __init__(
+            self,
+            summarizer: ImageSummarizer,
+            limiter: AdaptiveRateLimiter,
+            retry_policy: RetryPolicy,
+            instrumentation: Instrumentation | None = None,
+            service: str = "openai"
+    ) -> None:
+        """
+        Args:
+            summarizer:
+                Summarizer which sends requests to the service.
+            limiter:
+                Limiter shared by all workers summarizing images.
+            retry_policy:
+                Policy of retries of throttled images.
+            instrumentation:
+                Instrumentation to count retries. Retries are not counted if None.
+            service:
+                Name of the service, used as the label of the counter of retries.
+        """
+
+        self.summarizer = summarizer
+        self.limiter = limiter
+        self.retry_policy = retry_policy
+        self.instrumentation = instrumentation if instrumentation is not None else NullInstrumentation()
+        self.service = service
+
+    def summarize(
+            self,
+            img: bytes | str
+    ) -> str:
+        """Summarize image, waiting for the limiter and retrying on throttling.
+
+        Args:
+            img:
+                Image bytes, or path to image file.
+
+        Returns:
+            Summary of the image as str.
+        """
+
+        img = load_image(img)
+
+        return call_with_retry(lambda: self.summarizer.summarize(img), self.limiter, self.retry_policy, on_retry=self.__count_retry)
+
+    def summarize_many(
+            self,
+            imgs: List[bytes | str],
+            return_exceptions: bool = False
+    ) -> List[str | Exception]:
+        """Summarize images concurrently, waiting for the limiter and retrying on throttling.
+
+        If the summarizer has its own summarize_many, such as one waiting for all images on an event loop,
+        the images are passed to it together, and the throttled ones are retried together.
+        Otherwise each image is summarized by summarize in a thread.
+
+        Args:
+            imgs:
+                Image bytes, or paths to image files.
+            return_exceptions:
+                If True, the error of an image which failed is returned in place of its summary.
+
+        Returns:
+            Summaries of the images in the same order as imgs.
+        """
+
+        if type(self.summarizer).summarize_many is ImageSummarizer.summarize_many:
+            return super().summarize_many(imgs, return_exceptions)
+
+        imgs = [load_image(img) for img in imgs]
+        summaries = call_many_with_retry(
+            lambda indexes: self.summarizer.summarize_many([imgs[idx] for idx in indexes], return_exceptions=True),
+            len(imgs), self.limiter, self.retry_policy, on_retry=self.__count_retry
+        )
+
+        if not return_exceptions:
+            for summary in summaries:
+                if isinstance(summary, Exception):
+                    raise summary
+
+        return summaries
+
+    def __count_retry(
+            self,
+            status_code: int | None
+    ) -> None:
+        self.instrumentation.count("retries_total", service=self.service, status=str(status_code))
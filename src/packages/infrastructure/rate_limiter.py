@@ -0,0 +1,335 @@
+"""Limiting request rate to cloud services.
+
+This module provides a token bucket shared by all workers of the process,
+and a retry policy for requests throttled by the service.
+
+The rate of the bucket adapts to the service. It is halved when the service throttles requests,
+and it is raised step by step while requests succeed, up to the configured maximum.
+
+Typical usage example:
+
+    limiter = AdaptiveRateLimiter(max_rate_per_sec=5, burst=5)
+    retry_policy = RetryPolicy(max_retries=5)
+    result = call_with_retry(lambda: client.analyze(document), limiter, retry_policy)
+"""
+from email.utils import parsedate_to_datetime
+import random
+import time
+from threading import Condition
+from typing import Any, Callable, List
+
+from packages.domain.service_error import RETRYABLE_STATUS_CODES, status_code_of
+
+# Status codes of responses which mean the service throttles requests.
+THROTTLED_STATUS_CODES = {429, 503}
+
+class AdaptiveRateLimiter:
+    """Token bucket whose rate adapts to throttling of the service."""
+
+    def __init__(
+            self,
+            max_rate_per_sec: float,
+            burst: int = 1,
+            min_rate_per_sec: float | None = None,
+            increase_per_success: float | None = None,
+            decrease_factor: float = 0.5,
+            decrease_interval_sec: float = 1.0,
+            clock: Callable[[], float] = time.monotonic
+    ) -> None:
+        """
+        Args:
+            max_rate_per_sec:
+                Upper limit of requests per second. The bucket starts at this rate.
+            burst:
+                Number of requests which can be sent at once after the bucket has been idle.
+            min_rate_per_sec:
+                Lower limit of requests per second. One twentieth of max_rate_per_sec if None.
+            increase_per_success:
+                Requests per second added to the rate for each successful request.
+                One fiftieth of max_rate_per_sec if None.
+            decrease_factor:
+                The rate is multiplied by this factor when the service throttles requests.
+            decrease_interval_sec:
+                Throttled responses within this seconds after a decrease decrease the rate only once,
+                because requests in flight are throttled together.
+            clock:
+                Function to get the current time in seconds, which never goes back.
+                Waiting threads check it again after the time in which a token is refilled at the current rate.
+        """
+
+        if max_rate_per_sec <= 0:
+            raise ValueError("max_rate_per_sec must be more than 0.")
+        if burst < 1:
+            raise ValueError("burst must be 1 or more.")
+        if not 0 < decrease_factor < 1:
+            raise ValueError("decrease_factor must be more than 0 and less than 1.")
+
+        self.max_rate_per_sec = max_rate_per_sec
+        self.min_rate_per_sec = min_rate_per_sec if min_rate_per_sec is not None else max_rate_per_sec / 20
+        self.increase_per_success = increase_per_success if increase_per_success is not None else max_rate_per_sec / 50
+        self.decrease_factor = decrease_factor
+        self.decrease_interval_sec = decrease_interval_sec
+        self.burst = burst
+        self.clock = clock
+
+        self.rate_per_sec = max_rate_per_sec
+        self.tokens = float(burst)
+        self.updated_at = self.clock()
+        self.paused_until = 0.0
+        self.decreased_at = float("-inf")
+        self.condition = Condition()
+
+    def acquire(self) -> None:
+        """Wait until a request can be sent, and take a token for it."""
+
+        with self.condition:
+            while True:
+                now = self.__refill()
+                if now < self.paused_until:
+                    self.condition.wait(self.paused_until - now)
+                    continue
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                self.condition.wait((1 - self.tokens) / self.rate_per_sec)
+
+    def on_success(self) -> None:
+        """Raise the rate because the service accepted a request."""
+
+        with self.condition:
+            self.__refill()
+            self.rate_per_sec = min(self.max_rate_per_sec, self.rate_per_sec + self.increase_per_success)
+
+    def on_throttled(
+            self,
+            retry_after_sec: float | None = None
+    ) -> None:
+        """Lower the rate because the service throttled a request.
+
+        Args:
+            retry_after_sec:
+                Seconds the service asked to wait. No request is sent by any worker until then.
+        """
+
+        with self.condition:
+            now = self.__refill()
+            if now - self.decreased_at >= self.decrease_interval_sec:
+                self.rate_per_sec = max(self.min_rate_per_sec, self.rate_per_sec * self.decrease_factor)
+                self.decreased_at = now
+                self.tokens = min(self.tokens, 0.0)
+            if retry_after_sec is not None:
+                self.paused_until = max(self.paused_until, now + retry_after_sec)
+            self.condition.notify_all()
+
+    def __refill(self) -> float:
+        """Add tokens for the time since last refill. Must be called with the condition held.
+
+        Returns:
+            Current time of the clock.
+        """
+
+        now = self.clock()
+        self.tokens = min(float(self.burst), self.tokens + (now - self.updated_at) * self.rate_per_sec)
+        self.updated_at = now
+
+        return now
+
+class RetryPolicy:
+    """Decide whether and when failed requests are retried."""
+
+    def __init__(
+            self,
+            max_retries: int = 5,
+            base_delay_sec: float = 1.0,
+            max_delay_sec: float = 60.0
+    ) -> None:
+        """
+        Args:
+            max_retries:
+                Maximum number of retries of a request.
+            base_delay_sec:
+                Delay before the first retry when the service does not send Retry-After.
+                The delay doubles for each retry.
+            max_delay_sec:
+                Upper limit of the delay.
+        """
+
+        if max_retries < 0:
+            raise ValueError("max_retries must be 0 or more.")
+
+        self.max_retries = max_retries
+        self.base_delay_sec = base_delay_sec
+        self.max_delay_sec = max_delay_sec
+
+    def delay(
+            self,
+            attempt: int,
+            retry_after_sec: float | None = None
+    ) -> float:
+        """Get seconds to wait before the retry.
+
+        Args:
+            attempt:
+                Number of attempts which have failed so far, starting from 1.
+            retry_after_sec:
+                Seconds the service asked to wait, if any.
+
+        Returns:
+            Retry-After with a small jitter if it is given,
+            otherwise a random delay up to the exponential backoff (full jitter).
+        """
+
+        if retry_after_sec is not None:
+            return min(self.max_delay_sec, retry_after_sec) + random.uniform(0, self.base_delay_sec / 4)
+
+        return random.uniform(0, min(self.max_delay_sec, self.base_delay_sec * 2 ** (attempt - 1)))
+
+def retry_after_of(
+        error: Exception
+) -> float | None:
+    """Get seconds to wait from Retry-After headers of the response of the error.
+
+    retry-after-ms and x-ms-retry-after-ms sent by Azure services are preferred to Retry-After.
+
+    Returns:
+        Seconds to wait, or None if the response has no valid header.
+    """
+
+    headers = getattr(getattr(error, "response", None), "headers", None)
+    if not headers:
+        return None
+
+    for name in ["retry-after-ms", "x-ms-retry-after-ms"]:
+        value = headers.get(name)
+        if value is not None:
+            try:
+                return max(0.0, float(value) / 1000)
+            except ValueError:
+                pass
+
+    value = headers.get("retry-after")
+    if value is None:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+def call_with_retry(
+        request: Callable[[], Any],
+        limiter: AdaptiveRateLimiter,
+        retry_policy: RetryPolicy,
+        sleep: Callable[[float], None] = time.sleep,
+        on_retry: Callable[[int | None], None] | None = None
+) -> Any:
+    """Send request within the rate of the limiter, and retry it while it fails with a retryable status.
+
+    Args:
+        request:
+            Function to send the request. It is called for each attempt.
+        limiter:
+            Limiter shared by all requests to the service.
+        retry_policy:
+            Policy of retries.
+        sleep:
+            Function to wait between attempts.
+        on_retry:
+            Function called with the status code before each retry, such as to count retries.
+
+    Returns:
+        Result of request.
+    """
+
+    attempt = 0
+    while True:
+        limiter.acquire()
+        try:
+            result = request()
+        except Exception as e:
+            attempt += 1
+            status_code = status_code_of(e)
+            if (status_code not in RETRYABLE_STATUS_CODES) or (attempt > retry_policy.max_retries):
+                raise
+
+            retry_after_sec = retry_after_of(e)
+            if status_code in THROTTLED_STATUS_CODES:
+                limiter.on_throttled(retry_after_sec)
+            if on_retry is not None:
+                on_retry(status_code)
+            sleep(retry_policy.delay(attempt, retry_after_sec))
+            continue
+
+        limiter.on_success()
+        return result
+
+def call_many_with_retry(
+        request: Callable[[List[int]], List[Any]],
+        count: int,
+        limiter: AdaptiveRateLimiter,
+        retry_policy: RetryPolicy,
+        sleep: Callable[[float], None] = time.sleep,
+        on_retry: Callable[[int | None], None] | None = None
+) -> List[Any]:
+    """Send requests together within the rate of the limiter, and retry together the ones failed with a retryable status.
+
+    A token of the limiter is taken for each request before the requests of an attempt are sent.
+
+    Args:
+        request:
+            Function to send the requests of the given indexes at the same time.
+            It returns the result of each request, or its error in place of the result, in the same order.
+        count:
+            Number of requests.
+        limiter:
+            Limiter shared by all requests to the service.
+        retry_policy:
+            Policy of retries.
+        sleep:
+            Function to wait between attempts.
+        on_retry:
+            Function called with the status code before the retry of each request, such as to count retries.
+
+    Returns:
+        Result of each request, or the error of its last attempt in place of the result.
+    """
+
+    results: List[Any] = [None] * count
+    pending = list(range(count))
+    attempt = 0
+    while pending:
+        for _ in pending:
+            limiter.acquire()
+        attempt += 1
+
+        retried = []
+        throttled = False
+        retry_after_sec = None
+        for idx, result in zip(pending, request(pending)):
+            results[idx] = result
+            if not isinstance(result, Exception):
+                limiter.on_success()
+                continue
+
+            status_code = status_code_of(result)
+            if (status_code not in RETRYABLE_STATUS_CODES) or (attempt > retry_policy.max_retries):
+                continue
+
+            retried.append(idx)
+            throttled = throttled or (status_code in THROTTLED_STATUS_CODES)
+            retry_after = retry_after_of(result)
+            if retry_after is not None:
+                retry_after_sec = max(retry_after_sec or 0.0, retry_after)
+            if on_retry is not None:
+                on_retry(status_code)
+
+        if retried:
+            if throttled:
+                limiter.on_throttled(retry_after_sec)
+            sleep(retry_policy.delay(attempt, retry_after_sec))
+        pending = retried
+
+    return results
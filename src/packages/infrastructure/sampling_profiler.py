@@ -0,0 +1,106 @@
+"""Sampling stacks of all threads.
+
+This module provides profiler which takes the stack of every thread at a fixed interval
+and counts identical stacks, in the folded format read by flamegraph.pl, inferno and speedscope.
+
+The root frame of each stack is the name of the thread without its numbers, such as 'render' for 'render-0',
+so the flame graph is split by stage of the pipeline. Threads waiting for locks, queues or responses are sampled too,
+so the graph shows where wall-clock time goes, not only CPU time.
+
+Typical usage example:
+
+    profiler = SamplingProfiler(interval_sec=0.01)
+    profiler.start()
+    convert_documents()
+    profiler.stop()
+    profiler.write("output/.profile/profile.folded")
+    # flamegraph.pl output/.profile/profile.folded > flamegraph.svg
+"""
+from collections import Counter
+import os
+import re
+import sys
+import threading
+from types import FrameType
+
+# Numbers and ids in names of threads, such as '-0' of 'render-0', '-0_3' of 'ThreadPoolExecutor-0_3'
+# or the operation id of 'LROPoller(...)' of Azure SDK.
+THREAD_NUMBER = re.compile(r"[-_]\d+|\([0-9a-f]{8}-[0-9a-f-]+\)")
+
+class SamplingProfiler:
+    """Count stacks of all threads sampled at a fixed interval."""
+
+    def __init__(
+            self,
+            interval_sec: float = 0.01,
+            max_depth: int = 128
+    ) -> None:
+        """
+        Args:
+            interval_sec:
+                Time between samples. Shorter intervals are more precise and slow down the threads more.
+            max_depth:
+                Frames deeper than this from the root of a stack are dropped.
+        """
+
+        if interval_sec <= 0:
+            raise ValueError("interval_sec must be more than 0.")
+
+        self.interval_sec = interval_sec
+        self.max_depth = max_depth
+        self.stacks: Counter[str] = Counter()
+        self.samples = 0
+        self.stopped = threading.Event()
+        self.thread: threading.Thread | None = None
+
+    def start(self) -> None:
+        self.stopped.clear()
+        self.thread = threading.Thread(target=self.__sample_loop, name="sampling-profiler", daemon=True)
+        self.thread.start()
+
+    def stop(self) -> None:
+        self.stopped.set()
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+
+    def folded(self) -> list[str]:
+        """Get counted stacks in the folded format, most frequent first.
+
+        Returns:
+            Lines of frames from the root separated by ';' and the number of samples.
+        """
+
+        return [f"{stack} {count}" for stack, count in self.stacks.most_common()]
+
+    def write(
+            self,
+            path: str
+    ) -> None:
+        with open(path, "w", encoding="utf-8") as file:
+            for line in self.folded():
+                file.write(line + "\n")
+
+    def __sample_loop(self) -> None:
+        own_ident = threading.get_ident()
+        while not self.stopped.wait(self.interval_sec):
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == own_ident:
+                    continue
+                thread_name = THREAD_NUMBER.sub("", names.get(ident, "unknown")) or "unknown"
+                self.stacks[thread_name + ";" + self.__fold(frame)] += 1
+            self.samples += 1
+
+    def __fold(
+            self,
+            frame: FrameType
+    ) -> str:
+        labels = []
+        while frame is not None:
+            code = frame.f_code
+            labels.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+            frame = frame.f_back
+        labels.reverse()
+
+        return ";".join(labels[:self.max_depth])
@@ -0,0 +1,270 @@
+"""Extracting large PDFs in page-range shards.
+
+This module provides class to split a large PDF into shards of pages,
+extract the shards concurrently, and merge their results back into one result.
+
+The merged result looks like a result of the whole PDF.
+Page numbers, spans and references such as "/paragraphs/3" are renumbered,
+and sections of the shards are kept in the order of pages.
+
+Typical usage example:
+
+    extractor = ShardingDocumentExtractor(AzureDocumentExtractor(), pages_per_shard=100, max_workers=4)
+    with open("path/to/pdffile", "rb") as file:
+        result = extractor.extract(file)
+"""
+from concurrent.futures import Future, ThreadPoolExecutor
+import io
+import re
+from threading import Thread
+from typing import IO, List
+
+from packages.domain.document_extractor import DocumentExtractor
+
+ELEMENT_REFERENCE = re.compile(r"^/(paragraphs|tables|figures|sections)/(\d+)$")
+FIGURE_ID = re.compile(r"^(\d+)\.(\d+)$")
+
+# Separator between contents of shards.
+CONTENT_SEPARATOR = "\n"
+
+def utf16_length(
+        text: str
+) -> int:
+    """Get length of text in UTF-16 code units, the unit of offsets of spans."""
+
+    return len(text.encode("utf-16-le")) // 2
+
+def merge_analyze_results(
+        results: List[dict[str, any]],
+        page_counts: List[int]
+) -> dict[str, any]:
+    """Merge results of shards of a document into one result.
+
+    Args:
+        results:
+            Results of shards in the order of pages.
+        page_counts:
+            Number of pages of each shard.
+
+    Returns:
+        Result as if the whole document was extracted at once.
+        Lists such as paragraphs and sections are concatenated in the order of shards,
+        and other values are taken from the first shard.
+    """
+
+    merged: dict[str, any] = {}
+    contents = []
+    page_offset = 0
+    content_offset = 0
+
+    for result, page_count in zip(results, page_counts):
+        # Offsets of the collections of this shard in the merged result.
+        element_offsets = {
+            name: len(merged.get(name, [])) for name in ["paragraphs", "tables", "figures", "sections"]
+        }
+
+        for key, value in result.items():
+            if key == "content":
+                continue
+            if isinstance(value, list):
+                merged.setdefault(key, []).extend(
+                    _shift(item, key, page_offset, content_offset, element_offsets) for item in value
+                )
+            else:
+                merged.setdefault(key, value)
+
+        content = result.get("content", "")
+        contents.append(content)
+        content_offset += utf16_length(content) + utf16_length(CONTENT_SEPARATOR)
+        page_offset += page_count
+
+    merged["content"] = CONTENT_SEPARATOR.join(contents)
+
+    return merged
+
+def _shift(
+        value: any,
+        key: str,
+        page_offset: int,
+        content_offset: int,
+        element_offsets: dict[str, int]
+) -> any:
+    """Copy value of a shard with page numbers, spans and references moved to the merged result.
+
+    Args:
+        value:
+            Value in the result of the shard.
+        key:
+            Key of the value, or key of the list which has the value.
+        page_offset:
+            Number of pages before the shard.
+        content_offset:
+            Length of content before the shard in UTF-16 code units.
+        element_offsets:
+            Number of items of each collection before the shard.
+    """
+
+    if isinstance(value, dict):
+        shifted = {}
+        for child_key, child in value.items():
+            if child_key == "pageNumber":
+                shifted[child_key] = child + page_offset
+            elif (child_key == "offset") and (key in ("span", "spans")):
+                shifted[child_key] = child + content_offset
+            elif (child_key == "id") and (key == "figures") and isinstance(child, str):
+                shifted[child_key] = _shift_figure_id(child, page_offset)
+            else:
+                shifted[child_key] = _shift(child, child_key, page_offset, content_offset, element_offsets)
+        return shifted
+
+    if isinstance(value, list):
+        return [_shift(item, key, page_offset, content_offset, element_offsets) for item in value]
+
+    if (key == "elements") and isinstance(value, str):
+        match = ELEMENT_REFERENCE.match(value)
+        if match is not None:
+            return f"/{match[1]}/{int(match[2]) + element_offsets[match[1]]}"
+
+    return value
+
+def _shift_figure_id(
+        figure_id: str,
+        page_offset: int
+) -> str:
+    """Move page number of figure id such as "1.1" (page 1, figure 1 of the page)."""
+
+    match = FIGURE_ID.match(figure_id)
+    if match is None:
+        return figure_id
+
+    return f"{int(match[1]) + page_offset}.{match[2]}"
+
+class ShardingDocumentExtractor(DocumentExtractor):
+    """Extract large PDF in shards of pages."""
+
+    def __init__(
+            self,
+            extractor: DocumentExtractor,
+            pages_per_shard: int = 100,
+            max_workers: int = 4
+    ) -> None:
+        """
+        Args:
+            extractor:
+                Extractor called for each shard.
+            pages_per_shard:
+                Maximum number of pages of a shard.
+                PDFs of this number of pages or less are extracted without splitting.
+            max_workers:
+                Maximum number of shards of a PDF extracted at the same time.
+        """
+
+        if pages_per_shard < 1:
+            raise ValueError("pages_per_shard must be 1 or more.")
+        if max_workers < 1:
+            raise ValueError("max_workers must be 1 or more.")
+
+        self.extractor = extractor
+        self.pages_per_shard = pages_per_shard
+        self.max_workers = max_workers
+
+    def extract(
+            self,
+            document: IO
+    ) -> dict[str, any]:
+        """Extract document, splitting it into shards if it is a PDF with many pages.
+
+        Args:
+            document:
+                Document to be extracted.
+
+        Returns:
+            JSON response of extracted document. Results of shards are merged into one.
+        """
+
+        data = document.read()
+        shards = self.__split(data)
+        if shards is None:
+            return self.extractor.extract(io.BytesIO(data))
+
+        return self.__extract_shards(shards)
+
+    def begin_extract(
+            self,
+            document: IO
+    ) -> Future:
+        """Submit document, and get a future of the result.
+
+        A document which is not split is submitted by the extractor.
+        Shards of a split document are extracted by a thread of the document, up to max_workers shards at once.
+
+        Args:
+            document:
+                Document to be extracted.
+
+        Returns:
+            Future of JSON response of extracted document.
+        """
+
+        data = document.read()
+        shards = self.__split(data)
+        if shards is None:
+            return self.extractor.begin_extract(io.BytesIO(data))
+
+        future = Future()
+        Thread(target=self.__complete, args=(future, shards), name="analyze-shards", daemon=True).start()
+        return future
+
+    def __complete(
+            self,
+            future: Future,
+            shards: List[tuple[bytes, int]]
+    ) -> None:
+        try:
+            future.set_result(self.__extract_shards(shards))
+        except Exception as e:
+            future.set_exception(e)
+
+    def __extract_shards(
+            self,
+            shards: List[tuple[bytes, int]]
+    ) -> dict[str, any]:
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(shards))) as executor:
+            results = list(executor.map(lambda shard: self.extractor.extract(io.BytesIO(shard[0])), shards))
+
+        return merge_analyze_results(results, [page_count for _, page_count in shards])
+
+    def __split(
+            self,
+            data: bytes
+    ) -> List[tuple[bytes, int]] | None:
+        """Split PDF into shards of pages.
+
+        Args:
+            data:
+                Bytes of the document.
+
+        Returns:
+            PDF bytes and number of pages of each shard,
+            or None if the document is not a PDF or it has pages_per_shard pages or less.
+        """
+
+        import fitz
+
+        try:
+            source = fitz.open(stream=data, filetype="pdf")
+        except (fitz.FileDataError, RuntimeError):
+            return None
+
+        with source:
+            if source.page_count <= self.pages_per_shard:
+                return None
+
+            shards = []
+            for from_page in range(0, source.page_count, self.pages_per_shard):
+                to_page = min(from_page + self.pages_per_shard, source.page_count) - 1
+                with fitz.open() as shard:
+                    shard.insert_pdf(source, from_page=from_page, to_page=to_page)
+                    shards.append((shard.tobytes(garbage=3, deflate=True), to_page - from_page + 1))
+
+        return shards
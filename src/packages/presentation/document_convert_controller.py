@@ -1,25 +1,82 @@
 import pathlib
+from threading import Event
 
 from injector import inject
 
 from packages.application.document_convert_service import DocumentConvertService
+from packages.domain.profiler import NullProfiler, Profiler
 
 class DocumentConvertController:
     @inject
-    def __init__(self, convert_service: DocumentConvertService) -> None:
+    def __init__(self, convert_service: DocumentConvertService, profiler: Profiler = None) -> None:
         if not isinstance(convert_service, DocumentConvertService):
             raise Exception("convert_service is not DocumentConvertService.")
 
         self.convert_service = convert_service
+        self.profiler = profiler if profiler is not None else NullProfiler()
 
-    def batch_convert_local_files(self, source_dir: str, output_dir: str) -> int:
+    def batch_convert_local_files(
+            self,
+            source_dir: str,
+            output_dir: str,
+            convert_workers: int = 1,
+            analyze_workers: int = 1,
+            render_workers: int = 1,
+            convert_batch_size: int = 1,
+            analyze_in_flight: int = 0,
+            config_fingerprint: str = "",
+            force: bool = False,
+            max_attempts: int = 3,
+            retry_delay_sec: float = 5,
+            retry_quarantined: bool = False,
+            node_id: str | None = None,
+            lease_sec: float = 60,
+            watch: bool = False,
+            stop: Event | None = None,
+            profile_dir: str | None = None
+    ) -> int:
         if not pathlib.Path(source_dir).exists():
             raise RuntimeError(f"{source_dir} is not exists.")
 
         if not pathlib.Path(output_dir).exists():
             pathlib.Path(output_dir).mkdir()
 
-        if not [file for file in pathlib.Path(source_dir).iterdir() if file.is_file()]:
+        if (not watch) and (not [file for file in pathlib.Path(source_dir).iterdir() if file.is_file()]):
             raise RuntimeError(f"{source_dir} has no files.")
 
-        self.convert_service.extractDocument(source_dir, output_dir)
+        if (profile_dir is not None) and (not self.profiler.enabled):
+            raise RuntimeError("profiling is not enabled. Set profile_mode of DIContainer.")
+
+        if profile_dir is not None:
+            self.profiler.start()
+        try:
+            report = self.convert_service.extractDocument(
+                source_dir,
+                output_dir,
+                convert_workers=convert_workers,
+                analyze_workers=analyze_workers,
+                render_workers=render_workers,
+                convert_batch_size=convert_batch_size,
+                analyze_in_flight=analyze_in_flight,
+                config_fingerprint=config_fingerprint,
+                force=force,
+                max_attempts=max_attempts,
+                retry_delay_sec=retry_delay_sec,
+                retry_quarantined=retry_quarantined,
+                node_id=node_id,
+                lease_sec=lease_sec,
+                watch=watch,
+                stop=stop
+            )
+        finally:
+            if profile_dir is not None:
+                print(f"Profile: {', '.join(self.profiler.stop(profile_dir))}")
+
+        print(
+            f"Converted: {len(report.converted)} (Resumed: {len(report.resumed)}), Skipped: {len(report.skipped)}, "
+            f"Removed: {len(report.removed)}, Failed: {len(report.failed)}, Quarantined: {len(report.quarantined)}, "
+            f"Dropped: {len(report.dropped)}, "
+            f"Skipped figures: {sum(report.skipped_figures.values())}"
+        )
+
+        return len(report.converted)
@@ -0,0 +1,112 @@
+"""Local server standing in for Azure Document Intelligence.
+
+This module provides fake of the analyze operation of Azure Document Intelligence.
+Like the service, analyze returns 202 with Operation-Location,
+and the operation is polled until the result is ready after processing_sec.
+Polls are throttled separately from analyze by poll_profile, and counted as "poll_throttled".
+The result is the fixture of the tests unless another result is given.
+
+Typical usage example:
+
+    with FakeDocumentIntelligenceServer(ServiceProfile(latency_sec=0.05), processing_sec=2) as server:
+        client = DocumentIntelligenceClient(endpoint=server.url, credential=AzureKeyCredential("fake"))
+        result = client.begin_analyze_document("prebuilt-layout", analyze_request=document,
+                                               content_type="application/octet-stream").result()
+"""
+import json
+import pathlib
+import re
+import threading
+import time
+import uuid
+
+from tests.fakes.fake_server import FakeRequestHandler, FakeServer, ServiceProfile
+
+FIXTURE_PATH = pathlib.Path(__file__).parent.parent / "fixtures" / "sample_document_intelligence_result.json"
+
+ANALYZE_PATH = re.compile(r"^/documentintelligence/documentModels/([^/:?]+):analyze(\?.*)?$")
+RESULT_PATH = re.compile(r"^/documentintelligence/documentModels/([^/:?]+)/analyzeResults/([^/?]+)(\?.*)?$")
+
+class FakeDocumentIntelligenceHandler(FakeRequestHandler):
+    def do_POST(self):
+        server: FakeDocumentIntelligenceServer = self.server.fake_server
+        match = ANALYZE_PATH.match(self.path)
+        if match is None:
+            self.read_body()
+            self.send_json(404, {"error": {"code": "NotFound", "message": self.path}})
+            return
+
+        self.read_body()
+        server.count("analyze")
+        if self.throttle():
+            return
+
+        result_id = server.start_operation()
+        self.send_json(202, {}, {
+            "Operation-Location": f"{server.url}/documentintelligence/documentModels/{match[1]}/analyzeResults/{result_id}?api-version=fake",
+            "retry-after-ms": str(server.poll_after_ms)
+        })
+
+    def do_GET(self):
+        server: FakeDocumentIntelligenceServer = self.server.fake_server
+        match = RESULT_PATH.match(self.path)
+        ready_at = server.operations.get(match[2]) if match is not None else None
+        if ready_at is None:
+            self.send_json(404, {"error": {"code": "NotFound", "message": self.path}})
+            return
+
+        server.count("poll")
+        if (server.poll_profile is not None) and self.throttle(server.poll_profile, "poll_throttled"):
+            return
+        if time.monotonic() < ready_at:
+            self.send_json(200, {"status": "running"}, {"retry-after-ms": str(server.poll_after_ms)})
+            return
+
+        self.send_json(200, {
+            "status": "succeeded",
+            "createdDateTime": "2024-01-01T00:00:00Z",
+            "lastUpdatedDateTime": "2024-01-01T00:00:00Z",
+            "analyzeResult": server.result
+        })
+
+class FakeDocumentIntelligenceServer(FakeServer):
+    """Fake Azure Document Intelligence."""
+
+    def __init__(
+            self,
+            profile: ServiceProfile | None = None,
+            processing_sec: float = 0,
+            poll_after_ms: int = 50,
+            result: dict[str, any] | None = None,
+            poll_profile: ServiceProfile | None = None
+    ) -> None:
+        """
+        Args:
+            profile:
+                Latency and throttling of requests.
+            processing_sec:
+                Time from analyze until the result is ready.
+            poll_after_ms:
+                retry-after-ms sent to clients polling the operation.
+            result:
+                analyzeResult of every document. The fixture of the tests if None.
+            poll_profile:
+                Latency and throttling of polls of operations. Polls are answered at once if None.
+        """
+
+        super().__init__(FakeDocumentIntelligenceHandler, profile)
+        self.processing_sec = processing_sec
+        self.poll_after_ms = poll_after_ms
+        self.result = result if result is not None else json.loads(FIXTURE_PATH.read_text(encoding="utf-8"))
+        self.poll_profile = poll_profile
+        self.operations: dict[str, float] = {}
+        self.operations_lock = threading.Lock()
+
+    def start_operation(self) -> str:
+        """Start analyze operation and get its id."""
+
+        result_id = uuid.uuid4().hex
+        with self.operations_lock:
+            self.operations[result_id] = time.monotonic() + self.processing_sec
+
+        return result_id
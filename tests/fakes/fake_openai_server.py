@@ -0,0 +1,62 @@
+"""Local server standing in for Azure Open AI.
+
+This module provides fake of the chat completions endpoint of Azure Open AI deployments,
+which answers every request with the same summary.
+
+Typical usage example:
+
+    with FakeOpenAIServer(ServiceProfile(latency_sec=1, jitter_sec=0.5, throttle_rate=0.1)) as server:
+        llm = AzureChatOpenAI(azure_endpoint=server.url, azure_deployment="gpt-4o",
+                              openai_api_version="2024-06-01", api_key="fake")
+"""
+import re
+import time
+
+from tests.fakes.fake_server import FakeRequestHandler, FakeServer, ServiceProfile
+
+CHAT_COMPLETIONS_PATH = re.compile(r"^/openai/deployments/([^/?]+)/chat/completions(\?.*)?$")
+
+class FakeOpenAIHandler(FakeRequestHandler):
+    def do_POST(self):
+        server: FakeOpenAIServer = self.server.fake_server
+        self.read_body()
+        match = CHAT_COMPLETIONS_PATH.match(self.path)
+        if match is None:
+            self.send_json(404, {"error": {"code": "404", "message": self.path}})
+            return
+
+        server.count("chat_completions")
+        if self.throttle():
+            return
+
+        self.send_json(200, {
+            "id": "chatcmpl-fake",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": match[1],
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": server.summary},
+                "finish_reason": "stop"
+            }],
+            "usage": {"prompt_tokens": 1000, "completion_tokens": 100, "total_tokens": 1100}
+        })
+
+class FakeOpenAIServer(FakeServer):
+    """Fake Azure Open AI."""
+
+    def __init__(
+            self,
+            profile: ServiceProfile | None = None,
+            summary: str = "fake summary of the image"
+    ) -> None:
+        """
+        Args:
+            profile:
+                Latency and throttling of requests.
+            summary:
+                Answer to every request.
+        """
+
+        super().__init__(FakeOpenAIHandler, profile)
+        self.summary = summary
@@ -0,0 +1,155 @@
+"""Local HTTP server standing in for a cloud service.
+
+This module provides base class of fake servers with configurable latency, jitter and throttling,
+so that clients of the services can be tested and measured without network and cost.
+
+Typical usage example:
+
+    with FakeServer(ServiceProfile(latency_sec=0.2, jitter_sec=0.1, throttle_rate=0.05)) as server:
+        requests.get(server.url + "/")
+"""
+import json
+import math
+import random
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+class ServiceProfile:
+    """Latency and throttling of a fake service."""
+
+    def __init__(
+            self,
+            latency_sec: float = 0,
+            jitter_sec: float = 0,
+            throttle_rate: float = 0,
+            retry_after_ms: int = 100,
+            seed: int | None = None
+    ) -> None:
+        """
+        Args:
+            latency_sec:
+                Time to wait before responding to a request.
+            jitter_sec:
+                Upper limit of random time added to latency_sec.
+            throttle_rate:
+                Ratio of requests answered with 429, from 0 to 1.
+            retry_after_ms:
+                retry-after-ms sent with 429.
+            seed:
+                Seed of the random numbers, to repeat the same latencies and throttling.
+        """
+
+        if not 0 <= throttle_rate <= 1:
+            raise ValueError("throttle_rate must be from 0 to 1.")
+
+        self.latency_sec = latency_sec
+        self.jitter_sec = jitter_sec
+        self.throttle_rate = throttle_rate
+        self.retry_after_ms = retry_after_ms
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+
+    def delay_sec(self) -> float:
+        """Get time to wait before the next response."""
+
+        with self.lock:
+            return self.latency_sec + self.random.uniform(0, self.jitter_sec)
+
+    def is_throttled(self) -> bool:
+        """Decide whether the next request is answered with 429."""
+
+        with self.lock:
+            return self.random.random() < self.throttle_rate
+
+class FakeRequestHandler(BaseHTTPRequestHandler):
+    """Base handler of fake servers, which throttles requests and sends JSON."""
+
+    protocol_version = "HTTP/1.1"
+
+    def read_body(self) -> bytes:
+        return self.rfile.read(int(self.headers.get("Content-Length") or 0))
+
+    def throttle(self, profile: ServiceProfile | None = None, counter: str = "throttled") -> bool:
+        """Answer 429 and return True if the request is throttled, or wait for latency of the service.
+
+        Args:
+            profile:
+                Latency and throttling of this request. The profile of the server if None.
+            counter:
+                Name of the count of throttled requests.
+        """
+
+        server: FakeServer = self.server.fake_server
+        profile = profile if profile is not None else server.profile
+        if profile.is_throttled():
+            server.count(counter)
+            # Like Azure, both headers are sent. Azure SDKs use Retry-After, which is rounded up to seconds.
+            self.send_json(429, {"error": {"code": "429", "message": "Rate limit is exceeded."}}, {
+                "retry-after-ms": str(profile.retry_after_ms),
+                "Retry-After": str(math.ceil(profile.retry_after_ms / 1000))
+            })
+            return True
+
+        time.sleep(profile.delay_sec())
+        return False
+
+    def send_json(self, status: int, body: dict[str, any], headers: dict[str, str] | None = None) -> None:
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+class QuietHTTPServer(ThreadingHTTPServer):
+    """HTTP server which ignores connections closed by clients."""
+
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super().handle_error(request, client_address)
+
+class FakeServer:
+    """Fake service on a random local port, serving requests in threads."""
+
+    def __init__(
+            self,
+            handler_class: type[FakeRequestHandler],
+            profile: ServiceProfile | None = None
+    ) -> None:
+        self.profile = profile if profile is not None else ServiceProfile()
+        self.counts: dict[str, int] = {}
+        self.lock = threading.Lock()
+        self.http_server = QuietHTTPServer(("127.0.0.1", 0), handler_class)
+        self.http_server.fake_server = self
+        self.url = f"http://127.0.0.1:{self.http_server.server_address[1]}"
+        self.thread: threading.Thread | None = None
+
+    def __enter__(self) -> 'FakeServer':
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.stop()
+
+    def start(self) -> None:
+        self.thread = threading.Thread(target=self.http_server.serve_forever, daemon=True)
+        self.thread.start()
+
+    def stop(self) -> None:
+        self.http_server.shutdown()
+        self.http_server.server_close()
+
+    def count(self, name: str) -> None:
+        """Count an event of the server, such as a request or a throttled request."""
+
+        with self.lock:
+            self.counts[name] = self.counts.get(name, 0) + 1
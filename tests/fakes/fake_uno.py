@@ -0,0 +1,159 @@
+"""Python-UNO bridge and soffice standing in for LibreOffice.
+
+This module provides a fake `uno` module and a fake soffice executable,
+so that a pool of LibreOffice processes can be tested without LibreOffice.
+
+The fake soffice is a real process. It writes its pid to a file named after its UNO pipe and sleeps until it is terminated.
+The fake desktop connected over the pipe converts documents by their names:
+
+- "hang.*" blocks until the process is killed, as LibreOffice hung in a UNO call does.
+- "unreadable.*" can not be opened.
+- other documents are written as small PDF files.
+
+Typical usage example:
+
+    with FakeUno() as fake_uno:
+        pdf_generator = OfficePoolPdfGenerator(pool_size=1)
+        pdf_generator.generate("doc.docx", "outdir")
+        fake_uno.desktops[0].healthy = False
+"""
+import os
+import pathlib
+import signal
+import sys
+import tempfile
+import time
+import types
+import urllib.parse
+from unittest import mock
+
+FAKE_SOFFICE = '''#!/usr/bin/env python3
+import os
+import pathlib
+import sys
+import time
+
+accept = next(arg for arg in sys.argv if arg.startswith("--accept="))
+pipe_name = accept.split("name=")[1].split(";")[0]
+(pathlib.Path(os.environ["FAKE_SOFFICE_DIR"]) / pipe_name).write_text(str(os.getpid()))
+time.sleep(3600)
+'''
+
+def is_alive(pid: int) -> bool:
+    """Check whether the process is running and has not been reaped."""
+
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+
+    return True
+
+class FakeDocument:
+    """Document loaded by the fake desktop."""
+
+    def __init__(self) -> None:
+        self.closed = False
+
+    def supportsService(self, service: str) -> bool:
+        return service == "com.sun.star.text.TextDocument"
+
+    def storeToURL(self, url: str, properties: tuple) -> None:
+        pathlib.Path(file_url_to_path(url)).write_bytes(b"%PDF-1.4")
+
+    def close(self, deliver_ownership: bool) -> None:
+        self.closed = True
+
+class FakeDesktop:
+    """com.sun.star.frame.Desktop of one fake soffice process."""
+
+    def __init__(self, pid: int) -> None:
+        self.pid = pid
+        self.healthy = True
+        self.loaded: list[str] = []
+
+    def getComponents(self) -> list:
+        if not self.healthy:
+            raise RuntimeError("disposed")
+        return []
+
+    def loadComponentFromURL(self, url: str, target: str, flags: int, properties: tuple) -> FakeDocument | None:
+        path = pathlib.Path(file_url_to_path(url))
+        self.loaded.append(path.name)
+        if path.stem == "hang":
+            while is_alive(self.pid):
+                time.sleep(0.05)
+            raise RuntimeError("disposed")
+        if path.stem == "unreadable":
+            return None
+        return FakeDocument()
+
+    def terminate(self) -> None:
+        if is_alive(self.pid):
+            os.kill(self.pid, signal.SIGTERM)
+
+class FakeUno:
+    """Fake `uno` module and soffice on PATH while the context is entered."""
+
+    def __init__(self) -> None:
+        # desktops connected so far, in the order of their connections
+        self.desktops: list[FakeDesktop] = []
+
+    def __enter__(self) -> 'FakeUno':
+        self.tempdir = tempfile.TemporaryDirectory()
+        self.pipe_dir = pathlib.Path(self.tempdir.name) / "pipes"
+        self.pipe_dir.mkdir()
+        bindir = pathlib.Path(self.tempdir.name) / "bin"
+        bindir.mkdir()
+        soffice = bindir / "soffice"
+        soffice.write_text(FAKE_SOFFICE)
+        soffice.chmod(0o755)
+
+        self.patches = [
+            mock.patch.dict(os.environ, {"PATH": str(bindir) + os.pathsep + os.environ["PATH"], "FAKE_SOFFICE_DIR": str(self.pipe_dir)}),
+            mock.patch.dict(sys.modules, {"uno": self.__module()})
+        ]
+        for patch in self.patches:
+            patch.start()
+
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        for patch in reversed(self.patches):
+            patch.stop()
+        for desktop in self.desktops:
+            if is_alive(desktop.pid):
+                os.kill(desktop.pid, signal.SIGKILL)
+        self.tempdir.cleanup()
+
+    def started(self) -> int:
+        """Get number of fake soffice processes started so far."""
+
+        return len(list(self.pipe_dir.iterdir()))
+
+    def __module(self) -> types.ModuleType:
+        fake = self
+
+        class Resolver:
+            def resolve(self, url: str) -> types.SimpleNamespace:
+                pid_path = fake.pipe_dir / url.split("name=")[1].split(";")[0]
+                if not pid_path.exists():
+                    raise RuntimeError("connection refused")
+                desktop = FakeDesktop(int(pid_path.read_text()))
+                fake.desktops.append(desktop)
+                return context_of(desktop)
+
+        def context_of(instance) -> types.SimpleNamespace:
+            return types.SimpleNamespace(ServiceManager=types.SimpleNamespace(
+                createInstanceWithContext=lambda name, context: instance
+            ))
+
+        module = types.ModuleType("uno")
+        module.getComponentContext = lambda: context_of(Resolver())
+        module.systemPathToFileUrl = lambda path: pathlib.Path(path).as_uri()
+        module.createUnoStruct = lambda name: types.SimpleNamespace(Name=None, Value=None)
+
+        return module
+
+def file_url_to_path(url: str) -> str:
+    return urllib.parse.unquote(urllib.parse.urlparse(url).path)
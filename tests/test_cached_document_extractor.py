@@ -0,0 +1,131 @@
+import io
+import os
+import sys
+import tempfile
+import unittest
+
+from unittest.mock import MagicMock
+
+sys.path.append(
+    os.path.abspath(
+        os.path.join(
+            os.path.dirname(__file__),
+            '../src'
+        )
+    )
+)
+import src.packages.domain.document_extractor as document_extractor
+import src.packages.infrastructure.cached_document_extractor as cached_document_extractor
+import src.packages.infrastructure.disk_lru_cache as disk_lru_cache
+
+class TestCachedDocumentExtractor(unittest.TestCase):
+    def setUp(self):
+        self.tempdir = tempfile.TemporaryDirectory()
+        self.extractor = MagicMock(spec=document_extractor.DocumentExtractor)
+        self.extractor.extract.side_effect = lambda document: {"content": document.read().decode()}
+        self.cache = disk_lru_cache.DiskLruCache(self.tempdir.name, max_bytes=1024 * 1024)
+
+    def tearDown(self):
+        self.tempdir.cleanup()
+
+    def test_extract_twice(self):
+        # Given
+        cached_extractor = cached_document_extractor.CachedDocumentExtractor(
+            self.extractor, self.cache, "prebuilt-layout", "markdown"
+        )
+
+        # When
+        first = cached_extractor.extract(io.BytesIO(b"same pdf"))
+        second = cached_extractor.extract(io.BytesIO(b"same pdf"))
+
+        # Then
+        self.assertEqual({"content": "same pdf"}, first)
+        self.assertEqual(first, second)
+        self.assertEqual(1, self.extractor.extract.call_count)
+
+    def test_extract_after_restart(self):
+        # Given
+        cached_document_extractor.CachedDocumentExtractor(
+            self.extractor, self.cache, "prebuilt-layout", "markdown"
+        ).extract(io.BytesIO(b"same pdf"))
+        restarted_cache = disk_lru_cache.DiskLruCache(self.tempdir.name, max_bytes=1024 * 1024)
+        cached_extractor = cached_document_extractor.CachedDocumentExtractor(
+            self.extractor, restarted_cache, "prebuilt-layout", "markdown"
+        )
+
+        # When
+        result = cached_extractor.extract(io.BytesIO(b"same pdf"))
+
+        # Then
+        self.assertEqual({"content": "same pdf"}, result)
+        self.assertEqual(1, self.extractor.extract.call_count)
+
+    def test_extract_with_other_model(self):
+        # Given
+        layout_extractor = cached_document_extractor.CachedDocumentExtractor(
+            self.extractor, self.cache, "prebuilt-layout", "markdown"
+        )
+        read_extractor = cached_document_extractor.CachedDocumentExtractor(
+            self.extractor, self.cache, "prebuilt-read", "markdown"
+        )
+
+        # When
+        layout_extractor.extract(io.BytesIO(b"same pdf"))
+        read_extractor.extract(io.BytesIO(b"same pdf"))
+
+        # Then
+        self.assertEqual(2, self.extractor.extract.call_count)
+
+class TestDiskLruCache(unittest.TestCase):
+    def setUp(self):
+        self.tempdir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tempdir.cleanup()
+
+    def test_put_over_limit(self):
+        # Given
+        value = os.urandom(400)
+        cache = disk_lru_cache.DiskLruCache(self.tempdir.name, max_bytes=1000)
+        cache.put("aa01", value)
+        cache.put("aa02", value)
+        cache.get("aa01")
+
+        # When
+        cache.put("aa03", value)
+
+        # Then
+        self.assertEqual(value, cache.get("aa01"))
+        self.assertIsNone(cache.get("aa02"))
+        self.assertEqual(value, cache.get("aa03"))
+        self.assertEqual(["aa01", "aa03"], cache.keys())
+
+    def test_get_broken_value(self):
+        # Given
+        cache = disk_lru_cache.DiskLruCache(self.tempdir.name, max_bytes=1000)
+        cache.put("aa01", b"value")
+        cache.put("aa02", b"value")
+        cache.put("aa03", b"value")
+        path = lambda key: os.path.join(self.tempdir.name, "aa", key + disk_lru_cache.DiskLruCache.SUFFIX)
+        with open(path("aa01"), "r+b") as file:
+            file.truncate(10)
+        with open(path("aa02"), "wb") as file:
+            file.write(b"not gzip")
+        with open(path("aa03"), "r+b") as file:
+            data = bytearray(file.read())
+            data[12:16] = b"\xff\xff\xff\xff"
+            file.seek(0)
+            file.write(data)
+
+        # When
+        values = [cache.get(key) for key in ["aa01", "aa02", "aa03"]]
+
+        # Then
+        self.assertEqual([None, None, None], values)
+        self.assertEqual([], cache.keys())
+        self.assertFalse(any(os.path.exists(path(key)) for key in ["aa01", "aa02", "aa03"]))
+        cache.put("aa01", b"new value")
+        self.assertEqual(b"new value", cache.get("aa01"))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,178 @@
+import os
+import sys
+import tempfile
+import threading
+import time
+import unittest
+
+from unittest.mock import MagicMock
+import fitz
+
+sys.path.append(
+    os.path.abspath(
+        os.path.join(
+            os.path.dirname(__file__),
+            '../src'
+        )
+    )
+)
+import src.packages.domain.image_summarizer as image_summarizer
+import src.packages.infrastructure.cached_image_summarizer as cached_image_summarizer
+import src.packages.infrastructure.disk_lru_cache as disk_lru_cache
+
+def render_png(path, dpi, shapes):
+    with fitz.open() as doc:
+        page = doc.new_page(width=200, height=100)
+        for rect, color in shapes:
+            page.draw_rect(fitz.Rect(rect), color=color, fill=color)
+        page.get_pixmap(dpi=dpi).save(path)
+    return path
+
+class TestCachedImageSummarizer(unittest.TestCase):
+    def setUp(self):
+        self.tempdir = tempfile.TemporaryDirectory()
+        self.summarizer = MagicMock(spec=image_summarizer.ImageSummarizer)
+        self.summarizer.summarize.return_value = "company logo"
+        self.cache = disk_lru_cache.DiskLruCache(self.tempdir.name + "/cache", max_bytes=1024 * 1024)
+        self.logo = [((10, 10, 90, 90), (1, 0, 0)), ((110, 20, 190, 60), (0, 0, 1))]
+
+    def tearDown(self):
+        self.tempdir.cleanup()
+
+    def test_summarize_same_image(self):
+        # Given
+        img_path = render_png(self.tempdir.name + "/logo.png", 72, self.logo)
+        cached_summarizer = cached_image_summarizer.CachedImageSummarizer(self.summarizer, self.cache)
+
+        # When
+        first = cached_summarizer.summarize(img_path)
+        second = cached_summarizer.summarize(img_path)
+
+        # Then
+        self.assertEqual("company logo", first)
+        self.assertEqual("company logo", second)
+        self.assertEqual(1, self.summarizer.summarize.call_count)
+
+    def test_summarize_similar_image_after_restart(self):
+        # Given
+        cached_image_summarizer.CachedImageSummarizer(self.summarizer, self.cache, max_distance=2).summarize(
+            render_png(self.tempdir.name + "/logo_72.png", 72, self.logo)
+        )
+        restarted_cache = disk_lru_cache.DiskLruCache(self.tempdir.name + "/cache", max_bytes=1024 * 1024)
+        cached_summarizer = cached_image_summarizer.CachedImageSummarizer(self.summarizer, restarted_cache, max_distance=2)
+
+        # When
+        summary = cached_summarizer.summarize(render_png(self.tempdir.name + "/logo_96.png", 96, self.logo))
+
+        # Then
+        self.assertEqual("company logo", summary)
+        self.assertEqual(1, self.summarizer.summarize.call_count)
+
+    def test_do_not_share_summaries_between_namespaces(self):
+        # Given
+        logo_72 = render_png(self.tempdir.name + "/logo_72.png", 72, self.logo)
+        cached_image_summarizer.CachedImageSummarizer(self.summarizer, self.cache, max_distance=2, namespace="gpt-4o").summarize(logo_72)
+        restarted_cache = disk_lru_cache.DiskLruCache(self.tempdir.name + "/cache", max_bytes=1024 * 1024)
+        same_namespace = cached_image_summarizer.CachedImageSummarizer(self.summarizer, restarted_cache, max_distance=2, namespace="gpt-4o")
+        other_namespace = cached_image_summarizer.CachedImageSummarizer(self.summarizer, restarted_cache, max_distance=2, namespace="gpt-4.1")
+        self.summarizer.summarize.return_value = "new logo"
+
+        # When
+        same = same_namespace.summarize(logo_72)
+        other = other_namespace.summarize(logo_72)
+        other_similar = other_namespace.summarize(render_png(self.tempdir.name + "/logo_96.png", 96, self.logo))
+
+        # Then
+        self.assertEqual("company logo", same)
+        self.assertEqual("new logo", other)
+        self.assertEqual("new logo", other_similar)
+        self.assertEqual(2, self.summarizer.summarize.call_count)
+        self.assertTrue(set(other_namespace.perceptual_index).isdisjoint(same_namespace.perceptual_index))
+
+    def test_summarize_similar_image_only_with_max_distance(self):
+        # Given
+        cached_summarizer = cached_image_summarizer.CachedImageSummarizer(self.summarizer, self.cache)
+        cached_summarizer.summarize(render_png(self.tempdir.name + "/logo_72.png", 72, self.logo))
+
+        # When
+        cached_summarizer.summarize(render_png(self.tempdir.name + "/logo_96.png", 96, self.logo))
+
+        # Then
+        self.assertEqual(2, self.summarizer.summarize.call_count)
+        self.assertEqual({}, dict(cached_summarizer.perceptual_index))
+        self.assertTrue(all(key.startswith(cached_image_summarizer.EXACT_KEY_PREFIX) for key in self.cache.keys()))
+
+    def test_forget_old_summaries_of_run(self):
+        # Given
+        cached_summarizer = cached_image_summarizer.CachedImageSummarizer(self.summarizer, self.cache, max_distance=2)
+        cached_summarizer.MAX_RUN_SUMMARIES = 2
+        cached_summarizer.MAX_PERCEPTUAL_INDEX = 2
+        shapes = [[((10 + idx * 20, 10, 30 + idx * 20, 90), (0, 0, 0))] for idx in range(3)]
+
+        # When
+        for idx, shape in enumerate(shapes):
+            cached_summarizer.summarize(render_png(self.tempdir.name + f"/shape{idx}.png", 72, shape))
+        summary = cached_summarizer.summarize(render_png(self.tempdir.name + "/shape0.png", 72, shapes[0]))
+
+        # Then
+        self.assertEqual("company logo", summary)
+        self.assertEqual(2, len(cached_summarizer.summaries))
+        self.assertLessEqual(len(cached_summarizer.perceptual_index), 2)
+        self.assertEqual(3, self.summarizer.summarize.call_count)
+
+    def test_summarize_different_image(self):
+        # Given
+        cached_summarizer = cached_image_summarizer.CachedImageSummarizer(self.summarizer, self.cache)
+        cached_summarizer.summarize(render_png(self.tempdir.name + "/logo.png", 72, self.logo))
+        chart = [((10, 60, 40, 90), (0, 0, 0)), ((60, 30, 90, 90), (0, 0, 0)), ((110, 10, 140, 90), (0, 0, 0))]
+
+        # When
+        cached_summarizer.summarize(render_png(self.tempdir.name + "/chart.png", 72, chart))
+
+        # Then
+        self.assertEqual(2, self.summarizer.summarize.call_count)
+
+    def test_summarize_same_image_concurrently(self):
+        # Given
+        img_path = render_png(self.tempdir.name + "/logo.png", 72, self.logo)
+
+        def slow_summarize(path):
+            time.sleep(0.1)
+            return "company logo"
+
+        self.summarizer.summarize.side_effect = slow_summarize
+        cached_summarizer = cached_image_summarizer.CachedImageSummarizer(self.summarizer, self.cache)
+        summaries = []
+
+        # When
+        threads = [threading.Thread(target=lambda: summaries.append(cached_summarizer.summarize(img_path))) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        # Then
+        self.assertEqual(["company logo"] * 4, summaries)
+        self.assertEqual(1, self.summarizer.summarize.call_count)
+
+    def test_summarize_many(self):
+        # Given
+        chart = [((10, 60, 40, 90), (0, 0, 0)), ((60, 30, 90, 90), (0, 0, 0)), ((110, 10, 140, 90), (0, 0, 0))]
+        logo_path = render_png(self.tempdir.name + "/logo.png", 72, self.logo)
+        chart_path = render_png(self.tempdir.name + "/chart.png", 72, chart)
+        self.summarizer.summarize_many.side_effect = lambda imgs, return_exceptions: [f"image {len(img)}" for img in imgs]
+        cached_summarizer = cached_image_summarizer.CachedImageSummarizer(self.summarizer, self.cache)
+
+        # When
+        first = cached_summarizer.summarize_many([logo_path, chart_path, logo_path])
+        second = cached_summarizer.summarize_many([chart_path, logo_path])
+
+        # Then: images which are not cached are passed on together, once for each image
+        self.assertEqual(first[0], first[2])
+        self.assertEqual([first[1], first[0]], second)
+        self.assertEqual(1, self.summarizer.summarize_many.call_count)
+        self.assertEqual(2, len(self.summarizer.summarize_many.call_args.args[0]))
+        self.summarizer.summarize.assert_not_called()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,219 @@
+import os
+import pathlib
+import sys
+import tempfile
+import threading
+import time
+import unittest
+
+sys.path.append(
+    os.path.abspath(
+        os.path.join(
+            os.path.dirname(__file__),
+            '../src'
+        )
+    )
+)
+import src.packages.application.convert_manifest as convert_manifest
+import src.packages.application.document_convert_service as document_convert_service
+import src.packages.domain.document_extractor as document_extractor
+import src.packages.domain.instrumentation as instrumentation
+import src.packages.domain.md_creator as md_creator
+
+class ThrottledError(Exception):
+    status_code = 429
+
+class FakeExtractor(document_extractor.DocumentExtractor):
+    def __init__(self):
+        self.documents = []
+        self.times = []
+
+    def extract(self, document):
+        name = pathlib.Path(document.name).name
+        self.documents.append(name)
+        self.times.append(time.monotonic())
+        if name.startswith("broken"):
+            raise RuntimeError("broken document")
+        if name.startswith("throttled"):
+            raise ThrottledError("too many requests")
+        return {"content": document.read().decode()}
+
+class FakeMdCreator(md_creator.MdCreator):
+    def __init__(self):
+        self.fail = False
+
+    def create(self, analyze_result, source_pdf_path):
+        if self.fail:
+            raise RuntimeError("render failed")
+        return analyze_result["content"]
+
+class FigureMdCreator(md_creator.MdCreator):
+    """Store a figure summary of each document, and render b.pdf only after another document is converted."""
+
+    def __init__(self, converted):
+        self.converted = converted
+
+    def create(self, analyze_result, source_pdf_path):
+        return analyze_result["content"]
+
+    def create_chunks(self, analyze_result, source_pdf_path, figure_summaries=None, skipped_figures=None):
+        name = pathlib.Path(source_pdf_path).name
+        if name == "b.pdf":
+            self.converted.wait(5)
+        figure_summaries[0] = name
+        yield analyze_result["content"]
+
+class ConvertedInstrumentation(instrumentation.NullInstrumentation):
+    def __init__(self):
+        self.converted = threading.Event()
+
+    def count(self, name, value=1, **labels):
+        if labels.get("result") == "converted":
+            self.converted.set()
+
+class TestConvertCheckpoint(unittest.TestCase):
+    def setUp(self):
+        self.tempdir = tempfile.TemporaryDirectory()
+        self.source_dir = pathlib.Path(self.tempdir.name) / "source"
+        self.output_dir = pathlib.Path(self.tempdir.name) / "output"
+        self.source_dir.mkdir()
+        self.output_dir.mkdir()
+        (self.source_dir / "a.pdf").write_bytes(b"a")
+
+        self.extractor = FakeExtractor()
+        self.md_creator = FakeMdCreator()
+        self.service = document_convert_service.DocumentConvertService(self.extractor, None, None, None, self.md_creator)
+
+    def tearDown(self):
+        self.tempdir.cleanup()
+
+    def convert(self, max_attempts=3, force=False, retry_delay_sec=0.01, retry_quarantined=False):
+        self.extractor.documents = []
+        self.extractor.times = []
+        return self.service.extractDocument(
+            str(self.source_dir), str(self.output_dir), config_fingerprint="config", force=force, max_attempts=max_attempts,
+            retry_delay_sec=retry_delay_sec, retry_quarantined=retry_quarantined
+        )
+
+    def test_retry_and_quarantine(self):
+        # Given
+        (self.source_dir / "broken.pdf").write_bytes(b"x")
+
+        # When
+        first = self.convert(max_attempts=2)
+        first_documents = self.extractor.documents
+        second = self.convert(max_attempts=2)
+        second_documents = self.extractor.documents
+        (self.source_dir / "broken.pdf").write_bytes(b"changed")
+        third = self.convert(max_attempts=2)
+
+        # Then
+        self.assertEqual(["a.pdf", "broken.pdf", "broken.pdf"], sorted(first_documents))
+        self.assertEqual([str(self.source_dir / "broken.pdf")], list(first.failed))
+        self.assertEqual([], second_documents)
+        self.assertEqual([str(self.source_dir / "broken.pdf")], second.quarantined)
+        self.assertEqual(["broken.pdf", "broken.pdf"], self.extractor.documents)
+        self.assertEqual([], third.quarantined)
+
+    def test_back_off_between_attempts(self):
+        # Given
+        (self.source_dir / "broken.pdf").write_bytes(b"x")
+
+        # When
+        report = self.convert(max_attempts=3, retry_delay_sec=0.2)
+
+        # Then
+        times = [at for name, at in zip(self.extractor.documents, self.extractor.times) if name == "broken.pdf"]
+        self.assertEqual(3, len(times))
+        self.assertGreaterEqual(times[1] - times[0], 0.2)
+        self.assertGreaterEqual(times[2] - times[1], 0.4)
+        self.assertEqual([str(self.source_dir / "broken.pdf")], list(report.failed))
+
+    def test_do_not_quarantine_transient_failures(self):
+        # Given
+        (self.source_dir / "throttled.pdf").write_bytes(b"x")
+
+        # When
+        first = self.convert(max_attempts=2)
+        first_documents = self.extractor.documents
+        second = self.convert(max_attempts=2)
+
+        # Then
+        self.assertEqual(["a.pdf", "throttled.pdf", "throttled.pdf"], sorted(first_documents))
+        self.assertEqual([str(self.source_dir / "throttled.pdf")], list(first.failed))
+        self.assertEqual([], second.quarantined)
+        self.assertEqual(["throttled.pdf", "throttled.pdf"], self.extractor.documents)
+
+    def test_retry_quarantined(self):
+        # Given
+        (self.source_dir / "broken.pdf").write_bytes(b"x")
+        self.convert(max_attempts=2)
+
+        # When
+        retried = self.convert(max_attempts=2, retry_quarantined=True)
+        retried_documents = self.extractor.documents
+        quarantined = self.convert(max_attempts=2)
+
+        # Then
+        self.assertEqual([], retried.quarantined)
+        self.assertEqual([str(self.source_dir / "a.pdf")], retried.skipped)
+        self.assertEqual(["broken.pdf", "broken.pdf"], retried_documents)
+        self.assertEqual([str(self.source_dir / "broken.pdf")], quarantined.quarantined)
+
+    def test_resume_from_analyze_result(self):
+        # Given
+        self.md_creator.fail = True
+        failed = self.convert(max_attempts=1)
+
+        # When
+        self.md_creator.fail = False
+        resumed = self.convert(max_attempts=1, force=True)
+
+        # Then
+        self.assertEqual(1, len(failed.failed))
+        self.assertEqual([], self.extractor.documents)
+        self.assertEqual([str(self.output_dir / "a.md")], resumed.converted)
+        self.assertEqual("a", (self.output_dir / "a.md").read_text())
+        self.assertEqual([], list((self.output_dir / document_convert_service.DocumentConvertService.CHECKPOINT_DIR_NAME).iterdir()))
+
+    def test_keep_checkpoint_of_source_with_same_content(self):
+        # Given
+        (self.source_dir / "b.pdf").write_bytes(b"a")
+        metrics = ConvertedInstrumentation()
+        service = document_convert_service.DocumentConvertService(
+            self.extractor, None, None, None, FigureMdCreator(metrics.converted), instrumentation=metrics
+        )
+
+        # When
+        # b.pdf stores its figure summary after a.pdf of the same content is converted and its checkpoint is removed.
+        report = service.extractDocument(
+            str(self.source_dir), str(self.output_dir), config_fingerprint="config", render_workers=2, max_attempts=1
+        )
+
+        # Then
+        self.assertEqual({}, report.failed)
+        self.assertEqual(sorted([str(self.output_dir / "a.md"), str(self.output_dir / "b.md")]), sorted(report.converted))
+        self.assertEqual([], list((self.output_dir / document_convert_service.DocumentConvertService.CHECKPOINT_DIR_NAME).iterdir()))
+
+    def test_replay_journal_after_crash(self):
+        # Given
+        manifest_path = str(self.output_dir / "manifest.json")
+        manifest = convert_manifest.ConvertManifest(manifest_path)
+        source = self.source_dir / "a.pdf"
+        (self.output_dir / "a.md").write_text("a")
+        _, state = manifest.check(source, str(self.output_dir / "a.md"), "config")
+        manifest.start(source)
+        manifest.record(source, state, str(self.output_dir / "a.md"), "config")
+
+        # When
+        # The manifest is not saved, as if the run was killed.
+        reopened = convert_manifest.ConvertManifest(manifest_path)
+
+        # Then
+        self.assertTrue(reopened.check(source, str(self.output_dir / "a.md"), "config")[0])
+        self.assertEqual(set(), reopened.in_flight)
+        manifest.close()
+        reopened.close()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,110 @@
+import os
+import pathlib
+import sys
+import tempfile
+import unittest
+
+sys.path.append(
+    os.path.abspath(
+        os.path.join(
+            os.path.dirname(__file__),
+            '../src'
+        )
+    )
+)
+import src.packages.application.document_convert_service as document_convert_service
+import src.packages.domain.document_extractor as document_extractor
+import src.packages.domain.md_creator as md_creator
+
+class FakeExtractor(document_extractor.DocumentExtractor):
+    def __init__(self):
+        self.documents = []
+
+    def extract(self, document):
+        self.documents.append(pathlib.Path(document.name).name)
+        return {"content": document.read().decode()}
+
+class FakeMdCreator(md_creator.MdCreator):
+    def create(self, analyze_result, source_pdf_path):
+        return analyze_result["content"]
+
+class TestConvertManifest(unittest.TestCase):
+    def setUp(self):
+        self.tempdir = tempfile.TemporaryDirectory()
+        self.source_dir = pathlib.Path(self.tempdir.name) / "source"
+        self.output_dir = pathlib.Path(self.tempdir.name) / "output"
+        self.source_dir.mkdir()
+        self.output_dir.mkdir()
+        (self.source_dir / "a.pdf").write_bytes(b"a")
+        (self.source_dir / "b.pdf").write_bytes(b"b")
+
+        self.extractor = FakeExtractor()
+        self.service = document_convert_service.DocumentConvertService(self.extractor, None, None, None, FakeMdCreator())
+
+    def tearDown(self):
+        self.tempdir.cleanup()
+
+    def convert(self, config_fingerprint="config", force=False):
+        self.extractor.documents = []
+        return self.service.extractDocument(
+            str(self.source_dir), str(self.output_dir), config_fingerprint=config_fingerprint, force=force
+        )
+
+    def test_convert_only_changed_documents(self):
+        # Given
+        self.convert()
+
+        # When
+        unchanged = self.convert()
+        unchanged_documents = self.extractor.documents
+        (self.source_dir / "a.pdf").write_bytes(b"a2")
+        changed = self.convert()
+
+        # Then
+        self.assertEqual([], unchanged_documents)
+        self.assertEqual(2, len(unchanged.skipped))
+        self.assertEqual(["a.pdf"], self.extractor.documents)
+        self.assertEqual(1, len(changed.converted))
+        self.assertEqual(1, len(changed.skipped))
+        self.assertEqual("a2", (self.output_dir / "a.md").read_text())
+
+    def test_skip_touched_document(self):
+        # Given
+        self.convert()
+        stat = (self.source_dir / "a.pdf").stat()
+        os.utime(self.source_dir / "a.pdf", ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+
+        # When
+        report = self.convert()
+
+        # Then
+        self.assertEqual([], report.converted)
+        self.assertEqual(2, len(report.skipped))
+
+    def test_convert_again_with_another_config_or_force(self):
+        # Given
+        self.convert()
+
+        # When
+        other_config = self.convert(config_fingerprint="other")
+        forced = self.convert(config_fingerprint="other", force=True)
+
+        # Then
+        self.assertEqual(2, len(other_config.converted))
+        self.assertEqual(2, len(forced.converted))
+
+    def test_remove_output_of_deleted_document(self):
+        # Given
+        self.convert()
+        (self.source_dir / "b.pdf").unlink()
+
+        # When
+        report = self.convert()
+
+        # Then
+        self.assertEqual([str(self.output_dir / "b.md")], report.removed)
+        self.assertFalse((self.output_dir / "b.md").exists())
+        self.assertTrue((self.output_dir / "a.md").exists())
+
+if __name__ == '__main__':
+    unittest.main()
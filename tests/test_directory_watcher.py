@@ -0,0 +1,207 @@
+import os
+import pathlib
+import sys
+import tempfile
+import threading
+import time
+import unittest
+
+sys.path.append(
+    os.path.abspath(
+        os.path.join(
+            os.path.dirname(__file__),
+            '../src'
+        )
+    )
+)
+import src.packages.application.document_convert_service as document_convert_service
+import src.packages.domain.document_extractor as document_extractor
+import src.packages.domain.md_creator as md_creator
+import src.packages.infrastructure.inotify_directory_watcher as inotify_directory_watcher
+import src.packages.infrastructure.polling_directory_watcher as polling_directory_watcher
+
+class FakeExtractor(document_extractor.DocumentExtractor):
+    def extract(self, document):
+        return {"content": document.read().decode()}
+
+class BlockingExtractor(document_extractor.DocumentExtractor):
+    """Extractor which blocks on a document of "first" until released, and records how many documents it extracts at a time."""
+
+    def __init__(self):
+        self.started = threading.Event()
+        self.released = threading.Event()
+        self.lock = threading.Lock()
+        self.contents = []
+        self.active = 0
+        self.max_active = 0
+
+    def extract(self, document):
+        content = document.read().decode()
+        with self.lock:
+            self.contents.append(content)
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+        if content == "first":
+            self.started.set()
+            self.released.wait(5)
+        with self.lock:
+            self.active -= 1
+        return {"content": content}
+
+class FakeMdCreator(md_creator.MdCreator):
+    def create(self, analyze_result, source_pdf_path):
+        return analyze_result["content"]
+
+class TestDirectoryWatcher(unittest.TestCase):
+    def setUp(self):
+        self.tempdir = tempfile.TemporaryDirectory()
+        self.directory = pathlib.Path(self.tempdir.name)
+        (self.directory / "existing.pdf").write_bytes(b"existing")
+
+    def tearDown(self):
+        self.tempdir.cleanup()
+
+    def collect(self, watcher, timeout_sec=1.5):
+        """Write files slowly in a thread while watching, and collect files reported until timeout_sec."""
+
+        stop = threading.Event()
+        reported = []
+        started_at = time.monotonic()
+        writer = threading.Thread(target=self.write_slowly)
+        for paths in watcher.watch(str(self.directory), [".pdf"], stop):
+            if writer.ident is None:
+                writer.start()
+            reported.extend((path.name, time.monotonic()) for path in paths)
+            if time.monotonic() - started_at > timeout_sec:
+                stop.set()
+        writer.join()
+
+        return reported
+
+    def write_slowly(self):
+        with open(self.directory / "uploading.pdf", "wb") as file:
+            for _ in range(5):
+                file.write(b"x" * 1024)
+                file.flush()
+                self.written_at = time.monotonic()
+                time.sleep(0.1)
+        (self.directory / "ignored.txt").write_text("text")
+
+    def assert_reported_once_after_settled(self, reported, settle_sec):
+        self.assertEqual(["uploading.pdf"], [name for name, _ in reported])
+        self.assertGreaterEqual(reported[0][1] - self.written_at, settle_sec)
+
+    def test_polling(self):
+        # Given
+        watcher = polling_directory_watcher.PollingDirectoryWatcher(poll_sec=0.05, settle_sec=0.3)
+
+        # When
+        reported = self.collect(watcher)
+
+        # Then
+        self.assert_reported_once_after_settled(reported, 0.3)
+
+    @unittest.skipUnless(inotify_directory_watcher.InotifyDirectoryWatcher.is_available(), "inotify is not available")
+    def test_inotify(self):
+        # Given
+        watcher = inotify_directory_watcher.InotifyDirectoryWatcher(poll_sec=0.05, settle_sec=0.3)
+
+        # When
+        reported = self.collect(watcher)
+
+        # Then
+        self.assert_reported_once_after_settled(reported, 0.3)
+
+    def test_convert_written_documents_while_watching(self):
+        # Given
+        source_dir = self.directory
+        output_dir = self.directory / "output"
+        output_dir.mkdir()
+        watcher = polling_directory_watcher.PollingDirectoryWatcher(poll_sec=0.05, settle_sec=0.1)
+        service = document_convert_service.DocumentConvertService(FakeExtractor(), None, None, None, FakeMdCreator(), watcher)
+        stop = threading.Event()
+        reports = []
+        thread = threading.Thread(target=lambda: reports.append(service.extractDocument(
+            str(source_dir), str(output_dir), config_fingerprint="config", watch=True, stop=stop
+        )))
+
+        # When
+        thread.start()
+        for _ in range(100):
+            if (output_dir / "existing.md").exists():
+                break
+            time.sleep(0.05)
+        (source_dir / "new.pdf").write_bytes(b"new")
+        for _ in range(100):
+            if (output_dir / "new.md").exists():
+                break
+            time.sleep(0.05)
+        stop.set()
+        thread.join()
+
+        # Then
+        self.assertEqual("existing", (output_dir / "existing.md").read_text())
+        self.assertEqual("new", (output_dir / "new.md").read_text())
+        self.assertEqual(sorted([str(output_dir / "existing.md"), str(output_dir / "new.md")]), sorted(reports[0].converted))
+
+    def watch_service(self, extractor, **kwargs):
+        """Start converting self.directory while watching it, and get output directory, stop event, thread and reports."""
+
+        output_dir = self.directory / "output"
+        output_dir.mkdir()
+        watcher = polling_directory_watcher.PollingDirectoryWatcher(poll_sec=0.05, settle_sec=0.1)
+        service = document_convert_service.DocumentConvertService(extractor, None, None, None, FakeMdCreator(), watcher)
+        service.MISSING_CHECK_INTERVAL_SEC = 0.1
+        stop = threading.Event()
+        reports = []
+        thread = threading.Thread(target=lambda: reports.append(service.extractDocument(
+            str(self.directory), str(output_dir), config_fingerprint="config", watch=True, stop=stop, **kwargs
+        )))
+        thread.start()
+
+        return output_dir, stop, thread, reports
+
+    def wait_until(self, condition):
+        for _ in range(100):
+            if condition():
+                return
+            time.sleep(0.05)
+
+    def test_convert_document_written_while_converting_after_it(self):
+        # Given
+        (self.directory / "existing.pdf").write_bytes(b"first")
+        extractor = BlockingExtractor()
+        output_dir, stop, thread, reports = self.watch_service(extractor, analyze_workers=2)
+        extractor.started.wait(5)
+
+        # When
+        (self.directory / "existing.pdf").write_bytes(b"second")
+        time.sleep(0.5)
+        extractor.released.set()
+        self.wait_until(lambda: (output_dir / "existing.md").exists() and (output_dir / "existing.md").read_text() == "second")
+        stop.set()
+        thread.join()
+
+        # Then
+        self.assertEqual(["first", "second"], extractor.contents)
+        self.assertEqual(1, extractor.max_active)
+        self.assertEqual("second", (output_dir / "existing.md").read_text())
+        self.assertEqual([str(output_dir / "existing.md")] * 2, reports[0].converted)
+
+    def test_remove_markdown_of_document_deleted_while_watching(self):
+        # Given
+        output_dir, stop, thread, reports = self.watch_service(FakeExtractor())
+        self.wait_until(lambda: (output_dir / "existing.md").exists())
+
+        # When
+        (self.directory / "existing.pdf").unlink()
+        self.wait_until(lambda: not (output_dir / "existing.md").exists())
+        stop.set()
+        thread.join()
+
+        # Then
+        self.assertFalse((output_dir / "existing.md").exists())
+        self.assertEqual([str(output_dir / "existing.md")], reports[0].removed)
+
+if __name__ == '__main__':
+    unittest.main()
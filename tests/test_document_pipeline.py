@@ -0,0 +1,160 @@
+from concurrent.futures import Future
+import os
+import sys
+import threading
+import time
+import unittest
+
+sys.path.append(
+    os.path.abspath(
+        os.path.join(
+            os.path.dirname(__file__),
+            '../src'
+        )
+    )
+)
+import src.packages.application.document_pipeline as document_pipeline
+
+class TestDocumentPipeline(unittest.TestCase):
+    def test_run(self):
+        # Given
+        processed = []
+        lock = threading.Lock()
+
+        def double(job):
+            job["value"] *= 2
+
+        def collect(job):
+            with lock:
+                processed.append(job["value"])
+
+        pipeline = document_pipeline.DocumentPipeline([
+            document_pipeline.PipelineStage("double", double, workers=3),
+            document_pipeline.PipelineStage("collect", collect, workers=2)
+        ])
+
+        # When
+        failures = pipeline.run({"value": i} for i in range(100))
+
+        # Then
+        self.assertEqual([], failures)
+        self.assertEqual([i * 2 for i in range(100)], sorted(processed))
+
+    def test_run_with_failure(self):
+        # Given
+        processed = []
+
+        def check(job):
+            if job == 3:
+                raise ValueError("broken document")
+
+        pipeline = document_pipeline.DocumentPipeline([
+            document_pipeline.PipelineStage("check", check, workers=2),
+            document_pipeline.PipelineStage("collect", processed.append)
+        ])
+
+        # When
+        failures = pipeline.run(range(5))
+
+        # Then
+        self.assertEqual([0, 1, 2, 4], sorted(processed))
+        self.assertEqual(1, len(failures))
+        self.assertEqual(3, failures[0].job)
+        self.assertEqual("check", failures[0].stage_name)
+        self.assertIsInstance(failures[0].error, ValueError)
+
+    def test_run_reports_failure_before_jobs_end(self):
+        # Given
+        reported = threading.Event()
+
+        def check(job):
+            if job == 0:
+                raise ValueError("broken document")
+
+        def jobs():
+            yield 0
+            # The generator blocks until the failure of the first job is reported.
+            self.assertTrue(reported.wait(5))
+            yield 1
+
+        pipeline = document_pipeline.DocumentPipeline([
+            document_pipeline.PipelineStage("check", check)
+        ])
+
+        # When
+        failures = pipeline.run(jobs(), on_failure=lambda failure: reported.set())
+
+        # Then
+        self.assertEqual([0], [failure.job for failure in failures])
+
+    def test_run_overlaps_stages(self):
+        # Given
+        processed = []
+        lock = threading.Lock()
+        counter = {"current": 0, "max": 0}
+
+        def slow(job):
+            with lock:
+                counter["current"] += 1
+                counter["max"] = max(counter["max"], counter["current"])
+            time.sleep(0.05)
+            with lock:
+                counter["current"] -= 1
+
+        pipeline = document_pipeline.DocumentPipeline([
+            document_pipeline.PipelineStage("slow", slow, workers=4),
+            document_pipeline.PipelineStage("collect", processed.append)
+        ])
+
+        # When
+        pipeline.run(range(8))
+
+        # Then
+        self.assertEqual(4, counter["max"])
+        self.assertEqual(8, len(processed))
+
+    def test_run_jobs_in_flight(self):
+        # Given: one worker which starts jobs completed later by timers
+        lock = threading.Lock()
+        counter = {"current": 0, "max": 0}
+        finished = []
+        processed = []
+
+        def begin(job):
+            future = Future()
+            with lock:
+                counter["current"] += 1
+                counter["max"] = max(counter["max"], counter["current"])
+
+            def complete():
+                with lock:
+                    counter["current"] -= 1
+                if job == 3:
+                    future.set_exception(ValueError("broken document"))
+                else:
+                    future.set_result(job * 2)
+
+            threading.Timer(0.05, complete).start()
+            return future
+
+        def finish(job, future):
+            finished.append((threading.current_thread().name, future.result()))
+
+        pipeline = document_pipeline.DocumentPipeline([
+            document_pipeline.PipelineStage("begin", begin, workers=1, max_in_flight=6, finish=finish),
+            document_pipeline.PipelineStage("collect", processed.append)
+        ])
+
+        # When
+        failures = pipeline.run(range(12))
+
+        # Then: jobs are in flight together without a thread for each, and a failed future drops its job
+        self.assertEqual(6, counter["max"])
+        self.assertEqual([job for job in range(12) if job != 3], sorted(processed))
+        self.assertEqual(["begin-finish"] * 11, [name for name, _ in finished])
+        self.assertEqual(1, len(failures))
+        self.assertEqual(3, failures[0].job)
+        self.assertEqual("begin", failures[0].stage_name)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,157 @@
+import asyncio
+import io
+import os
+import sys
+import threading
+import unittest
+
+sys.path.append(
+    os.path.abspath(
+        os.path.join(
+            os.path.dirname(__file__),
+            '../src'
+        )
+    )
+)
+import src.packages.domain.async_document_extractor as async_document_extractor
+import src.packages.domain.async_image_summarizer as async_image_summarizer
+import src.packages.infrastructure.event_loop_bridge as event_loop_bridge
+import src.packages.infrastructure.event_loop_runner as event_loop_runner
+import src.packages.infrastructure.rate_limited_image_summarizer as rate_limited_image_summarizer
+import src.packages.infrastructure.rate_limiter as rate_limiter
+
+class ThrottledError(Exception):
+    status_code = 429
+
+class FakeAsyncImageSummarizer(async_image_summarizer.AsyncImageSummarizer):
+    def __init__(self):
+        self.running = 0
+        self.max_running = 0
+
+        self.throttled = set()
+        self.closed = False
+
+    async def summarize(self, img):
+        self.running += 1
+        self.max_running = max(self.max_running, self.running)
+        await asyncio.sleep(0.05)
+        self.running -= 1
+        if img in self.throttled:
+            self.throttled.remove(img)
+            raise ThrottledError()
+        return "summary of " + img.decode()
+
+    async def close(self):
+        self.closed = True
+
+class FakeAsyncDocumentExtractor(async_document_extractor.AsyncDocumentExtractor):
+    async def extract(self, document):
+        await asyncio.sleep(0)
+        return {"content": document.decode()}
+
+class FakeAsyncPollingExtractor(async_document_extractor.AsyncDocumentExtractor):
+    """Submit documents at once, and complete them when released."""
+
+    def __init__(self):
+        self.released = threading.Event()
+
+    async def extract(self, document):
+        return await (await self.begin_extract(document))()
+
+    async def begin_extract(self, document):
+        async def wait():
+            while not self.released.is_set():
+                await asyncio.sleep(0.01)
+            return {"content": document.decode()}
+
+        return wait
+
+class TestEventLoopBridge(unittest.TestCase):
+    def setUp(self):
+        self.runner = event_loop_runner.EventLoopRunner(max_concurrency=3)
+
+    def tearDown(self):
+        self.runner.close()
+
+    def test_summarize_many(self):
+        # Given
+        summarizer = FakeAsyncImageSummarizer()
+        imgs = [f"img{i}".encode() for i in range(8)]
+
+        # When
+        summaries = event_loop_bridge.LoopImageSummarizer(summarizer, self.runner).summarize_many(imgs)
+
+        # Then
+        self.assertEqual([f"summary of img{i}" for i in range(8)], summaries)
+        self.assertEqual(3, summarizer.max_running)
+
+    def test_extract(self):
+        # Given
+        extractor = event_loop_bridge.LoopDocumentExtractor(FakeAsyncDocumentExtractor(), self.runner)
+
+        # When
+        result = extractor.extract(io.BytesIO(b"document"))
+
+        # Then
+        self.assertEqual({"content": "document"}, result)
+
+    def test_begin_extract_without_waiting(self):
+        # Given
+        async_extractor = FakeAsyncPollingExtractor()
+        extractor = event_loop_bridge.LoopDocumentExtractor(async_extractor, self.runner)
+
+        # When: documents are submitted before any of them is done
+        futures = [extractor.begin_extract(io.BytesIO(f"document{i}".encode())) for i in range(3)]
+        pending = [future.done() for future in futures]
+        async_extractor.released.set()
+
+        # Then
+        self.assertEqual([False] * 3, pending)
+        self.assertEqual([{"content": f"document{i}"} for i in range(3)], [future.result(5) for future in futures])
+
+    def test_summarize_many_through_rate_limiter(self):
+        # Given: a throttled image, and a limiter wrapping the summarizer on the event loop
+        summarizer = FakeAsyncImageSummarizer()
+        summarizer.throttled.add(b"img2")
+        limited = rate_limited_image_summarizer.RateLimitedImageSummarizer(
+            event_loop_bridge.LoopImageSummarizer(summarizer, self.runner),
+            rate_limiter.AdaptiveRateLimiter(max_rate_per_sec=1000, burst=8),
+            rate_limiter.RetryPolicy(max_retries=2, base_delay_sec=0.01)
+        )
+
+        # When
+        summaries = limited.summarize_many([f"img{i}".encode() for i in range(6)])
+
+        # Then: images are summarized together on the event loop, and the throttled one is retried
+        self.assertEqual([f"summary of img{i}" for i in range(6)], summaries)
+        self.assertEqual(3, summarizer.max_running)
+
+    def test_summarize_many_with_exceptions(self):
+        # Given
+        summarizer = FakeAsyncImageSummarizer()
+        summarizer.throttled.add(b"img1")
+
+        # When
+        summaries = event_loop_bridge.LoopImageSummarizer(summarizer, self.runner).summarize_many(
+            [b"img0", b"img1"], return_exceptions=True
+        )
+
+        # Then
+        self.assertEqual("summary of img0", summaries[0])
+        self.assertIsInstance(summaries[1], ThrottledError)
+
+    def test_close_clients(self):
+        # Given
+        summarizer = FakeAsyncImageSummarizer()
+        self.runner.on_close(summarizer.close)
+        event_loop_bridge.LoopImageSummarizer(summarizer, self.runner).summarize(b"img0")
+
+        # When
+        self.runner.close()
+
+        # Then
+        self.assertTrue(summarizer.closed)
+        self.assertIsNone(self.runner.loop)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,107 @@
+import os
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+import fitz
+
+sys.path.append(
+    os.path.abspath(
+        os.path.join(
+            os.path.dirname(__file__),
+            '../src'
+        )
+    )
+)
+from injector import Injector
+
+import src.packages.application.document_convert_service as document_convert_service
+import src.packages.dicontainer.di_container as di_container
+import src.packages.infrastructure.http_pool_settings as http_pool_settings
+import src.packages.infrastructure.rate_limiter as rate_limiter
+from tests.fakes.fake_document_intelligence_server import FakeDocumentIntelligenceServer
+from tests.fakes.fake_openai_server import FakeOpenAIServer
+from tests.fakes.fake_server import ServiceProfile
+
+class TestFakeAzureServices(unittest.TestCase):
+    def setUp(self):
+        self.source_dir = tempfile.TemporaryDirectory()
+        self.output_dir = tempfile.TemporaryDirectory()
+        for idx in range(3):
+            with fitz.open() as doc:
+                page = doc.new_page(width=612, height=792)
+                # The figure of the fixture is at (1.03, 7.12) - (4.14, 9.07) inches.
+                page.draw_rect(fitz.Rect(1.03 * 72, 7.12 * 72, 4.14 * 72, 9.07 * 72), color=(0, 0, 0), fill=(0.2, 0.4, 0.8))
+                doc.save(os.path.join(self.source_dir.name, f"document_{idx}.pdf"))
+
+    def tearDown(self):
+        self.source_dir.cleanup()
+        self.output_dir.cleanup()
+
+    def test_convert_with_throttled_services(self):
+        # Given: fake services which throttle some requests
+        di_server = FakeDocumentIntelligenceServer(ServiceProfile(throttle_rate=0.3, seed=1), processing_sec=0.1)
+        oai_server = FakeOpenAIServer(ServiceProfile(throttle_rate=0.3, seed=2), summary="a blue box")
+
+        with di_server, oai_server, mock.patch.dict(os.environ, {
+            "DI_KEY": "fake",
+            "DI_ENDPOINT": di_server.url,
+            "AZURE_OPENAI_API_KEY": "fake",
+            "AZURE_OPENAI_ENDPOINT": oai_server.url,
+            "AZURE_OPENAI_API_VERSION": "2024-06-01",
+            "AZURE_OPENAI_DEPLOYMENT": "fake-deployment"
+        }):
+            service = Injector([di_container.DIContainer()]).get(document_convert_service.DocumentConvertService)
+
+            # When: converting documents with the real Azure clients
+            report = service.extractDocument(self.source_dir.name, self.output_dir.name, analyze_workers=3)
+
+        # Then: all documents are converted with the summary of the fake, retrying throttled requests
+        self.assertEqual(3, len(report.converted))
+        self.assertFalse(report.failed)
+        for idx in range(3):
+            with open(os.path.join(self.output_dir.name, f"document_{idx}.md"), encoding="utf-8") as file:
+                self.assertIn("a blue box", file.read())
+        self.assertEqual(3, di_server.counts["analyze"] - di_server.counts.get("throttled", 0))
+        self.assertEqual(3, oai_server.counts["chat_completions"] - oai_server.counts.get("throttled", 0))
+        self.assertGreater(di_server.counts.get("throttled", 0) + oai_server.counts.get("throttled", 0), 0)
+
+    def test_resume_throttled_polls(self):
+        for use_async in [False, True]:
+            with self.subTest(use_async=use_async), tempfile.TemporaryDirectory() as output_dir:
+                # Given: polls are throttled, and only the limiter retries requests
+                di_server = FakeDocumentIntelligenceServer(
+                    ServiceProfile(throttle_rate=0.3, seed=3), processing_sec=0.1,
+                    poll_profile=ServiceProfile(throttle_rate=0.3, seed=4)
+                )
+                oai_server = FakeOpenAIServer(summary="a blue box")
+
+                with di_server, oai_server, mock.patch.dict(os.environ, {
+                    "DI_KEY": "fake",
+                    "DI_ENDPOINT": di_server.url,
+                    "AZURE_OPENAI_API_KEY": "fake",
+                    "AZURE_OPENAI_ENDPOINT": oai_server.url,
+                    "AZURE_OPENAI_API_VERSION": "2024-06-01",
+                    "AZURE_OPENAI_DEPLOYMENT": "fake-deployment"
+                }):
+                    container = di_container.DIContainer(
+                        http_pool_settings=http_pool_settings.HttpPoolSettings(max_retries=0),
+                        use_async=use_async,
+                        analyze_rate_limiter=rate_limiter.AdaptiveRateLimiter(max_rate_per_sec=50, burst=3),
+                        retry_policy=rate_limiter.RetryPolicy(max_retries=10, base_delay_sec=0.05)
+                    )
+                    service = Injector([container]).get(document_convert_service.DocumentConvertService)
+
+                    # When
+                    report = service.extractDocument(self.source_dir.name, output_dir, analyze_workers=3)
+                    container.close()
+
+                # Then: throttled polls resume the operations, and no document is submitted twice
+                self.assertEqual(3, len(report.converted))
+                self.assertFalse(report.failed)
+                self.assertGreater(di_server.counts.get("poll_throttled", 0), 0)
+                self.assertEqual(3, di_server.counts["analyze"] - di_server.counts.get("throttled", 0))
+
+if __name__ == '__main__':
+    unittest.main()
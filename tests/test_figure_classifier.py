@@ -0,0 +1,76 @@
+import os
+import sys
+import unittest
+
+import fitz
+
+sys.path.append(
+    os.path.abspath(
+        os.path.join(
+            os.path.dirname(__file__),
+            '../src'
+        )
+    )
+)
+import src.packages.domain.figure_classifier as figure_classifier
+
+def render(draw, width=300, height=200):
+    """Render a figure drawn on a page of the size, as the image extractor does."""
+
+    with fitz.open() as doc:
+        page = doc.new_page(width=width, height=height)
+        draw(page)
+        return page.get_pixmap(dpi=300).tobytes("png")
+
+class TestFigureClassifier(unittest.TestCase):
+    def setUp(self):
+        self.classifier = figure_classifier.FigureClassifier(
+            min_edge_pt=16, min_area_pt=32 * 32, uniform_max_stddev=4, min_ink_coverage=0.005, min_entropy_bits=0.05
+        )
+
+    def test_classify_region(self):
+        # Then
+        self.assertEqual("small", self.classifier.classify_region([100, 100, 400, 110]))
+        self.assertEqual("small", self.classifier.classify_region([100, 100, 120, 120]))
+        self.assertIsNone(self.classifier.classify_region([100, 100, 140, 140]))
+
+    def test_classify_trivial_images(self):
+        # Given
+        blank = render(lambda page: None)
+        solid = render(lambda page: page.draw_rect(page.rect, fill=(0.2, 0.4, 0.8), color=None))
+        rule = render(lambda page: page.draw_line((0, 100), (300, 100), width=0.5))
+
+        # Then
+        self.assertEqual("uniform", self.classifier.classify_image(blank))
+        self.assertEqual("uniform", self.classifier.classify_image(solid))
+        self.assertEqual("blank", self.classifier.classify_image(rule))
+
+    def test_classify_meaningful_images(self):
+        # Given
+        def draw_chart(page):
+            page.draw_line((20, 180), (280, 180))
+            page.draw_line((20, 20), (20, 180))
+            for idx, height in enumerate([30, 80, 50, 120, 150]):
+                page.draw_rect(fitz.Rect(40 + idx * 48, 180 - height, 70 + idx * 48, 180), color=(0, 0, 0), width=0.5)
+                page.insert_text((50 + idx * 48, 195), f"Q{idx + 1}", fontsize=8)
+
+        def draw_box(page):
+            page.draw_rect(fitz.Rect(50, 50, 250, 150), fill=(0.2, 0.4, 0.8))
+            page.insert_text((60, 100), "Figure of document", fontsize=12, color=(1, 1, 1))
+
+        # Then
+        self.assertIsNone(self.classifier.classify_image(render(draw_chart)))
+        self.assertIsNone(self.classifier.classify_image(render(draw_box)))
+        self.assertIsNone(self.classifier.classify_image(b"not an image"))
+
+    def test_disabled_by_default(self):
+        # Given
+        classifier = figure_classifier.FigureClassifier()
+
+        # Then
+        self.assertFalse(classifier.enabled)
+        self.assertIsNone(classifier.classify_region([0, 0, 1, 1]))
+        self.assertIsNone(classifier.classify_image(render(lambda page: None)))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,163 @@
+import json
+import os
+import pathlib
+import sys
+import tempfile
+import unittest
+import urllib.request
+
+sys.path.append(
+    os.path.abspath(
+        os.path.join(
+            os.path.dirname(__file__),
+            '../src'
+        )
+    )
+)
+import src.packages.application.document_convert_service as document_convert_service
+import src.packages.domain.document_extractor as document_extractor
+import src.packages.domain.instrumentation as instrumentation
+import src.packages.domain.md_creator as md_creator
+import src.packages.infrastructure.json_lines_exporter as json_lines_exporter
+import src.packages.infrastructure.metrics_instrumentation as metrics_instrumentation
+import src.packages.infrastructure.prometheus_exporter as prometheus_exporter
+
+class FakeExtractor(document_extractor.DocumentExtractor):
+    def extract(self, document):
+        if pathlib.Path(document.name).name.startswith("broken"):
+            raise RuntimeError("broken document")
+        return {"content": document.read().decode(), "pages": [{}, {}]}
+
+class FakeMdCreator(md_creator.MdCreator):
+    def create(self, analyze_result, source_pdf_path):
+        return analyze_result["content"]
+
+class TestInstrumentation(unittest.TestCase):
+    def setUp(self):
+        self.tempdir = tempfile.TemporaryDirectory()
+        self.log_path = os.path.join(self.tempdir.name, "metrics.jsonl")
+
+    def tearDown(self):
+        self.tempdir.cleanup()
+
+    def read_records(self):
+        with open(self.log_path, encoding="utf-8") as file:
+            return [json.loads(line) for line in file]
+
+    def test_null_instrumentation(self):
+        # Given
+        null = instrumentation.NullInstrumentation()
+
+        # When
+        with null.span("analyze", document="a.pdf") as span:
+            span.set(pages=1)
+        null.count("figures_total", 3)
+
+        # Then
+        self.assertFalse(null.enabled)
+        self.assertIs(instrumentation.NULL_SPAN, span)
+        self.assertIs(instrumentation.NULL_SPAN, null.span("render"))
+
+    def test_spans_and_metrics_to_json_lines(self):
+        # Given
+        metrics = metrics_instrumentation.MetricsInstrumentation([json_lines_exporter.JsonLinesExporter(self.log_path)])
+
+        # When
+        document = metrics.span("document", document="a.pdf")
+        with metrics.span("render", parent=document):
+            with metrics.span("render_figures", figures=2):
+                pass
+        try:
+            with metrics.span("analyze", parent=document):
+                raise RuntimeError("throttled")
+        except RuntimeError:
+            pass
+        document.end()
+        document.end()
+        metrics.count("figures_total", 2)
+        metrics.count("figures_total", 3)
+        metrics.observe("request_seconds", 0.3, service="openai")
+        metrics.close()
+
+        # Then
+        records = self.read_records()
+        spans = {record["name"]: record for record in records if record["type"] == "span"}
+        self.assertEqual(["render_figures", "render", "analyze", "document"], [record["name"] for record in records[:-1]])
+        self.assertEqual(spans["document"]["span_id"], spans["render"]["parent_id"])
+        self.assertEqual(spans["render"]["span_id"], spans["render_figures"]["parent_id"])
+        self.assertEqual(spans["document"]["trace_id"], spans["render_figures"]["trace_id"])
+        self.assertIsNone(spans["document"]["parent_id"])
+        self.assertEqual("RuntimeError: throttled", spans["analyze"]["error"])
+        self.assertEqual({"figures": 2}, spans["render_figures"]["attributes"])
+
+        snapshot = records[-1]
+        self.assertEqual("metrics", snapshot["type"])
+        counters = {(counter["name"], tuple(counter["labels"].items())): counter["value"] for counter in snapshot["counters"]}
+        self.assertEqual(5, counters[("figures_total", ())])
+        self.assertEqual(1, counters[("span_errors_total", (("span", "analyze"),))])
+        histograms = {(histogram["name"], tuple(histogram["labels"].items())): histogram for histogram in snapshot["histograms"]}
+        request_seconds = histograms[("request_seconds", (("service", "openai"),))]
+        self.assertEqual(1, request_seconds["count"])
+        self.assertEqual([0.25, 0], request_seconds["buckets"][5])
+        self.assertEqual([0.5, 1], request_seconds["buckets"][6])
+        self.assertEqual(1, histograms[("span_seconds", (("span", "document"),))]["count"])
+
+    def test_prometheus_exporter(self):
+        # Given
+        exporter = prometheus_exporter.PrometheusExporter(0)
+        metrics = metrics_instrumentation.MetricsInstrumentation([exporter])
+        metrics.count("documents_total", result="converted")
+        metrics.count("bytes_uploaded_total", 1024, service="document_intelligence")
+        metrics.observe("span_seconds", 2, span="analyze")
+
+        # When
+        try:
+            with urllib.request.urlopen(f"http://127.0.0.1:{exporter.port}/metrics") as response:
+                text = response.read().decode()
+        finally:
+            metrics.close()
+
+        # Then
+        self.assertIn("# TYPE document_converter_documents_total counter\n", text)
+        self.assertIn('document_converter_documents_total{result="converted"} 1\n', text)
+        self.assertIn('document_converter_bytes_uploaded_total{service="document_intelligence"} 1024\n', text)
+        self.assertIn("# TYPE document_converter_span_seconds histogram\n", text)
+        self.assertIn('document_converter_span_seconds_bucket{span="analyze",le="1.0"} 0\n', text)
+        self.assertIn('document_converter_span_seconds_bucket{span="analyze",le="2.5"} 1\n', text)
+        self.assertIn('document_converter_span_seconds_bucket{span="analyze",le="+Inf"} 1\n', text)
+        self.assertIn('document_converter_span_seconds_count{span="analyze"} 1\n', text)
+
+    def test_convert_service_spans(self):
+        # Given
+        source_dir = pathlib.Path(self.tempdir.name) / "source"
+        output_dir = pathlib.Path(self.tempdir.name) / "output"
+        source_dir.mkdir()
+        output_dir.mkdir()
+        (source_dir / "a.pdf").write_bytes(b"a")
+        (source_dir / "broken.pdf").write_bytes(b"x")
+        metrics = metrics_instrumentation.MetricsInstrumentation([json_lines_exporter.JsonLinesExporter(self.log_path)])
+        service = document_convert_service.DocumentConvertService(
+            FakeExtractor(), None, None, None, FakeMdCreator(), instrumentation=metrics
+        )
+
+        # When
+        service.extractDocument(str(source_dir), str(output_dir), max_attempts=2, retry_delay_sec=0.01)
+        metrics.close()
+
+        # Then
+        records = self.read_records()
+        documents = [record for record in records if record.get("name") == "document"]
+        converted = next(record for record in documents if record["attributes"]["document"] == "a.pdf")
+        self.assertEqual(2, converted["attributes"]["pages"])
+        children = sorted(record["name"] for record in records if record.get("parent_id") == converted["span_id"])
+        self.assertEqual(["analyze", "convert", "render"], children)
+
+        broken = [record for record in documents if record["attributes"]["document"] == "broken.pdf"]
+        self.assertEqual([1, 2], [record["attributes"]["attempt"] for record in broken])
+        self.assertTrue(all(record["error"] == "RuntimeError: broken document" for record in broken))
+
+        counters = {tuple(counter["labels"].items()): counter["value"] for counter in records[-1]["counters"] if counter["name"] == "documents_total"}
+        self.assertEqual({(("result", "converted"),): 1, (("result", "failed"),): 1}, counters)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,254 @@
+import os
+import pathlib
+import sys
+import tempfile
+import threading
+import time
+import unittest
+
+sys.path.append(
+    os.path.abspath(
+        os.path.join(
+            os.path.dirname(__file__),
+            '../src'
+        )
+    )
+)
+import src.packages.application.convert_manifest as convert_manifest
+import src.packages.application.document_checkpoint as document_checkpoint
+import src.packages.application.document_convert_service as document_convert_service
+import src.packages.application.lease_work_queue as lease_work_queue
+import src.packages.domain.document_extractor as document_extractor
+import src.packages.domain.md_creator as md_creator
+
+class FakeExtractor(document_extractor.DocumentExtractor):
+    def __init__(self, on_extract=None):
+        self.documents = []
+        self.lock = threading.Lock()
+        self.on_extract = on_extract
+
+    def extract(self, document):
+        time.sleep(0.02)
+        with self.lock:
+            self.documents.append(pathlib.Path(document.name).name)
+        if self.on_extract is not None:
+            self.on_extract()
+        return {"content": document.read().decode()}
+
+class FakePdfGenerator:
+    def __init__(self, on_generate):
+        self.on_generate = on_generate
+
+    def generate(self, document_path, outdir):
+        self.on_generate()
+        (pathlib.Path(outdir) / (pathlib.Path(document_path).stem + ".pdf")).write_bytes(pathlib.Path(document_path).read_bytes())
+
+class FakeMdCreator(md_creator.MdCreator):
+    def create(self, analyze_result, source_pdf_path):
+        return analyze_result["content"]
+
+class TestLeaseWorkQueue(unittest.TestCase):
+    def setUp(self):
+        self.tempdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tempdir.name, "queue.sqlite")
+
+    def tearDown(self):
+        self.tempdir.cleanup()
+
+    def stop_heartbeat(self, work_queue):
+        # The node stops without releasing its leases.
+        work_queue.closed.set()
+        work_queue.heartbeat.join()
+
+    def test_claim_and_release(self):
+        # Given
+        node1 = lease_work_queue.LeaseWorkQueue(self.path, "node-1")
+        node2 = lease_work_queue.LeaseWorkQueue(self.path, "node-2")
+
+        # When
+        claimed_by_node1 = node1.claim("doc")
+        claimed_by_node2 = node2.claim("doc")
+        node1.release("doc")
+        claimed_after_release = node2.claim("doc")
+
+        # Then
+        self.assertTrue(claimed_by_node1)
+        self.assertFalse(claimed_by_node2)
+        self.assertTrue(claimed_after_release)
+        self.assertTrue(node1.is_leased("doc"))
+        node1.close()
+        node2.close()
+        self.assertFalse(lease_work_queue.LeaseWorkQueue(self.path, "node-3").is_leased("doc"))
+
+    def test_lease_expires_without_heartbeat(self):
+        # Given
+        node1 = lease_work_queue.LeaseWorkQueue(self.path, "node-1", lease_sec=0.3)
+        node2 = lease_work_queue.LeaseWorkQueue(self.path, "node-2", lease_sec=0.3)
+        node1.claim("doc")
+        time.sleep(0.5)
+        claimed_while_alive = node2.claim("doc")
+
+        # When
+        self.stop_heartbeat(node1)
+        time.sleep(0.5)
+        claimed_after_stop = node2.claim("doc")
+
+        # Then
+        self.assertFalse(claimed_while_alive)
+        self.assertTrue(claimed_after_stop)
+        node1.renew()
+        self.assertEqual(set(), node1.held)
+        node2.close()
+
+    def test_lose_lease_taken_over(self):
+        # Given
+        node1 = lease_work_queue.LeaseWorkQueue(self.path, "node-1", lease_sec=0.3)
+        node2 = lease_work_queue.LeaseWorkQueue(self.path, "node-2", lease_sec=0.3)
+        node1.claim("doc")
+        self.stop_heartbeat(node1)
+        time.sleep(0.5)
+
+        # When
+        node2.claim("doc")
+
+        # Then
+        self.assertFalse(node1.holds("doc"))
+        self.assertEqual({"doc"}, node1.lost)
+        self.assertTrue(node2.holds("doc"))
+        self.assertFalse(node2.holds("other"))
+        node2.close()
+
+    def take_over(self, output_dir, key):
+        """Let node-0 take over the lease, as if node-1 had not renewed it in time."""
+
+        node0 = lease_work_queue.LeaseWorkQueue(
+            str(output_dir / document_convert_service.DocumentConvertService.WORK_QUEUE_NAME), "node-0"
+        )
+        node0.connection.execute("UPDATE leases SET expires_at = 0 WHERE key = ?", (key,))
+        self.assertTrue(node0.claim(key))
+        self.stop_heartbeat(node0)
+        node0.connection.close()
+
+    def test_drop_document_whose_lease_is_lost(self):
+        # Given
+        source_dir = pathlib.Path(self.tempdir.name) / "source"
+        output_dir = pathlib.Path(self.tempdir.name) / "output"
+        source_dir.mkdir()
+        output_dir.mkdir()
+        (source_dir / "a.pdf").write_bytes(b"a")
+        (source_dir / "b.docx").write_bytes(b"b")
+        keys = {
+            name: document_checkpoint.checkpoint_key(name, convert_manifest.file_sha256(source_dir / name), "config")
+            for name in ["a.pdf", "b.docx"]
+        }
+
+        # a.pdf is taken over while it is analyzed, and b.docx while it is converted to PDF.
+        extractor = FakeExtractor(on_extract=lambda: self.take_over(output_dir, keys["a.pdf"]))
+        pdf_generator = FakePdfGenerator(on_generate=lambda: self.take_over(output_dir, keys["b.docx"]))
+        service = document_convert_service.DocumentConvertService(extractor, pdf_generator, None, None, FakeMdCreator())
+
+        # When
+        report = service.extractDocument(
+            str(source_dir), str(output_dir), config_fingerprint="config", node_id="node-1", lease_sec=60
+        )
+
+        # Then
+        self.assertEqual(["a.pdf"], extractor.documents)
+        self.assertEqual(sorted([str(source_dir / "a.pdf"), str(source_dir / "b.docx")]), sorted(report.dropped))
+        self.assertEqual([], report.converted)
+        self.assertEqual({}, report.failed)
+        self.assertFalse((output_dir / "a.md").exists())
+        manifest = convert_manifest.ConvertManifest(str(output_dir / document_convert_service.DocumentConvertService.MANIFEST_NAME))
+        self.assertEqual({}, manifest.failures)
+        manifest.close()
+
+    def test_convert_sources_of_same_content(self):
+        # Given
+        source_dir = pathlib.Path(self.tempdir.name) / "source"
+        output_dir = pathlib.Path(self.tempdir.name) / "output"
+        source_dir.mkdir()
+        output_dir.mkdir()
+        names = ["a.pdf", "b.pdf", "c.pdf"]
+        for name in names:
+            (source_dir / name).write_bytes(b"same")
+
+        extractor = FakeExtractor()
+        service = document_convert_service.DocumentConvertService(extractor, None, None, None, FakeMdCreator())
+
+        # When
+        report = service.extractDocument(
+            str(source_dir), str(output_dir), config_fingerprint="config", node_id="node-1", render_workers=1
+        )
+
+        # Then
+        self.assertEqual(names, sorted(extractor.documents))
+        self.assertEqual([], report.dropped)
+        self.assertEqual({}, report.failed)
+        self.assertEqual(sorted(str(output_dir / (name.split('.')[0] + ".md")) for name in names), sorted(report.converted))
+
+    def test_nodes_share_documents(self):
+        # Given
+        source_dir = pathlib.Path(self.tempdir.name) / "source"
+        output_dir = pathlib.Path(self.tempdir.name) / "output"
+        source_dir.mkdir()
+        output_dir.mkdir()
+        names = [f"doc{i}" for i in range(8)]
+        for name in names:
+            (source_dir / (name + ".pdf")).write_bytes(name.encode())
+
+        extractor = FakeExtractor()
+        reports = {}
+
+        def convert(node_id):
+            service = document_convert_service.DocumentConvertService(extractor, None, None, None, FakeMdCreator())
+            reports[node_id] = service.extractDocument(
+                str(source_dir), str(output_dir), config_fingerprint="config", node_id=node_id, lease_sec=0.6
+            )
+
+        # When
+        threads = [threading.Thread(target=convert, args=(f"node-{i}",)) for i in range(2)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        # Then
+        self.assertEqual(sorted(name + ".pdf" for name in names), sorted(extractor.documents))
+        converted = reports["node-0"].converted + reports["node-1"].converted
+        self.assertEqual(sorted(str(output_dir / (name + ".md")) for name in names), sorted(converted))
+        for name in names:
+            self.assertEqual(name, (output_dir / (name + ".md")).read_text())
+
+        manifest = convert_manifest.ConvertManifest(str(output_dir / document_convert_service.DocumentConvertService.MANIFEST_NAME))
+        self.assertEqual(set(name + ".pdf" for name in names), set(manifest.entries))
+        manifest.close()
+
+    def test_take_over_document_of_stopped_node(self):
+        # Given
+        source_dir = pathlib.Path(self.tempdir.name) / "source"
+        output_dir = pathlib.Path(self.tempdir.name) / "output"
+        source_dir.mkdir()
+        output_dir.mkdir()
+        (source_dir / "a.pdf").write_bytes(b"a")
+
+        key = document_checkpoint.checkpoint_key("a.pdf", convert_manifest.file_sha256(source_dir / "a.pdf"), "config")
+        stopped_node = lease_work_queue.LeaseWorkQueue(
+            str(output_dir / document_convert_service.DocumentConvertService.WORK_QUEUE_NAME), "node-0", lease_sec=0.3
+        )
+        stopped_node.claim(key)
+        self.stop_heartbeat(stopped_node)
+
+        extractor = FakeExtractor()
+        service = document_convert_service.DocumentConvertService(extractor, None, None, None, FakeMdCreator())
+
+        # When
+        report = service.extractDocument(
+            str(source_dir), str(output_dir), config_fingerprint="config", node_id="node-1", lease_sec=0.3
+        )
+
+        # Then
+        self.assertEqual(["a.pdf"], extractor.documents)
+        self.assertEqual([str(output_dir / "a.md")], report.converted)
+
+if __name__ == '__main__':
+    unittest.main()
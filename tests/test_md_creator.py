@@ -15,6 +15,7 @@ sys.path.append(
     )
 )
 import src.packages.domain.document_intelligence_md_creator as document_intelligence_md_creator
+import src.packages.domain.figure_classifier as figure_classifier
 import src.packages.domain.image_extractor as image_extractor
 import src.packages.domain.image_summarizer as image_summarizer
 
@@ -22,7 +23,9 @@ class TestMdCreator(unittest.TestCase):
     def setUp(self):
         self.maxDiff = None
         self.img_extractor = MagicMock(spec=image_extractor.ImageExtractor)
+        self.img_extractor.open.return_value.__enter__.return_value.render_all.return_value = [b"image_data"]
         self.img_summarizer = MagicMock(spec=image_summarizer.ImageSummarizer)
+        self.img_summarizer.summarize_many.side_effect = lambda imgs: [self.img_summarizer.summarize(img) for img in imgs]
         self.document_intelligence_md_creator = document_intelligence_md_creator.DocumentIntelligenceMdCreator(self.img_extractor, self.img_summarizer)
 
     def test_create(self):
@@ -103,5 +106,162 @@ Learn how to accelerate your business processes by automating text extraction wi
         # Then
         self.assertEqual(expect_md_str, context)
 
+    def test_create_renders_figures_in_one_session(self):
+        # Given
+        with open("tests/fixtures/sample_document_intelligence_result.json") as json_test_data:
+            analyze_result_as_dict = AnalyzeResult(json.load(json_test_data)).as_dict()
+
+        session = self.img_extractor.open.return_value.__enter__.return_value
+        session.render_all.return_value = [b"rendered_image_data"]
+        self.img_summarizer.summarize.return_value = "summarized_text"
+
+        # When
+        self.document_intelligence_md_creator.create(analyze_result_as_dict, "dummy_path.pdf")
+
+        # Then
+        self.img_extractor.open.assert_called_once_with("dummy_path.pdf")
+        session.render_all.assert_called_once()
+        regions = session.render_all.call_args.args[0]
+        self.assertEqual(1, len(regions))
+        self.assertEqual(1, regions[0][0])
+        self.img_extractor.extract.assert_not_called()
+        self.img_summarizer.summarize.assert_called_once_with(b"rendered_image_data")
+
+    def test_create_chunks(self):
+        # Given
+        with open("tests/fixtures/sample_document_intelligence_result.json") as json_test_data:
+            analyze_result_as_dict = AnalyzeResult(json.load(json_test_data)).as_dict()
+
+        self.img_summarizer.summarize.return_value = "summarized_text"
+
+        # When
+        chunks = list(self.document_intelligence_md_creator.create_chunks(analyze_result_as_dict, "dummy_path.pdf"))
+
+        # Then
+        self.assertGreater(len(chunks), 1)
+        self.assertTrue(chunks[0].startswith('# This is title'))
+        self.assertEqual(
+            self.document_intelligence_md_creator.create(analyze_result_as_dict, "dummy_path.pdf"),
+            ''.join(chunks)
+        )
+
+    def test_create_resolves_referenced_elements_only(self):
+        # Given
+        analyze_result = {
+            "paragraphs": [
+                {"content": "Title", "role": "title"},
+                {"content": "Not referenced and without bounding regions"},
+                {"content": "Body"}
+            ],
+            "tables": [{"cells": [
+                {"kind": "columnHeader", "rowIndex": 0, "columnIndex": 0, "columnSpan": 2, "content": "H"},
+                {"rowIndex": 1, "columnIndex": 0, "rowSpan": 2, "content": "A"},
+                {"rowIndex": 1, "columnIndex": 1, "content": "B"}
+            ]}],
+            "sections": [{"elements": ["/paragraphs/0", "/sections/1"]}, {"elements": ["/tables/0", "/paragraphs/2"]}]
+        }
+
+        # When
+        context = self.document_intelligence_md_creator.create(analyze_result, "dummy_path.pdf")
+
+        # Then
+        self.assertEqual(
+            '# Title\n<table>\n<tr>\n<th colspan="2">H</th>\n</tr>\n<tr>\n<td rowspan="2">A</td>\n<td>B</td>\n</tr>\n</table>\n\nBody\n',
+            context
+        )
+        self.img_extractor.open.assert_not_called()
+
+    def test_create_chunks_with_stored_figure_summaries(self):
+        # Given
+        with open("tests/fixtures/sample_document_intelligence_result.json") as json_test_data:
+            analyze_result_as_dict = AnalyzeResult(json.load(json_test_data)).as_dict()
+
+        stored = {0: "stored_summary"}
+
+        # When
+        context = ''.join(self.document_intelligence_md_creator.create_chunks(analyze_result_as_dict, "dummy_path.pdf", stored))
+
+        # Then
+        self.assertIn('(stored_summary)', context)
+        self.img_extractor.open.assert_not_called()
+        self.img_summarizer.summarize.assert_not_called()
+
+    def test_create_chunks_skips_small_figures(self):
+        # Given
+        with open("tests/fixtures/sample_document_intelligence_result.json") as json_test_data:
+            analyze_result_as_dict = AnalyzeResult(json.load(json_test_data)).as_dict()
+
+        # The figure of the fixture is 224 x 140 points.
+        classifier = figure_classifier.FigureClassifier(min_edge_pt=150)
+        md_creator = document_intelligence_md_creator.DocumentIntelligenceMdCreator(
+            self.img_extractor, self.img_summarizer, figure_classifier=classifier
+        )
+        skipped = {}
+
+        # When
+        context = ''.join(md_creator.create_chunks(analyze_result_as_dict, "dummy_path.pdf", {}, skipped))
+
+        # Then
+        self.assertEqual({0: "small"}, skipped)
+        self.assertNotIn("画像情報", context)
+        self.assertIn("Figure 1: Here is a figure with text", context)
+        self.img_extractor.open.assert_not_called()
+        self.img_summarizer.summarize_many.assert_not_called()
+
+    def test_create_chunks_summarizes_trivial_images_with_template(self):
+        # Given
+        with open("tests/fixtures/sample_document_intelligence_result.json") as json_test_data:
+            analyze_result_as_dict = AnalyzeResult(json.load(json_test_data)).as_dict()
+
+        classifier = MagicMock(spec=figure_classifier.FigureClassifier)
+        classifier.classify_region.return_value = None
+        classifier.checks_image.return_value = True
+        classifier.classify_image.return_value = "uniform"
+        classifier.skipped_summary = "decoration"
+        md_creator = document_intelligence_md_creator.DocumentIntelligenceMdCreator(
+            self.img_extractor, self.img_summarizer, figure_classifier=classifier
+        )
+        stored = {}
+        skipped = {}
+
+        # When
+        context = ''.join(md_creator.create_chunks(analyze_result_as_dict, "dummy_path.pdf", stored, skipped))
+
+        # Then
+        self.assertEqual({0: "uniform"}, skipped)
+        self.assertIn("(decoration)", context)
+        self.assertEqual({}, stored)
+        classifier.classify_image.assert_called_once_with(b"image_data")
+        self.img_summarizer.summarize_many.assert_not_called()
+
+    def test_create_chunks_summarizes_figures_ahead_of_sections(self):
+        # Given
+        figure = {"boundingRegions": [{"pageNumber": 1, "polygon": [1, 1, 3, 1, 3, 2, 1, 2]}]}
+        analyze_result = {
+            "paragraphs": [{"content": f"Section {idx}"} for idx in range(3)],
+            "figures": [figure, figure, figure, figure],
+            "sections": [{"elements": [f"/paragraphs/{idx}", f"/figures/{idx}"]} for idx in range(3)]
+        }
+        session = self.img_extractor.open.return_value.__enter__.return_value
+        session.render_all.side_effect = lambda regions: [b"image_data"] * len(regions)
+        self.img_summarizer.summarize.return_value = "summarized_text"
+        self.document_intelligence_md_creator.FIGURE_SUMMARY_BATCH_SIZE = 2
+        stored = {}
+
+        # When
+        chunks = self.document_intelligence_md_creator.create_chunks(analyze_result, "dummy_path.pdf", stored)
+        first_chunk = next(chunks)
+        rendered_before_first_chunk = [len(call.args[0]) for call in session.render_all.call_args_list]
+        rest = list(chunks)
+
+        # Then
+        self.assertIn("Section 0", first_chunk)
+        self.assertIn("(summarized_text)", first_chunk)
+        self.assertEqual([2], rendered_before_first_chunk)
+        self.assertEqual([2, 1], [len(call.args[0]) for call in session.render_all.call_args_list])
+        self.assertEqual(2, len(rest))
+        self.assertEqual({0, 1, 2}, set(stored))
+        self.img_extractor.open.assert_called_once_with("dummy_path.pdf")
+
 if __name__ == '__main__':
     unittest.main()
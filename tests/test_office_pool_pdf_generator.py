@@ -0,0 +1,143 @@
+import os
+import pathlib
+import subprocess
+import sys
+import tempfile
+import time
+import unittest
+from unittest import mock
+
+sys.path.append(
+    os.path.abspath(
+        os.path.join(
+            os.path.dirname(__file__),
+            '../src'
+        )
+    )
+)
+import src.packages.infrastructure.office_pool_pdf_generator as office_pool_pdf_generator
+from tests.fakes.fake_uno import FakeUno, is_alive
+
+class TestOfficePoolPdfGenerator(unittest.TestCase):
+    def setUp(self):
+        self.fake_uno = FakeUno().__enter__()
+        self.tempdir = tempfile.TemporaryDirectory()
+        self.source_dir = pathlib.Path(self.tempdir.name) / "source"
+        self.outdir = pathlib.Path(self.tempdir.name) / "out"
+        self.source_dir.mkdir()
+        self.outdir.mkdir()
+        for name in ["doc0.docx", "doc1.docx", "hang.docx", "unreadable.docx"]:
+            (self.source_dir / name).write_bytes(b"docx")
+
+        self.generators = []
+
+    def tearDown(self):
+        for generator in self.generators:
+            generator.close()
+        self.fake_uno.__exit__(None, None, None)
+        self.tempdir.cleanup()
+
+    def create(self, **kwargs):
+        generator = office_pool_pdf_generator.OfficePoolPdfGenerator(startup_timeout_sec=10, **kwargs)
+        self.generators.append(generator)
+        return generator
+
+    def source(self, name):
+        return str(self.source_dir / name)
+
+    def test_generate(self):
+        # Given
+        generator = self.create(pool_size=1)
+
+        # When
+        generator.generate(self.source("doc0.docx"), str(self.outdir))
+        generator.generate(self.source("doc1.docx"), str(self.outdir))
+
+        # Then
+        self.assertTrue((self.outdir / "doc0.pdf").exists())
+        self.assertTrue((self.outdir / "doc1.pdf").exists())
+        self.assertEqual(1, self.fake_uno.started())
+        self.assertEqual(["doc0.docx", "doc1.docx"], self.fake_uno.desktops[0].loaded)
+
+    def test_timeout_of_conversion(self):
+        # Given
+        generator = self.create(pool_size=1, document_timeout_sec=0.5)
+
+        # When
+        started_at = time.monotonic()
+        with self.assertRaises(subprocess.TimeoutExpired):
+            generator.generate(self.source("hang.docx"), str(self.outdir))
+        elapsed = time.monotonic() - started_at
+        failures = generator.generate_many([self.source("unreadable.docx"), self.source("hang.docx")], str(self.outdir), timeout_sec=0.5)
+
+        # Then
+        self.assertLess(elapsed, 5)
+        self.assertEqual([self.source("unreadable.docx"), self.source("hang.docx")], list(failures))
+        self.assertIn("could not open", failures[self.source("unreadable.docx")])
+        self.assertIn("timed out", failures[self.source("hang.docx")])
+
+    def test_restart_hung_instance(self):
+        # Given
+        generator = self.create(pool_size=1, document_timeout_sec=0.5)
+        with self.assertRaises(subprocess.TimeoutExpired):
+            generator.generate(self.source("hang.docx"), str(self.outdir))
+        hung = self.fake_uno.desktops[0]
+
+        # When
+        generator.generate(self.source("doc0.docx"), str(self.outdir))
+
+        # Then
+        self.assertFalse(is_alive(hung.pid))
+        self.assertEqual(2, self.fake_uno.started())
+        self.assertEqual(["doc0.docx"], self.fake_uno.desktops[1].loaded)
+        self.assertTrue((self.outdir / "doc0.pdf").exists())
+
+    def test_replace_unhealthy_instance(self):
+        # Given
+        generator = self.create(pool_size=1)
+        generator.generate(self.source("doc0.docx"), str(self.outdir))
+        unhealthy = self.fake_uno.desktops[0]
+        unhealthy.healthy = False
+
+        # When
+        generator.generate(self.source("doc1.docx"), str(self.outdir))
+
+        # Then
+        self.assertFalse(is_alive(unhealthy.pid))
+        self.assertEqual(2, self.fake_uno.started())
+        self.assertEqual(["doc0.docx"], unhealthy.loaded)
+        self.assertEqual(["doc1.docx"], self.fake_uno.desktops[1].loaded)
+
+    def test_restart_after_max_documents(self):
+        # Given
+        generator = self.create(pool_size=1, max_documents_per_instance=1)
+
+        # When
+        generator.generate(self.source("doc0.docx"), str(self.outdir))
+        generator.generate(self.source("doc1.docx"), str(self.outdir))
+
+        # Then
+        self.assertEqual(2, self.fake_uno.started())
+        self.assertFalse(is_alive(self.fake_uno.desktops[0].pid))
+
+    def test_close_pool_on_exit(self):
+        # Given
+        with mock.patch.object(office_pool_pdf_generator.atexit, "register") as register:
+            generator = self.create(pool_size=2)
+        failures = generator.generate_many([self.source("doc0.docx"), self.source("doc1.docx")], str(self.outdir), parallelism=2)
+        profile_dirs = [instance.profile_dir for instance in generator.instances if instance.profile_dir is not None]
+        running = [desktop.pid for desktop in self.fake_uno.desktops if is_alive(desktop.pid)]
+
+        # When
+        register.assert_called_once_with(generator.close)
+        register.call_args.args[0]()
+
+        # Then
+        self.assertEqual({}, failures)
+        self.assertEqual(len(profile_dirs), len(running))
+        self.assertTrue(all(not is_alive(pid) for pid in running))
+        self.assertTrue(all(not pathlib.Path(profile_dir).exists() for profile_dir in profile_dirs))
+        self.assertTrue(all(instance.process is None for instance in generator.instances))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,84 @@
+import os
+import pathlib
+import sys
+import tempfile
+import unittest
+
+sys.path.append(
+    os.path.abspath(
+        os.path.join(
+            os.path.dirname(__file__),
+            '../src'
+        )
+    )
+)
+import src.packages.domain.pdf_generator as pdf_generator
+
+# Stand-in for soffice. It writes a PDF for each document and gives up at a document named "broken".
+FAKE_SOFFICE = '''#!/usr/bin/env python3
+import pathlib
+import sys
+
+args = sys.argv[1:]
+outdir = args[args.index("--outdir") + 1]
+documents = args[args.index("pdf") + 1:args.index("--outdir")]
+with open(pathlib.Path(outdir) / "calls.log", "a") as log:
+    log.write(" ".join(pathlib.Path(document).name for document in documents) + "\\n")
+for document in documents:
+    if pathlib.Path(document).stem == "broken":
+        sys.exit(1)
+    (pathlib.Path(outdir) / (pathlib.Path(document).stem + ".pdf")).write_bytes(b"%PDF-1.4")
+'''
+
+class TestPdfGenerator(unittest.TestCase):
+    def setUp(self):
+        self.tempdir = tempfile.TemporaryDirectory()
+        bindir = pathlib.Path(self.tempdir.name) / "bin"
+        bindir.mkdir()
+        soffice = bindir / "soffice"
+        soffice.write_text(FAKE_SOFFICE)
+        soffice.chmod(0o755)
+        self.path = os.environ["PATH"]
+        os.environ["PATH"] = str(bindir) + os.pathsep + self.path
+
+        self.outdir = pathlib.Path(self.tempdir.name) / "out"
+        self.outdir.mkdir()
+
+    def tearDown(self):
+        os.environ["PATH"] = self.path
+        self.tempdir.cleanup()
+
+    def test_generate_many(self):
+        # Given
+        documents = [f"source/doc{i}.docx" for i in range(5)]
+
+        # When
+        failures = pdf_generator.PdfGenerator().generate_many(documents, str(self.outdir), chunk_size=2)
+
+        # Then
+        self.assertEqual({}, failures)
+        self.assertEqual(
+            ["doc0.docx doc1.docx", "doc2.docx doc3.docx", "doc4.docx"],
+            (self.outdir / "calls.log").read_text().splitlines()
+        )
+        for i in range(5):
+            self.assertTrue((self.outdir / f"doc{i}.pdf").exists())
+
+    def test_generate_many_with_broken_document(self):
+        # Given
+        documents = ["source/doc0.docx", "source/broken.docx", "source/doc2.docx"]
+
+        # When
+        failures = pdf_generator.PdfGenerator().generate_many(documents, str(self.outdir), chunk_size=3)
+
+        # Then
+        self.assertEqual(["source/broken.docx"], list(failures))
+        self.assertEqual(
+            ["doc0.docx broken.docx doc2.docx", "broken.docx", "doc2.docx"],
+            (self.outdir / "calls.log").read_text().splitlines()
+        )
+        self.assertTrue((self.outdir / "doc0.pdf").exists())
+        self.assertTrue((self.outdir / "doc2.pdf").exists())
+
+if __name__ == '__main__':
+    unittest.main()
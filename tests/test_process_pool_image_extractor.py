@@ -0,0 +1,64 @@
+import os
+import sys
+import tempfile
+import unittest
+
+import fitz
+
+sys.path.append(
+    os.path.abspath(
+        os.path.join(
+            os.path.dirname(__file__),
+            '../src'
+        )
+    )
+)
+import src.packages.domain.image_extractor as image_extractor
+import src.packages.infrastructure.process_pool_image_extractor as process_pool_image_extractor
+
+class TestProcessPoolImageExtractor(unittest.TestCase):
+    def setUp(self):
+        self.tempdir = tempfile.TemporaryDirectory()
+        self.pdf_path = os.path.join(self.tempdir.name, "figures.pdf")
+        with fitz.open() as doc:
+            for i in range(6):
+                page = doc.new_page()
+                page.draw_rect(fitz.Rect(50, 50, 250, 150), color=(0, 0, 0), fill=(i / 6, 0.5, 0.2))
+                page.insert_text((60, 100), f"figure {i + 1}")
+            doc.save(self.pdf_path)
+
+        self.extractor = process_pool_image_extractor.ProcessPoolImageExtractor(max_workers=2)
+
+    def tearDown(self):
+        self.extractor.close()
+        self.tempdir.cleanup()
+
+    def test_render_all_in_processes(self):
+        # Given
+        regions = [(page_number, [40, 40, 260, 160]) for page_number in [6, 1, 3, 2, 5, 4, 1, 2, 3]]
+
+        # When
+        with self.extractor.open(self.pdf_path) as session:
+            images = session.render_all(regions)
+
+        # Then
+        with image_extractor.ImageExtractor().open(self.pdf_path) as session:
+            expected = session.render_all(regions)
+        self.assertEqual(expected, images)
+        self.assertIsNotNone(self.extractor.executor)
+
+    def test_render_few_regions_in_this_process(self):
+        # Given
+        regions = [(1, [40, 40, 260, 160]), (2, [40, 40, 260, 160])]
+
+        # When
+        with self.extractor.open(self.pdf_path) as session:
+            images = session.render_all(regions)
+
+        # Then
+        self.assertEqual(2, len(images))
+        self.assertTrue(all(image is not None for image in images))
+        self.assertIsNone(self.extractor.executor)
+
+if __name__ == '__main__':
+    unittest.main()
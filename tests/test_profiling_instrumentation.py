@@ -0,0 +1,105 @@
+import csv
+import os
+import pathlib
+import pstats
+import sys
+import tempfile
+import time
+import unittest
+
+sys.path.append(
+    os.path.abspath(
+        os.path.join(
+            os.path.dirname(__file__),
+            '../src'
+        )
+    )
+)
+import src.packages.domain.document_extractor as document_extractor
+import src.packages.domain.md_creator as md_creator
+import src.packages.infrastructure.profiling_instrumentation as profiling_instrumentation
+import src.packages.presentation.document_convert_controller as document_convert_controller
+
+class FakeExtractor(document_extractor.DocumentExtractor):
+    def extract(self, document):
+        return {"content": document.read().decode(), "pages": [{}] * 3}
+
+class FakeMdCreator(md_creator.MdCreator):
+    def __init__(self, instrumentation):
+        self.instrumentation = instrumentation
+
+    def create(self, analyze_result, source_pdf_path):
+        self.instrumentation.count("tables_total", 2)
+        return self.render_tables(analyze_result["content"])
+
+    def render_tables(self, content):
+        # Busy for a while, so that the render stage is sampled.
+        deadline = time.thread_time() + 0.05
+        rows = []
+        while time.thread_time() < deadline:
+            rows.append("<tr><td>" + content + "</td></tr>")
+        return content
+
+class TestProfilingInstrumentation(unittest.TestCase):
+    def setUp(self):
+        self.tempdir = tempfile.TemporaryDirectory()
+        self.source_dir = pathlib.Path(self.tempdir.name) / "source"
+        self.output_dir = pathlib.Path(self.tempdir.name) / "output"
+        self.profile_dir = self.output_dir / ".profile"
+        self.source_dir.mkdir()
+        (self.source_dir / "a.pdf").write_bytes(b"a")
+        (self.source_dir / "b.pdf").write_bytes(b"b")
+
+    def tearDown(self):
+        self.tempdir.cleanup()
+
+    def convert(self, mode):
+        profiler = profiling_instrumentation.ProfilingInstrumentation(mode, sample_interval_sec=0.002)
+        # The controller checks the class of the service, which it imports from 'packages' instead of 'src.packages'.
+        service = document_convert_controller.DocumentConvertService(
+            FakeExtractor(), None, None, None, FakeMdCreator(profiler), instrumentation=profiler
+        )
+        controller = document_convert_controller.DocumentConvertController(service, profiler)
+        controller.batch_convert_local_files(str(self.source_dir), str(self.output_dir), profile_dir=str(self.profile_dir))
+
+    def read_documents(self):
+        with open(self.profile_dir / "documents.csv", encoding="utf-8", newline="") as file:
+            return list(csv.DictReader(file))
+
+    def test_sampling_profile(self):
+        # When
+        self.convert("sampling")
+
+        # Then
+        with open(self.profile_dir / "profile.folded", encoding="utf-8") as file:
+            stacks = [line.rsplit(" ", 1) for line in file.read().splitlines()]
+        render_samples = sum(int(count) for stack, count in stacks if stack.startswith("render;"))
+        self.assertGreater(render_samples, 0)
+        self.assertTrue(any("render_tables (test_profiling_instrumentation.py:" in stack for stack, _ in stacks))
+
+        documents = self.read_documents()
+        self.assertEqual(["a.pdf", "b.pdf"], sorted(row["document"] for row in documents))
+        for row in documents:
+            self.assertEqual("converted", row["result"])
+            self.assertEqual("3", row["pages"])
+            self.assertEqual("2", row["tables"])
+            self.assertGreaterEqual(float(row["render_sec"]), 0.05)
+            self.assertGreaterEqual(float(row["cpu_sec"]), 0.05)
+            self.assertGreaterEqual(float(row["total_sec"]), float(row["render_sec"]))
+
+        self.assertTrue((self.profile_dir / "tracemalloc_render.txt").exists())
+
+    def test_cprofile_profile(self):
+        # When
+        self.convert("cprofile")
+
+        # Then
+        stats = pstats.Stats(str(self.profile_dir / "cprofile_render.prof"))
+        functions = {function_name for _, _, function_name in stats.stats}
+        self.assertIn("render_tables", functions)
+        self.assertIn("render_tables", (self.profile_dir / "cprofile.txt").read_text(encoding="utf-8"))
+        self.assertFalse((self.profile_dir / "profile.folded").exists())
+        self.assertEqual(2, len(self.read_documents()))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,218 @@
+from concurrent.futures import Future
+import io
+import os
+import sys
+import time
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+sys.path.append(
+    os.path.abspath(
+        os.path.join(
+            os.path.dirname(__file__),
+            '../src'
+        )
+    )
+)
+import src.packages.domain.document_extractor as document_extractor
+import src.packages.infrastructure.rate_limited_document_extractor as rate_limited_document_extractor
+import src.packages.infrastructure.rate_limiter as rate_limiter
+
+class FakeClock:
+    """Clock which advances only when told to."""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+    def advance(self, seconds):
+        self.now += seconds
+
+class FakeServiceHandler(BaseHTTPRequestHandler):
+    """Throttle the first requests of the server, and then accept requests."""
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers["Content-Length"]))
+        with self.server.lock:
+            self.server.requests += 1
+            throttled = self.server.requests <= self.server.throttled_requests
+
+        if throttled:
+            self.send_response(429)
+            self.send_header("retry-after-ms", "100")
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+
+        body = self.server.status_body
+        self.send_response(self.server.status_code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+class HttpDocumentExtractor(document_extractor.DocumentExtractor):
+    def __init__(self, url):
+        self.url = url
+
+    def extract(self, document):
+        response = requests.post(self.url, data=document.read())
+        response.raise_for_status()
+        return response.json()
+
+class ThrottledPollError(Exception):
+    status_code = 429
+
+class PollingDocumentExtractor(HttpDocumentExtractor):
+    """Submit document, and fail to poll the result because the service throttles polls."""
+
+    def begin_extract(self, document):
+        self.extract(document)
+        future = Future()
+        future.set_exception(ThrottledPollError())
+        return future
+
+class TestRateLimiter(unittest.TestCase):
+    def setUp(self):
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), FakeServiceHandler)
+        self.server.lock = threading.Lock()
+        self.server.requests = 0
+        self.server.throttled_requests = 0
+        self.server.status_code = 200
+        self.server.status_body = b'{"content": "extracted"}'
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}/analyze"
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_retry_throttled_requests(self):
+        # Given
+        self.server.throttled_requests = 2
+        limiter = rate_limiter.AdaptiveRateLimiter(max_rate_per_sec=100, burst=1, decrease_interval_sec=0)
+        extractor = rate_limited_document_extractor.RateLimitedDocumentExtractor(
+            HttpDocumentExtractor(self.url), limiter, rate_limiter.RetryPolicy(max_retries=3, base_delay_sec=0.01)
+        )
+
+        # When
+        started_at = time.monotonic()
+        result = extractor.extract(io.BytesIO(b"document"))
+        elapsed = time.monotonic() - started_at
+
+        # Then
+        self.assertEqual({"content": "extracted"}, result)
+        self.assertEqual(3, self.server.requests)
+        self.assertGreaterEqual(elapsed, 0.2)
+        self.assertLess(limiter.rate_per_sec, 100)
+
+    def test_give_up_after_max_retries(self):
+        # Given
+        self.server.throttled_requests = 10
+        limiter = rate_limiter.AdaptiveRateLimiter(max_rate_per_sec=100, burst=1)
+        extractor = rate_limited_document_extractor.RateLimitedDocumentExtractor(
+            HttpDocumentExtractor(self.url), limiter, rate_limiter.RetryPolicy(max_retries=1, base_delay_sec=0.01)
+        )
+
+        # When
+        with self.assertRaises(requests.HTTPError):
+            extractor.extract(io.BytesIO(b"document"))
+
+        # Then
+        self.assertEqual(2, self.server.requests)
+
+    def test_do_not_retry_client_error(self):
+        # Given
+        self.server.status_code = 400
+        self.server.status_body = b'{}'
+        limiter = rate_limiter.AdaptiveRateLimiter(max_rate_per_sec=100, burst=1)
+        extractor = rate_limited_document_extractor.RateLimitedDocumentExtractor(
+            HttpDocumentExtractor(self.url), limiter, rate_limiter.RetryPolicy(max_retries=3)
+        )
+
+        # When
+        with self.assertRaises(requests.HTTPError):
+            extractor.extract(io.BytesIO(b"document"))
+
+        # Then
+        self.assertEqual(1, self.server.requests)
+
+    def test_do_not_resubmit_on_failed_poll(self):
+        # Given
+        limiter = rate_limiter.AdaptiveRateLimiter(max_rate_per_sec=100, burst=1)
+        extractor = rate_limited_document_extractor.RateLimitedDocumentExtractor(
+            PollingDocumentExtractor(self.url), limiter, rate_limiter.RetryPolicy(max_retries=3, base_delay_sec=0.01)
+        )
+
+        # When
+        with self.assertRaises(ThrottledPollError):
+            extractor.extract(io.BytesIO(b"document"))
+
+        # Then
+        self.assertEqual(1, self.server.requests)
+
+    def test_rate_shared_by_threads(self):
+        # Given
+        # Ticks of 1/64 second are exact in binary, so each tick refills exactly one token.
+        clock = FakeClock()
+        limiter = rate_limiter.AdaptiveRateLimiter(max_rate_per_sec=64, burst=1, clock=clock)
+        acquired = []
+        lock = threading.Lock()
+
+        def acquire():
+            for _ in range(5):
+                limiter.acquire()
+                with lock:
+                    acquired.append(clock())
+
+        threads = [threading.Thread(target=acquire) for _ in range(4)]
+
+        # When
+        for thread in threads:
+            thread.start()
+        counts = [self.wait_for_count(acquired, 1)]
+        for tick in range(19):
+            clock.advance(1 / 64)
+            counts.append(self.wait_for_count(acquired, tick + 2))
+        for thread in threads:
+            thread.join()
+
+        # Then: one token at start and one for each tick, never more
+        self.assertEqual(list(range(1, 21)), counts)
+        self.assertEqual([tick / 64 for tick in range(20)], sorted(acquired))
+        self.assertEqual(0, limiter.tokens)
+
+    def wait_for_count(self, acquired, count):
+        """Wait until count tokens are taken, and get the number of tokens taken a little later."""
+
+        for _ in range(500):
+            if len(acquired) >= count:
+                break
+            time.sleep(0.01)
+        time.sleep(0.05)
+        return len(acquired)
+
+    def test_adapt_rate(self):
+        # Given
+        limiter = rate_limiter.AdaptiveRateLimiter(max_rate_per_sec=10, burst=1, increase_per_success=1, decrease_interval_sec=0)
+
+        # When
+        limiter.on_throttled()
+        throttled_rate = limiter.rate_per_sec
+        for _ in range(10):
+            limiter.on_success()
+
+        # Then
+        self.assertEqual(5, throttled_rate)
+        self.assertEqual(10, limiter.rate_per_sec)
+
+if __name__ == '__main__':
+    unittest.main()
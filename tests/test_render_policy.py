@@ -0,0 +1,67 @@
+import os
+import sys
+import unittest
+
+import fitz
+
+sys.path.append(
+    os.path.abspath(
+        os.path.join(
+            os.path.dirname(__file__),
+            '../src'
+        )
+    )
+)
+import src.packages.domain.image_summarizer as image_summarizer
+import src.packages.domain.render_policy as render_policy
+
+class TestRenderPolicy(unittest.TestCase):
+    def test_dpi_of_small_figure(self):
+        # Given
+        policy = render_policy.RenderPolicy(max_dpi=300, max_edge_px=2048, max_pixels=2048 * 768)
+
+        # When
+        dpi = policy.dpi([0, 0, 72, 72])
+
+        # Then
+        self.assertEqual(300, dpi)
+
+    def test_dpi_limited_by_edge(self):
+        # Given
+        policy = render_policy.RenderPolicy(max_dpi=300, max_edge_px=1000, max_pixels=None)
+
+        # When
+        dpi = policy.dpi([0, 0, 720, 144])
+
+        # Then
+        self.assertAlmostEqual(100, dpi)
+
+    def test_dpi_limited_by_pixels(self):
+        # Given
+        policy = render_policy.RenderPolicy(max_dpi=300, max_edge_px=None, max_pixels=200 * 200)
+
+        # When
+        dpi = policy.dpi([0, 0, 144, 144])
+
+        # Then
+        self.assertAlmostEqual(100, dpi)
+
+    def test_encode(self):
+        # Given
+        pix = fitz.Pixmap(fitz.csRGB, fitz.IRect(0, 0, 16, 16), False)
+        pix.clear_with(200)
+
+        # When
+        png = render_policy.RenderPolicy(image_format="png").encode(pix)
+        jpeg = render_policy.RenderPolicy(image_format="jpeg", quality=50).encode(pix)
+
+        # Then
+        self.assertEqual("image/png", image_summarizer.image_mime_type(png))
+        self.assertEqual("image/jpeg", image_summarizer.image_mime_type(jpeg))
+
+    def test_invalid_format(self):
+        with self.assertRaises(ValueError):
+            render_policy.RenderPolicy(image_format="gif")
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,105 @@
+import io
+import os
+import sys
+import threading
+import unittest
+
+import fitz
+
+sys.path.append(
+    os.path.abspath(
+        os.path.join(
+            os.path.dirname(__file__),
+            '../src'
+        )
+    )
+)
+import src.packages.domain.document_extractor as document_extractor
+import src.packages.infrastructure.sharding_document_extractor as sharding_document_extractor
+
+def create_pdf(page_count):
+    with fitz.open() as doc:
+        for i in range(page_count):
+            doc.new_page().insert_text((72, 72), f"page {i + 1}")
+        return doc.tobytes()
+
+class FakePageExtractor(document_extractor.DocumentExtractor):
+    """Return a paragraph and a figure for each page, like a result of the service."""
+
+    def __init__(self):
+        self.page_counts = []
+        self.lock = threading.Lock()
+
+    def extract(self, document):
+        with fitz.open(stream=document.read(), filetype="pdf") as doc:
+            texts = [page.get_text().strip() + " é" for page in doc]
+        with self.lock:
+            self.page_counts.append(len(texts))
+
+        content = ""
+        paragraphs = []
+        figures = []
+        for i, text in enumerate(texts):
+            paragraphs.append({
+                "content": text,
+                "spans": [{"offset": len(content), "length": len(text)}],
+                "boundingRegions": [{"pageNumber": i + 1, "polygon": [0, 0, 1, 0, 1, 1, 0, 1]}]
+            })
+            figures.append({
+                "id": f"{i + 1}.1",
+                "boundingRegions": [{"pageNumber": i + 1, "polygon": [0, 0, 1, 0, 1, 1, 0, 1]}],
+                "elements": [f"/paragraphs/{i}"]
+            })
+            content += text + "\n"
+
+        return {
+            "modelId": "prebuilt-layout",
+            "content": content,
+            "pages": [{"pageNumber": i + 1, "words": [{"content": "page", "span": {"offset": 0, "length": 4}}]} for i in range(len(texts))],
+            "paragraphs": paragraphs,
+            "figures": figures,
+            "sections": [
+                {"elements": ["/sections/1"]},
+                {"elements": [f"/paragraphs/{i}" for i in range(len(texts))] + [f"/figures/{i}" for i in range(len(texts))]}
+            ]
+        }
+
+class TestShardingDocumentExtractor(unittest.TestCase):
+    def test_extract_in_shards(self):
+        # Given
+        inner = FakePageExtractor()
+        extractor = sharding_document_extractor.ShardingDocumentExtractor(inner, pages_per_shard=2, max_workers=2)
+
+        # When
+        result = extractor.extract(io.BytesIO(create_pdf(5)))
+
+        # Then
+        self.assertEqual([1, 2, 2], sorted(inner.page_counts))
+        self.assertEqual("prebuilt-layout", result["modelId"])
+        self.assertEqual([f"page {i} é" for i in range(1, 6)], [p["content"] for p in result["paragraphs"]])
+        self.assertEqual([1, 2, 3, 4, 5], [p["boundingRegions"][0]["pageNumber"] for p in result["paragraphs"]])
+        self.assertEqual([1, 2, 3, 4, 5], [p["pageNumber"] for p in result["pages"]])
+        self.assertEqual(["1.1", "2.1", "3.1", "4.1", "5.1"], [f["id"] for f in result["figures"]])
+        self.assertEqual([f"/paragraphs/{i}" for i in range(5)], [f["elements"][0] for f in result["figures"]])
+        for paragraph in result["paragraphs"]:
+            span = paragraph["spans"][0]
+            self.assertEqual(paragraph["content"], result["content"][span["offset"]:span["offset"] + span["length"]])
+
+        self.assertEqual(6, len(result["sections"]))
+        self.assertEqual(["/sections/3"], result["sections"][2]["elements"])
+        self.assertEqual(["/paragraphs/2", "/paragraphs/3", "/figures/2", "/figures/3"], result["sections"][3]["elements"])
+
+    def test_extract_small_pdf_at_once(self):
+        # Given
+        inner = FakePageExtractor()
+        extractor = sharding_document_extractor.ShardingDocumentExtractor(inner, pages_per_shard=2)
+
+        # When
+        result = extractor.extract(io.BytesIO(create_pdf(2)))
+
+        # Then
+        self.assertEqual([2], inner.page_counts)
+        self.assertEqual(2, len(result["paragraphs"]))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,72 @@
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+
+SRC_DIR = os.path.abspath(
+    os.path.join(
+        os.path.dirname(__file__),
+        '../src'
+    )
+)
+
+# Packages which are imported only when the first document needs them.
+HEAVY_MODULES = ["aiohttp", "azure", "fitz", "httpx", "langchain_core", "langchain_openai", "openai", "pymupdf", "requests"]
+
+RESOLVE_CONTROLLER = """
+import json
+import sys
+from injector import Injector
+import main
+from packages.dicontainer.di_container import DIContainer
+from packages.domain.document_extractor import DocumentExtractor
+from packages.domain.image_summarizer import ImageSummarizer
+from packages.presentation.document_convert_controller import DocumentConvertController
+from packages.infrastructure.rate_limiter import AdaptiveRateLimiter
+
+injector = Injector([DIContainer({arguments})])
+injector.get(DocumentConvertController)
+print(json.dumps({{
+    "extractor": type(injector.get(DocumentExtractor)).__name__,
+    "summarizer": type(injector.get(ImageSummarizer)).__name__,
+    "heavy": sorted({{name.split('.')[0] for name in sys.modules}} & set({heavy}))
+}}))
+"""
+
+class TestStartupImports(unittest.TestCase):
+    def resolve(self, arguments=""):
+        # A new interpreter, because other tests have imported the heavy packages into this one.
+        code = RESOLVE_CONTROLLER.format(arguments=arguments, heavy=HEAVY_MODULES)
+        output = subprocess.run([sys.executable, "-c", code], cwd=SRC_DIR, stdout=subprocess.PIPE, text=True, check=True).stdout
+        return json.loads(output.splitlines()[-1])
+
+    def test_default_configuration(self):
+        # When
+        resolved = self.resolve()
+
+        # Then
+        self.assertEqual("AzureDocumentExtractor", resolved["extractor"])
+        self.assertEqual("AzureOaiImgSummarizer", resolved["summarizer"])
+        self.assertEqual([], resolved["heavy"])
+
+    def test_all_options(self):
+        # Given
+        with tempfile.TemporaryDirectory() as tempdir:
+            arguments = (
+                f"analyze_cache_dir={os.path.join(tempdir, 'analyze')!r}, summary_cache_dir={os.path.join(tempdir, 'summary')!r}, "
+                "use_async=True, analyze_rate_limiter=AdaptiveRateLimiter(10), summary_rate_limiter=AdaptiveRateLimiter(10), "
+                f"analyze_shard_pages=100, metrics_log_path={os.path.join(tempdir, 'metrics.jsonl')!r}, profile_mode='sampling'"
+            )
+
+            # When
+            resolved = self.resolve(arguments)
+
+        # Then
+        self.assertEqual("CachedDocumentExtractor", resolved["extractor"])
+        self.assertEqual("CachedImageSummarizer", resolved["summarizer"])
+        self.assertEqual([], resolved["heavy"])
+
+if __name__ == '__main__':
+    unittest.main()